@@ -163,8 +163,10 @@ class ArcGisProAcquisitionSource(AcquisitionSource):
         )
         if not os.path.isfile(sPath):
             raise FileNotFoundError(f"Shape file not found: {sPath}")
-        region = ParseArea.fromJSONFile(sPath).getTotalRegion()
-        return ShapeTileFilter(self.cache_info, region)
+        area = ParseArea.fromJSONFile(sPath)
+        return ShapeTileFilter(
+            self.cache_info, area.getTotalRegion(), boundary=area.boundary()
+        )
 
     @staticmethod
     def _level_id_from_folder(level_folder: str) -> int:
@@ -208,6 +210,7 @@ class ArcGisProAcquisitionSource(AcquisitionSource):
         """
         tile_filter = self._build_tile_filter(shape_file)
         box = tile_filter.box if tile_filter is not None else None
+        area_mask = tile_filter.area_mask if tile_filter is not None else None
 
         row_dirs = discover_row_dirs(input_dir)
         if not row_dirs:
@@ -239,6 +242,7 @@ class ArcGisProAcquisitionSource(AcquisitionSource):
                 str(input_dir),
                 None,
                 self.extract_function,
+                area_mask,
             ),
         ) as executor:
             futures = [
@@ -307,11 +311,12 @@ class ArcGisProAcquisitionSource(AcquisitionSource):
         reintroduces passing per-tile data, which this design avoids.
         """
         # Build the shape filter in the main process only to extract the
-        # projected shape box (a picklable tuple).
+        # projected shape box (a picklable tuple) and outline mask.
         # Each worker rebuilds a transformer-free copy from the box via
         # ShapeTileFilter.from_box.
         tile_filter = self._build_tile_filter(shape_file)
         box = tile_filter.box if tile_filter is not None else None
+        area_mask = tile_filter.area_mask if tile_filter is not None else None
 
         out_path = Path(output_dir)
         out_path.mkdir(parents=True, exist_ok=True)
@@ -352,6 +357,7 @@ class ArcGisProAcquisitionSource(AcquisitionSource):
                     str(all_layers_dir),
                     str(out_path),
                     self.extract_function,
+                    area_mask,
                 ),
             ) as executor:
                 futures = [
@@ -0,0 +1,360 @@
+"""A local stand-in for an ArcGIS ImageServer, for offline benchmarks/tests.
+
+:class:`MockImageServer` serves ``exportImage`` for a synthetic raster that
+covers the whole Web Mercator plane -- ``format=png`` / ``pixelType=U8``
+(RGB imagery; ``jpg`` / ``jpgpng`` and ``png8`` also work) and
+``format=tiff`` / ``pixelType=F32`` (a georeferenced elevation GeoTIFF, as
+3DEP returns) -- plus the ``?f=json`` service info. It does not encode
+LERC, and says so in ``allowedCompressions``. With ``tile_levels`` the
+imagery also has a Web Mercator tile cache at those LODs, served as JPEG
+from ``/tile/{z}/{y}/{x}`` (404 at any other level).
+Every response can be delayed (``latency_s`` plus up to ``jitter_s``), and a
+seeded fraction answered ``500`` (``error_rate``) or ``429`` with
+``Retry-After`` (``throttle_rate``), so the download path's retries and
+adaptive concurrency see a server that behaves like USGS under load.
+
+It runs in a background thread on a free localhost port::
+
+    with MockImageServer(latency_s=0.05) as server:
+        service = server.service("imagery")  # ImageryService pointing at it
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+from PIL import Image as pImage
+
+from terrain_stitcher.arcgis.services import (
+    KIND_ELEVATION,
+    KIND_IMAGERY,
+    ImageryService,
+)
+
+# Web Mercator half-extent, the synthetic raster's bounds.
+_MERC_MAX = 20037508.342789244
+
+# Largest exportImage side the mock renders (ArcGIS's default maxImageWidth).
+MAX_IMAGE_PX = 4100
+
+# Native cell size (m) the mock advertises per kind.
+_NATIVE_PX_M = {KIND_IMAGERY: 0.6, KIND_ELEVATION: 10.0}
+
+_SERVICE_PATH = "/arcgis/rest/services/Mock/ImageServer"
+
+
+def render_rgb(bbox: tuple, width: int, height: int) -> np.ndarray:
+    """``height x width x 3`` uint8 pixels of the synthetic imagery over
+    *bbox* (EPSG:3857). A function of world position, so neighbouring
+    requests join seamlessly; the hashed low bits give PNG realistic
+    (photo-like, poorly compressible) sizes."""
+    xs, ys = _pixel_centres(bbox, width, height)
+    xi = np.floor(xs).astype(np.int64)
+    yi = np.floor(ys).astype(np.int64)
+    noise = ((xi * 73856093) ^ (yi * 19349663)) & 0x3F
+    rgb = np.stack(
+        [
+            (xs / 37.0) % 192 + noise,
+            (ys / 53.0) % 192 + noise,
+            ((xs + ys) / 71.0) % 192 + noise,
+        ],
+        axis=-1,
+    )
+    return rgb.astype(np.uint8)
+
+
+def render_elevation(bbox: tuple, width: int, height: int) -> np.ndarray:
+    """``height x width`` float32 synthetic elevations (m) over *bbox*."""
+    xs, ys = _pixel_centres(bbox, width, height)
+    return (300.0 + 50.0 * np.sin(xs / 500.0) * np.cos(ys / 700.0)).astype(
+        np.float32
+    )
+
+
+def _pixel_centres(bbox: tuple, width: int, height: int):
+    xmin, ymin, xmax, ymax = bbox
+    px = (xmax - xmin) / width
+    py = (ymax - ymin) / height
+    xs = xmin + (np.arange(width) + 0.5) * px
+    ys = ymax - (np.arange(height) + 0.5) * py
+    return np.meshgrid(xs, ys)
+
+
+def _encode_image(rgb: np.ndarray, img_format: str, quality: int) -> bytes:
+    """*rgb* in the exportImage *img_format* (``png8``, ``jpg``,
+    ``jpgpng``; anything else as PNG). The synthetic imagery has no
+    transparency, so ``jpgpng`` is always JPEG."""
+    img = pImage.fromarray(rgb, "RGB")
+    buf = io.BytesIO()
+    if img_format in ("jpg", "jpgpng"):
+        img.save(buf, format="JPEG", quality=quality)
+    elif img_format == "png8":
+        img.quantize(256).save(buf, format="PNG")
+    else:
+        img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _encode_f32_tiff(values: np.ndarray, bbox: tuple, srs: int) -> bytes:
+    import rasterio
+    from rasterio.io import MemoryFile
+    from rasterio.transform import from_bounds
+
+    height, width = values.shape
+    with MemoryFile() as mem:
+        with mem.open(
+            driver="GTiff",
+            width=width,
+            height=height,
+            count=1,
+            dtype="float32",
+            crs=rasterio.crs.CRS.from_epsg(srs),
+            transform=from_bounds(*bbox, width, height),
+        ) as ds:
+            ds.write(values, 1)
+        return mem.read()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format, *args) -> None:  # noqa: A002
+        pass
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path == _SERVICE_PATH + "/exportImage":
+            self._export(query)
+        elif url.path.startswith(_SERVICE_PATH + "/tile/"):
+            self._tile(url.path[len(_SERVICE_PATH + "/tile/") :].split("/"))
+        elif url.path == _SERVICE_PATH and query.get("f") == "json":
+            self._send(200, "application/json", json.dumps(self.server.mock.info()))
+        else:
+            self._send(404, "application/json", '{"error": {"code": 404}}')
+
+    def _failed(self) -> bool:
+        """Delay the request, then answer it with a drawn 429 / 500 (and
+        return True) if it is to fail."""
+        mock = self.server.mock
+        delay, outcome = mock._draw()
+        if delay:
+            time.sleep(delay)
+        if outcome == 429:
+            self._send(
+                429,
+                "text/plain",
+                "Too Many Requests",
+                {"Retry-After": str(mock.retry_after_s)},
+            )
+            return True
+        if outcome == 500:
+            self._send(500, "text/plain", "Internal Server Error")
+            return True
+        return False
+
+    def _tile(self, parts: list) -> None:
+        mock = self.server.mock
+        if self._failed():
+            return
+        try:
+            z, y, x = (int(p) for p in parts)
+        except ValueError:
+            z = y = x = -1
+        if z not in mock.tile_levels or not (0 <= x < 2**z and 0 <= y < 2**z):
+            self._send(404, "application/json", '{"error": {"code": 404}}')
+            return
+        tile_m = 2 * _MERC_MAX / 2**z
+        bbox = (
+            -_MERC_MAX + x * tile_m,
+            _MERC_MAX - (y + 1) * tile_m,
+            -_MERC_MAX + (x + 1) * tile_m,
+            _MERC_MAX - y * tile_m,
+        )
+        body = _encode_image(render_rgb(bbox, 256, 256), "jpg", 75)
+        self._send(200, "image/jpeg", body)
+        mock._sent(len(body))
+
+    def _export(self, query: dict) -> None:
+        mock = self.server.mock
+        if self._failed():
+            return
+        try:
+            bbox = tuple(float(v) for v in query["bbox"].split(","))
+            width, height = (int(v) for v in query["size"].split(","))
+            srs = int(query.get("imageSR", 3857))
+            if len(bbox) != 4 or not (
+                0 < width <= MAX_IMAGE_PX and 0 < height <= MAX_IMAGE_PX
+            ):
+                raise ValueError("bad bbox/size")
+        except (KeyError, ValueError) as e:
+            body = json.dumps({"error": {"code": 400, "message": str(e)}})
+            self._send(400, "application/json", body)
+            return
+        if query.get("pixelType") == "F32" or query.get("format") == "tiff":
+            content_type = "image/tiff"
+            body = _encode_f32_tiff(render_elevation(bbox, width, height), bbox, srs)
+        else:
+            img_format = query.get("format", "png")
+            jpeg = img_format.startswith("jpg")
+            content_type = "image/jpeg" if jpeg else "image/png"
+            body = _encode_image(
+                render_rgb(bbox, width, height),
+                img_format,
+                int(query.get("compressionQuality", 75)),
+            )
+        self._send(200, content_type, body)
+        mock._sent(len(body))
+
+    def _send(self, status: int, content_type: str, body, headers=None) -> None:
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    mock: "MockImageServer"
+
+
+class MockImageServer:
+    """A threaded localhost ImageServer; use as a context manager or call
+    :meth:`start` / :meth:`stop`.
+
+    ``requests``, ``errors``, ``throttled`` and ``bytes_sent`` count the
+    ``exportImage`` and tile traffic served so far.
+    """
+
+    def __init__(
+        self,
+        latency_s: float = 0.0,
+        jitter_s: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after_s: int = 1,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        tile_levels=(),
+    ) -> None:
+        if not 0.0 <= error_rate + throttle_rate <= 1.0:
+            raise ValueError("error_rate + throttle_rate must be within [0, 1]")
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after_s = retry_after_s
+        self.tile_levels = sorted(tile_levels)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._address = (host, port)
+        self._httpd: _Server | None = None
+        self._thread: threading.Thread | None = None
+        self.requests = self.errors = self.throttled = self.bytes_sent = 0
+
+    def __enter__(self) -> "MockImageServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._httpd = _Server(self._address, _Handler)
+        self._httpd.mock = self
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="mock-image-server", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{_SERVICE_PATH}"
+
+    def service(self, kind: str = KIND_IMAGERY) -> ImageryService:
+        """An :class:`ImageryService` for this server's *kind* layer."""
+        return ImageryService(
+            key=f"mock_{kind}",
+            label=f"Mock {kind}",
+            base_url=f"{self.base_url}/exportImage",
+            native_pixel_size_m=_NATIVE_PX_M[kind],
+            srs=3857,
+            coverage=(-85.0, -180.0, 85.0, 180.0),
+            kinds=[kind],
+            tile_levels=self.tile_levels if kind == KIND_IMAGERY else [],
+            max_image_width=MAX_IMAGE_PX,
+            max_image_height=MAX_IMAGE_PX,
+        )
+
+    def info(self) -> dict:
+        """The ``?f=json`` service description."""
+        info = {
+            "name": "Mock",
+            "serviceDataType": "esriImageServiceDataTypeGeneric",
+            "pixelSizeX": _NATIVE_PX_M[KIND_IMAGERY],
+            "pixelSizeY": _NATIVE_PX_M[KIND_IMAGERY],
+            "maxImageWidth": MAX_IMAGE_PX,
+            "maxImageHeight": MAX_IMAGE_PX,
+            "allowedCompressions": "None,JPEG,LZ77",
+            "extent": {
+                "xmin": -_MERC_MAX,
+                "ymin": -_MERC_MAX,
+                "xmax": _MERC_MAX,
+                "ymax": _MERC_MAX,
+                "spatialReference": {"wkid": 102100, "latestWkid": 3857},
+            },
+        }
+        if self.tile_levels:
+            info["singleFusedMapCache"] = True
+            info["tileInfo"] = {
+                "rows": 256,
+                "cols": 256,
+                "format": "JPEG",
+                "origin": {"x": -_MERC_MAX, "y": _MERC_MAX},
+                "spatialReference": {"wkid": 102100, "latestWkid": 3857},
+                "lods": [
+                    {"level": z, "resolution": 2 * _MERC_MAX / 256 / 2**z}
+                    for z in self.tile_levels
+                ],
+            }
+        return info
+
+    def _draw(self) -> tuple[float, int | None]:
+        """``(delay_s, outcome)`` for the next exportImage or tile request."""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency_s + self._rng.uniform(0.0, self.jitter_s)
+            r = self._rng.random()
+            if r < self.throttle_rate:
+                self.throttled += 1
+                return delay, 429
+            if r < self.throttle_rate + self.error_rate:
+                self.errors += 1
+                return delay, 500
+        return delay, None
+
+    def _sent(self, nbytes: int) -> None:
+        with self._lock:
+            self.bytes_sent += nbytes
@@ -16,6 +16,12 @@ KIND_IMAGERY = "imagery"
 KIND_ELEVATION = "elevation"
 DEFAULT_KINDS = (KIND_IMAGERY,)
 
+# The ArcGIS Online / Google / Bing Web Mercator tiling scheme: 256 px tiles
+# from the upper-left corner of the EPSG:3857 plane, LOD 0 at this m/px.
+_WEBMERC_ORIGIN = (-20037508.342787, 20037508.342787)
+_WEBMERC_LOD0_M = 156543.03392804097
+_WEBMERC_WKIDS = {3857, 102100, 102113, 900913}
+
 
 @dataclass(frozen=True)
 class ImageryService:
@@ -31,6 +37,16 @@ class ImageryService:
     ``download-arcgis``, elevation services by ``download-elevation``. It
     defaults to ``["imagery"]`` so legacy cache entries (written before this
     field existed) keep resolving as imagery-only.
+
+    ``tile_levels`` lists the LODs of the layer's tile cache, when it has one
+    on the standard Web Mercator 256 px scheme (the XYZ tile grid); those
+    levels can be fetched pre-rendered from ``/tile/{z}/{y}/{x}`` instead of
+    through ``exportImage``. Empty for dynamic-only services and for cache
+    entries written before this field existed.
+
+    ``max_image_width`` / ``max_image_height`` are the largest exportImage
+    request the server renders (``maxImageWidth`` / ``maxImageHeight``), the
+    upper bound of ``--chunk-px auto``; ``None`` when not recorded.
     """
 
     key: str
@@ -40,6 +56,9 @@ class ImageryService:
     srs: int
     coverage: tuple[float, float, float, float]
     kinds: list[str] = field(default_factory=lambda: list(DEFAULT_KINDS))
+    tile_levels: list[int] = field(default_factory=list)
+    max_image_width: int | None = None
+    max_image_height: int | None = None
 
     @classmethod
     def from_dict(cls, d: dict) -> "ImageryService":
@@ -55,6 +74,9 @@ class ImageryService:
             srs=int(d["srs"]),
             coverage=(float(cov[0]), float(cov[1]), float(cov[2]), float(cov[3])),
             kinds=list(kinds),
+            tile_levels=[int(z) for z in d.get("tile_levels") or ()],
+            max_image_width=_optional_int(d.get("max_image_width")),
+            max_image_height=_optional_int(d.get("max_image_height")),
         )
 
     def to_dict(self) -> dict:
@@ -65,6 +87,14 @@ class ImageryService:
     def supports_kind(self, kind: str) -> bool:
         return kind in self.kinds
 
+    def has_tile_level(self, zoom: int) -> bool:
+        return zoom in self.tile_levels
+
+    def tile_url(self, zoom: int, x: int, y: int) -> str:
+        """URL of the cached XYZ tile *x*, *y* at *zoom* (ArcGIS orders
+        the path level / row / column)."""
+        return f"{_endpoint_url(self.base_url)}/tile/{zoom}/{y}/{x}"
+
     def contains_point(self, lat: float, lon: float) -> bool:
         min_lat, min_lon, max_lat, max_lon = self.coverage
         return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
@@ -114,7 +144,7 @@ def _kind_label(kind: str) -> str:
     return kind or "imagery"
 
 
-def _covering_services(
+def covering_services(
     services: dict[str, ImageryService],
     aoi_bbox: tuple[float, float, float, float],
     kind: str = KIND_IMAGERY,
@@ -181,7 +211,7 @@ def select_service(
     if the AOI extends outside every covering service, or if ``index`` is
     out of range.
     """
-    candidates = _covering_services(services, aoi_bbox, kind=kind)
+    candidates = covering_services(services, aoi_bbox, kind=kind)
     if index is not None:
         if not (0 <= index < len(candidates)):
             raise ValueError(
@@ -196,6 +226,70 @@ def select_service(
     raise AmbiguousServiceError(candidates, kind=kind)
 
 
+def _split_services(
+    services: dict[str, ImageryService],
+    aoi_bbox: tuple[float, float, float, float],
+    kind: str = KIND_IMAGERY,
+) -> list[ImageryService]:
+    """The services of *kind* whose coverages together cover an AOI that no
+    single one covers, or ``[]`` when they cannot (or one covers it alone).
+
+    Services are taken greedily by how much of the still-uncovered AOI they
+    cover (ties by ``key``), and ones adding nothing are left out. The
+    order is also each chunk's priority where coverages overlap (see
+    :func:`ServiceSplit.split_chunks`).
+    """
+    import shapely
+
+    min_lat, min_lon, max_lat, max_lon = aoi_bbox
+    uncovered = shapely.box(min_lon, min_lat, max_lon, max_lat)
+    boxes = {}
+    for s in sorted(services.values(), key=lambda s: s.key):
+        if not s.supports_kind(kind):
+            continue
+        c_min_lat, c_min_lon, c_max_lat, c_max_lon = s.coverage
+        boxes[s.key] = (s, shapely.box(c_min_lon, c_min_lat, c_max_lon, c_max_lat))
+    if any(box.covers(uncovered) for _, box in boxes.values()):
+        return []
+
+    picked = []
+    while not uncovered.is_empty and boxes:
+        key, (service, box) = max(
+            boxes.items(), key=lambda kv: kv[1][1].intersection(uncovered).area
+        )
+        if not box.intersection(uncovered).area:
+            return []
+        picked.append(service)
+        uncovered = uncovered.difference(box)
+        del boxes[key]
+    return picked if uncovered.is_empty else []
+
+
+def select_services(
+    services: dict[str, ImageryService],
+    aoi_bbox: tuple[float, float, float, float],
+    index: int | None = None,
+    kind: str = KIND_IMAGERY,
+) -> list[ImageryService]:
+    """The services to download an AOI from: ``[select_service(...)]``, or
+    for an AOI that crosses the edge of every service's coverage (a county
+    on a state line), the services that together cover it (see
+    :func:`_split_services`), each downloading its own part.
+
+    Raises what :func:`select_service` raises when the AOI cannot be split
+    either.
+    """
+    try:
+        return [select_service(services, aoi_bbox, index=index, kind=kind)]
+    except AmbiguousServiceError:
+        raise
+    except ValueError:
+        parts = _split_services(services, aoi_bbox, kind=kind)
+        if not parts:
+            raise
+        return parts
+
+
 # --- Registry persistence ---------------------------------------------------
 
 
@@ -307,6 +401,42 @@ def _native_pixel_size(meta: dict) -> float:
     )
 
 
+def _optional_int(value) -> int | None:
+    return int(value) if value else None
+
+
+def _tile_cache_levels(meta: dict) -> list[int]:
+    """The LODs of the service's tile cache, if it is cut on the standard
+    Web Mercator 256 px scheme (so ``/tile/{z}/{y}/{x}`` is the XYZ tile
+    at ``z``); otherwise (no cache, another scheme, an elevation cache of
+    LERC tiles) an empty list. Levels whose resolution does not match the
+    scheme's are left out.
+    """
+    tile_info = meta.get("tileInfo")
+    if not tile_info or meta.get("singleFusedMapCache") is False:
+        return []
+    sr = tile_info.get("spatialReference") or {}
+    origin = tile_info.get("origin") or {}
+    if (
+        tile_info.get("rows") != 256
+        or tile_info.get("cols") != 256
+        or str(tile_info.get("format", "")).upper().startswith("LERC")
+        or not {sr.get("wkid"), sr.get("latestWkid")} & _WEBMERC_WKIDS
+        or abs(origin.get("x", 0.0) - _WEBMERC_ORIGIN[0]) > 1.0
+        or abs(origin.get("y", 0.0) - _WEBMERC_ORIGIN[1]) > 1.0
+    ):
+        return []
+    levels = []
+    for lod in tile_info.get("lods") or ():
+        level = lod.get("level")
+        if level is None or not lod.get("resolution"):
+            continue
+        expected = _WEBMERC_LOD0_M / 2**level
+        if abs(lod["resolution"] - expected) <= expected * 1e-3:
+            levels.append(int(level))
+    return sorted(levels)
+
+
 def _endpoint_url(item) -> str:
     """Normalize a scan-list entry to an ImageServer URL (strip a trailing
     ``/exportImage`` if present). Accepts a plain URL string or an object
@@ -369,7 +499,9 @@ def harvest_from_items(items, timeout: int = 30) -> dict:
     be registered with their real cell size.
 
     Each entry's ``fullExtent`` (coverage) is always read from the metadata;
-    only the resolution and capability kinds may be supplied statically. No
+    only the resolution and capability kinds may be supplied statically. So
+    are the levels of a Web Mercator tile cache (see
+    :func:`_tile_cache_levels`) and the largest image the service renders. No
     folder crawling, so the scan list is exactly the set of services to
     register.
     """
@@ -413,6 +545,9 @@ def harvest_from_items(items, timeout: int = 30) -> dict:
                 srs=srs,
                 coverage=cov,
                 kinds=kinds,
+                tile_levels=_tile_cache_levels(meta),
+                max_image_width=_optional_int(meta.get("maxImageWidth")),
+                max_image_height=_optional_int(meta.get("maxImageHeight")),
             ).to_dict()
         )
     return {"services": services, "_endpoints": endpoints}
@@ -439,6 +574,26 @@ def harvest_from_file(path, timeout: int = 30) -> dict:
     return harvest_from_items(items, timeout=timeout)
 
 
+def service_info(service: ImageryService, timeout: int = 30) -> dict:
+    """The ``?f=json`` metadata of *service*'s ImageServer resource.
+
+    Raises ``requests.RequestException`` on a transport failure and
+    ``ValueError`` on a response that is not a JSON service description.
+    """
+    import requests
+
+    resp = requests.get(
+        _endpoint_url(service.base_url), params={"f": "json"}, timeout=timeout
+    )
+    resp.raise_for_status()
+    info = resp.json()
+    if not isinstance(info, dict) or "error" in info:
+        raise ValueError(
+            f"no service description for {service.key}: {str(info)[:300]}"
+        )
+    return info
+
+
 def refresh_services(timeout: int = 30, from_file=None) -> Path:
     """Fetch each endpoint's metadata and write the resolved registry to the
     user cache dir so ``load_services`` picks it up on subsequent runs.
@@ -6,7 +6,7 @@ import pyproj
 from terrain_stitcher.arcgis.tile_scheme import TileSchemeInfo
 from terrain_stitcher.arcgis.tile_info import TileInfo
 from terrain_stitcher.arcgis.tile_bounds import TileFootprints
-from terrain_stitcher.common import World_Bounding_Box
+from terrain_stitcher.common import AreaMask, World_Bounding_Box
 
 
 class ShapeTileFilter:
@@ -21,7 +21,9 @@ class ShapeTileFilter:
     A tile is included if ANY part of it falls within the shape bounds -- i.e.
     overlap, not full containment. The overlap test uses closed intervals, so a
     tile that merely shares an edge or a corner with the shape region is still
-    included.
+    included. With a ``boundary`` (the lon/lat outline of a CIRCLE / POLYGON
+    Shape.json, :meth:`ParseArea.boundary`) a tile must also touch that
+    outline, tested against its projection (an :class:`AreaMask`).
 
     Two entry points are provided:
 
@@ -40,6 +42,7 @@ class ShapeTileFilter:
         self,
         cache_info: TileSchemeInfo,
         region: World_Bounding_Box,
+        boundary=None,
     ) -> None:
         self._cache = cache_info
         self._res_by_id = {lvl.level_id: lvl.resolution for lvl in cache_info.levels}
@@ -55,14 +58,29 @@ class ShapeTileFilter:
         min_x, min_y = to_cache.transform(ll.get_lon(), ll.get_lat())
         max_x, max_y = to_cache.transform(ur.get_lon(), ur.get_lat())
         self._box = (min_x, min_y, max_x, max_y)
+        self._area_mask = (
+            AreaMask.from_lonlat(boundary, cache_info.pyproj_epsg)
+            if boundary is not None
+            else None
+        )
 
     @property
     def box(self) -> tuple:
         """Projected (min_x, min_y, max_x, max_y) shape region in cache CRS."""
         return self._box
 
+    @property
+    def area_mask(self) -> AreaMask | None:
+        """The projected AOI outline, or None when the box is the AOI."""
+        return self._area_mask
+
     @classmethod
-    def from_box(cls, cache_info: TileSchemeInfo, box: tuple) -> "ShapeTileFilter":
+    def from_box(
+        cls,
+        cache_info: TileSchemeInfo,
+        box: tuple,
+        area_mask: AreaMask | None = None,
+    ) -> "ShapeTileFilter":
         """Build a filter from a precomputed projected box, no Transformer.
 
         ``__init__`` builds a pyproj Transformer only to project the shape
@@ -71,12 +89,14 @@ class ShapeTileFilter:
         reconstruct a fully-functional filter from just the box + cache_info:
         ``mask`` only needs ``_box`` and ``_res_by_id``, never the transformer.
         Bypassing ``__init__`` keeps the non-picklable transformer out of the
-        worker's pickle path.
+        worker's pickle path. The (picklable) *area_mask* comes along the
+        same way.
         """
         f = cls.__new__(cls)
         f._cache = cache_info
         f._res_by_id = {lvl.level_id: lvl.resolution for lvl in cache_info.levels}
         f._box = box
+        f._area_mask = area_mask
         return f
 
     def __call__(self, tile: TileInfo) -> bool:
@@ -100,7 +120,11 @@ class ShapeTileFilter:
         # tile footprint [x0, x1] x [y1, y0]; shape box [min_x, max_x] x [min_y, max_y].
         # Closed-interval AABB overlap: include if the two rectangles share any
         # point (so a shared edge/corner counts), not just positive-area overlap.
-        return (x0 <= max_x) and (x1 >= min_x) and (y1 <= max_y) and (y0 >= min_y)
+        if not ((x0 <= max_x) and (x1 >= min_x) and (y1 <= max_y) and (y0 >= min_y)):
+            return False
+        if self._area_mask is None:
+            return True
+        return bool(self._area_mask.intersects(x0, y1, x1, y0))
 
     def mask(self, footprints: TileFootprints) -> np.ndarray:
         """Vectorized closed-interval AABB overlap test over ``footprints``.
@@ -124,4 +148,9 @@ class ShapeTileFilter:
         x1 = np.asarray(footprints.east_x)
         y0 = np.asarray(footprints.north_y)
         y1 = np.asarray(footprints.south_y)
-        return (x0 <= max_x) & (x1 >= min_x) & (y1 <= max_y) & (y0 >= min_y)
+        keep = (x0 <= max_x) & (x1 >= min_x) & (y1 <= max_y) & (y0 >= min_y)
+        if self._area_mask is not None and keep.any():
+            # Only the tiles already inside the box go to the outline test.
+            idx = np.flatnonzero(keep)
+            keep[idx] = self._area_mask.intersects(x0[idx], y1[idx], x1[idx], y0[idx])
+        return keep
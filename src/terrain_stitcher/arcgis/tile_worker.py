@@ -8,6 +8,7 @@ from terrain_stitcher.arcgis.bounded_tile_info import BoundedTileInfo
 from terrain_stitcher.arcgis.tile_files import gather_tile_files
 from terrain_stitcher.arcgis.tile_zip import process_tile
 from terrain_stitcher.arcgis.tile_scheme import TileSchemeInfo
+from terrain_stitcher.common import AreaMask
 import numpy as np
 
 # --- worker-process state --------------------------------------------------
@@ -31,12 +32,14 @@ def _init_worker(
     all_layers_dir: str,
     output_dir: str,
     extract_lat_lon_from_path_function: Callable,
+    area_mask: Optional[AreaMask] = None,
 ) -> None:
     """Per-worker one-time setup, run by the pool's ``initializer``.
 
     Builds the (non-picklable) pyproj Transformer inside the worker so it is
     never sent across the process boundary; only picklable inputs
-    (``cache_info``, the projected shape box, paths) arrive via ``initargs``.
+    (``cache_info``, the projected shape box and outline, paths) arrive via
+    ``initargs``.
     """
     global _WORKER_CACHE, _WORKER_CALC, _WORKER_FILTER
     global _WORKER_ALL_LAYERS, _WORKER_OUT, _WORKER_EXTRACT_LAT_LON_FROM_PATH
@@ -44,7 +47,9 @@ def _init_worker(
     _WORKER_CACHE = cache_info
     _WORKER_CALC = TileBoundsCalculator(cache_info)
     _WORKER_FILTER = (
-        ShapeTileFilter.from_box(cache_info, box) if box is not None else None
+        ShapeTileFilter.from_box(cache_info, box, area_mask)
+        if box is not None
+        else None
     )
     _WORKER_ALL_LAYERS = all_layers_dir
     _WORKER_OUT = output_dir
@@ -13,7 +13,294 @@ from terrain_stitcher.functions import (
     main_arcgis_downloader,
     main_elevation,
     main_split_image,
+    main_benchmark_download,
 )
+from terrain_stitcher.functions.DownloadOptions import DownloadOptions
+from terrain_stitcher.functions.TransferFormat import (
+    TRANSFER_FORMATS,
+    parse_transfer_format,
+    transfer_format_kind,
+)
+
+
+def _chunk_px(value):
+    """argparse ``type`` for ``--chunk-px``: ``auto`` or a pixel count."""
+    if value == "auto":
+        return value
+    try:
+        px = int(value)
+    except ValueError:
+        px = 0
+    if px <= 0:
+        raise argparse.ArgumentTypeError(
+            f"expected 'auto' or a positive pixel count, got {value!r}"
+        )
+    return px
+
+
+def _service_index(value):
+    """argparse ``type`` for ``--service-index``: ``auto`` or an index."""
+    if value == "auto":
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected 'auto' or a candidate index, got {value!r}"
+        ) from None
+
+
+def _transfer_format(kinds):
+    """argparse ``type`` for a ``--transfer-format`` spec for one of *kinds*."""
+
+    def parse(spec):
+        try:
+            spec = parse_transfer_format(spec)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e)) from None
+        if transfer_format_kind(spec) not in kinds:
+            names = [n for kind in kinds for n in TRANSFER_FORMATS[kind]]
+            raise argparse.ArgumentTypeError(
+                f"{spec} is not a format for this command; expected one of {names}"
+            )
+        return spec
+
+    return parse
+
+
+def _download_options(args) -> DownloadOptions:
+    """The :class:`DownloadOptions` of a ``download-arcgis``,
+    ``download-elevation`` or ``process-terrain`` command line."""
+    return DownloadOptions(
+        engine=args.engine,
+        adaptive=args.adaptive,
+        max_workers=args.max_workers,
+        # download-elevation has no --world-file.
+        world_file=getattr(args, "world_file", False),
+        deep_verify=args.deep_verify,
+        tile_store=args.tile_store,
+        tile_store_max_gb=args.tile_store_max_gb,
+        metrics_csv=args.metrics_csv,
+        breaker_threshold=args.breaker_threshold,
+        chunk_deadline_s=args.chunk_deadline,
+        run_deadline_s=args.run_deadline,
+        write_workers=args.write_workers,
+        order=args.order,
+        preview_s=args.preview,
+        chunk_compression=args.chunk_compression,
+        transfer_formats=args.transfer_format,
+        failover=args.failover,
+    )
+
+
+# --transfer-format choices per download kind, for its help.
+_TRANSFER_FORMAT_HELP = {
+    "imagery": (
+        "'png' (default), 'png8' (paletted), 'jpg[:QUALITY]' (JPEG, quality "
+        "1-100, default 85) or 'jpgpng[:QUALITY]' (JPEG, PNG where the chunk "
+        "has transparent pixels); JPEG is several times smaller than PNG on "
+        "the wire and on disk"
+    ),
+    "elevation": (
+        "'tiff' (F32 GeoTIFF, default) or 'lerc[:MAX_ERROR]' (LERC, lossy to "
+        "at most MAX_ERROR metres per pixel, default 0.01; 0 is lossless), "
+        "typically several times smaller than the TIFF"
+    ),
+}
+
+
+def _add_download_options_args(parser, kinds):
+    """Add the flags read by :func:`_download_options` to *parser*, for a
+    command that downloads the *kinds* (``"imagery"``, ``"elevation"``)."""
+    parser.add_argument(
+        "--engine",
+        choices=["thread", "async"],
+        default="thread",
+        help=(
+            "Download transport (default: thread). 'thread' fetches chunks on "
+            "-w/--workers blocking threads; 'async' drives them from one "
+            "asyncio event loop, where -w is the number of in-flight requests "
+            "and can be set in the thousands. 'async' requires aiohttp "
+            "(pip install terrain_stitcher[async])."
+        ),
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help=(
+            "Adapt the number of in-flight requests to the server instead of "
+            "holding -w/--workers fixed. Starts at -w, widens while latency "
+            "and error rate stay healthy, halves on HTTP 429/503, honours "
+            "Retry-After and jitters retry backoff. The current concurrency "
+            "and throughput are shown on the progress bar."
+        ),
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=None,
+        help=(
+            "Ceiling for --adaptive concurrency (default: 4x -w/--workers)."
+        ),
+    )
+    parser.add_argument(
+        "--deep-verify",
+        action="store_true",
+        help=(
+            "On resume, decode every pixel of each chunk kept from the "
+            "previous run before reusing it. By default a kept chunk is only "
+            "checked against the size and CRC32 recorded when it was written, "
+            "which needs no decode."
+        ),
+    )
+    parser.add_argument(
+        "--tile-store",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="DIR",
+        help=(
+            "Keep every exportImage response in a persistent store shared by "
+            "all runs and AOIs, and read chunks from it before going to the "
+            "network. Responses the server sent an ETag/Last-Modified for are "
+            "revalidated with a conditional request. Without DIR the store "
+            "lives in the per-user cache directory. The chunk grid is snapped "
+            "to a global grid so overlapping AOIs share chunks, and "
+            "--chunk-px auto becomes a fixed 1024 so every run cuts the same "
+            "chunks."
+        ),
+    )
+    parser.add_argument(
+        "--tile-store-max-gb",
+        type=float,
+        default=50.0,
+        help=(
+            "Size cap of the --tile-store in GB; least recently used "
+            "responses are evicted beyond it (default: 50)."
+        ),
+    )
+    parser.add_argument(
+        "--metrics-csv",
+        action="store_true",
+        help=(
+            "Also log every exportImage request (status, time to first byte, "
+            "latency, bytes, retries) to download_requests.csv next to the "
+            "chunk manifest. A download_metrics.json summary (MB/s, latency "
+            "and write-time percentiles) is always written there. Both are "
+            "moved to the output when a run completes and the chunk "
+            "directory is removed."
+        ),
+    )
+    parser.add_argument(
+        "--breaker-threshold",
+        type=int,
+        default=20,
+        help=(
+            "Consecutive failed requests (across all workers) that open the "
+            "circuit breaker: no new requests are sent, failures stop using "
+            "up chunks' retries, and one probe request is sent every 30 s "
+            "(doubling to 5 min) until the server answers again. After 6 "
+            "failed probes in a row (about 17 min) it gives up and failures "
+            "use up retries again. 0 disables it (default: 20)."
+        ),
+    )
+    parser.add_argument(
+        "--chunk-deadline",
+        type=float,
+        default=None,
+        help=(
+            "Seconds a chunk may take from its first attempt, waits on an "
+            "open circuit included, before it is marked failed (default: "
+            "no deadline)."
+        ),
+    )
+    parser.add_argument(
+        "--run-deadline",
+        type=float,
+        default=None,
+        help=(
+            "Seconds the whole download may take. Chunks not fetched by then "
+            "are left for the next run rather than marked failed (default: "
+            "no deadline)."
+        ),
+    )
+    parser.add_argument(
+        "--failover",
+        action="store_true",
+        help=(
+            "Re-fetch the chunks that fail from the other services covering "
+            "the AOI at an equivalent resolution, best ranked first (probed "
+            "like --service-index auto), instead of leaving gaps."
+        ),
+    )
+    parser.add_argument(
+        "--write-workers",
+        type=int,
+        default=None,
+        help=(
+            "Threads that georeference and write downloaded chunks, a "
+            "pipeline stage separate from the -w download workers so disk "
+            "and GDAL work neither holds up requests nor is limited by them "
+            "(default: one per CPU core)."
+        ),
+    )
+    parser.add_argument(
+        "--order",
+        choices=["row", "spiral", "hilbert"],
+        default="row",
+        help=(
+            "Order the chunks are downloaded in: grid rows (default), "
+            "'spiral' outwards from the AOI centre so an interrupted run has "
+            "the middle, or 'hilbert' along a Hilbert curve for locality."
+        ),
+    )
+    parser.add_argument(
+        "--preview",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help=(
+            "Every SECONDS, save a low-resolution preview.png (with world "
+            "file) of the chunks downloaded so far next to the chunk "
+            "manifest."
+        ),
+    )
+    parser.add_argument(
+        "--chunk-compression",
+        choices=["none", "deflate", "zstd", "lerc"],
+        default="none",
+        help=(
+            "How chunk GeoTIFFs are stored in the scratch directory: 'none' "
+            "(GDAL defaults; elevation chunks as the server sent them), or "
+            "tiled with DEFLATE or ZSTD plus a predictor, or lossless LERC "
+            "for F32 elevation (imagery falls back to DEFLATE). Several "
+            "times less scratch disk; 'zstd' decodes fastest (default: none)."
+        ),
+    )
+    parser.add_argument(
+        "--transfer-format",
+        nargs="+",
+        type=_transfer_format(kinds),
+        default=None,
+        metavar="SPEC",
+        help=(
+            "exportImage format to download chunks in, at most one per kind: "
+            + "; or ".join(_TRANSFER_FORMAT_HELP[kind] for kind in kinds)
+            + ". Checked against the service's allowedCompressions before "
+            "the download starts."
+        ),
+    )
+    if "imagery" in kinds:
+        parser.add_argument(
+            "--world-file",
+            action="store_true",
+            help=(
+                "Keep each exportImage PNG exactly as the server sent it "
+                "and georeference it with .pgw/.aux.xml sidecar files written "
+                "from the chunk grid, instead of re-encoding every chunk as a "
+                "GeoTIFF. Removes all pixel transcoding before tiling."
+            ),
+        )
 
 
 def addCreateBoundsGeneratorArgs(subparser):
@@ -24,8 +311,9 @@ def addCreateBoundsGeneratorArgs(subparser):
             "Generate a Shape.json bounds file that every other command uses "
             "to define the area of interest (AOI). The bounds are computed as "
             "a square region centered on -lat/-lon and sized by "
-            "-vd/--viewDistance (radius in miles). The file is written to "
-            "Shape.json in the current working directory."
+            "-vd/--viewDistance (radius in miles), a circle of that radius, "
+            "or the outline of a GeoJSON polygon (--polygon). The file is "
+            "written to Shape.json in the current working directory."
         ),
     )
 
@@ -51,9 +339,23 @@ def addCreateBoundsGeneratorArgs(subparser):
         "-t",
         "--type",
         help=(
-            "Type of generation approach to use. Currently only 'POINT' is "
-            "supported: it creates a square bounding box around the center "
-            "point using --viewDistance as the radius."
+            "Type of generation approach to use. 'POINT' creates a square "
+            "bounding box around the center point using --viewDistance as the "
+            "radius. 'CIRCLE' keeps only the circle of that radius: downloads "
+            "and tile filters skip chunks and tiles wholly outside it. "
+            "'POLYGON' does the same for the outline read from --polygon "
+            "(-lat/-lon/-vd are then optional and default to the square "
+            "around the polygon)."
+        ),
+    )
+    parserGenerate.add_argument(
+        "--polygon",
+        default=None,
+        metavar="FILE",
+        help=(
+            "GeoJSON file (a Polygon/MultiPolygon geometry, Feature or "
+            "FeatureCollection, in WGS84 lon/lat) whose outline is the AOI "
+            "for -t POLYGON. It is stored in Shape.json as 'polygon'."
         ),
     )
     parserGenerate.add_argument(
@@ -66,7 +368,8 @@ def addCreateBoundsGeneratorArgs(subparser):
             "10). The radius is converted to degrees (lat offset = miles / 69; "
             "lon offset is additionally divided by cos(latitude)) and the "
             "resulting square region is written to Shape.json as "
-            "'view_distance'."
+            "'view_distance'. For -t POLYGON it defaults to, and is raised to "
+            "at least, the radius of the square covering the polygon."
         ),
     )
 
@@ -313,14 +616,19 @@ def addDownloadArcgisArgs(subparser):
     )
     parserGenerate.add_argument(
         "--chunk-px",
-        type=int,
-        default=256,
+        type=_chunk_px,
+        default="auto",
         help=(
-            "Pixels per exportImage request chunk (default: 256). The AOI is "
-            "split into a grid of square chunks of this many pixels; larger "
-            "chunks mean fewer requests but larger responses."
+            "Pixels per exportImage request chunk, or 'auto' (default). The "
+            "AOI is split into a grid of square chunks of this many pixels; "
+            "larger chunks mean fewer requests but larger responses. 'auto' "
+            "picks the largest multiple of 256 within the service's "
+            "maxImageWidth/Height, a 1 GB memory budget and the request "
+            "timeout (from a few timed probe requests), keeping two chunks "
+            "per worker; it is saved with the chunk manifest for resumes."
         ),
     )
+    _add_download_options_args(parserGenerate, ["imagery"])
     parserGenerate.add_argument(
         "--timeout",
         type=int,
@@ -367,13 +675,15 @@ def addDownloadArcgisArgs(subparser):
     parserGenerate.set_defaults(xyz=True)
     parserGenerate.add_argument(
         "--service-index",
-        type=int,
+        type=_service_index,
         default=None,
         help=(
             "When several imagery services cover the AOI, pick one by its "
-            "0-based index in the printed candidate list. Only needed when "
-            "more than one registered service fully covers the AOI; run "
-            "without it to print the candidates and their native resolutions."
+            "0-based index in the printed candidate list, or 'auto' to probe "
+            "each with a few sample requests and use the fastest healthy "
+            "one. Only needed when more than one registered service fully "
+            "covers the AOI; run without it to print the candidates and "
+            "their native resolutions."
         ),
     )
     parserGenerate.add_argument(
@@ -383,6 +693,52 @@ def addDownloadArcgisArgs(subparser):
         default=False,
         help="Flag to set downloader to skip processing raw downloaded chunks",
     )
+    parserGenerate.add_argument(
+        "--tile-aligned",
+        action="store_true",
+        help=(
+            "Snap the download grid to the LOD's XYZ tile boundaries and cut "
+            "each exportImage response straight into <z>/<x>/<y>.png tiles, "
+            "skipping the mosaic VRT and the gdal2tiles resample. Requires "
+            "--chunk-px to be a multiple of 256; only the requested LOD is "
+            "written. --world-file and --skip_mosaic have no effect with it."
+        ),
+    )
+    parserGenerate.add_argument(
+        "--no-tile-cache",
+        action="store_true",
+        help=(
+            "Render every chunk with exportImage even when the service has a "
+            "Web Mercator tile cache at --lod. By default such a service's "
+            "pre-rendered tiles are copied straight into <z>/<x>/<y>.png "
+            "(as with --tile-aligned), which is much faster and less "
+            "throttled; the cache may hold older imagery than the live "
+            "mosaic, though."
+        ),
+    )
+    parserGenerate.add_argument(
+        "--pyramid-lods",
+        type=int,
+        nargs="+",
+        default=None,
+        help=(
+            "Lower zoom levels to build in-process from the downloaded --lod "
+            "tiles, each by 2x2 reduction of the level above with --resampling "
+            "(e.g. --lod 19 --pyramid-lods 17 18). Levels in between that are "
+            "not listed are built as intermediates and kept (see "
+            "--drop-intermediate). Resumable: existing tiles are skipped."
+        ),
+    )
+    parserGenerate.add_argument(
+        "--drop-intermediate",
+        action="store_true",
+        default=False,
+        help=(
+            "With --pyramid-lods, delete each intermediate level that is not "
+            "listed as soon as the level below it is built, to cap scratch "
+            "disk. A later re-run then has to rebuild those levels."
+        ),
+    )
 
 
 def addDownloadElevationArgs(subparser):
@@ -437,14 +793,19 @@ def addDownloadElevationArgs(subparser):
     )
     parserGenerate.add_argument(
         "--chunk-px",
-        type=int,
-        default=256,
+        type=_chunk_px,
+        default="auto",
         help=(
-            "Pixels per exportImage request chunk (default: 256). The AOI is "
-            "split into a grid of square chunks of this many pixels; larger "
-            "chunks mean fewer requests but larger responses."
+            "Pixels per exportImage request chunk, or 'auto' (default). The "
+            "AOI is split into a grid of square chunks of this many pixels; "
+            "larger chunks mean fewer requests but larger responses. 'auto' "
+            "picks the largest multiple of 256 within the service's "
+            "maxImageWidth/Height, a 1 GB memory budget and the request "
+            "timeout (from a few timed probe requests), keeping two chunks "
+            "per worker; it is saved with the chunk manifest for resumes."
         ),
     )
+    _add_download_options_args(parserGenerate, ["elevation"])
     parserGenerate.add_argument(
         "--timeout",
         type=int,
@@ -468,13 +829,15 @@ def addDownloadElevationArgs(subparser):
     )
     parserGenerate.add_argument(
         "--service-index",
-        type=int,
+        type=_service_index,
         default=None,
         help=(
             "When several elevation services cover the AOI, pick one by its "
-            "0-based index in the printed candidate list. Only needed when "
-            "more than one registered service fully covers the AOI; run "
-            "without it to print the candidates and their native resolutions."
+            "0-based index in the printed candidate list, or 'auto' to probe "
+            "each with a few sample requests and use the fastest healthy "
+            "one. Only needed when more than one registered service fully "
+            "covers the AOI; run without it to print the candidates and "
+            "their native resolutions."
         ),
     )
     parserGenerate.add_argument(
@@ -895,11 +1258,38 @@ def addProcessTerrainArgs(subparser):
     )
     parserGenerate.add_argument(
         "--chunk-px",
-        type=int,
-        default=256,
+        type=_chunk_px,
+        default="auto",
+        help=(
+            "Pixels per exportImage request chunk for the downloads, or "
+            "'auto' (default). Mirrors download-arcgis/download-elevation "
+            "--chunk-px."
+        ),
+    )
+    _add_download_options_args(parserGenerate, ["imagery", "elevation"])
+    parserGenerate.add_argument(
+        "--tile-aligned",
+        action="store_true",
+        help=(
+            "Download ortho tiles on the XYZ tile grid without gdal2tiles. "
+            "Mirrors download-arcgis --tile-aligned."
+        ),
+    )
+    parserGenerate.add_argument(
+        "--no-tile-cache",
+        action="store_true",
+        help="Never copy a service's cached tiles. Mirrors download-arcgis.",
+    )
+    parserGenerate.add_argument(
+        "--direct",
+        action="store_true",
         help=(
-            "Pixels per exportImage request chunk for the downloads (default: "
-            "256). Mirrors download-arcgis/download-elevation --chunk-px."
+            "Fetch each tier's gathered_r*_c* windows straight from "
+            "exportImage (as sub-requests up to the service's image size "
+            "limit) and write the "
+            "PNGs and height_info.json directly. No chunk files, mosaic, tile "
+            "pyramid or gather rescan; the download tuning flags other than "
+            "-w/--workers and --timeout do not apply."
         ),
     )
     parserGenerate.add_argument(
@@ -931,11 +1321,12 @@ def addProcessTerrainArgs(subparser):
     )
     parserGenerate.add_argument(
         "--service-index",
-        type=int,
+        type=_service_index,
         default=None,
         help=(
             "When several imagery/elevation services cover the AOI, pick one "
-            "by its 0-based index. Forwarded to both download-arcgis and "
+            "by its 0-based index, or 'auto' to probe them and use the best "
+            "ranked. Forwarded to both download-arcgis and "
             "download-elevation. Only needed when more than one registered "
             "service fully covers the AOI."
         ),
@@ -1014,6 +1405,113 @@ def addSplitImageArgs(subparser):
     )
 
 
+def addBenchmarkDownloadArgs(subparser):
+    parserGenerate = subparser.add_parser(
+        "benchmark-download",
+        help=(
+            "Benchmark the download -> mosaic -> tile pipeline against a local "
+            "mock ImageServer (offline)"
+        ),
+        description=(
+            "Starts a local stand-in ArcGIS ImageServer that serves exportImage "
+            "(PNG U8 imagery and TIFF F32 elevation) for a synthetic raster, "
+            "then times the download, mosaic and (with gdal2tiles installed) "
+            "tile stages for square AOIs of each --sizes and each --workers, "
+            "reporting chunks/s and MB/s. No network access is needed, so it "
+            "can run in CI: save a run with --json and compare later runs "
+            "with --baseline to catch download throughput regressions."
+        ),
+    )
+
+    parserGenerate.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[4, 16],
+        help="AOI sizes, in chunks per side (default: 4 16).",
+    )
+    parserGenerate.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[8, 32],
+        help="Worker counts to run every AOI size with (default: 8 32).",
+    )
+    parserGenerate.add_argument(
+        "--kinds",
+        nargs="+",
+        choices=["imagery", "elevation"],
+        default=["imagery", "elevation"],
+        help="Which pipelines to benchmark (default: both).",
+    )
+    parserGenerate.add_argument(
+        "--chunk-px",
+        type=int,
+        default=256,
+        help="Chunk size in pixels (default: 256).",
+    )
+    parserGenerate.add_argument(
+        "--engine",
+        choices=["thread", "async"],
+        default="thread",
+        help="Download engine to benchmark (default: thread).",
+    )
+    parserGenerate.add_argument(
+        "--latency",
+        type=float,
+        default=0.02,
+        help="Mock server delay before every response, seconds (default: 0.02).",
+    )
+    parserGenerate.add_argument(
+        "--jitter",
+        type=float,
+        default=0.01,
+        help="Extra random delay of up to this many seconds (default: 0.01).",
+    )
+    parserGenerate.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests the mock answers with HTTP 500 (default: 0).",
+    )
+    parserGenerate.add_argument(
+        "--throttle-rate",
+        type=float,
+        default=0.0,
+        help=(
+            "Fraction of requests the mock answers with HTTP 429 and "
+            "Retry-After (default: 0)."
+        ),
+    )
+    parserGenerate.add_argument(
+        "--no-tiles",
+        action="store_true",
+        help="Skip the gdal2tiles stage.",
+    )
+    parserGenerate.add_argument(
+        "--json",
+        default=None,
+        metavar="FILE",
+        help="Write the results to FILE, for use as a later --baseline.",
+    )
+    parserGenerate.add_argument(
+        "--baseline",
+        default=None,
+        metavar="FILE",
+        help=(
+            "Results of an earlier --json run. Exits non-zero when a case's "
+            "download chunks/s is more than --tolerance below it."
+        ),
+    )
+    parserGenerate.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed chunks/s drop against --baseline, as a fraction (default: 0.25).",
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(
         prog="TerrainStitcher",
@@ -1038,11 +1536,12 @@ def main():
     addPrepGeoArgs(subparser)
     addProcessTerrainArgs(subparser)
     addSplitImageArgs(subparser)
+    addBenchmarkDownloadArgs(subparser)
 
     args = parser.parse_args()
 
     if args.command == "create-bounds":
-        main_shape(args.lat, args.lon, args.type, args.viewDistance)
+        main_shape(args.lat, args.lon, args.type, args.viewDistance, args.polygon)
     elif args.command == "gather-ortho":
         if args.source == "arcgis":
             # The arcgis source folds prep-ortho + stitch-ortho into the
@@ -1112,6 +1611,11 @@ def main():
             processes=args.processes,
             service_index=args.service_index,
             skip_mosaic=args.skip_mosaic,
+            tile_aligned=args.tile_aligned,
+            tile_cache=not args.no_tile_cache,
+            pyramid_lods=args.pyramid_lods,
+            drop_intermediate=args.drop_intermediate,
+            options=_download_options(args),
         )
     elif args.command == "download-elevation":
         main_elevation(
@@ -1123,6 +1627,7 @@ def main():
             chunk_px=args.chunk_px,
             service_index=args.service_index,
             padding=args.padding,
+            options=_download_options(args),
         )
     elif args.command == "refresh-services":
         from terrain_stitcher.arcgis.services import refresh_services
@@ -1177,6 +1682,10 @@ def main():
             timeout=args.timeout,
             resampling=args.resampling,
             service_index=args.service_index,
+            tile_aligned=args.tile_aligned,
+            tile_cache=not args.no_tile_cache,
+            direct=args.direct,
+            options=_download_options(args),
         )
     elif args.command == "split-image":
         main_split_image(
@@ -1185,5 +1694,21 @@ def main():
             axis=args.axis,
             workers=args.workers,
         )
+    elif args.command == "benchmark-download":
+        main_benchmark_download(
+            sizes=args.sizes,
+            workers=args.workers,
+            kinds=args.kinds,
+            chunk_px=args.chunk_px,
+            engine=args.engine,
+            latency_s=args.latency,
+            jitter_s=args.jitter,
+            error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate,
+            tiles=not args.no_tiles,
+            json_out=args.json,
+            baseline=args.baseline,
+            tolerance=args.tolerance,
+        )
     else:
         print("Unknown command type")
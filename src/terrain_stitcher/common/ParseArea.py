@@ -1,6 +1,10 @@
 import math
 import json
 
+import numpy as np
+import shapely
+from shapely.geometry import mapping, shape
+
 from .TerrainArea import World_Bounding_Box, World_Coordinates
 
 from enum import Enum
@@ -8,19 +12,52 @@ from enum import Enum
 
 # enum definition of the type of center used to calculate bounds of terrains
 class TerrainBoundsCalculateType(Enum):
+    # square bbox around center, view_distance miles to each side
     POINT = "1"
+    # circle of radius view_distance miles around center
+    CIRCLE = "2"
+    # GeoJSON (Multi)Polygon outline
+    POLYGON = "3"
 
 
 def terrainBoundsTypeToString(type: TerrainBoundsCalculateType) -> str:
-    if type == TerrainBoundsCalculateType.POINT:
-        return "POINT"
+    return type.name
 
 
 def nameToTerrainBoundsType(name: str) -> TerrainBoundsCalculateType:
-    if name == "POINT":
-        return TerrainBoundsCalculateType.POINT
+    try:
+        return TerrainBoundsCalculateType[name]
+    except KeyError:
+        raise Exception(f"Unknown TerrainBoundsCalculateType name: {name}")
+
+
+# Vertices of the polygon a CIRCLE outline is approximated by.
+_CIRCLE_VERTICES = 256
+
+# Miles per degree of latitude in the downloads' ``bbox_from_radius``.
+_DOWNLOAD_MILES_PER_DEG = 111_320.0 / 1609.344
+
 
-    raise Exception(f"Unknown TerrainBoundsCalculateType name: {name}")
+def _degree_offsets(lat: float, radius_miles: float) -> tuple:
+    """``(lat_offset, lon_offset)`` in degrees of *radius_miles* at *lat*."""
+    return radius_miles / 69.0, radius_miles / (69.0 * math.cos(math.radians(lat)))
+
+
+def polygon_from_geojson(data: dict):
+    """The shapely (Multi)Polygon, in lon/lat, of a GeoJSON geometry,
+    Feature or FeatureCollection (whose features are merged)."""
+    kind = data.get("type")
+    if kind == "FeatureCollection":
+        geometry = shapely.union_all([shape(f["geometry"]) for f in data["features"]])
+    elif kind == "Feature":
+        geometry = shape(data["geometry"])
+    else:
+        geometry = shape(data)
+    if geometry.is_empty or geometry.geom_type not in ("Polygon", "MultiPolygon"):
+        raise Exception(
+            f"POLYGON bounds need a Polygon or MultiPolygon, got {geometry.geom_type}"
+        )
+    return geometry
 
 
 def calculate_bounding_box_around_point(
@@ -32,8 +69,7 @@ def calculate_bounding_box_around_point(
     radius_miles = float(radius_miles)
 
     # Convert miles to degrees
-    lat_offset = radius_miles / 69.0
-    lon_offset = radius_miles / (69.0 * math.cos(math.radians(lat)))
+    lat_offset, lon_offset = _degree_offsets(lat, radius_miles)
 
     # Calculate bounding box
     min_lat = lat - lat_offset
@@ -48,9 +84,41 @@ def calculate_bounding_box_around_point(
 
 class ParseArea:
     def __init__(
-        self, boundsType: TerrainBoundsCalculateType, center: World_Coordinates, view_distance=None
+        self,
+        boundsType: TerrainBoundsCalculateType,
+        center: World_Coordinates,
+        view_distance=None,
+        polygon=None,
     ) -> None:
         self.boundsType = boundsType
+        # POLYGON outline (shapely, lon/lat); None for POINT / CIRCLE.
+        self.polygon = polygon
+        if boundsType is TerrainBoundsCalculateType.POLYGON:
+            if polygon is None:
+                raise Exception("POLYGON bounds need a polygon")
+            # Center and radius of the square around the polygon, so code
+            # that sizes the AOI from them (the downloads) still covers it.
+            min_lon, min_lat, max_lon, max_lat = polygon.bounds
+            if center is None:
+                center = World_Coordinates(
+                    (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+                )
+            # In the downloads' miles per degree, a little more than the
+            # 69 of _degree_offsets, so their square reaches the polygon.
+            lat, lon = center.get_lat(), center.get_lon()
+            covering = _DOWNLOAD_MILES_PER_DEG * max(
+                max(lat - min_lat, max_lat - lat),
+                max(lon - min_lon, max_lon - lon) * math.cos(math.radians(lat)),
+            )
+            if view_distance is None:
+                view_distance = covering
+            elif float(view_distance) < covering:
+                # A smaller square would cut the polygon off the download.
+                print(
+                    f"view_distance {float(view_distance):g} mi does not cover "
+                    f"the polygon; using {covering:g} mi."
+                )
+                view_distance = covering
         self.center = center
         # Radius (in miles) used to calculate the bounding box around the
         # center point. Defaults to 10 to preserve historical behavior.
@@ -62,16 +130,25 @@ class ParseArea:
         with open(filePath, "r") as file:
             jData = json.load(file)
             bounds = nameToTerrainBoundsType(jData["boundsType"])
-            view_distance = jData.get("view_distance", jData.get("range", 10.0))
-            center = jData["center"]
+            polygon = None
+            if bounds is TerrainBoundsCalculateType.POLYGON:
+                # center / view_distance are derived from the polygon when
+                # the file does not carry them.
+                polygon = polygon_from_geojson(jData["polygon"])
+                view_distance = jData.get("view_distance")
+            else:
+                view_distance = jData.get("view_distance", jData.get("range", 10.0))
+            center = jData.get("center")
             # Shape.json stores the center using "x"/"y" keys (x = longitude,
             # y = latitude) with numeric values. The legacy "lat"/"lon" format
             # is still accepted so existing Shape.json files keep working.
-            if "x" in center and "y" in center:
+            if center is None:
+                coords = None
+            elif "x" in center and "y" in center:
                 coords = World_Coordinates(lat=center["y"], lon=center["x"])
             else:
                 coords = World_Coordinates.fromDict(center)
-            return cls(bounds, coords, view_distance)
+            return cls(bounds, coords, view_distance, polygon)
 
     def toJSON(self) -> dict:
         # The center is written with both the new "x"/"y" keys and the
@@ -79,7 +156,7 @@ class ParseArea:
         # working. "x" mirrors the longitude and "y" mirrors the latitude
         # and are emitted as floats; "lat"/"lon" retain their original
         # (string) values for backwards compatibility.
-        return {
+        data = {
             "boundsType": terrainBoundsTypeToString(self.boundsType),
             "center": {
                 "lat": self.center.lat,
@@ -89,9 +166,38 @@ class ParseArea:
             },
             "view_distance": self.view_distance,
         }
+        if self.polygon is not None:
+            data["polygon"] = mapping(self.polygon)
+        return data
 
     def getTotalRegion(self) -> World_Bounding_Box:
-        if self.boundsType is TerrainBoundsCalculateType.POINT:
+        if self.boundsType in (
+            TerrainBoundsCalculateType.POINT,
+            TerrainBoundsCalculateType.CIRCLE,
+        ):
             return calculate_bounding_box_around_point(self.center, self.view_distance)
+        elif self.boundsType is TerrainBoundsCalculateType.POLYGON:
+            min_lon, min_lat, max_lon, max_lat = self.polygon.bounds
+            return World_Bounding_Box(
+                World_Coordinates(min_lat, min_lon), World_Coordinates(max_lat, max_lon)
+            )
         else:
             raise Exception("Unhandled boundsType declaration")
+
+    def boundary(self):
+        """The AOI outline as a shapely polygon in lon/lat, or None when the
+        AOI is its whole bbox (POINT). See :class:`AreaMask`."""
+        if self.boundsType is TerrainBoundsCalculateType.CIRCLE:
+            lat = self.center.get_lat()
+            lon = self.center.get_lon()
+            lat_offset, lon_offset = _degree_offsets(lat, self.view_distance)
+            angles = np.linspace(0.0, 2 * math.pi, _CIRCLE_VERTICES, endpoint=False)
+            return shapely.Polygon(
+                np.column_stack(
+                    (
+                        lon + lon_offset * np.cos(angles),
+                        lat + lat_offset * np.sin(angles),
+                    )
+                )
+            )
+        return self.polygon
@@ -2,4 +2,5 @@
 from .ParseArea import TerrainBoundsCalculateType, terrainBoundsTypeToString, nameToTerrainBoundsType, ParseArea
 from .files import get_all_files_in_directory
 from .tile import Tile, TileSide
-from .bounds import Bounds
\ No newline at end of file
+from .bounds import Bounds
+from .area_mask import AreaMask
\ No newline at end of file
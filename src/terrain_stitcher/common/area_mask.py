@@ -0,0 +1,77 @@
+"""Vectorised tests of chunks, tiles and windows against an AOI outline.
+
+A ``POINT`` Shape.json covers its whole square bbox, but a ``CIRCLE`` or
+``POLYGON`` AOI (see :class:`ParseArea`) covers only part of it: about 21%
+of a circle's bbox, much more of an irregular county outline. The download
+grid, :class:`ShapeTileFilter` and the direct gather work on projected
+rectangles, so :class:`AreaMask` holds the AOI outline projected into their
+CRS and tests whole arrays of rectangles against it at once.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pyproj
+import shapely
+
+# Longest outline edge, in degrees, before projecting: a straight edge in
+# lon/lat is not straight in the projected CRS, so long edges are split.
+_SEGMENT_DEG = 0.01
+
+# Rectangles tested per shapely call, bounding the temporary geometries.
+_BATCH = 1 << 16
+
+
+class AreaMask:
+    """An AOI outline in a projected CRS.
+
+    Use :meth:`for_area` to build one from a :class:`ParseArea`, then
+    :meth:`intersects` to test rectangles. Picklable, so it can be sent to
+    worker processes.
+    """
+
+    def __init__(self, geometry) -> None:
+        self.geometry = geometry
+        shapely.prepare(self.geometry)
+
+    @classmethod
+    def from_lonlat(cls, outline, epsg: int, buffer_deg: float = 0.0) -> "AreaMask":
+        """Project a WGS84 lon/lat *outline* (grown by *buffer_deg*) into
+        ``EPSG:{epsg}``."""
+        if buffer_deg:
+            outline = outline.buffer(buffer_deg)
+        to_crs = pyproj.Transformer.from_crs("EPSG:4326", f"EPSG:{epsg}", always_xy=True)
+        projected = shapely.transform(
+            shapely.segmentize(outline, _SEGMENT_DEG),
+            lambda xy: np.column_stack(to_crs.transform(xy[:, 0], xy[:, 1])),
+        )
+        return cls(projected)
+
+    @classmethod
+    def for_area(cls, area, epsg: int, buffer_deg: float = 0.0) -> "AreaMask | None":
+        """The mask of *area* in ``EPSG:{epsg}``, or None for a ``POINT``
+        area (its square bbox needs no mask)."""
+        outline = area.boundary()
+        if outline is None:
+            return None
+        return cls.from_lonlat(outline, epsg, buffer_deg)
+
+    def __getstate__(self):
+        return shapely.to_wkb(self.geometry)
+
+    def __setstate__(self, state) -> None:
+        self.__init__(shapely.from_wkb(state))
+
+    def intersects(self, xmin, ymin, xmax, ymax) -> np.ndarray:
+        """True for each rectangle that shares any point with the outline
+        (closed, like :class:`ShapeTileFilter`'s bbox test)."""
+        xmin, ymin, xmax, ymax = np.broadcast_arrays(
+            *(np.asarray(a, dtype=float) for a in (xmin, ymin, xmax, ymax))
+        )
+        flat = [a.ravel() for a in (xmin, ymin, xmax, ymax)]
+        out = np.empty(xmin.size, dtype=bool)
+        for start in range(0, xmin.size, _BATCH):
+            part = slice(start, start + _BATCH)
+            boxes = shapely.box(*(a[part] for a in flat))
+            out[part] = shapely.intersects(self.geometry, boxes)
+        return out.reshape(xmin.shape)
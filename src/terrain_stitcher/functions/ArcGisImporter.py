@@ -21,6 +21,7 @@ from terrain_stitcher.functions.OrthoStitcher import (
     process_group,
 )
 from terrain_stitcher.common import World_Coordinates, get_all_files_in_directory
+from terrain_stitcher.functions.BlankImage import is_blank
 
 from terrain_stitcher.functions.ElevationGeoPrep import DEFAULT_PADDING_DEG
 from terrain_stitcher.common.bounds import Bounds
@@ -132,7 +133,7 @@ def _stitch_one_group(
     pool: ProcessPoolExecutor,
     num_workers: int,
     resume: bool,
-) -> None:
+) -> bool:
     """Stitch a single group to its output PNG, using the shared worker pool.
 
     One group at a time: either fan its row-strips across the pool (small
@@ -143,10 +144,13 @@ def _stitch_one_group(
     the PNG is saved the group is dropped by the caller. Bounding work to
     one group is what keeps the streaming import's peak memory proportional
     to one window's tile count instead of the whole cache's.
+
+    Returns False, writing nothing, when the stitched window is blank
+    (every tile transparent or one flat colour, e.g. outside the imagery).
     """
     out_path = os.path.join(out_abs, _output_stem(group.origin) + ".png")
     if resume and os.path.isfile(out_path):
-        return
+        return True
     mode, _cw, _ch = group.canvas_meta()
     positions = group.get_traversal()
     rows = max(r for r, _ in positions) + 1
@@ -159,15 +163,18 @@ def _stitch_one_group(
         }
         for fut in as_completed(fut_to_r):
             _paste_strip(canvas, fut.result(), fut_to_r[fut], group.cell_height)
+        if is_blank(canvas):
+            return False
         _save_canvas(canvas, out_path)
         del canvas
+        return True
     else:
         # Whole-group: canvas is allocated and saved inside the worker, never
         # round-tripped. We submit one task and block on it before the next
         # group, so only one giant canvas is live at a time regardless of
         # num_workers (which would otherwise run num_workers multi-GB
         # canvases concurrently and blow the commit limit).
-        pool.submit(process_group, out_abs, group, resume).result()
+        return pool.submit(process_group, out_abs, group, resume, True).result()
 
 
 def writeManifestFromEntries(
@@ -324,6 +331,7 @@ def process(
         msg += " (--resume)"
     print(msg + "...")
     skipped = 0
+    blank: set[tuple[int, int]] = set()
     summaries: list[StitchedGroup] = []
     with ProcessPoolExecutor(max_workers=num_workers) as pool:
         pbar = tqdm(sorted_origins, desc="Stitching groups", unit="grp")
@@ -346,15 +354,24 @@ def process(
                 scale_factor,
                 source.tile_path_for,
             )
-            _stitch_one_group(group, out_abs, pool, num_workers, resume)
-            summaries.append(StitchedGroup(origin=origin, n_tiles=len(idxs)))
+            if _stitch_one_group(group, out_abs, pool, num_workers, resume):
+                summaries.append(StitchedGroup(origin=origin, n_tiles=len(idxs)))
+            else:
+                blank.add(origin)
             del group
             gc.collect()
         pbar.close()
 
+    # Blank windows have no PNG, so they get no manifest entry either.
+    if blank:
+        entries = [
+            e for origin, e in zip(sorted_origins, entries) if origin not in blank
+        ]
     manifest_path = writeManifestFromEntries(output_dir, entries, elevation_files)
     done = len(summaries) - skipped
     note = f" ({skipped} skipped via --resume)" if skipped else ""
+    if blank:
+        note += f" ({len(blank)} blank group(s) left out)"
     print(f"Stitched {done} group(s){note}; wrote {len(entries)} image(s).")
     print(f"Wrote manifest: {manifest_path} ({len(entries)} image(s))")
     return summaries
@@ -0,0 +1,301 @@
+"""asyncio transport for the chunk download (``--engine async``).
+
+The default engine runs the blocking :func:`fetch_chunk` on a thread pool, so
+the number of in-flight requests is capped by the number of OS threads. This
+module drives the same exportImage requests from a single asyncio event loop
+over an ``aiohttp`` keep-alive connection pool, so one process can keep
+thousands of requests in flight.
+
+The loop runs on a background thread. :func:`stream_async` exposes it to the
+caller as a plain generator of ``(item, result)`` pairs -- the same contract
+as :func:`DownloaderBase._stream_futures` -- so ``download_all_chunks`` keeps a
+single consumer loop (manifest, georeference, progress) for both engines.
+
+``aiohttp`` is an optional dependency (``pip install terrain_stitcher[async]``);
+it is imported lazily so the thread engine never needs it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+import time
+
+# Seconds an idle keep-alive connection is held open for reuse. Chunk requests
+# arrive back to back, so a connection is rarely idle this long mid-run.
+_KEEPALIVE_TIMEOUT = 30
+
+# Sentinels passed from the loop thread to the consumer over the result queue.
+_DONE = object()
+_ERROR = object()
+
+
+def require_aiohttp():
+    """Import and return ``aiohttp``, or raise ``ImportError`` with an
+    install hint naming the extra that provides it."""
+    try:
+        import aiohttp
+    except ImportError as exc:
+        raise ImportError(
+            "--engine async requires aiohttp. Install it with:\n"
+            "  pip install terrain_stitcher[async]\n"
+            "  (or) pip install aiohttp"
+        ) from exc
+    return aiohttp
+
+
+def open_async_session(pool_size: int):
+    """Return an ``aiohttp.ClientSession`` whose connector keeps up to
+    *pool_size* keep-alive connections to the (single) service host.
+
+    Must be called from inside the running event loop.
+    """
+    aiohttp = require_aiohttp()
+    connector = aiohttp.TCPConnector(
+        limit=pool_size,
+        limit_per_host=pool_size,
+        keepalive_timeout=_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=300,
+    )
+    return aiohttp.ClientSession(connector=connector)
+
+
+async def fetch_chunk_async(
+    session,
+    service,
+    chunk: dict,
+    img_format: str,
+    max_retries: int,
+    timeout: int,
+    pixel_type: str = "U8",
+    controller=None,
+    validators: dict | None = None,
+    metrics=None,
+    breaker=None,
+) -> bytes | None:
+    """Async counterpart of :func:`DownloaderBase.fetch_chunk`.
+
+    Same request parameters and retry semantics: transport errors and
+    transient statuses (429/5xx) are retried with ``min(2**attempt, 30)``
+    seconds of backoff up to *max_retries* attempts; any other non-image
+    response fails the chunk immediately. With a *controller* each attempt
+    is gated on, and reported to, the shared
+    :class:`~terrain_stitcher.functions.RateControl.AimdController` exactly
+    as in the thread engine, *validators* makes the request conditional
+    the same way, *metrics* gets the same one record per call (time to
+    first byte being when the response headers arrived), and a *breaker*
+    (:class:`~terrain_stitcher.functions.CircuitBreaker.CircuitBreaker`)
+    pauses attempts and enforces deadlines as it does there.
+    """
+    import aiohttp
+
+    from .DownloaderBase import (
+        TRANSIENT_STATUS_CODES,
+        _conditional_headers,
+        _request_target,
+        _update_validators,
+    )
+    from .CircuitBreaker import capped_sleep, request_timeout
+    from .RateControl import THROTTLE_STATUS_CODES, parse_retry_after
+
+    url, params = _request_target(service, chunk, img_format, pixel_type)
+    if params is not None:
+        # aiohttp (unlike requests) only accepts str query values.
+        params = {k: str(v) for k, v in params.items()}
+    headers = _conditional_headers(validators)
+    deadline = breaker.deadline() if breaker is not None else None
+
+    last_error = None
+    attempt = failures = 0
+    status = ttfb = latency = None
+    nbytes = 0
+    try:
+        while failures < max_retries:
+            if breaker is not None:
+                await breaker.wait_async(deadline)
+            attempt += 1
+            delay = min(2 ** (failures + 1), 30)
+            outage = False
+            if controller is not None:
+                await controller.acquire_async()
+            started = time.monotonic()
+            status = ttfb = None
+            try:
+                async with session.get(
+                    url,
+                    params=params,
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(
+                        total=request_timeout(timeout, deadline)
+                    ),
+                ) as resp:
+                    status = resp.status
+                    ttfb = time.monotonic() - started
+                    if breaker is not None and status not in TRANSIENT_STATUS_CODES:
+                        breaker.on_success()
+                    if resp.status == 304 and headers:
+                        latency = ttfb
+                        if controller is not None:
+                            controller.on_success(latency, 0)
+                        return None
+                    if resp.status == 200 and resp.headers.get(
+                        "Content-Type", ""
+                    ).startswith("image"):
+                        body = await resp.read()
+                        latency = time.monotonic() - started
+                        nbytes = len(body)
+                        if controller is not None:
+                            controller.on_success(latency, nbytes)
+                        _update_validators(validators, resp.headers)
+                        return body
+                    latency = time.monotonic() - started
+                    if resp.status == 404 and params is None:
+                        # The cache has no tile where the service has no data.
+                        if controller is not None:
+                            controller.on_success(latency, 0)
+                        return b""
+                    if resp.status in TRANSIENT_STATUS_CODES:
+                        last_error = RuntimeError(f"HTTP {resp.status} (transient)")
+                        if controller is not None:
+                            if resp.status in THROTTLE_STATUS_CODES:
+                                delay = controller.on_throttle(
+                                    failures + 1,
+                                    parse_retry_after(resp.headers.get("Retry-After")),
+                                )
+                            else:
+                                delay = controller.on_error(failures + 1)
+                        outage = breaker is not None and breaker.on_failure()
+                    else:
+                        # Non-transient failure (bad request, auth, etc.) -
+                        # don't bother retrying
+                        text = await resp.text(errors="replace")
+                        raise RuntimeError(
+                            f"exportImage failed for chunk ({chunk['col']},"
+                            f"{chunk['row']}): HTTP {resp.status}: {text[:300]}"
+                        )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = e
+                latency = time.monotonic() - started
+                if controller is not None:
+                    delay = controller.on_error(failures + 1)
+                outage = breaker is not None and breaker.on_failure()
+            finally:
+                if controller is not None:
+                    controller.release()
+            if outage:
+                continue  # an outage: wait on the breaker, not a retry
+            failures += 1
+            await asyncio.sleep(capped_sleep(delay, deadline))
+
+        raise RuntimeError(
+            f"Chunk ({chunk['col']},{chunk['row']}) failed after {max_retries} "
+            f"retries: {last_error}"
+        )
+    finally:
+        if metrics is not None and attempt:
+            metrics.record(chunk, status, ttfb, latency, nbytes, attempt - 1)
+
+
+def _call_in_loop(state: dict, callback) -> None:
+    """Schedule *callback* on the background loop, ignoring a loop that has
+    already finished (its tasks are all done, so there is nothing to wake)."""
+    loop = state.get("loop")
+    if loop is None:
+        return
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:  # loop closed between the last result and now
+        pass
+
+
+def stream_async(fn, items, max_inflight: int, session_factory):
+    """Run ``await fn(session, item)`` for each item on a background event
+    loop, keeping at most *max_inflight* items outstanding.
+
+    Yields ``(item, result)`` as each task completes; if ``fn`` raised, the
+    exception is yielded in place of the result, exactly like
+    :func:`DownloaderBase._stream_futures`. *session_factory* is called once,
+    inside the loop, and must return an async context manager (normally
+    :func:`open_async_session`).
+
+    An item's slot is released only after the caller has consumed its
+    result, so completed-but-unprocessed response bodies are bounded by
+    *max_inflight* too -- a slow consumer throttles the fetches instead of
+    letting responses pile up in memory.
+    """
+    results: queue.Queue = queue.Queue()
+    state: dict = {}
+    ready = threading.Event()
+
+    async def _one(session, item):
+        try:
+            res = await fn(session, item)
+        except Exception as exc:  # surfaced to the caller, not raised
+            res = exc
+        results.put((item, res))
+
+    async def _drive():
+        sem = asyncio.Semaphore(max_inflight)
+        state["sem"] = sem
+        ready.set()
+        tasks: set = set()
+        async with session_factory() as session:
+            try:
+                for item in items:
+                    await sem.acquire()
+                    task = asyncio.ensure_future(_one(session, item))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                if tasks:
+                    await asyncio.gather(*tasks)
+            finally:
+                # Only non-empty when cancelled: drop in-flight requests
+                # before the session (and its connections) closes.
+                for task in tasks:
+                    task.cancel()
+                if tasks:
+                    await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _run():
+        loop = asyncio.new_event_loop()
+        state["loop"] = loop
+        try:
+            state["task"] = loop.create_task(_drive())
+            loop.run_until_complete(state["task"])
+        except asyncio.CancelledError:
+            pass
+        except BaseException as exc:
+            results.put((_ERROR, exc))
+        finally:
+            ready.set()
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+            results.put(_DONE)
+
+    thread = threading.Thread(target=_run, name="chunk-async-loop", daemon=True)
+    thread.start()
+    ready.wait()
+
+    finished = False
+    try:
+        while True:
+            msg = results.get()
+            if msg is _DONE:
+                finished = True
+                break
+            item, res = msg
+            if item is _ERROR:
+                raise res
+            try:
+                yield item, res
+            finally:
+                _call_in_loop(state, state["sem"].release)
+    finally:
+        if not finished:
+            # Consumer stopped early (exception / generator closed): cancel
+            # the in-flight requests and let the loop thread wind down.
+            task = state.get("task")
+            if task is not None:
+                _call_in_loop(state, task.cancel)
+        thread.join()
@@ -0,0 +1,38 @@
+"""Blank-content detection for downloaded chunks and gathered windows.
+
+Large AOIs at the edge of a service's coverage come back with many
+exportImage responses that are fully transparent (outside the imagery) or a
+single flat colour (nodata fill). Every one of them used to be georeferenced,
+mosaicked, tiled by gdal2tiles and pasted into a gathered window. The
+download records them as ``empty`` in the chunk manifest instead of writing
+them (see :func:`download_all_chunks`), and the gathers write no PNG and no
+``height_info.json`` entry for a window that stitched to a blank canvas.
+"""
+
+from __future__ import annotations
+
+import io
+
+from PIL import Image as pImage, UnidentifiedImageError
+
+
+def is_blank(img: pImage.Image) -> bool:
+    """True if every pixel of *img* is fully transparent, or every pixel has
+    the same value in every band."""
+    bands = img.getbands()
+    extrema = img.getextrema()
+    if len(bands) == 1:
+        extrema = (extrema,)
+    if "A" in bands and extrema[bands.index("A")][1] == 0:
+        return True
+    return all(lo == hi for lo, hi in extrema)
+
+
+def is_blank_bytes(raw_bytes: bytes) -> bool:
+    """:func:`is_blank` for an encoded image; bytes PIL cannot decode are
+    never blank (they are left for the writer / verification to handle)."""
+    try:
+        with pImage.open(io.BytesIO(raw_bytes)) as img:
+            return is_blank(img)
+    except (OSError, UnidentifiedImageError):
+        return False
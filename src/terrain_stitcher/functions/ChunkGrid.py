@@ -0,0 +1,218 @@
+"""Lazy chunk grid for the exportImage downloads.
+
+:func:`DownloaderBase.build_chunk_grid` used to return a list with one
+8-key dict per chunk -- over a KB of Python objects each, so a 20-mile AOI
+at LOD 19 (millions of 256-px chunks) held GBs before the first request.
+Every chunk of a download lies on one regular grid, so :class:`ChunkGrid`
+stores only the grid (origin, pixel size, chunk size, raster size) and
+computes a chunk's dict when it is asked for. It is a read-only sequence in
+row-major order (``len``, iteration, ``grid[i]``), so code written for the
+list of dicts keeps working; :meth:`ChunkGrid.rows_cols` gives every chunk's
+``(row, col)`` as arrays for vectorised manifest lookups (see
+:func:`download_all_chunks`). :meth:`ChunkGrid.restrict` drops the chunks
+outside a CIRCLE / POLYGON AOI, leaving an index array of the rest, and
+:meth:`ChunkGrid.subset` takes a part of the grid the same way.
+"""
+
+from __future__ import annotations
+
+import copy
+import math
+from collections.abc import Sequence
+
+import numpy as np
+
+# Side of an XYZ tile, for grids of --tile-aligned chunks.
+TILE_PX = 256
+
+# The fixed chunk size of runs from before grids were recorded.
+LEGACY_CHUNK_PX = 256
+
+
+class ChunkGrid(Sequence):
+    """``n_rows x n_cols`` chunks of ``chunk_px`` covering a
+    ``total_w_px x total_h_px`` raster whose upper-left corner is
+    ``(xmin, ymax)``; the last row/column are cut to the raster.
+
+    With ``tile_origin`` (the XYZ column/row of the grid's upper-left tile,
+    see :func:`build_tile_aligned_grid`) every chunk also carries the
+    ``tile_x`` / ``tile_y`` of its upper-left 256-px tile. ``aoi_origin`` is
+    the AOI's upper-left corner when the grid's was moved off it (see
+    :func:`build_chunk_grid`'s ``snap``).
+    """
+
+    def __init__(
+        self,
+        xmin: float,
+        ymax: float,
+        pixel_size_m: float,
+        chunk_px: int,
+        total_w_px: int,
+        total_h_px: int,
+        tile_origin: tuple[int, int] | None = None,
+        aoi_origin: tuple[float, float] | None = None,
+    ):
+        self.xmin = xmin
+        self.ymax = ymax
+        self.pixel_size_m = pixel_size_m
+        self.chunk_px = chunk_px
+        self.total_w_px = total_w_px
+        self.total_h_px = total_h_px
+        self.tile_origin = tile_origin
+        self.aoi_origin = aoi_origin or (xmin, ymax)
+        self.n_cols = math.ceil(total_w_px / chunk_px)
+        self.n_rows = math.ceil(total_h_px / chunk_px)
+        # Flat indices of the chunks kept by restrict(); None keeps all.
+        self._kept: np.ndarray | None = None
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.n_rows, self.n_cols
+
+    @property
+    def bounds(self) -> tuple[float, float, float, float]:
+        """``(xmin, ymin, xmax, ymax)`` of the whole grid."""
+        return (
+            self.xmin,
+            self.ymax - self.total_h_px * self.pixel_size_m,
+            self.xmin + self.total_w_px * self.pixel_size_m,
+            self.ymax,
+        )
+
+    def __len__(self) -> int:
+        if self._kept is not None:
+            return len(self._kept)
+        return self.n_rows * self.n_cols
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk index out of range")
+        if self._kept is not None:
+            index = int(self._kept[index])
+        return self.chunk(*divmod(index, self.n_cols))
+
+    def __iter__(self):
+        if self._kept is not None:
+            for index in self._kept:
+                yield self.chunk(*divmod(int(index), self.n_cols))
+            return
+        for row in range(self.n_rows):
+            for col in range(self.n_cols):
+                yield self.chunk(row, col)
+
+    def contains(self, row: int, col: int) -> bool:
+        return 0 <= row < self.n_rows and 0 <= col < self.n_cols
+
+    def chunk(self, row: int, col: int) -> dict:
+        """The chunk dict at ``(row, col)``, with the keys the download,
+        mosaic and tile writer read."""
+        px = self.pixel_size_m
+        x_off = col * self.chunk_px
+        y_off = row * self.chunk_px
+        w = min(self.chunk_px, self.total_w_px - x_off)
+        h = min(self.chunk_px, self.total_h_px - y_off)
+        xmin = self.xmin + x_off * px
+        ymax = self.ymax - y_off * px
+        chunk = {
+            "row": row,
+            "col": col,
+            "w": w,
+            "h": h,
+            "xmin": xmin,
+            "ymin": ymax - h * px,
+            "xmax": xmin + w * px,
+            "ymax": ymax,
+        }
+        if self.tile_origin is not None:
+            per_chunk = self.chunk_px // TILE_PX
+            chunk["tile_x"] = self.tile_origin[0] + col * per_chunk
+            chunk["tile_y"] = self.tile_origin[1] + row * per_chunk
+        return chunk
+
+    def grid_params(self) -> dict:
+        """What fixes the area each ``(row, col)`` names: the origin, pixel
+        size and chunk size (see :func:`ChunkManifest.save_grid`)."""
+        return {
+            "xmin": float(self.xmin),
+            "ymax": float(self.ymax),
+            "pixel_size_m": float(self.pixel_size_m),
+            "chunk_px": int(self.chunk_px),
+        }
+
+    def legacy_grid_params(self) -> dict:
+        """The :meth:`grid_params` a run from before grids were recorded
+        would have cut this AOI into: ``LEGACY_CHUNK_PX`` chunks from the
+        AOI's own corner."""
+        xmin, ymax = self.aoi_origin
+        return {
+            "xmin": float(xmin),
+            "ymax": float(ymax),
+            "pixel_size_m": float(self.pixel_size_m),
+            "chunk_px": LEGACY_CHUNK_PX,
+        }
+
+    def rows_cols(self) -> tuple[np.ndarray, np.ndarray]:
+        """Every chunk's row and column, in sequence order."""
+        if self._kept is not None:
+            return np.divmod(self._kept, self.n_cols)
+        rows, cols = np.indices(self.shape, dtype=np.int64)
+        return rows.ravel(), cols.ravel()
+
+    def subset(self, keep: np.ndarray) -> "ChunkGrid":
+        """A copy of the grid with only the chunks where the boolean *keep*
+        (one per chunk, in sequence order) is set; rows and columns keep
+        their place on the whole grid."""
+        part = copy.copy(self)
+        if self._kept is not None:
+            part._kept = self._kept[keep]
+        else:
+            part._kept = np.flatnonzero(keep)
+        return part
+
+    def restrict(self, area_mask) -> None:
+        """Keep only the chunks whose bbox intersects *area_mask* (an
+        :class:`AreaMask` in the grid's CRS), one grid row at a time."""
+        px = self.pixel_size_m
+        x_off = np.arange(self.n_cols, dtype=np.int64) * self.chunk_px
+        xmin = self.xmin + x_off * px
+        xmax = xmin + np.minimum(self.chunk_px, self.total_w_px - x_off) * px
+        kept = []
+        for row in range(self.n_rows):
+            y_off = row * self.chunk_px
+            ymax = self.ymax - y_off * px
+            ymin = ymax - min(self.chunk_px, self.total_h_px - y_off) * px
+            hit = area_mask.intersects(xmin, ymin, xmax, ymax)
+            kept.append(np.flatnonzero(hit) + row * self.n_cols)
+        total = self.n_rows * self.n_cols
+        self._kept = np.concatenate(kept) if kept else np.empty(0, np.int64)
+        print(
+            f"AOI shape keeps {len(self._kept)} of {total} chunks "
+            f"({total - len(self._kept)} outside it skipped)"
+        )
+
+
+class ChunkPaths(Sequence):
+    """The files of the chunks at *indices* of *chunks*, as a lazy sequence:
+    ``path_of(chunk)`` is only called for the path being read."""
+
+    def __init__(self, chunks, indices: np.ndarray, path_of):
+        self.chunks = chunks
+        self.indices = indices
+        self.path_of = path_of
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self.path_of(self.chunks[self.indices[index]])
+
+    def __iter__(self):
+        for i in self.indices:
+            yield self.path_of(self.chunks[i])
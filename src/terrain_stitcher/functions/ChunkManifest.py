@@ -0,0 +1,347 @@
+"""Compact resume manifest for the chunk download.
+
+The original manifest was a ``manifest.json`` dict with one
+``{"status": ..., "file": ...}`` entry per chunk, rewritten in full (with
+``indent=2``) every ``_MANIFEST_FLUSH_EVERY`` completions. At LOD 19 with
+~1.8M chunks each flush wrote hundreds of MB and the run held a
+million-entry dict in RAM.
+
+:class:`ChunkManifest` stores the same information as
+
+* ``manifest.npy`` -- a ``uint8`` status array indexed by ``(row, col)``
+  (one byte per chunk, so 1.8M chunks is ~1.8 MB), and
+* ``manifest.journal`` -- an append-only log of fixed-size
+  ``(row, col, status)`` records written since the array was last saved.
+
+A flush appends only the chunks completed since the previous flush
+(O(new chunks)); :meth:`ChunkManifest.compact` folds the journal into the
+array and deletes it when the download finishes. Loading is one ``np.load``
+plus one vectorised journal replay, so resume takes milliseconds even for
+millions of chunks. A journal whose last record was torn by a crash is
+replayed up to the last complete record.
+
+Each downloaded chunk also gets a digest -- its file size and the CRC32 of
+its bytes, computed by the download worker right after the write (see
+:func:`file_digest`) -- kept the same way in ``manifest_digests.npy`` plus
+``manifest_digests.journal``. On resume a cached chunk is checked against
+its digest by a stat and one sequential read instead of a full raster
+decode. The digest journal is appended before the status journal, so every
+``DOWNLOADED`` record has its digest on disk; a chunk without one (an older
+run, or files recovered from disk) falls back to the decode check.
+
+The chunk file name is not stored: it is always ``chunk_{col}_{row}`` plus
+the manifest's ``suffix``. An older run's ``manifest.json`` is still read
+(and migrated on the next compaction).
+
+A ``(row, col)`` only names an area on one chunk grid, so the grid's origin,
+pixel size and chunk size are kept in ``manifest_grid.json``
+(:func:`save_grid`); a run on another grid must not resume from it.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+MANIFEST_FILENAME = "manifest.npy"
+JOURNAL_FILENAME = "manifest.journal"
+LEGACY_MANIFEST_FILENAME = "manifest.json"
+DIGEST_FILENAME = "manifest_digests.npy"
+DIGEST_JOURNAL_FILENAME = "manifest_digests.journal"
+GRID_FILENAME = "manifest_grid.json"
+
+# Every file of a manifest, for discarding one.
+MANIFEST_FILES = (
+    MANIFEST_FILENAME,
+    JOURNAL_FILENAME,
+    LEGACY_MANIFEST_FILENAME,
+    DIGEST_FILENAME,
+    DIGEST_JOURNAL_FILENAME,
+)
+
+_CHUNK_FILE_RE = re.compile(r"chunk_\d+_\d+\.")
+
+# Chunk status codes stored in the array / journal.
+MISSING = 0
+DOWNLOADED = 1
+FAILED = 2
+# Fetched, but blank (fully transparent or one flat colour); no file is kept.
+EMPTY = 3
+
+_STATUS_NAMES = {DOWNLOADED: "downloaded", FAILED: "failed", EMPTY: "empty"}
+_STATUS_CODES = {v: k for k, v in _STATUS_NAMES.items()}
+
+_JOURNAL_DTYPE = np.dtype([("row", "<u4"), ("col", "<u4"), ("status", "u1")])
+
+# A size of 0 marks "no digest": no valid chunk file is empty.
+_DIGEST_DTYPE = np.dtype([("size", "<u8"), ("crc", "<u4")])
+_DIGEST_JOURNAL_DTYPE = np.dtype(
+    [("row", "<u4"), ("col", "<u4"), ("size", "<u8"), ("crc", "<u4")]
+)
+
+_DIGEST_READ_SIZE = 1 << 20
+
+
+def file_digest(path) -> tuple[int, int]:
+    """``(size, crc32)`` of the file at *path*, as stored in the manifest."""
+    crc = 0
+    size = 0
+    with open(path, "rb") as fh:
+        while block := fh.read(_DIGEST_READ_SIZE):
+            crc = zlib.crc32(block, crc)
+            size += len(block)
+    return size, crc
+
+
+def load_legacy_manifest(tmp_dir: Path) -> dict:
+    """Load an older run's ``manifest.json`` from *tmp_dir*, or return an
+    empty dict if none exists. It maps ``"row_col"`` keys to
+    ``{"status": "downloaded"|"failed", "file": str|None}``."""
+    manifest_path = tmp_dir / LEGACY_MANIFEST_FILENAME
+    if manifest_path.is_file():
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (json.JSONDecodeError, OSError):
+            print("Warning: manifest.json was corrupt -- ignoring it.")
+    return {}
+
+
+def load_grid(tmp_dir: Path) -> dict | None:
+    """The :meth:`ChunkGrid.grid_params` saved in *tmp_dir*, or None."""
+    try:
+        return json.loads((Path(tmp_dir) / GRID_FILENAME).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def previous_run_files(tmp_dir: Path) -> list[Path]:
+    """The manifest and chunk files an earlier run left in *tmp_dir*."""
+    if not Path(tmp_dir).is_dir():
+        return []
+    return [
+        p
+        for p in Path(tmp_dir).iterdir()
+        if p.name in MANIFEST_FILES or _CHUNK_FILE_RE.match(p.name)
+    ]
+
+
+def save_grid(tmp_dir: Path, grid: dict) -> None:
+    """Record the :meth:`ChunkGrid.grid_params` the manifest in *tmp_dir*
+    is indexed by."""
+    (Path(tmp_dir) / GRID_FILENAME).write_text(json.dumps(grid) + "\n")
+
+
+class ChunkManifest:
+    """Per-chunk download status for one ``tmp_dir``.
+
+    Use :meth:`load` to open (or start) the manifest, :meth:`set` as each
+    chunk completes, :meth:`flush` periodically and :meth:`compact` when the
+    run ends.
+    """
+
+    def __init__(self, tmp_dir: Path, status: np.ndarray | None = None, suffix: str = ".tif"):
+        self.tmp_dir = Path(tmp_dir)
+        self.suffix = suffix
+        self.status = (
+            status if status is not None else np.zeros((0, 0), dtype=np.uint8)
+        )
+        self.digests = np.zeros(self.status.shape, dtype=_DIGEST_DTYPE)
+        self._pending: list[tuple[int, int, int]] = []
+        self._pending_digests: list[tuple[int, int, int, int]] = []
+
+    # -- persistence ----------------------------------------------------------
+
+    @classmethod
+    def load(cls, tmp_dir: Path, suffix: str = ".tif") -> "ChunkManifest":
+        """Open the manifest in *tmp_dir*: the status array plus any journal,
+        else an older ``manifest.json``, else an empty manifest."""
+        tmp_dir = Path(tmp_dir)
+        array_path = tmp_dir / MANIFEST_FILENAME
+        journal_path = tmp_dir / JOURNAL_FILENAME
+
+        status = None
+        if array_path.is_file():
+            try:
+                status = np.load(array_path, allow_pickle=False)
+                if status.ndim != 2 or status.dtype != np.uint8:
+                    raise ValueError(f"unexpected array {status.dtype}{status.shape}")
+            except (OSError, ValueError) as e:
+                print(f"Warning: {MANIFEST_FILENAME} was corrupt ({e}) -- ignoring it.")
+                status = None
+        manifest = cls(tmp_dir, status, suffix=suffix)
+
+        if status is None and not journal_path.is_file():
+            legacy = load_legacy_manifest(tmp_dir)
+            if legacy:
+                manifest.update_from_dict(legacy)
+            return manifest
+
+        if status is not None:
+            manifest._load_digests(tmp_dir / DIGEST_FILENAME)
+        if journal_path.is_file():
+            manifest._replay_journal(journal_path)
+        digest_journal_path = tmp_dir / DIGEST_JOURNAL_FILENAME
+        if digest_journal_path.is_file():
+            manifest._replay_digest_journal(digest_journal_path)
+        return manifest
+
+    def _load_digests(self, digest_path: Path) -> None:
+        if not digest_path.is_file():
+            return
+        try:
+            digests = np.load(digest_path, allow_pickle=False)
+        except (OSError, ValueError):
+            digests = None
+        if (
+            digests is None
+            or digests.dtype != _DIGEST_DTYPE
+            or digests.shape != self.status.shape
+        ):
+            # Only costs the fast path: those chunks get the decode check.
+            print(f"Warning: {DIGEST_FILENAME} was corrupt -- ignoring it.")
+            return
+        self.digests = digests
+
+    def _replay_journal(self, journal_path: Path) -> None:
+        size = journal_path.stat().st_size
+        n = size // _JOURNAL_DTYPE.itemsize  # drop a torn trailing record
+        if n == 0:
+            return
+        records = np.fromfile(journal_path, dtype=_JOURNAL_DTYPE, count=n)
+        rows = records["row"].astype(np.int64)
+        cols = records["col"].astype(np.int64)
+        self._ensure_shape(int(rows.max()) + 1, int(cols.max()) + 1)
+        # Later records win: keep the last occurrence of each (row, col).
+        keys = rows * self.status.shape[1] + cols
+        _, last = np.unique(keys[::-1], return_index=True)
+        last = n - 1 - last
+        self.status[rows[last], cols[last]] = records["status"][last]
+
+    def _replay_digest_journal(self, journal_path: Path) -> None:
+        n = journal_path.stat().st_size // _DIGEST_JOURNAL_DTYPE.itemsize
+        if n == 0:
+            return
+        records = np.fromfile(journal_path, dtype=_DIGEST_JOURNAL_DTYPE, count=n)
+        rows = records["row"].astype(np.int64)
+        cols = records["col"].astype(np.int64)
+        self._ensure_shape(int(rows.max()) + 1, int(cols.max()) + 1)
+        # In write order, so the last record of a chunk wins.
+        self.digests["size"][rows, cols] = records["size"]
+        self.digests["crc"][rows, cols] = records["crc"]
+
+    def flush(self) -> None:
+        """Append the chunks completed since the last flush to the journals."""
+        if self._pending_digests:
+            records = np.array(self._pending_digests, dtype=_DIGEST_JOURNAL_DTYPE)
+            with open(self.tmp_dir / DIGEST_JOURNAL_FILENAME, "ab") as fh:
+                fh.write(records.tobytes())
+            self._pending_digests.clear()
+        if not self._pending:
+            return
+        records = np.array(self._pending, dtype=_JOURNAL_DTYPE)
+        with open(self.tmp_dir / JOURNAL_FILENAME, "ab") as fh:
+            fh.write(records.tobytes())
+        self._pending.clear()
+
+    def compact(self) -> None:
+        """Write the full status and digest arrays and drop the journals (and
+        any legacy ``manifest.json`` they superseded)."""
+        self._pending.clear()
+        self._pending_digests.clear()
+        # Digests first: a status array on disk always has its digests.
+        self._save_array(DIGEST_FILENAME, self.digests)
+        self._save_array(MANIFEST_FILENAME, self.status)
+        (self.tmp_dir / JOURNAL_FILENAME).unlink(missing_ok=True)
+        (self.tmp_dir / DIGEST_JOURNAL_FILENAME).unlink(missing_ok=True)
+        (self.tmp_dir / LEGACY_MANIFEST_FILENAME).unlink(missing_ok=True)
+
+    def _save_array(self, name: str, array: np.ndarray) -> None:
+        tmp_path = self.tmp_dir / (name + ".tmp")
+        with open(tmp_path, "wb") as fh:
+            np.save(fh, array, allow_pickle=False)
+        os.replace(tmp_path, self.tmp_dir / name)
+
+    # -- access ---------------------------------------------------------------
+
+    def _ensure_shape(self, n_rows: int, n_cols: int) -> None:
+        rows, cols = self.status.shape
+        if n_rows <= rows and n_cols <= cols:
+            return
+        shape = (max(rows, n_rows), max(cols, n_cols))
+        grown = np.zeros(shape, dtype=np.uint8)
+        grown[:rows, :cols] = self.status
+        self.status = grown
+        grown_digests = np.zeros(shape, dtype=_DIGEST_DTYPE)
+        grown_digests[:rows, :cols] = self.digests
+        self.digests = grown_digests
+
+    def reserve(self, n_rows: int, n_cols: int) -> None:
+        """Size the array for an ``n_rows x n_cols`` grid up front so
+        :meth:`set` never has to grow it mid-run."""
+        self._ensure_shape(n_rows, n_cols)
+
+    def get(self, row: int, col: int) -> int:
+        rows, cols = self.status.shape
+        if row >= rows or col >= cols:
+            return MISSING
+        return int(self.status[row, col])
+
+    def lookup(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Vectorised :meth:`get`: the status of every ``(rows[i], cols[i])``."""
+        out = np.full(len(rows), MISSING, dtype=np.uint8)
+        n_rows, n_cols = self.status.shape
+        inside = (rows < n_rows) & (cols < n_cols)
+        out[inside] = self.status[rows[inside], cols[inside]]
+        return out
+
+    def set(
+        self,
+        row: int,
+        col: int,
+        status: int,
+        digest: tuple[int, int] | None = None,
+    ) -> None:
+        """Record *status* for a chunk, with the :func:`file_digest` of the
+        file just written when one is given."""
+        self._ensure_shape(row + 1, col + 1)
+        self.status[row, col] = status
+        if digest is not None:
+            self.digests[row, col] = digest
+            self._pending_digests.append((row, col, *digest))
+        self._pending.append((row, col, status))
+
+    def digest(self, row: int, col: int) -> tuple[int, int] | None:
+        """The chunk's recorded ``(size, crc32)``, or None if it has none."""
+        rows, cols = self.digests.shape
+        if row >= rows or col >= cols:
+            return None
+        size, crc = self.digests[row, col].item()
+        return (size, crc) if size else None
+
+    def file_name(self, row: int, col: int) -> str:
+        return f"chunk_{col}_{row}{self.suffix}"
+
+    def update_from_dict(self, entries: dict) -> None:
+        """Merge ``{"row_col": {"status": ...}}`` entries (the legacy JSON /
+        on-disk recovery format) into the manifest."""
+        for key, entry in entries.items():
+            code = _STATUS_CODES.get(entry.get("status"))
+            if code is None:
+                continue
+            try:
+                row, col = (int(p) for p in key.split("_"))
+            except ValueError:
+                continue
+            self.set(row, col, code)
+
+    def count(self, status: int = DOWNLOADED) -> int:
+        return int(np.count_nonzero(self.status == status))
+
+    def __bool__(self) -> bool:
+        return bool(self.status.any())
@@ -0,0 +1,233 @@
+"""Automatic exportImage chunk size (``--chunk-px auto``).
+
+A fixed 256 px chunk makes a large AOI millions of requests, VRT sources
+and files, each paying the server's per-request overhead, while most
+ImageServers render up to their ``maxImageWidth`` x ``maxImageHeight``
+(4100 px by default) in one request. :func:`choose_chunk_px` picks the
+largest multiple of 256 px that stays within:
+
+* the service's image size limits (recorded by ``refresh-services``);
+* a memory budget for the decoded chunks held by the fetch and write
+  stages at once;
+* the request timeout, through a :class:`LatencyModel` -- request time as
+  a fixed overhead plus a cost per pixel -- fitted to a few probe requests
+  of different sizes (:func:`measure_latency`);
+* enough chunks to keep every worker busy.
+
+The size chosen is saved next to the chunk manifest, since the manifest is
+indexed by the grid: a resumed ``auto`` run reuses it (or the chunk size of
+the grid the manifest records) instead of measuring again and re-cutting
+the grid under a half-finished download, whichever service it picks. A
+scratch directory from before grids were recorded resumes at the fixed
+256 px those runs used.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from .ChunkGrid import LEGACY_CHUNK_PX, TILE_PX
+from .ChunkManifest import load_grid, previous_run_files
+from .ServiceProbe import probe_chunk
+
+AUTO = "auto"
+
+CHUNK_SIZE_FILENAME = "chunk_size.json"
+
+# MB of decoded chunk pixels the fetch and write stages may hold at once.
+DEFAULT_MEMORY_BUDGET_MB = 1024
+
+# Side (px) assumed for a service whose image size limits are not recorded
+# (a registry written before they were), well below ArcGIS's default 4100.
+_UNKNOWN_LIMIT_PX = 2048
+
+# Decoded bytes per pixel: RGBA imagery and F32 elevation alike.
+_BYTES_PER_PX = 4
+
+# Largest share of the request timeout a chunk's predicted latency may use,
+# leaving room for a slow server before requests time out.
+_TIMEOUT_SHARE = 0.25
+
+# Chunks per worker the grid should at least have.
+_CHUNKS_PER_WORKER = 2
+
+# Sides (px) of the probe requests, each fetched twice.
+_PROBE_PX = (256, 1024)
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """Request latency as ``overhead_s + s_per_px * pixels``."""
+
+    overhead_s: float
+    s_per_px: float
+
+    @classmethod
+    def fit(cls, samples) -> "LatencyModel":
+        """Least-squares fit to ``(pixels, seconds)`` *samples* (at least two
+        sizes); the overhead and slope are clamped at zero."""
+        xs, ys = zip(*samples)
+        mean_x = sum(xs) / len(xs)
+        mean_y = sum(ys) / len(ys)
+        var = sum((x - mean_x) ** 2 for x in xs)
+        if not var:
+            raise ValueError("latency samples need at least two sizes")
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in samples) / var
+        slope = max(slope, 0.0)
+        return cls(max(mean_y - slope * mean_x, 0.0), slope)
+
+    def predict(self, side_px: int) -> float:
+        """Seconds for a ``side_px`` x ``side_px`` chunk."""
+        return self.overhead_s + self.s_per_px * side_px * side_px
+
+    def max_side(self, seconds: float) -> float:
+        """Largest chunk side predicted to take at most *seconds*."""
+        if self.s_per_px <= 0:
+            return math.inf
+        return math.sqrt(max(seconds - self.overhead_s, 0.0) / self.s_per_px)
+
+
+def service_limit_px(service) -> int:
+    """The largest image side (px) *service*'s exportImage will return."""
+    limits = [
+        v for v in (service.max_image_width, service.max_image_height) if v
+    ]
+    return min(limits) if limits else _UNKNOWN_LIMIT_PX
+
+
+def choose_chunk_px(
+    total_w_px: int,
+    total_h_px: int,
+    service,
+    workers: int,
+    timeout: float,
+    model: LatencyModel | None = None,
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+) -> int:
+    """The chunk side for a ``total_w_px`` x ``total_h_px`` raster from
+    *service* fetched by *workers* workers: the largest multiple of 256 px
+    within every bound in the module docstring (never below 256)."""
+    # Fetched chunks wait for the write stage, so up to twice the workers'
+    # chunks can be decoded at once.
+    in_flight = 2 * max(workers, 1)
+    bounds = {
+        "service limit": service_limit_px(service),
+        "memory": math.sqrt(
+            memory_budget_mb * 2**20 / (_BYTES_PER_PX * in_flight)
+        ),
+        "workers": math.sqrt(
+            total_w_px * total_h_px / (_CHUNKS_PER_WORKER * max(workers, 1))
+        ),
+    }
+    if model is not None:
+        bounds["latency"] = model.max_side(timeout * _TIMEOUT_SHARE)
+    reason, side = min(bounds.items(), key=lambda kv: kv[1])
+    chunk_px = max(TILE_PX, int(side) // TILE_PX * TILE_PX)
+    print(f"Auto chunk size: {chunk_px}px (bounded by {reason})")
+    return chunk_px
+
+
+def measure_latency(
+    service,
+    img_format: str,
+    pixel_type: str,
+    centre: tuple[float, float],
+    pixel_size_m: float,
+    timeout: int,
+) -> LatencyModel | None:
+    """Fit a :class:`LatencyModel` to probe requests of ``_PROBE_PX`` sides
+    centred on *centre* (EPSG:3857, at *pixel_size_m*), or None when the
+    probes fail -- the size is then chosen without it."""
+    from .DownloaderBase import _make_session, fetch_chunk
+
+    samples = []
+    sides = [px for px in _PROBE_PX if px <= service_limit_px(service)]
+    try:
+        with _make_session(1) as session:
+            for side in sides:
+                chunk = probe_chunk(centre, side, pixel_size_m)
+                # The faster of two requests, to discount a cold cache.
+                times = []
+                for _ in range(2):
+                    started = time.monotonic()
+                    fetch_chunk(
+                        session, service, chunk, img_format, 1, timeout, pixel_type
+                    )
+                    times.append(time.monotonic() - started)
+                samples.append((side * side, min(times)))
+        model = LatencyModel.fit(samples)
+    except (RuntimeError, ValueError) as e:
+        print(f"Could not measure {service.key} latency ({e}).")
+        return None
+    print(
+        f"Measured {service.key}: {model.overhead_s * 1000:.0f} ms per request "
+        f"+ {model.s_per_px * 1e9:.1f} ns/px"
+    )
+    return model
+
+
+def resolve_chunk_px(
+    chunk_px,
+    tmp_dir: Path,
+    service,
+    bounds: tuple[float, float, float, float],
+    pixel_size_m: float,
+    workers: int,
+    timeout: int,
+    img_format: str,
+    pixel_type: str,
+) -> int:
+    """*chunk_px*, or for ``auto`` the size chosen for the EPSG:3857
+    *bounds* at *pixel_size_m* (see :func:`choose_chunk_px`), measured
+    against *service* unless an earlier run at the same pixel size in
+    *tmp_dir* saved one or left a chunk grid. Files of a run that recorded
+    neither resume at ``LEGACY_CHUNK_PX``."""
+    if chunk_px != AUTO:
+        return int(chunk_px)
+    saved_path = Path(tmp_dir) / CHUNK_SIZE_FILENAME
+    try:
+        saved = json.loads(saved_path.read_text())
+    except (OSError, ValueError):
+        saved = {}
+    grid = load_grid(tmp_dir)
+    if not saved and grid is None and previous_run_files(tmp_dir):
+        print(f"Auto chunk size: {LEGACY_CHUNK_PX}px (from the previous run)")
+        return LEGACY_CHUNK_PX
+    grid = grid or {}
+    for previous in (saved, grid):
+        if previous.get("chunk_px") and round(
+            previous.get("pixel_size_m", 0), 6
+        ) == round(pixel_size_m, 6):
+            print(
+                f"Auto chunk size: {previous['chunk_px']}px (from the previous run)"
+            )
+            return int(previous["chunk_px"])
+
+    xmin, ymin, xmax, ymax = bounds
+    model = measure_latency(
+        service,
+        img_format,
+        pixel_type,
+        ((xmin + xmax) / 2, (ymin + ymax) / 2),
+        pixel_size_m,
+        timeout,
+    )
+    chunk_px = choose_chunk_px(
+        max(1, round((xmax - xmin) / pixel_size_m)),
+        max(1, round((ymax - ymin) / pixel_size_m)),
+        service,
+        workers,
+        timeout,
+        model,
+    )
+    saved = {
+        "service": service.key,
+        "pixel_size_m": round(pixel_size_m, 6),
+        "chunk_px": chunk_px,
+    }
+    saved_path.write_text(json.dumps(saved) + "\n")
+    return chunk_px
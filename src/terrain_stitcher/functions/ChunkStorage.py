@@ -0,0 +1,65 @@
+"""GeoTIFF creation options for the downloaded chunks (``--chunk-compression``).
+
+GDAL's GTiff defaults -- uncompressed, one strip per row block -- make an
+LOD 19 ``aoi_chunks`` directory hundreds of GB, all of which the mosaic VRT
+and gdal2tiles then read back through the page cache. The presets here trade
+a little CPU on the write stage for several times less disk, and are chosen
+for fast *decode*, which is what the later reads pay for:
+
+* ``deflate`` -- DEFLATE with a predictor (horizontal differencing for U8
+  imagery, floating-point for F32 elevation); readable everywhere.
+* ``zstd`` -- ZSTD with the same predictors: about as small as DEFLATE at a
+  low level and several times faster to decode; needs a GDAL built with
+  ZSTD (the default in current releases).
+* ``lerc`` -- lossless LERC (with DEFLATE) for F32 elevation, which packs
+  smooth terrain tighter than a predictor does; U8 imagery chunks use
+  ``deflate`` instead.
+
+Every preset also writes 256 x 256 internal tiles, so a reader that needs a
+window of a large chunk decodes only the tiles under it. ``none`` keeps
+GDAL's defaults (and the server's own TIFF bytes for elevation).
+"""
+
+from __future__ import annotations
+
+CHUNK_COMPRESSIONS = ("none", "deflate", "zstd", "lerc")
+
+# Internal tile size of compressed chunks.
+_BLOCK_PX = 256
+
+# PREDICTOR values: 2 = horizontal differencing, 3 = floating point.
+_PREDICTOR = {"U8": "2", "F32": "3"}
+
+
+def chunk_creation_options(compression: str, pixel_type: str = "U8") -> list[str]:
+    """GTiff ``KEY=VALUE`` creation options for *compression* (one of
+    ``CHUNK_COMPRESSIONS``) and chunks of *pixel_type*; empty for ``none``."""
+    if compression not in CHUNK_COMPRESSIONS:
+        raise ValueError(
+            f"unknown chunk compression {compression!r}; "
+            f"expected one of {CHUNK_COMPRESSIONS}"
+        )
+    if compression == "none":
+        return []
+    if compression == "lerc" and pixel_type != "F32":
+        compression = "deflate"
+    options = [
+        "TILED=YES",
+        f"BLOCKXSIZE={_BLOCK_PX}",
+        f"BLOCKYSIZE={_BLOCK_PX}",
+    ]
+    if compression == "lerc":
+        return options + ["COMPRESS=LERC_DEFLATE", "MAX_Z_ERROR=0"]
+    options += [
+        f"COMPRESS={compression.upper()}",
+        f"PREDICTOR={_PREDICTOR.get(pixel_type, '1')}",
+    ]
+    if compression == "zstd":
+        # Decode speed barely depends on the level; encode time does.
+        options.append("ZSTD_LEVEL=3")
+    return options
+
+
+def options_dict(options: list[str]) -> dict[str, str]:
+    """*options* as the keyword arguments rasterio takes."""
+    return dict(option.split("=", 1) for option in options)
@@ -0,0 +1,264 @@
+"""Shared circuit breaker and deadlines for exportImage fetches.
+
+Each download worker retries a failed chunk on its own, so when the server
+goes down for ten minutes every worker burns through the retry budget of
+each chunk it picks up and the run ends with thousands of ``FAILED``
+entries. :class:`CircuitBreaker` is one object shared by every worker
+(thread or asyncio task) of a run that:
+
+* counts consecutive transport errors / transient statuses across all
+  workers and, past ``threshold``, *opens*: no worker starts a request,
+* after ``cooldown_s`` lets exactly one *probe* request through
+  (half-open); its success closes the circuit and releases every worker,
+  its failure re-opens it for twice as long (up to ``max_cooldown_s``),
+* does not charge failures that happen while the circuit is open to the
+  chunk's retry budget -- an outage stalls the run instead of failing it,
+* gives up after ``max_probes`` probes in a row have failed: the circuit
+  closes and failures use up the chunks' retries again, so a service that
+  is down for good ends the run as it did without a breaker,
+* bounds that stall with a per-chunk deadline (from the chunk's first
+  attempt) and a whole-run deadline (from the breaker's creation).
+
+A chunk past its own deadline fails with :class:`DeadlineExceeded`; chunks
+reached after the run deadline fail fast with :class:`RunDeadlineExceeded`
+and are left unrecorded, so the next run fetches them.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+from .RateControl import Waiters
+
+# Consecutive failed requests (across all workers) that open the circuit.
+DEFAULT_BREAKER_THRESHOLD = 20
+
+# Seconds the circuit stays open before the first probe, and the ceiling the
+# doubling reaches while probes keep failing.
+DEFAULT_BREAKER_COOLDOWN_S = 30.0
+DEFAULT_BREAKER_MAX_COOLDOWN_S = 300.0
+
+# Failed probes in a row after which the breaker gives up (about 17 minutes
+# of outage at the default cooldowns).
+DEFAULT_BREAKER_MAX_PROBES = 6
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class DeadlineExceeded(RuntimeError):
+    """A chunk ran out of time before it could be fetched."""
+
+
+class RunDeadlineExceeded(DeadlineExceeded):
+    """The whole run ran out of time; the chunk was not fetched and is left
+    for the next run."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker shared by every worker of one
+    download run, plus the run's deadlines.
+
+    Workers call :meth:`wait` (or :meth:`wait_async`) before each attempt,
+    passing the chunk's :meth:`deadline`, and report the outcome with
+    :meth:`on_success` (any response that is not transient: the server is
+    answering) or :meth:`on_failure`, whose return value says whether the
+    failure belongs to an outage and so should not count as a retry.
+
+    ``threshold`` 0 never opens the circuit; only the deadlines apply.
+    ``max_probes`` 0 never gives up on an outage.
+    ``chunk_deadline_s`` / ``run_deadline_s`` of None mean no deadline.
+    """
+
+    def __init__(
+        self,
+        threshold: int = DEFAULT_BREAKER_THRESHOLD,
+        cooldown_s: float = DEFAULT_BREAKER_COOLDOWN_S,
+        max_cooldown_s: float = DEFAULT_BREAKER_MAX_COOLDOWN_S,
+        max_probes: int = DEFAULT_BREAKER_MAX_PROBES,
+        chunk_deadline_s: Optional[float] = None,
+        run_deadline_s: Optional[float] = None,
+    ) -> None:
+        self.threshold = max(int(threshold), 0)
+        self.cooldown_s = cooldown_s
+        self.max_cooldown_s = max(max_cooldown_s, cooldown_s)
+        self.max_probes = max(int(max_probes), 0)
+        self.chunk_deadline_s = chunk_deadline_s
+        self.run_deadline = (
+            time.monotonic() + run_deadline_s if run_deadline_s is not None else None
+        )
+
+        self._cond = threading.Condition()
+        self._state = CLOSED
+        self._consecutive = 0
+        self._cooldown = cooldown_s
+        self._opened_at = 0.0
+        self._reopen_at = 0.0
+        self._probe_started = 0.0
+        self._failed_probes = 0
+        self.gave_up = False
+        self._waiters = Waiters(self._cond)
+        self.trips = 0
+        self.probes = 0
+        self.open_s = 0.0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def deadline(self) -> Optional[float]:
+        """Monotonic time by which a chunk whose first attempt starts now
+        must be fetched: the earlier of its own and the run's deadline."""
+        deadline = self.run_deadline
+        if self.chunk_deadline_s is not None:
+            own = time.monotonic() + self.chunk_deadline_s
+            deadline = own if deadline is None else min(deadline, own)
+        return deadline
+
+    # -- gating ---------------------------------------------------------------
+
+    def _check(self, now: float, deadline: Optional[float]) -> None:
+        if self.run_deadline is not None and now >= self.run_deadline:
+            raise RunDeadlineExceeded("run deadline reached")
+        if deadline is not None and now >= deadline:
+            raise DeadlineExceeded("chunk deadline reached")
+
+    def _bounded(self, wait: float, now: float, deadline: Optional[float]) -> float:
+        """*wait*, cut short so the waiter wakes in time to see *deadline*
+        or the run's."""
+        for d in (deadline, self.run_deadline):
+            if d is not None:
+                wait = min(wait, d - now)
+        return max(wait, 0.0)
+
+    def _admit_delay(self, now: float) -> float:
+        """With the lock held: admit the caller (returns 0.0) or return how
+        long to wait before asking again."""
+        if self._state == CLOSED:
+            return 0.0
+        if self._state == OPEN:
+            if now < self._reopen_at:
+                return self._reopen_at - now
+            self._state = HALF_OPEN
+        elif now < self._probe_started + self.cooldown_s:
+            # One probe at a time; the others wait for its outcome.
+            return self._probe_started + self.cooldown_s - now
+        # First caller after the cooldown -- or the previous probe went
+        # unreported for a whole cooldown -- becomes the probe.
+        self._probe_started = now
+        self.probes += 1
+        return 0.0
+
+    def _gate(self, now: float, deadline: Optional[float]) -> float:
+        """With the lock held: raise past a deadline, else admit the caller
+        (returns 0.0) or return how long to wait before asking again."""
+        self._check(now, deadline)
+        wait = self._admit_delay(now)
+        if wait == 0.0:
+            return 0.0
+        return self._bounded(wait, now, deadline)
+
+    def wait(self, deadline: Optional[float] = None) -> None:
+        """Block while the circuit is open. Raises :class:`DeadlineExceeded`
+        (or :class:`RunDeadlineExceeded`) once *deadline* (or the run's)
+        passes first."""
+        with self._cond:
+            while True:
+                wait = self._gate(time.monotonic(), deadline)
+                if wait == 0.0:
+                    return
+                self._cond.wait(timeout=wait)
+
+    async def wait_async(self, deadline: Optional[float] = None) -> None:
+        """:meth:`wait` for asyncio tasks; suspends instead of blocking the
+        event loop."""
+        await self._waiters.wait_async(lambda now: self._gate(now, deadline))
+
+    # -- outcomes -------------------------------------------------------------
+
+    def on_success(self) -> None:
+        now = time.monotonic()
+        with self._cond:
+            self._consecutive = 0
+            self._failed_probes = 0
+            self.gave_up = False
+            if self._state != CLOSED:
+                self.open_s += now - self._opened_at
+                self._state = CLOSED
+                self._cooldown = self.cooldown_s
+                self._waiters.wake()
+
+    def on_failure(self) -> bool:
+        """Record a transport error or transient status. Returns True when
+        the circuit is open after it: the failure is part of an outage, and
+        the worker should wait on the breaker rather than spend a retry.
+        After ``max_probes`` failed probes in a row it gives up until the
+        next success: the circuit closes and this returns False."""
+        now = time.monotonic()
+        with self._cond:
+            if self._state == CLOSED:
+                self._consecutive += 1
+                if (
+                    self.gave_up
+                    or not self.threshold
+                    or self._consecutive < self.threshold
+                ):
+                    return False
+                self.trips += 1
+                self._opened_at = now
+                self._cooldown = self.cooldown_s
+            elif self._state == HALF_OPEN:
+                self._failed_probes += 1
+                if self.max_probes and self._failed_probes >= self.max_probes:
+                    self.open_s += now - self._opened_at
+                    self._state = CLOSED
+                    self.gave_up = True
+                    self._waiters.wake()
+                    return False
+                self._cooldown = min(self._cooldown * 2, self.max_cooldown_s)
+            self._state = OPEN
+            self._reopen_at = max(self._reopen_at, now + self._cooldown)
+            return True
+
+    # -- reporting ------------------------------------------------------------
+
+    def status(self) -> str:
+        """Short progress-bar summary of an open circuit ("" when closed)."""
+        if self._state == CLOSED:
+            return ""
+        if self._state == HALF_OPEN:
+            return "circuit half-open, probing"
+        wait = max(self._reopen_at - time.monotonic(), 0.0)
+        return f"circuit open, probe in {wait:.0f}s"
+
+    def report(self) -> str:
+        """One-line summary of the run's outages."""
+        report = (
+            f"Circuit breaker opened {self.trips} time(s) after "
+            f"{self.threshold} consecutive failures; downloads paused for "
+            f"{self.open_s:.0f}s in total ({self.probes} probe request(s))."
+        )
+        if self.gave_up:
+            report += (
+                f" Gave up after {self.max_probes} failed probes in a row; "
+                f"the service did not come back."
+            )
+        return report
+
+
+def capped_sleep(delay: float, deadline: Optional[float]) -> float:
+    """A retry's backoff *delay*, shortened to end at *deadline*."""
+    if deadline is None:
+        return delay
+    return max(min(delay, deadline - time.monotonic()), 0.0)
+
+
+def request_timeout(timeout: float, deadline: Optional[float]) -> float:
+    """A request's *timeout*, shortened to end at *deadline* (but positive,
+    so a request just before the deadline still gets sent)."""
+    if deadline is None:
+        return timeout
+    return max(min(timeout, deadline - time.monotonic()), 0.1)
@@ -0,0 +1,309 @@
+"""Direct gather: render each gathered window straight from exportImage.
+
+The regular ``process-terrain`` path downloads 256-px chunks, mosaics them,
+tiles the mosaic with gdal2tiles, rescans the tile pyramid and finally
+stitches ``d x d`` tile windows back into ``gathered_r*_c*.png`` images --
+several full passes over the AOI on disk to rebuild images the server can
+render directly. :func:`gather_direct` instead computes every window's
+projected extent from the shape region up front, fetches it as a few
+server-sized exportImage sub-requests (each at most ``max_image_px`` on a
+side, by default the service's ``maxImageWidth/Height``), assembles them in
+memory and writes the PNG plus its ``height_info.json`` entry. No chunk
+files, VRT or tile pyramid are involved.
+
+The windows match ``gather-ortho --from-download`` exactly: the same tiles
+survive the shape filter (closed-interval overlap, as
+:class:`ShapeTileFilter`), windows are bucketed ``d x d`` from the NW-most
+tile, and the manifest bounds come from
+:meth:`TileBoundsCalculator.window_bounds`. With ``scale_factor`` < 1 the
+server renders each window at the reduced size instead of the stitcher
+downscaling every tile. For a CIRCLE / POLYGON Shape.json, windows and
+sub-requests that lie wholly outside the shape are not fetched.
+"""
+
+from __future__ import annotations
+
+import io
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+from PIL import Image as pImage
+from tqdm import tqdm
+
+from terrain_stitcher.arcgis.services import (
+    ImageryService,
+    bbox_latlon_from_radius,
+    load_services,
+)
+from terrain_stitcher.arcgis.tile_bounds import TileBoundsCalculator
+from terrain_stitcher.arcgis.tile_filter import ShapeTileFilter
+from terrain_stitcher.arcgis.tile_scheme import TileSchemeInfo
+from terrain_stitcher.common.ParseArea import ParseArea
+from terrain_stitcher.common.area_mask import AreaMask
+
+from .ArcGisImporter import (
+    StitchedGroup,
+    _merge_elevation_into_output,
+    writeManifestFromEntries,
+)
+from .BlankImage import is_blank
+from .ChunkSize import service_limit_px
+from .DownloaderBase import (
+    _MAX_INFLIGHT_FACTOR,
+    _make_session,
+    _stream_futures,
+    fetch_chunk,
+)
+from .ElevationGeoPrep import DEFAULT_PADDING_DEG
+from .OrthoDownloader import OrthoDownloader, assert_lod_within_native
+from .OrthoStitcher import _output_stem, _save_canvas
+
+# Largest exportImage sub-request side, in pixels. ArcGIS ImageServer's
+# default maxImageWidth is 4100 (maxImageHeight 15000).
+DEFAULT_MAX_IMAGE_PX = 4096
+
+
+def plan_windows(
+    region,
+    lod: int,
+    dimension: int,
+    scale_factor: float = 1.0,
+    area_mask: AreaMask | None = None,
+) -> tuple[TileSchemeInfo, list[dict]]:
+    """Every ``dimension x dimension`` gather window over *region* at *lod*
+    (with *area_mask*, only those touching it).
+
+    Returns the Web Mercator scheme and one dict per window with its
+    normalized ``origin``, inclusive tile range ``r_lo``/``c_lo``/``r_hi``/
+    ``c_hi``, EPSG:3857 extent ``xmin``/``ymin``/``xmax``/``ymax`` and output
+    size ``w`` x ``h`` (``cell`` px per tile).
+    """
+    scheme = TileSchemeInfo.from_web_mercator(min_level=lod, max_level=lod)
+    res = scheme.levels[0].resolution
+    tw = scheme.tile_cols * res
+    th = scheme.tile_rows * res
+    ox, oy = scheme.tile_origin_x, scheme.tile_origin_y
+    min_x, min_y, max_x, max_y = ShapeTileFilter(scheme, region).box
+
+    # Tiles whose closed footprint touches the box, as ShapeTileFilter.mask.
+    c_min = math.ceil((min_x - ox) / tw - 1)
+    c_max = math.floor((max_x - ox) / tw)
+    r_min = math.ceil((oy - max_y) / th - 1)
+    r_max = math.floor((oy - min_y) / th)
+
+    cell_w = int(scheme.tile_cols * scale_factor)
+    cell_h = int(scheme.tile_rows * scale_factor)
+    windows = []
+    for wr in range(0, r_max - r_min + 1, dimension):
+        r_lo = r_min + wr
+        r_hi = min(r_lo + dimension - 1, r_max)
+        for wc in range(0, c_max - c_min + 1, dimension):
+            c_lo = c_min + wc
+            c_hi = min(c_lo + dimension - 1, c_max)
+            windows.append(
+                {
+                    "origin": (wr, wc),
+                    "r_lo": r_lo,
+                    "c_lo": c_lo,
+                    "r_hi": r_hi,
+                    "c_hi": c_hi,
+                    "xmin": ox + c_lo * tw,
+                    "xmax": ox + (c_hi + 1) * tw,
+                    "ymax": oy - r_lo * th,
+                    "ymin": oy - (r_hi + 1) * th,
+                    "w": (c_hi - c_lo + 1) * cell_w,
+                    "h": (r_hi - r_lo + 1) * cell_h,
+                }
+            )
+    if area_mask is not None and windows:
+        keep = area_mask.intersects(
+            *(np.array([w[k] for w in windows]) for k in ("xmin", "ymin", "xmax", "ymax"))
+        )
+        windows = [w for w, k in zip(windows, keep) if k]
+    return scheme, windows
+
+
+def window_requests(window: dict, max_image_px: int = DEFAULT_MAX_IMAGE_PX):
+    """Split *window* into exportImage chunk dicts of at most *max_image_px*
+    per side, each with its pixel offset ``x_off``/``y_off`` in the window."""
+    px = (window["xmax"] - window["xmin"]) / window["w"]
+    py = (window["ymax"] - window["ymin"]) / window["h"]
+    pieces = []
+    for y_off in range(0, window["h"], max_image_px):
+        h = min(max_image_px, window["h"] - y_off)
+        for x_off in range(0, window["w"], max_image_px):
+            w = min(max_image_px, window["w"] - x_off)
+            xmin = window["xmin"] + x_off * px
+            ymax = window["ymax"] - y_off * py
+            pieces.append(
+                {
+                    "row": window["origin"][0],
+                    "col": window["origin"][1],
+                    "w": w,
+                    "h": h,
+                    "xmin": xmin,
+                    "xmax": xmin + w * px,
+                    "ymin": ymax - h * py,
+                    "ymax": ymax,
+                    "x_off": x_off,
+                    "y_off": y_off,
+                }
+            )
+    return pieces
+
+
+def gather_direct(
+    shape_file: str,
+    output_dir: str,
+    lod: int,
+    dimension: int,
+    scale_factor: float = 1.0,
+    resume: bool = False,
+    workers: int = 32,
+    timeout: int = 30,
+    service: ImageryService | None = None,
+    service_index: Optional[int | str] = None,
+    elevation_data_dir: Optional[str] = None,
+    elevation_padding_deg: float = DEFAULT_PADDING_DEG,
+    max_image_px: int | None = None,
+) -> list[StitchedGroup]:
+    """Write ``gathered_r*_c*.png`` + ``height_info.json`` for *shape_file*
+    at *lod* into *output_dir*, fetching every window from exportImage.
+
+    The output matches ``gather-ortho --from-download`` over a
+    ``download-arcgis`` of the same AOI. *workers* sub-requests are in
+    flight at once; windows are assembled in order, so only the few windows
+    whose sub-requests are in flight are held in memory. With *resume*,
+    windows whose PNG exists are skipped. A window with a failed sub-request
+    is left out (no PNG, no manifest entry) and reported; re-run with
+    *resume* to fill it. A window that comes back blank (see
+    :func:`is_blank`) is left out the same way. Sub-requests are at most
+    *max_image_px* per side, by default the service's image size limit.
+    """
+    if not (0.0 < scale_factor <= 1.0):
+        raise ValueError(
+            "scale_factor must be in (0.0, 1.0]; only downscaling is supported"
+        )
+    shape_area = ParseArea.fromJSONFile(shape_file)
+    downloader = OrthoDownloader(service=service, service_index=service_index)
+    lat = shape_area.center.get_lat()
+    lon = shape_area.center.get_lon()
+    service = downloader.resolve_service(
+        load_services, bbox_latlon_from_radius(lat, lon, shape_area.view_distance)
+    )
+    assert_lod_within_native(lod, service)
+    if max_image_px is None:
+        max_image_px = service_limit_px(service)
+
+    os.makedirs(output_dir, exist_ok=True)
+    elevation_files = None
+    if elevation_data_dir is not None:
+        elevation_files = _merge_elevation_into_output(
+            shape_file, elevation_data_dir, output_dir, elevation_padding_deg
+        )
+
+    area_mask = AreaMask.for_area(shape_area, 3857)
+    scheme, windows = plan_windows(
+        shape_area.getTotalRegion(), lod, dimension, scale_factor, area_mask
+    )
+    out_abs = os.path.abspath(output_dir)
+    out_paths = {
+        w["origin"]: os.path.join(out_abs, _output_stem(w["origin"]) + ".png")
+        for w in windows
+    }
+    todo = [w for w in windows if not (resume and os.path.isfile(out_paths[w["origin"]]))]
+    skipped = len(windows) - len(todo)
+    pieces = []
+    remaining: dict[tuple[int, int], int] = {}
+    for w in todo:
+        window_pieces = window_requests(w, max_image_px)
+        if area_mask is not None:
+            # The rest of the canvas stays transparent, like the tiles the
+            # shape filter drops from a gather-ortho window.
+            keep = area_mask.intersects(
+                *(
+                    np.array([p[k] for p in window_pieces])
+                    for k in ("xmin", "ymin", "xmax", "ymax")
+                )
+            )
+            window_pieces = [p for p, k in zip(window_pieces, keep) if k]
+        pieces.extend(window_pieces)
+        remaining[w["origin"]] = len(window_pieces)
+    print(
+        f"Direct gather at LOD {lod}: {len(windows)} window(s) of "
+        f"{dimension}x{dimension} tiles; fetching {len(todo)} as "
+        f"{len(pieces)} exportImage request(s)"
+        + (f" ({skipped} skipped via --resume)" if skipped else "")
+    )
+
+    by_origin = {w["origin"]: w for w in todo}
+    canvases: dict[tuple[int, int], pImage.Image] = {}
+    failed: set[tuple[int, int]] = set()
+    blank: set[tuple[int, int]] = set()
+    max_retries = downloader.default_max_retries
+
+    def fetch(piece):
+        raw = fetch_chunk(
+            session,
+            service,
+            piece,
+            downloader.img_format,
+            max_retries,
+            timeout,
+            downloader.pixel_type,
+        )
+        with pImage.open(io.BytesIO(raw)) as img:
+            return img.convert("RGBA")
+
+    with _make_session(workers) as session, ThreadPoolExecutor(
+        max_workers=workers
+    ) as pool:
+        with tqdm(total=len(todo), desc="Gathering windows", unit="win") as pbar:
+            for piece, res in _stream_futures(
+                pool, fetch, pieces, max(workers, 1) * _MAX_INFLIGHT_FACTOR
+            ):
+                origin = (piece["row"], piece["col"])
+                if isinstance(res, Exception):
+                    pbar.write(f"Window {_output_stem(origin)} FAILED: {res}")
+                    failed.add(origin)
+                    canvases.pop(origin, None)
+                elif origin not in failed:
+                    window = by_origin[origin]
+                    canvas = canvases.get(origin)
+                    if canvas is None:
+                        canvas = pImage.new("RGBA", (window["w"], window["h"]))
+                        canvases[origin] = canvas
+                    canvas.paste(res, (piece["x_off"], piece["y_off"]))
+                remaining[origin] -= 1
+                if remaining[origin] == 0:
+                    canvas = canvases.pop(origin, None)
+                    if canvas is not None and is_blank(canvas):
+                        blank.add(origin)
+                    elif canvas is not None:
+                        _save_canvas(canvas, out_paths[origin])
+                    pbar.update(1)
+
+    calc = TileBoundsCalculator(scheme)
+    entries = []
+    summaries = []
+    for w in windows:
+        if w["origin"] in failed or w["origin"] in blank:
+            continue
+        bounds = calc.window_bounds(lod, w["r_lo"], w["c_lo"], w["r_hi"], w["c_hi"])
+        entries.append({"name": _output_stem(w["origin"]), "bounds": bounds.toJSON()})
+        n_tiles = (w["r_hi"] - w["r_lo"] + 1) * (w["c_hi"] - w["c_lo"] + 1)
+        summaries.append(StitchedGroup(origin=w["origin"], n_tiles=n_tiles))
+
+    manifest_path = writeManifestFromEntries(output_dir, entries, elevation_files)
+    print(f"Wrote manifest: {manifest_path} ({len(entries)} image(s))")
+    if blank:
+        print(f"{len(blank)} blank window(s) left out.")
+    if failed:
+        print(
+            f"{len(failed)} window(s) failed after all retries and were left "
+            f"out. Re-run with --resume to fetch only those windows."
+        )
+    return summaries
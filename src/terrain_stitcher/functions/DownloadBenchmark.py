@@ -0,0 +1,297 @@
+"""Offline benchmark of the exportImage download pipeline.
+
+Times the download (``fetch_chunk`` + georeference / chunk write), mosaic
+(:func:`build_mosaic`) and tile (:func:`run_gdal2tiles`) stages against a
+:class:`MockImageServer` on localhost, for square AOIs of several sizes
+(chunks per side) and several worker counts, and reports chunks/s and MB/s
+per case. Nothing touches the network, so it runs in CI: ``--json`` saves
+the results and ``--baseline`` compares a run against saved ones, failing
+when a case's download chunks/s drops by more than ``--tolerance``.
+
+Stages that need GDAL (georeferencing PNGs, gdal2tiles) adapt to what is
+installed: without the GDAL bindings or ``gdal_translate``, ortho chunks are
+kept as PNG + world file (``--world-file``), and the tile stage is skipped
+without gdal2tiles.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import shutil
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from terrain_stitcher.arcgis.mock_image_server import MockImageServer
+from terrain_stitcher.arcgis.services import KIND_ELEVATION, KIND_IMAGERY
+
+from .DownloaderBase import build_chunk_grid, build_mosaic
+from .DownloadOptions import DownloadOptions
+from .ElevationDownloader import ElevationDownloader
+from .OrthoDownloader import OrthoDownloader, pixel_size_for_zoom, run_gdal2tiles
+
+# Upper-left corner (EPSG:3857) of every benchmark AOI.
+_ORIGIN = (-10_000_000.0, 4_900_000.0)
+
+# LOD whose pixel size the imagery AOIs are requested at.
+_IMAGERY_LOD = 17
+
+RESULTS_SCHEMA = 1
+
+
+@dataclass
+class BenchmarkResult:
+    """One (kind, AOI size, workers) case. Stage times are seconds, None
+    when the stage was skipped."""
+
+    kind: str
+    chunks_per_side: int
+    workers: int
+    chunks: int
+    failed: int
+    bytes: int
+    download_s: float
+    mosaic_s: float | None = None
+    tiles_s: float | None = None
+
+    @property
+    def case(self) -> str:
+        side = self.chunks_per_side
+        return f"{self.kind}/{side}x{side}/w{self.workers}"
+
+    @property
+    def chunks_per_s(self) -> float:
+        return self.chunks / self.download_s if self.download_s else 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.bytes / 1e6 / self.download_s if self.download_s else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            **asdict(self),
+            "case": self.case,
+            "chunks_per_s": self.chunks_per_s,
+            "mb_per_s": self.mb_per_s,
+        }
+
+
+def _have_gdal_translate() -> bool:
+    return (
+        importlib.util.find_spec("osgeo") is not None
+        or shutil.which("gdal_translate") is not None
+    )
+
+
+def _have_gdal2tiles() -> bool:
+    return (
+        shutil.which("gdal2tiles.py") is not None
+        or shutil.which("gdal2tiles") is not None
+        or importlib.util.find_spec("osgeo_utils") is not None
+    )
+
+
+def run_case(
+    server: MockImageServer,
+    kind: str,
+    chunks_per_side: int,
+    workers: int,
+    work_dir: Path,
+    chunk_px: int = 256,
+    engine: str = "thread",
+    tiles: bool = True,
+) -> BenchmarkResult:
+    """Download, mosaic and (imagery only) tile one square AOI of
+    *chunks_per_side* x *chunks_per_side* chunks from *server*."""
+    if kind == KIND_IMAGERY:
+        downloader = OrthoDownloader(service=server.service(kind))
+        pixel_size_m = pixel_size_for_zoom(_IMAGERY_LOD)
+    else:
+        downloader = ElevationDownloader(service=server.service(kind))
+        pixel_size_m = server.service(kind).native_pixel_size_m
+    service = downloader.service
+    side_m = chunks_per_side * chunk_px * pixel_size_m
+    xmin, ymax = _ORIGIN
+    chunks = build_chunk_grid(
+        xmin, ymax - side_m, xmin + side_m, ymax, chunk_px, pixel_size_m
+    )
+    tmp_dir = work_dir / "chunks"
+    tmp_dir.mkdir(parents=True)
+
+    sent_before = server.bytes_sent
+    started = time.perf_counter()
+    chunk_paths, failed = downloader.download_chunks(
+        service,
+        chunks,
+        tmp_dir,
+        timeout=30,
+        num_workers=workers,
+        options=DownloadOptions(
+            engine=engine, world_file=not _have_gdal_translate()
+        ),
+    )
+    result = BenchmarkResult(
+        kind=kind,
+        chunks_per_side=chunks_per_side,
+        workers=workers,
+        chunks=len(chunk_paths),
+        failed=len(failed),
+        bytes=server.bytes_sent - sent_before,
+        download_s=time.perf_counter() - started,
+    )
+    if not len(chunk_paths):
+        return result
+
+    started = time.perf_counter()
+    try:
+        mosaic = build_mosaic(chunk_paths, tmp_dir, chunks=chunks, srs=service.srs)
+    except (OSError, RuntimeError) as e:
+        print(f"{result.case}: mosaic skipped ({e})")
+        return result
+    result.mosaic_s = time.perf_counter() - started
+
+    if tiles and kind == KIND_IMAGERY and _have_gdal2tiles():
+        started = time.perf_counter()
+        run_gdal2tiles(
+            mosaic,
+            str(work_dir / "tiles"),
+            str(_IMAGERY_LOD),
+            True,
+            "average",
+            1,
+            "none",
+        )
+        result.tiles_s = time.perf_counter() - started
+    return result
+
+
+def compare_to_baseline(
+    results: list[BenchmarkResult], baseline: dict, tolerance: float
+) -> list[str]:
+    """One message per case whose download chunks/s fell more than
+    *tolerance* (a fraction) below the same case in *baseline* (a saved
+    ``--json`` file). Cases missing from the baseline are not compared."""
+    previous = {r["case"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get(result.case)
+        if before is None or not before["chunks_per_s"]:
+            continue
+        floor = before["chunks_per_s"] * (1.0 - tolerance)
+        if result.chunks_per_s < floor:
+            regressions.append(
+                f"{result.case}: {result.chunks_per_s:.1f} chunks/s, baseline "
+                f"{before['chunks_per_s']:.1f} (-{tolerance:.0%} floor {floor:.1f})"
+            )
+    return regressions
+
+
+def _seconds(value: float | None) -> str:
+    return "skipped" if value is None else f"{value:.2f}s"
+
+
+def run_benchmark(
+    sizes=(4, 16),
+    workers=(8, 32),
+    kinds=(KIND_IMAGERY, KIND_ELEVATION),
+    chunk_px: int = 256,
+    engine: str = "thread",
+    latency_s: float = 0.02,
+    jitter_s: float = 0.01,
+    error_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    tiles: bool = True,
+) -> list[BenchmarkResult]:
+    """Run every (kind, size, workers) case against one mock server and
+    print a table of the results."""
+    results = []
+    with MockImageServer(
+        latency_s=latency_s,
+        jitter_s=jitter_s,
+        error_rate=error_rate,
+        throttle_rate=throttle_rate,
+    ) as server:
+        for kind in kinds:
+            for size in sizes:
+                for n in workers:
+                    with tempfile.TemporaryDirectory(prefix="ts_bench_") as tmp:
+                        results.append(
+                            run_case(
+                                server,
+                                kind,
+                                size,
+                                n,
+                                Path(tmp),
+                                chunk_px=chunk_px,
+                                engine=engine,
+                                tiles=tiles,
+                            )
+                        )
+
+    print(
+        f"\n{'case':<28}{'chunks/s':>10}{'MB/s':>8}{'download':>10}"
+        f"{'mosaic':>10}{'tiles':>10}"
+    )
+    for r in results:
+        print(
+            f"{r.case:<28}{r.chunks_per_s:>10.1f}{r.mb_per_s:>8.2f}"
+            f"{_seconds(r.download_s):>10}{_seconds(r.mosaic_s):>10}"
+            f"{_seconds(r.tiles_s):>10}"
+            + (f"  ({r.failed} failed)" if r.failed else "")
+        )
+    return results
+
+
+def main(
+    sizes=(4, 16),
+    workers=(8, 32),
+    kinds=(KIND_IMAGERY, KIND_ELEVATION),
+    chunk_px: int = 256,
+    engine: str = "thread",
+    latency_s: float = 0.02,
+    jitter_s: float = 0.01,
+    error_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    tiles: bool = True,
+    json_out: str | None = None,
+    baseline: str | None = None,
+    tolerance: float = 0.25,
+) -> list[BenchmarkResult]:
+    results = run_benchmark(
+        sizes=sizes,
+        workers=workers,
+        kinds=kinds,
+        chunk_px=chunk_px,
+        engine=engine,
+        latency_s=latency_s,
+        jitter_s=jitter_s,
+        error_rate=error_rate,
+        throttle_rate=throttle_rate,
+        tiles=tiles,
+    )
+    if json_out:
+        Path(json_out).write_text(
+            json.dumps(
+                {
+                    "schema": RESULTS_SCHEMA,
+                    "engine": engine,
+                    "latency_s": latency_s,
+                    "results": [r.to_dict() for r in results],
+                },
+                indent=2,
+            )
+        )
+        print(f"Wrote {json_out}")
+    if baseline:
+        regressions = compare_to_baseline(
+            results, json.loads(Path(baseline).read_text()), tolerance
+        )
+        if regressions:
+            print("Download throughput regressed:")
+            for line in regressions:
+                print(f"  {line}")
+            raise SystemExit(1)
+        print(f"No case regressed more than {tolerance:.0%} against {baseline}.")
+    return results
@@ -0,0 +1,243 @@
+"""Per-request metrics for exportImage downloads.
+
+The progress bar only says how many chunks are done, so a slow run could be
+server latency, throttling, the georeference step or the disk.
+:class:`DownloadMetrics` is shared by every worker of one
+:func:`download_all_chunks` run and records, for every chunk fetched, the
+time to first byte, total latency, bytes, final HTTP status and retry count
+of its request, plus the time spent writing the chunk. It shows live MB/s
+and latency percentiles on the progress bar and, when the download ends,
+writes a JSON summary (``download_metrics.json``) and optionally one CSV row
+per request (``download_requests.csv``) next to the chunk manifest. A run that
+completes removes its scratch directory, so the downloaders move these files
+out to the output first (see :func:`keep_metrics`).
+
+Latencies go into fixed log-spaced histograms rather than lists, so memory
+stays constant however many chunks a run fetches, and percentiles are read
+to within a few percent.
+"""
+
+from __future__ import annotations
+
+import collections
+import csv
+import json
+import math
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+METRICS_FILENAME = "download_metrics.json"
+REQUESTS_CSV_FILENAME = "download_requests.csv"
+
+# Histogram range (seconds) and resolution: bin edges grow by 2**(1/16)
+# (~4.4%) from 1 ms to ~17 min; values outside land in the end bins.
+_HIST_MIN_S = 0.001
+_HIST_BINS_PER_DOUBLING = 16
+_HIST_BINS = 20 * _HIST_BINS_PER_DOUBLING
+
+# Seconds of history used for the live MB/s figure.
+_RATE_WINDOW_S = 10.0
+
+# Minimum seconds between recomputations of the progress-bar status.
+_STATUS_EVERY_S = 0.5
+
+_CSV_FIELDS = ("row", "col", "status", "ttfb_s", "latency_s", "bytes", "retries")
+
+
+class LatencyHistogram:
+    """Counts of durations in log-spaced bins, for percentiles in O(bins)."""
+
+    def __init__(self) -> None:
+        self.counts = np.zeros(_HIST_BINS, dtype=np.int64)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        doublings = math.log2(max(seconds, _HIST_MIN_S) / _HIST_MIN_S)
+        i = int(doublings * _HIST_BINS_PER_DOUBLING)
+        self.counts[min(i, _HIST_BINS - 1)] += 1
+        self.total += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float | None:
+        """The *q*-quantile (0..1), as the upper edge of its bin (capped at
+        the largest value seen), or None when empty."""
+        if not self.total:
+            return None
+        i = int(np.searchsorted(np.cumsum(self.counts), q * self.total))
+        upper = _HIST_MIN_S * 2 ** ((i + 1) / _HIST_BINS_PER_DOUBLING)
+        return min(upper, self.max)
+
+    def summary(self) -> dict:
+        return {
+            "count": self.total,
+            "mean_s": self.sum / self.total if self.total else None,
+            "p50_s": self.quantile(0.50),
+            "p95_s": self.quantile(0.95),
+            "p99_s": self.quantile(0.99),
+            "max_s": self.max if self.total else None,
+        }
+
+
+def _ms(seconds: float | None) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.0f}ms"
+
+
+class DownloadMetrics:
+    """Request metrics of one download run, safe to share between threads.
+
+    :func:`fetch_chunk` (and its async counterpart) calls :meth:`record`
+    once per chunk it fetches, with the figures of the chunk's last attempt;
+    the chunk writer reports its time through :meth:`record_write`. With
+    *csv_path* every request is also appended there as it completes.
+    """
+
+    def __init__(self, csv_path: Path | None = None) -> None:
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.requests = 0
+        self.retries = 0
+        self.bytes = 0
+        self.by_status: collections.Counter = collections.Counter()
+        self.latency = LatencyHistogram()
+        self.ttfb = LatencyHistogram()
+        self.write = LatencyHistogram()
+        self._recent: collections.deque = collections.deque()  # (t, bytes)
+        self._status = ""
+        self._status_at = 0.0
+        self._csv_file = None
+        self._csv = None
+        if csv_path is not None:
+            self._csv_file = open(csv_path, "w", newline="")
+            self._csv = csv.writer(self._csv_file)
+            self._csv.writerow(_CSV_FIELDS)
+
+    def record(
+        self,
+        chunk: dict,
+        status: int | None,
+        ttfb: float | None,
+        latency: float | None,
+        nbytes: int,
+        retries: int,
+    ) -> None:
+        """One chunk's request: its final HTTP *status* (None for a
+        transport error), *ttfb* / *latency* in seconds, response *nbytes*
+        and the number of *retries* before the final attempt."""
+        now = time.monotonic()
+        with self._lock:
+            self.requests += 1
+            self.retries += retries
+            self.bytes += nbytes
+            self.by_status["error" if status is None else str(status)] += 1
+            if latency is not None:
+                self.latency.add(latency)
+            if ttfb is not None:
+                self.ttfb.add(ttfb)
+            self._recent.append((now, nbytes))
+            while self._recent and now - self._recent[0][0] > _RATE_WINDOW_S:
+                self._recent.popleft()
+            if self._csv is not None:
+                self._csv.writerow(
+                    (
+                        chunk["row"],
+                        chunk["col"],
+                        "" if status is None else status,
+                        "" if ttfb is None else f"{ttfb:.4f}",
+                        "" if latency is None else f"{latency:.4f}",
+                        nbytes,
+                        retries,
+                    )
+                )
+
+    def record_write(self, seconds: float) -> None:
+        """Time spent georeferencing / writing one chunk."""
+        with self._lock:
+            self.write.add(seconds)
+
+    def mb_per_s(self) -> float:
+        """Response MB/s over the last ``_RATE_WINDOW_S`` seconds."""
+        now = time.monotonic()
+        with self._lock:
+            window = min(_RATE_WINDOW_S, now - self.started)
+            recent = sum(n for t, n in self._recent if now - t <= _RATE_WINDOW_S)
+        return recent / 1e6 / window if window > 0 else 0.0
+
+    def status(self) -> str:
+        """Short live figures for the progress bar, refreshed at most every
+        ``_STATUS_EVERY_S`` seconds."""
+        now = time.monotonic()
+        if now - self._status_at >= _STATUS_EVERY_S:
+            with self._lock:
+                p50, p95, p99 = [self.latency.quantile(q) for q in (0.5, 0.95, 0.99)]
+            self._status = (
+                f"{self.mb_per_s():.1f} MB/s p50 {_ms(p50)} p95 {_ms(p95)} "
+                f"p99 {_ms(p99)}"
+            )
+            self._status_at = now
+        return self._status
+
+    def summary(self) -> dict:
+        """The whole run's figures, as written to ``download_metrics.json``."""
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            return {
+                "elapsed_s": elapsed,
+                "requests": self.requests,
+                "retries": self.retries,
+                "bytes": self.bytes,
+                "mb_per_s": self.bytes / 1e6 / elapsed if elapsed > 0 else 0.0,
+                "status_counts": dict(sorted(self.by_status.items())),
+                "latency": self.latency.summary(),
+                "ttfb": self.ttfb.summary(),
+                "write": self.write.summary(),
+            }
+
+    def report(self) -> str:
+        """One line for the end of a download."""
+        s = self.summary()
+        latency = s["latency"]
+        return (
+            f"{s['requests']} request(s), {s['retries']} retry(ies), "
+            f"{s['bytes'] / 1e6:.1f} MB at {s['mb_per_s']:.2f} MB/s; latency "
+            f"p50 {_ms(latency['p50_s'])} p95 {_ms(latency['p95_s'])} "
+            f"p99 {_ms(latency['p99_s'])}, write p95 {_ms(s['write']['p95_s'])}."
+        )
+
+    def write_summary(self, out_dir: Path) -> Path:
+        path = Path(out_dir) / METRICS_FILENAME
+        path.write_text(json.dumps(self.summary(), indent=2))
+        return path
+
+    def close(self) -> None:
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = self._csv = None
+
+
+def keep_metrics(src_dir: Path, out_dir: Path, prefix: str = "") -> list[Path]:
+    """Move the metrics files in *src_dir* to *out_dir* before *src_dir* is
+    removed, named with *prefix*; returns their new paths.
+
+    The files of a split AOI's parts (subdirectories of *src_dir*, see
+    :meth:`ArcGISDownloaderBase.part_dir`) are moved too, with the part's
+    name added to the prefix.
+    """
+    src_dir, out_dir = Path(src_dir), Path(out_dir)
+    kept = []
+    for name in (METRICS_FILENAME, REQUESTS_CSV_FILENAME):
+        for path in [src_dir / name, *sorted(src_dir.glob(f"*/{name}"))]:
+            if not path.is_file():
+                continue
+            part = "" if path.parent == src_dir else f"{path.parent.name}_"
+            out_dir.mkdir(parents=True, exist_ok=True)
+            dest = out_dir / f"{prefix}{part}{name}"
+            shutil.move(str(path), dest)
+            kept.append(dest)
+    return kept
@@ -0,0 +1,56 @@
+"""Run options shared by every layer of an exportImage download.
+
+``download-arcgis``, ``download-elevation`` and ``process-terrain`` take the
+same fetch options (transport, concurrency, resume checks, tile store,
+metrics, outage handling, ordering, chunk storage, transfer format,
+failover). Their flags are defined once for all three commands
+(``cli._add_download_options_args``) and read once into a
+:class:`DownloadOptions` (``cli._download_options``), which is handed down
+unchanged -- through :func:`main_process_terrain`, the downloaders'
+``main`` / ``run`` and :meth:`ArcGISDownloaderBase.download_chunks` to
+:func:`download_all_chunks` -- so a new option is one field here and one
+flag there instead of one keyword per layer.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from .CircuitBreaker import DEFAULT_BREAKER_THRESHOLD
+from .TileStore import DEFAULT_MAX_GB
+
+
+@dataclass(frozen=True)
+class DownloadOptions:
+    """The options of one download; the defaults are the CLI defaults."""
+
+    # Transport (``--engine``, see ``ENGINES``) and AIMD concurrency
+    # (``--adaptive``, up to ``--max-workers`` requests in flight).
+    engine: str = "thread"
+    adaptive: bool = False
+    max_workers: int | None = None
+    # Keep ortho responses as-is with sidecar georeferencing (``--world-file``).
+    world_file: bool = False
+    # Decode every reused chunk instead of checking its digest.
+    deep_verify: bool = False
+    # Persistent response store shared across runs (``--tile-store``).
+    tile_store: str | None = None
+    tile_store_max_gb: float = DEFAULT_MAX_GB
+    # Log every request to download_requests.csv (``--metrics-csv``).
+    metrics_csv: bool = False
+    # Circuit breaker and deadlines (``--breaker-threshold``,
+    # ``--chunk-deadline``, ``--run-deadline``).
+    breaker_threshold: int = DEFAULT_BREAKER_THRESHOLD
+    chunk_deadline_s: float | None = None
+    run_deadline_s: float | None = None
+    # Threads of the georeference / write stage (``--write-workers``).
+    write_workers: int | None = None
+    # Fetch order and preview interval (``--order``, ``--preview``).
+    order: str = "row"
+    preview_s: float | None = None
+    # Chunk GeoTIFF creation options (``--chunk-compression``).
+    chunk_compression: str = "none"
+    # ``--transfer-format`` specs, the last one per kind wins.
+    transfer_formats: list[str] | None = None
+    # Fetch failed chunks from the next ranked service (``--failover``).
+    failover: bool = False
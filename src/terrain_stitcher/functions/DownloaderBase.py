@@ -1,166 +1,457 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import dataclasses
+import functools
 import math
+import os
 import re
 import shutil
 import subprocess
 import sys
 import time
 import itertools
+from contextlib import contextmanager
 from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
+from xml.sax.saxutils import escape as xml_escape
 
+import numpy as np
 import requests
-from pyproj import Transformer
+import requests.adapters
+from pyproj import CRS, Transformer
 from tqdm import tqdm
 
 from terrain_stitcher.arcgis.services import (
     AmbiguousServiceError,
     ImageryService,
+    covering_services,
     load_services,
     select_service,
+    select_services,
+    service_info,
 )
+from terrain_stitcher.functions.BlankImage import is_blank_bytes
+from terrain_stitcher.functions.CircuitBreaker import (
+    CircuitBreaker,
+    RunDeadlineExceeded,
+    capped_sleep,
+    request_timeout,
+)
+from terrain_stitcher.functions.DownloadOptions import DownloadOptions
+from terrain_stitcher.functions.DownloadMetrics import (
+    REQUESTS_CSV_FILENAME,
+    DownloadMetrics,
+)
+from terrain_stitcher.functions.ChunkGrid import ChunkGrid, ChunkPaths
+from terrain_stitcher.functions.ChunkOrder import ORDERS, chunk_order
+from terrain_stitcher.functions.ChunkStorage import (
+    chunk_creation_options,
+    options_dict,
+)
+from terrain_stitcher.functions.ChunkManifest import (
+    DOWNLOADED,
+    EMPTY,
+    FAILED,
+    ChunkManifest,
+    file_digest,
+    load_grid,
+    previous_run_files,
+    save_grid,
+)
+from terrain_stitcher.functions.MosaicVrt import (
+    UnsupportedChunkLayout,
+    write_mosaic_vrt,
+)
+from terrain_stitcher.functions.PreviewMosaic import PreviewMosaic
+from terrain_stitcher.functions.ServiceProbe import (
+    AUTO_INDEX,
+    equivalent_resolution,
+    rank_services,
+)
+from terrain_stitcher.functions.ServiceSplit import covered_by, split_chunks
+from terrain_stitcher.functions.TileStore import TileStore, store_key
+from terrain_stitcher.functions.TransferFormat import (
+    check_transfer_format,
+    export_format_params,
+    response_ext,
+    select_transfer_format,
+)
+from terrain_stitcher.functions.RateControl import (
+    THROTTLE_STATUS_CODES,
+    AimdController,
+    parse_retry_after,
+)
+from terrain_stitcher.functions.XyzTiles import XyzTileWriter
 
 WGS84_TO_WEBMERC = Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
 
 TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
 
-MANIFEST_FILENAME = "manifest.json"
+# img_format prefix of chunks fetched from the service's tile cache
+# (``tile:{zoom}``) instead of rendered by exportImage; see
+# :func:`cached_tile_format`.
+CACHED_TILE_FORMAT = "tile"
 
 
-def build_chunk_grid(xmin, ymin, xmax, ymax, chunk_px: int, pixel_size_m: float):
-    """Return a list of chunk dicts covering the AOI, each with pixel
-    dimensions and a projected bbox, sized at `pixel_size_m` resolution."""
+def build_chunk_grid(
+    xmin, ymin, xmax, ymax, chunk_px: int, pixel_size_m: float, snap: bool = False
+):
+    """Return the :class:`ChunkGrid` covering the AOI: chunk dicts with
+    pixel dimensions and a projected bbox, sized at `pixel_size_m`
+    resolution, computed as they are read.
+
+    With ``snap`` the grid's upper-left corner moves out to the nearest
+    multiple of the chunk size, so every AOI at this resolution requests
+    chunks from one global grid (what lets a :class:`TileStore` reuse them).
+    """
+    aoi_origin = (xmin, ymax)
+    if snap:
+        step = chunk_px * pixel_size_m
+        xmin = math.floor(xmin / step) * step
+        ymax = math.ceil(ymax / step) * step
     total_w_px = max(1, round((xmax - xmin) / pixel_size_m))
     total_h_px = max(1, round((ymax - ymin) / pixel_size_m))
 
-    n_cols = math.ceil(total_w_px / chunk_px)
-    n_rows = math.ceil(total_h_px / chunk_px)
-
-    chunks = []
-    for row in range(n_rows):
-        y_off = row * chunk_px
-        h = min(chunk_px, total_h_px - y_off)
-        chunk_ymax = ymax - y_off * pixel_size_m
-        chunk_ymin = chunk_ymax - h * pixel_size_m
-
-        for col in range(n_cols):
-            x_off = col * chunk_px
-            w = min(chunk_px, total_w_px - x_off)
-            chunk_xmin = xmin + x_off * pixel_size_m
-            chunk_xmax = chunk_xmin + w * pixel_size_m
-
-            chunks.append(
-                {
-                    "row": row,
-                    "col": col,
-                    "w": w,
-                    "h": h,
-                    "xmin": chunk_xmin,
-                    "ymin": chunk_ymin,
-                    "xmax": chunk_xmax,
-                    "ymax": chunk_ymax,
-                }
-            )
+    chunks = ChunkGrid(
+        xmin,
+        ymax,
+        pixel_size_m,
+        chunk_px,
+        total_w_px,
+        total_h_px,
+        aoi_origin=aoi_origin,
+    )
 
     print(
         f"Total raster: {total_w_px} x {total_h_px} px @ {pixel_size_m:.3f} m/px "
-        f"-> {len(chunks)} chunks ({n_cols} cols x {n_rows} rows, {chunk_px}px each)"
+        f"-> {len(chunks)} chunks ({chunks.n_cols} cols x {chunks.n_rows} rows, "
+        f"{chunk_px}px each)"
     )
     return chunks
 
 
-def fetch_chunk(
-    session: requests.Session,
-    service: ImageryService,
-    chunk: dict,
-    img_format: str,
-    max_retries: int,
-    timeout: int,
-    pixel_type: str = "U8",
-) -> bytes:
-    params = {
+def _export_params(
+    service: ImageryService, chunk: dict, img_format: str, pixel_type: str
+) -> dict:
+    """exportImage query parameters for one chunk (shared by both engines).
+    *img_format* is a transfer-format spec (see :mod:`TransferFormat`)."""
+    return {
         "bbox": f"{chunk['xmin']},{chunk['ymin']},{chunk['xmax']},{chunk['ymax']}",
         "bboxSR": service.srs,
         "imageSR": service.srs,
         "size": f"{chunk['w']},{chunk['h']}",
-        "format": img_format,
+        **export_format_params(img_format),
         "pixelType": pixel_type,
         "interpolation": "RSP_BilinearInterpolation",
         "f": "image",
     }
 
-    last_error = None
-    for attempt in range(1, max_retries + 1):
-        try:
-            resp = session.get(service.base_url, params=params, timeout=timeout)
-        except requests.RequestException as e:
-            last_error = e
-            time.sleep(min(2**attempt, 30))
-            continue
 
-        if resp.status_code == 200 and resp.headers.get("Content-Type", "").startswith(
-            "image"
-        ):
-            return resp.content
+def cached_tile_format(zoom: int) -> str:
+    """The img_format that fetches each chunk of a 256-px tile-aligned grid
+    (see :func:`build_tile_aligned_grid`) as the pre-rendered tile of the
+    service's cache at *zoom*."""
+    return f"{CACHED_TILE_FORMAT}:{zoom}"
 
-        if resp.status_code in TRANSIENT_STATUS_CODES:
-            last_error = RuntimeError(f"HTTP {resp.status_code} (transient)")
-            time.sleep(min(2**attempt, 30))
-            continue
 
-        # Non-transient failure (bad request, auth, etc.) - don't bother retrying
-        raise RuntimeError(
-            f"exportImage failed for chunk ({chunk['col']},{chunk['row']}): "
-            f"HTTP {resp.status_code}: {resp.text[:300]}"
-        )
+def _request_target(
+    service: ImageryService, chunk: dict, img_format: str, pixel_type: str
+) -> tuple[str, dict | None]:
+    """``(url, params)`` of the request for one chunk (shared by both
+    engines): the cached tile for a :func:`cached_tile_format`, else
+    exportImage."""
+    name, _, zoom = img_format.partition(":")
+    if name == CACHED_TILE_FORMAT:
+        return service.tile_url(int(zoom), chunk["tile_x"], chunk["tile_y"]), None
+    return service.base_url, _export_params(service, chunk, img_format, pixel_type)
+
 
-    raise RuntimeError(
-        f"Chunk ({chunk['col']},{chunk['row']}) failed after {max_retries} retries: {last_error}"
+def _make_session(pool_size: int) -> requests.Session:
+    """A ``requests.Session`` whose keep-alive pool holds *pool_size*
+    connections per host.
+
+    The urllib3 default (10) is smaller than the usual ``-w 32``: the extra
+    workers' connections are opened and then discarded after every request
+    ("Connection pool is full"), so each of their chunks pays a fresh TCP +
+    TLS handshake.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1, pool_maxsize=max(pool_size, 1)
     )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fetch_chunk(
+    session: requests.Session,
+    service: ImageryService,
+    chunk: dict,
+    img_format: str,
+    max_retries: int,
+    timeout: int,
+    pixel_type: str = "U8",
+    controller: AimdController | None = None,
+    validators: dict | None = None,
+    metrics: DownloadMetrics | None = None,
+    breaker: CircuitBreaker | None = None,
+) -> bytes | None:
+    """Fetch one chunk's exportImage response body, retrying transport errors
+    and transient statuses up to *max_retries* attempts. For a
+    :func:`cached_tile_format` the chunk's cached tile is fetched instead,
+    and a tile missing from the cache (404) is returned as ``b""``.
+
+    Without a *controller* each retry sleeps a fixed ``min(2**attempt, 30)``
+    seconds. With one (``--adaptive``), every attempt first takes an
+    in-flight slot from the shared :class:`AimdController`, reports its
+    latency/outcome back, and sleeps the controller's jittered delay (which
+    honours ``Retry-After``) instead.
+
+    *validators* (``--tile-store``) makes the request conditional: its
+    ``etag`` / ``last_modified`` are sent as ``If-None-Match`` /
+    ``If-Modified-Since``, a ``304 Not Modified`` returns None, and a fresh
+    response's validators are written back into the dict.
+
+    *metrics* (a :class:`DownloadMetrics`) gets one record per call, with
+    the final attempt's status, time to first byte (``resp.elapsed``),
+    latency and size, and the number of retries before it.
+
+    With a *breaker* (a :class:`CircuitBreaker`) every attempt first waits
+    while the shared circuit is open, failures made while it is open are not
+    counted against *max_retries*, and the chunk must be fetched before the
+    breaker's chunk and run deadlines (:class:`DeadlineExceeded`
+    otherwise); retry sleeps and request timeouts are cut to fit.
+    """
+    url, params = _request_target(service, chunk, img_format, pixel_type)
+    headers = _conditional_headers(validators)
+    deadline = breaker.deadline() if breaker is not None else None
+
+    last_error = None
+    attempt = failures = 0
+    status = ttfb = latency = None
+    nbytes = 0
+    try:
+        while failures < max_retries:
+            if breaker is not None:
+                breaker.wait(deadline)
+            attempt += 1
+            delay = min(2 ** (failures + 1), 30)
+            if controller is not None:
+                controller.acquire()
+            started = time.monotonic()
+            status = ttfb = None
+            try:
+                resp = session.get(
+                    url,
+                    params=params,
+                    headers=headers,
+                    timeout=request_timeout(timeout, deadline),
+                )
+            except requests.RequestException as e:
+                last_error = e
+                latency = time.monotonic() - started
+                if controller is not None:
+                    controller.release()
+                    delay = controller.on_error(failures + 1)
+                if breaker is not None and breaker.on_failure():
+                    continue  # an outage: wait on the breaker, not a retry
+                failures += 1
+                time.sleep(capped_sleep(delay, deadline))
+                continue
+            latency = time.monotonic() - started
+            if controller is not None:
+                controller.release()
+            if metrics is not None:
+                status = resp.status_code
+                ttfb = resp.elapsed.total_seconds()
+            if breaker is not None and resp.status_code not in TRANSIENT_STATUS_CODES:
+                breaker.on_success()
+
+            if resp.status_code == 304 and headers:
+                if controller is not None:
+                    controller.on_success(latency, 0)
+                return None
+
+            if resp.status_code == 200 and resp.headers.get(
+                "Content-Type", ""
+            ).startswith("image"):
+                nbytes = len(resp.content)
+                if controller is not None:
+                    controller.on_success(latency, nbytes)
+                _update_validators(validators, resp.headers)
+                return resp.content
+
+            if resp.status_code == 404 and params is None:
+                # The cache has no tile where the service has no data.
+                if controller is not None:
+                    controller.on_success(latency, 0)
+                return b""
+
+            if resp.status_code in TRANSIENT_STATUS_CODES:
+                last_error = RuntimeError(f"HTTP {resp.status_code} (transient)")
+                if controller is not None:
+                    if resp.status_code in THROTTLE_STATUS_CODES:
+                        delay = controller.on_throttle(
+                            failures + 1,
+                            parse_retry_after(resp.headers.get("Retry-After")),
+                        )
+                    else:
+                        delay = controller.on_error(failures + 1)
+                if breaker is not None and breaker.on_failure():
+                    continue
+                failures += 1
+                time.sleep(capped_sleep(delay, deadline))
+                continue
+
+            # Non-transient failure (bad request, auth, etc.) - don't bother
+            # retrying
+            raise RuntimeError(
+                f"exportImage failed for chunk ({chunk['col']},{chunk['row']}): "
+                f"HTTP {resp.status_code}: {resp.text[:300]}"
+            )
+
+        raise RuntimeError(
+            f"Chunk ({chunk['col']},{chunk['row']}) failed after {max_retries} "
+            f"retries: {last_error}"
+        )
+    finally:
+        # A chunk turned away by the breaker before any request (e.g. after
+        # the run deadline) made no request to record.
+        if metrics is not None and attempt:
+            metrics.record(chunk, status, ttfb, latency, nbytes, attempt - 1)
+
+
+def _conditional_headers(validators: dict | None) -> dict | None:
+    """``If-None-Match`` / ``If-Modified-Since`` for a stored response."""
+    if not validators:
+        return None
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers or None
+
+
+def _update_validators(validators: dict | None, response_headers) -> None:
+    if validators is not None:
+        validators["etag"] = response_headers.get("ETag")
+        validators["last_modified"] = response_headers.get("Last-Modified")
+
+
+def _store_lookup(store: TileStore, key: str):
+    """``(stored, validators)`` for a chunk about to be fetched through
+    *store*. *validators* is None when the stored response is reused without
+    a request; otherwise it is the dict to pass to :func:`fetch_chunk`."""
+    stored = store.get(key)
+    if stored is not None and not stored.revalidates:
+        store.note_reuse(revalidated=False)
+        return stored, None
+    if stored is None:
+        return None, {}
+    return stored, {"etag": stored.etag, "last_modified": stored.last_modified}
+
+
+def _store_result(store: TileStore, key: str, stored, validators, raw):
+    """The chunk bytes after a (conditional) fetch: the stored response on a
+    304, else *raw*, which is stored with its validators."""
+    if raw is None:
+        store.note_reuse(revalidated=True)
+        return stored.data
+    store.put(key, raw, validators.get("etag"), validators.get("last_modified"))
+    return raw
+
+
+# PNG colour types (IHDR byte 25) that carry an alpha channel, and the
+# paletted one.
+_PNG_ALPHA_TYPES = (b"\x04", b"\x06")
+_PNG_PALETTE_TYPE = b"\x03"
+
+
+def _band_args(raw_bytes: bytes, img_format: str) -> list[str]:
+    """``gdal_translate`` band options that give every chunk of a download
+    the same bands, so one mosaic VRT describes them all.
+
+    A paletted (``png8``) response is expanded to RGBA: gdal2tiles refuses
+    a mosaic with a colour table. A ``jpgpng`` run gets JPEG (RGB) for most
+    chunks and PNG (RGBA) for the ones at a coverage edge; a response without
+    alpha gets an opaque one from its mask band.
+    """
+    colour_type = raw_bytes[25:26] if raw_bytes.startswith(b"\x89PNG") else None
+    if colour_type == _PNG_PALETTE_TYPE:
+        return ["-expand", "rgba"]
+    if not img_format.startswith("jpgpng") or colour_type in _PNG_ALPHA_TYPES:
+        return []
+    return ["-b", "1", "-b", "2", "-b", "3", "-b", "mask"]
 
 
 def _georeference_inprocess(
-    raw_path: Path, out_path: Path, chunk: dict, srs: int
+    raw_bytes: bytes,
+    out_path: Path,
+    chunk: dict,
+    srs: int,
+    ext: str,
+    creation_options: list[str] | None = None,
+    band_args: list[str] | None = None,
 ) -> Path:
-    """Georeference a raw image using the GDAL Python bindings.
+    """Georeference a raw image from memory using the GDAL Python bindings.
 
     Equivalent to ``gdal_translate -a_srs EPSG:{srs} -a_ullr ...`` but runs
     in-process, avoiding the ~30-50 ms per-call subprocess-spawn overhead on
-    Windows that dominates the cost for small chunks.
+    Windows that dominates the cost for small chunks. The response bytes are
+    handed to GDAL as a ``/vsimem/`` file, so the only disk I/O per chunk is
+    writing the output GeoTIFF (no raw file write, re-read and delete).
+    *creation_options* are GTiff ``KEY=VALUE`` options (see
+    :func:`chunk_creation_options`); *band_args* come from
+    :func:`_band_args`.
     """
     from osgeo import gdal
 
-    options = gdal.TranslateOptions(
-        [
-            "-a_srs",
-            f"EPSG:{srs}",
-            "-a_ullr",
-            str(chunk["xmin"]),
-            str(chunk["ymax"]),
-            str(chunk["xmax"]),
-            str(chunk["ymin"]),
-        ],
-        format="GTiff",
-    )
-    ds = gdal.Translate(str(out_path), str(raw_path), options=options)
-    if ds is None:
-        raise RuntimeError(
-            f"gdal.Translate failed for {raw_path} "
-            f"(chunk {chunk['col']},{chunk['row']})"
+    mem_path = f"/vsimem/raw_{chunk['col']}_{chunk['row']}_{id(raw_bytes)}.{ext}"
+    gdal.FileFromMemBuffer(mem_path, raw_bytes)
+    extra = {"creationOptions": creation_options} if creation_options else {}
+    try:
+        options = gdal.TranslateOptions(
+            [
+                "-a_srs",
+                f"EPSG:{srs}",
+                "-a_ullr",
+                str(chunk["xmin"]),
+                str(chunk["ymax"]),
+                str(chunk["xmax"]),
+                str(chunk["ymin"]),
+                *(band_args or ()),
+            ],
+            format="GTiff",
+            **extra,
         )
-    ds = None  # close the output dataset
+        ds = gdal.Translate(str(out_path), mem_path, options=options)
+        if ds is None:
+            raise RuntimeError(
+                f"gdal.Translate failed for {mem_path} "
+                f"(chunk {chunk['col']},{chunk['row']})"
+            )
+        ds = None  # close the output dataset
+    finally:
+        gdal.Unlink(mem_path)
     return out_path
 
 
 def _georeference_subprocess(
-    raw_path: Path, out_path: Path, chunk: dict, srs: int
+    raw_path: Path,
+    out_path: Path,
+    chunk: dict,
+    srs: int,
+    creation_options: list[str] | None = None,
+    band_args: list[str] | None = None,
 ) -> Path:
     """Georeference a raw image by shelling out to ``gdal_translate``.
 
     Fallback used when the GDAL Python bindings are not importable.
     """
+    co_args = [arg for option in creation_options or () for arg in ("-co", option)]
     subprocess.run(
         [
             "gdal_translate",
@@ -171,6 +462,8 @@ def _georeference_subprocess(
             str(chunk["ymax"]),
             str(chunk["xmax"]),
             str(chunk["ymin"]),
+            *(band_args or ()),
+            *co_args,
             str(raw_path),
             str(out_path),
         ],
@@ -182,24 +475,50 @@ def _georeference_subprocess(
 
 
 def georeference_chunk(
-    raw_bytes: bytes, chunk: dict, img_format: str, tmp_dir: Path, srs: int
+    raw_bytes: bytes,
+    chunk: dict,
+    img_format: str,
+    tmp_dir: Path,
+    srs: int,
+    creation_options: list[str] | None = None,
 ) -> Path:
-    ext = "tif" if img_format == "tiff" else img_format
-    raw_path = tmp_dir / f"raw_{chunk['col']}_{chunk['row']}.{ext}"
-    raw_path.write_bytes(raw_bytes)
-
+    """Write *raw_bytes* (an exportImage PNG/JPEG, or a LERC blob) as the
+    georeferenced ``chunk_{col}_{row}.tif`` in *tmp_dir*, with the GTiff
+    *creation_options* (``--chunk-compression``). GDAL picks the decoder
+    from the bytes themselves, so a ``jpgpng`` response may be either; both
+    are written as RGBA (see :func:`_band_args`).
+
+    Translates straight from memory when the GDAL bindings are available;
+    ``gdal_translate`` needs a real input file, so the subprocess fallback
+    still writes (and afterwards removes) ``raw_{col}_{row}.{ext}``.
+    """
+    ext = response_ext(img_format)
     out_path = tmp_dir / f"chunk_{chunk['col']}_{chunk['row']}.tif"
+    band_args = _band_args(raw_bytes, img_format)
     try:
-        _georeference_inprocess(raw_path, out_path, chunk, srs)
+        return _georeference_inprocess(
+            raw_bytes, out_path, chunk, srs, ext, creation_options, band_args
+        )
     except ImportError:
-        _georeference_subprocess(raw_path, out_path, chunk, srs)
+        pass
+
+    raw_path = tmp_dir / f"raw_{chunk['col']}_{chunk['row']}.{ext}"
+    raw_path.write_bytes(raw_bytes)
+    try:
+        _georeference_subprocess(
+            raw_path, out_path, chunk, srs, creation_options, band_args
+        )
     finally:
         raw_path.unlink(missing_ok=True)
     return out_path
 
 
 def write_chunk_direct(
-    raw_bytes: bytes, chunk: dict, img_format: str, tmp_dir: Path
+    raw_bytes: bytes,
+    chunk: dict,
+    img_format: str,
+    tmp_dir: Path,
+    creation_options: list[str] | None = None,
 ) -> Path:
     """Persist an already-georeferenced exportImage response directly.
 
@@ -208,48 +527,88 @@ def write_chunk_direct(
     transform + SRS), so unlike raw PNG ortho chunks they need no
     ``-a_ullr`` / ``-a_srs`` pass. Writes ``chunk_{col}_{row}.tif`` to match
     the filename convention the manifest and on-disk recovery expect.
+
+    With GTiff *creation_options* (``--chunk-compression``) a TIFF response
+    is re-encoded with them, through rasterio, instead of being written
+    byte-for-byte.
     """
-    ext = "tif" if img_format == "tiff" else img_format
+    ext = response_ext(img_format)
     out_path = tmp_dir / f"chunk_{chunk['col']}_{chunk['row']}.{ext}"
+    if creation_options and ext == "tif":
+        import rasterio.shutil
+        from rasterio.io import MemoryFile
+
+        with MemoryFile(raw_bytes) as mem, mem.open() as src:
+            rasterio.shutil.copy(
+                src, out_path, driver="GTiff", **options_dict(creation_options)
+            )
+        return out_path
     out_path.write_bytes(raw_bytes)
     return out_path
 
 
-def _chunk_key(chunk: dict) -> str:
-    return f"{chunk['row']}_{chunk['col']}"
+def _world_file_path(image_path: Path) -> Path:
+    """ESRI world-file path for *image_path*: the first and last letters of
+    the image extension plus ``w`` (``.png`` -> ``.pgw``, ``.jpg`` ->
+    ``.jgw``)."""
+    ext = image_path.suffix[1:]
+    return image_path.with_suffix(f".{ext[0]}{ext[-1]}w")
 
 
-def _load_manifest(tmp_dir: Path) -> dict:
-    """Load an existing chunk manifest from *tmp_dir*, or return an empty
-    manifest if none exists.  The manifest maps ``"row_col"`` keys to
-    ``{"status": "downloaded"|"failed", "file": str|None}``."""
-    manifest_path = tmp_dir / MANIFEST_FILENAME
-    if manifest_path.is_file():
-        try:
-            with open(manifest_path, "r", encoding="utf-8") as fh:
-                return json.load(fh)
-        except (json.JSONDecodeError, OSError):
-            print("Warning: manifest.json was corrupt -- ignoring it.")
-    return {}
+@functools.lru_cache(maxsize=None)
+def _srs_wkt(srs: int) -> str:
+    return CRS.from_epsg(srs).to_wkt("WKT1_GDAL")
 
 
-def _save_manifest(tmp_dir: Path, manifest: dict) -> None:
-    manifest_path = tmp_dir / MANIFEST_FILENAME
-    with open(manifest_path, "w", encoding="utf-8") as fh:
-        json.dump(manifest, fh, indent=2)
+def write_chunk_worldfile(
+    raw_bytes: bytes, chunk: dict, img_format: str, tmp_dir: Path, srs: int
+) -> Path:
+    """Keep an exportImage response byte-for-byte and georeference it with
+    sidecar files (``--world-file``).
+
+    The alternative to :func:`georeference_chunk`, which decodes and
+    re-encodes every pixel only to attach ``-a_srs`` / ``-a_ullr``. The chunk
+    dict already holds the exact projected bbox, so this writes
+    ``chunk_{col}_{row}.{ext}`` unchanged next to a world file (the pixel
+    size and the centre of the upper-left pixel) and a ``.aux.xml`` carrying
+    the SRS. GDAL, and so ``gdalbuildvrt`` / gdal2tiles, reads both. The
+    sidecars are written first so an image on disk always has them.
+    """
+    ext = response_ext(img_format)
+    out_path = tmp_dir / f"chunk_{chunk['col']}_{chunk['row']}.{ext}"
+    write_georef_sidecars(out_path, chunk, chunk["w"], chunk["h"], srs)
+    out_path.write_bytes(raw_bytes)
+    return out_path
+
+
+def write_georef_sidecars(
+    image_path: Path, bbox: dict, width: int, height: int, srs: int
+) -> None:
+    """Write the world file and ``.aux.xml`` (SRS) that georeference the
+    *width* x *height* image at *image_path* to *bbox* (a dict with
+    ``xmin`` / ``ymin`` / ``xmax`` / ``ymax``, e.g. a chunk)."""
+    px = (bbox["xmax"] - bbox["xmin"]) / width
+    py = (bbox["ymax"] - bbox["ymin"]) / height
+    world = (px, 0.0, 0.0, -py, bbox["xmin"] + px / 2, bbox["ymax"] - py / 2)
+    _world_file_path(image_path).write_text(
+        "\n".join(repr(v) for v in world) + "\n"
+    )
+    Path(f"{image_path}.aux.xml").write_text(
+        f"<PAMDataset>\n  <SRS>{xml_escape(_srs_wkt(srs))}</SRS>\n</PAMDataset>\n"
+    )
 
 
-def _recover_manifest_from_disk(tmp_dir: Path) -> dict:
-    """Build a manifest from chunk GeoTIFFs left on disk by an interrupted
-    run (one where ``manifest.json`` was never written).
+def _recover_manifest_from_disk(tmp_dir: Path, suffix: str = ".tif") -> dict:
+    """Build a manifest from chunk files left on disk by an interrupted run
+    that never wrote a manifest.
 
-    Scans *tmp_dir* for files named ``chunk_{col}_{row}.tif``, parses the
+    Scans *tmp_dir* for files named ``chunk_{col}_{row}{suffix}``, parses the
     col/row from each filename, and returns a manifest dict with those chunks
     marked as ``"downloaded"``.
     """
     manifest: dict[str, dict] = {}
-    for chunk_file in tmp_dir.glob("chunk_*.tif"):
-        # filename is chunk_{col}_{row}.tif
+    for chunk_file in tmp_dir.glob(f"chunk_*{suffix}"):
+        # filename is chunk_{col}_{row}{suffix}
         stem = chunk_file.stem  # "chunk_0_3"
         parts = stem.split("_")
         if len(parts) != 3 or parts[0] != "chunk":
@@ -264,13 +623,43 @@ def _recover_manifest_from_disk(tmp_dir: Path) -> dict:
     return manifest
 
 
+def _check_grid(tmp_dir: Path, chunks) -> None:
+    """Record the grid of *chunks* in *tmp_dir*, first discarding a previous
+    run's manifest and chunk files there if they were cut from another grid:
+    their rows and columns name other areas. A run from before grids were
+    recorded is taken to be on :meth:`ChunkGrid.legacy_grid_params`."""
+    if not isinstance(chunks, ChunkGrid):
+        return
+    grid = chunks.grid_params()
+    saved = load_grid(tmp_dir)
+    if saved == grid:
+        return
+    stale = previous_run_files(tmp_dir)
+    if saved is None and stale:
+        saved = chunks.legacy_grid_params()
+    if stale and saved != grid:
+        print(
+            f"Chunks in {tmp_dir} were cut from another grid "
+            f"({saved['chunk_px']}px chunks, now {grid['chunk_px']}px) -- "
+            f"discarding them and starting over."
+        )
+        for path in stale:
+            path.unlink(missing_ok=True)
+    save_grid(tmp_dir, grid)
+
+
 def _verify_chunk(path: Path) -> bool:
     """Return True if *path* is a readable raster with valid pixel data.
 
     Tries, in order, the GDAL Python bindings (most thorough -- reads all
     pixel data via ``Checksum``), the ``gdalinfo`` command-line tool, and
-    finally a basic TIFF header + minimum size sanity check.
+    finally a basic header + minimum size sanity check. A ``--world-file``
+    PNG/JPEG chunk without its world file is never valid: it could not be
+    placed in the mosaic.
     """
+    if path.suffix != ".tif" and not _world_file_path(path).is_file():
+        return False
+
     # 1. GDAL Python bindings -- forces a full read of every band
     try:
         from osgeo import gdal
@@ -302,7 +691,9 @@ def _verify_chunk(path: Path) -> bool:
         )
         return result.returncode == 0
 
-    # 3. Basic TIFF header + minimum size sanity check
+    # 3. Basic header + minimum size sanity check
+    if path.suffix != ".tif":
+        return _image_trailer_ok(path)
     try:
         import struct
 
@@ -319,6 +710,62 @@ def _verify_chunk(path: Path) -> bool:
         return False
 
 
+# Leading signature and trailing end marker of the --world-file chunk
+# formats. A download cut off mid-write keeps the signature but loses the
+# trailer, which is what the no-GDAL verification fallback looks for.
+_IMAGE_SIGNATURES = {
+    ".png": (b"\x89PNG\r\n\x1a\n", b"IEND\xaeB`\x82"),
+    ".jpg": (b"\xff\xd8", b"\xff\xd9"),
+}
+
+
+def _image_trailer_ok(path: Path) -> bool:
+    """True if *path* starts and ends with its format's markers."""
+    markers = _IMAGE_SIGNATURES.get(path.suffix)
+    if markers is None:
+        return False
+    head, tail = markers
+    try:
+        with open(path, "rb") as fh:
+            if fh.read(len(head)) != head:
+                return False
+            fh.seek(-len(tail), 2)
+            return fh.read(len(tail)) == tail
+    except OSError:
+        return False
+
+
+def _digest_matches(path: Path, digest: tuple[int, int]) -> bool:
+    """True if *path* still has the size and CRC32 recorded at write time.
+
+    The size is checked with a stat first, so a truncated file costs no read.
+    """
+    try:
+        if path.stat().st_size != digest[0]:
+            return False
+        return file_digest(path) == digest
+    except OSError:
+        return False
+
+
+def _verify_cached(
+    path: Path, digest: tuple[int, int] | None, deep: bool = False
+) -> bool:
+    """Verify a chunk file reused on resume.
+
+    A chunk with a recorded *digest* is checked against it (one stat plus
+    one sequential read, no decode) and, for ``--world-file`` images, for its
+    world file. Only with *deep* (``--deep-verify``), or when the manifest
+    has no digest for the chunk, is it fully decoded by :func:`_verify_chunk`.
+    """
+    if digest is not None:
+        if not _digest_matches(path, digest):
+            return False
+        if not deep:
+            return path.suffix == ".tif" or _world_file_path(path).is_file()
+    return _verify_chunk(path)
+
+
 # Cap on the number of chunk futures (verify + download) that are live at
 # once. The original download path submitted *every* chunk to the pool up
 # front in one comprehension, materialising a Future + queued work item per
@@ -328,10 +775,17 @@ def _verify_chunk(path: Path) -> bool:
 # is O(workers), independent of the chunk count.
 _MAX_INFLIGHT_FACTOR = 2
 
-# How often (completed chunks) the on-disk manifest is flushed during a long
+# Download engines for download_all_chunks. "thread" runs the blocking
+# fetch_chunk on a thread pool (one request per thread); "async" drives
+# fetch_chunk_async from one asyncio loop (see AsyncTransport), so the number
+# of in-flight requests is no longer capped by the OS thread count.
+ENGINES = ("thread", "async")
+
+# How often (completed chunks) the manifest journal is flushed during a long
 # download, so an interrupted run can resume without losing everything
-# since the previous run's manifest. 1000 trades a little I/O for crash
-# safety on multi-hour LOD-19 runs.
+# since the previous run's manifest. A flush appends only the chunks
+# completed since the last one (9 bytes each, plus 20 for the chunk's digest;
+# see ChunkManifest).
 _MANIFEST_FLUSH_EVERY = 1000
 
 
@@ -365,6 +819,314 @@ def _stream_futures(pool, fn, items, max_inflight):
             pending[pool.submit(fn, item)] = item
 
 
+def _write_stage(fetched, pool, persist, max_pending):
+    """Second pipeline stage: run ``persist(chunk, raw)`` on *pool* for each
+    ``(chunk, raw | exception)`` of *fetched*, yielding ``(chunk, result |
+    exception)`` as the writes complete.
+
+    At most *max_pending* writes are queued; when that many are pending the
+    stage stops pulling from *fetched* until one finishes, so the fetch
+    stage runs at most its own in-flight bound ahead of the writers. Fetch
+    failures are passed straight through.
+    """
+    pending: dict = {}
+
+    def finished(block: bool):
+        if block:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        else:
+            done = [fut for fut in pending if fut.done()]
+        for fut in done:
+            chunk = pending.pop(fut)
+            try:
+                yield chunk, fut.result()
+            except Exception as exc:  # surfaced to the caller, not raised
+                yield chunk, exc
+
+    for chunk, raw in fetched:
+        if isinstance(raw, Exception):
+            yield chunk, raw
+        else:
+            pending[pool.submit(persist, chunk, raw)] = chunk
+        yield from finished(block=len(pending) >= max_pending)
+    while pending:
+        yield from finished(block=True)
+
+
+@contextmanager
+def _fetch_results(
+    engine,
+    to_download,
+    service: ImageryService,
+    img_format,
+    max_retries,
+    timeout,
+    workers,
+    pixel_type,
+    persist,
+    controller: AimdController | None = None,
+    store: TileStore | None = None,
+    metrics: DownloadMetrics | None = None,
+    breaker: CircuitBreaker | None = None,
+    write_workers: int | None = None,
+):
+    """Yield an iterator of ``(chunk, result | exception)`` for
+    *to_download*, fetched with the selected *engine* and written to disk by
+    ``persist(chunk, raw_bytes) -> result``.
+
+    The two run as separate pipeline stages, each with its own concurrency:
+    the fetch stage only holds a worker (or in-flight request) for the
+    network round trip, and hands each response to a pool of
+    *write_workers* threads (default: one per CPU core) that run
+    ``persist`` -- georeferencing / encoding and writing the chunk file.
+    GDAL and PIL release the GIL for that work, so it scales across cores
+    without tying up network slots, and the consumer loop only records
+    manifest state. The write stage queues at most ``write_workers *
+    _MAX_INFLIGHT_FACTOR`` responses (see :func:`_write_stage`).
+
+    The thread engine keeps ``workers * _MAX_INFLIGHT_FACTOR`` futures
+    pending on a ``workers``-thread pool; the async engine keeps ``workers``
+    requests in flight on one event loop. Either way the connection pool is
+    sized to the concurrency so every in-flight request has a keep-alive
+    connection to reuse.
+
+    With a *controller* the pool, in-flight cap and connection pool are
+    sized to its ``max_limit`` instead, and the controller's dynamic limit
+    decides how many of those requests are actually on the wire.
+
+    With a *store* (``--tile-store``) each chunk is looked up there first
+    and only fetched (or revalidated) when needed; fresh responses are added
+    to it. Every request made is recorded in *metrics*, and every attempt
+    is gated on the shared *breaker*.
+    """
+    if controller is not None:
+        workers = controller.max_limit
+    write_workers = max(write_workers or os.cpu_count() or 1, 1)
+    with ThreadPoolExecutor(
+        max_workers=write_workers, thread_name_prefix="chunk-write"
+    ) as write_pool:
+        with _fetch_stage(
+            engine,
+            to_download,
+            service,
+            img_format,
+            max_retries,
+            timeout,
+            workers,
+            pixel_type,
+            controller,
+            store,
+            metrics,
+            breaker,
+        ) as fetched:
+            results = _write_stage(
+                fetched, write_pool, persist, write_workers * _MAX_INFLIGHT_FACTOR
+            )
+            try:
+                yield results
+            finally:
+                results.close()
+
+
+@contextmanager
+def _fetch_stage(
+    engine,
+    to_download,
+    service: ImageryService,
+    img_format,
+    max_retries,
+    timeout,
+    workers,
+    pixel_type,
+    controller: AimdController | None,
+    store: TileStore | None,
+    metrics: DownloadMetrics | None,
+    breaker: CircuitBreaker | None,
+):
+    """First pipeline stage of :func:`_fetch_results`: yield ``(chunk,
+    raw_bytes | exception)`` for *to_download*, read from *store* or
+    fetched with *engine*."""
+    if engine == "async":
+        from .AsyncTransport import (
+            fetch_chunk_async,
+            open_async_session,
+            stream_async,
+        )
+
+        pool_size = max(workers, 1)
+
+        async def fetch(session, c):
+            loop = asyncio.get_running_loop()
+            stored = validators = None
+            if store is not None:
+                key = store_key(service, c, img_format, pixel_type)
+                stored, validators = await loop.run_in_executor(
+                    None, _store_lookup, store, key
+                )
+            if store is not None and validators is None:
+                return stored.data
+            raw = await fetch_chunk_async(
+                session,
+                service,
+                c,
+                img_format,
+                max_retries,
+                timeout,
+                pixel_type,
+                controller,
+                validators,
+                metrics,
+                breaker,
+            )
+            if store is not None:
+                raw = await loop.run_in_executor(
+                    None, _store_result, store, key, stored, validators, raw
+                )
+            return raw
+
+        results = stream_async(
+            fetch, to_download, pool_size, lambda: open_async_session(pool_size)
+        )
+        try:
+            yield results
+        finally:
+            results.close()
+        return
+
+    max_inflight = max(workers, 1) * _MAX_INFLIGHT_FACTOR
+    with _make_session(workers) as session, ThreadPoolExecutor(
+        max_workers=workers
+    ) as pool:
+
+        def fetch(c):
+            if store is None:
+                validators = None
+            else:
+                key = store_key(service, c, img_format, pixel_type)
+                stored, validators = _store_lookup(store, key)
+                if validators is None:
+                    return stored.data
+            raw = fetch_chunk(
+                session,
+                service,
+                c,
+                img_format,
+                max_retries,
+                timeout,
+                pixel_type,
+                controller,
+                validators,
+                metrics,
+                breaker,
+            )
+            if store is not None:
+                raw = _store_result(store, key, stored, validators, raw)
+            return raw
+
+        yield _stream_futures(pool, fetch, to_download, max_inflight)
+
+
+def _chunk_rows_cols(chunks) -> tuple[np.ndarray, np.ndarray]:
+    """Every chunk's row and column as arrays, in *chunks* order."""
+    if isinstance(chunks, ChunkGrid):
+        return chunks.rows_cols()
+    rows = np.fromiter((c["row"] for c in chunks), np.int64, len(chunks))
+    cols = np.fromiter((c["col"] for c in chunks), np.int64, len(chunks))
+    return rows, cols
+
+
+def _verify_cached_chunks(
+    chunks,
+    cached: np.ndarray,
+    manifest: ChunkManifest,
+    path_of,
+    tile_writer: XyzTileWriter | None,
+    deep_verify: bool,
+    workers: int,
+    max_inflight: int,
+) -> tuple[int, list[int]]:
+    """Verify the *cached* chunks (indices into *chunks*) of a resumed
+    download on *workers* threads; returns ``(n_reused, redo)``.
+
+    A chunk whose file is gone is fetched again without a warning; a
+    corrupt one is deleted and marked ``FAILED`` in *manifest*. Both are
+    in *redo*.
+    """
+
+    def verify(i):
+        """``(chunk, path, ok)`` for cached chunk *i*; ``ok`` is None when
+        its file is gone."""
+        chunk = chunks[i]
+        cached_path = path_of(chunk)
+        if not cached_path.is_file():
+            return chunk, cached_path, None
+        digest = manifest.digest(chunk["row"], chunk["col"])
+        if tile_writer is not None:
+            # The digest covers the upper-left tile, written last.
+            ok = tile_writer.verify(chunk) and (
+                digest is None or _digest_matches(cached_path, digest)
+            )
+        else:
+            ok = _verify_cached(cached_path, digest, deep_verify)
+        return chunk, cached_path, bool(ok)
+
+    n_reused = 0
+    n_corrupt = 0
+    redo: list[int] = []
+    with ThreadPoolExecutor(max_workers=workers) as verify_pool:
+        with tqdm(total=len(cached), desc="Verifying cached chunks") as pbar:
+            for i, res in _stream_futures(verify_pool, verify, cached, max_inflight):
+                if isinstance(res, Exception):
+                    chunk = chunks[i]
+                    res = (chunk, path_of(chunk), False)
+                chunk, cached_path, ok = res
+                if ok:
+                    n_reused += 1
+                elif ok is None:
+                    redo.append(i)
+                else:
+                    pbar.write(
+                        f"Chunk ({chunk['col']},{chunk['row']}) failed "
+                        f"verification -- will re-download."
+                    )
+                    cached_path.unlink(missing_ok=True)
+                    manifest.set(chunk["row"], chunk["col"], FAILED)
+                    redo.append(i)
+                    n_corrupt += 1
+                pbar.update(1)
+    if n_corrupt:
+        print(
+            f"{n_reused} chunk(s) verified, "
+            f"{n_corrupt} corrupt and will be re-downloaded."
+        )
+    elif n_reused:
+        print(f"{n_reused} chunk(s) verified OK.")
+    return n_reused, redo
+
+
+def _chunk_writer(
+    img_format: str,
+    tmp_dir: Path,
+    srs: int,
+    georeference: bool,
+    world_file: bool,
+    tile_writer: XyzTileWriter | None,
+    creation_options,
+):
+    """The ``write(chunk, raw) -> path`` step of :func:`download_all_chunks`."""
+    if tile_writer is not None:
+        return lambda c, raw: tile_writer.write(raw, c)
+    if world_file:
+        return lambda c, raw: write_chunk_worldfile(raw, c, img_format, tmp_dir, srs)
+    if georeference:
+        return lambda c, raw: georeference_chunk(
+            raw, c, img_format, tmp_dir, srs, creation_options
+        )
+    return lambda c, raw: write_chunk_direct(
+        raw, c, img_format, tmp_dir, creation_options
+    )
+
+
 def download_all_chunks(
     chunks,
     service: ImageryService,
@@ -375,19 +1137,33 @@ def download_all_chunks(
     tmp_dir: Path,
     pixel_type: str = "U8",
     georeference: bool = True,
+    options: DownloadOptions | None = None,
+    controller: AimdController | None = None,
+    breaker: CircuitBreaker | None = None,
+    store: TileStore | None = None,
+    tile_writer: XyzTileWriter | None = None,
 ) -> tuple[list[Path], list[dict]]:
     """Download *chunks* into *tmp_dir*, skipping any that already appear as
     downloaded in a previous run's manifest (and whose GeoTIFF still exists).
 
+    *options* (a :class:`DownloadOptions`, default: the CLI defaults) holds
+    the run options below; the run objects built from them (``controller``,
+    ``breaker``, ``store``, ``tile_writer``) are passed in ready-made.
+
     ``pixel_type`` selects the exportImage band depth (``U8`` for ortho PNGs,
     ``F32`` for elevation). When ``georeference`` is True (ortho) raw bytes
     are passed through :func:`georeference_chunk`; when False (elevation) the
     already-georeferenced TIFF bytes are written directly via
-    :func:`write_chunk_direct`.
+    :func:`write_chunk_direct`. With ``world_file`` (``--world-file``) the
+    raw bytes are instead kept as-is and georeferenced by sidecars via
+    :func:`write_chunk_worldfile`. The step runs in its own pipeline stage
+    of ``write_workers`` threads (default: one per CPU core), fed by the
+    download workers (see :func:`_fetch_results`).
 
     Returns ``(chunk_paths, failed)`` where *chunk_paths* are the GeoTIFFs of
-    every successfully fetched chunk (reused + freshly downloaded) and
-    *failed* is the list of chunks that could not be fetched.
+    every successfully fetched chunk (reused + freshly downloaded), in grid
+    order, as a lazy :class:`ChunkPaths` sequence, and *failed* is the list
+    of chunks that could not be fetched.
 
     Memory model: chunks are streamed through the pool in bounded batches
     (see :func:`_stream_futures`) rather than submitted all at once, so the
@@ -395,145 +1171,314 @@ def download_all_chunks(
     instead of O(total chunks). This is what keeps a large LOD-19 AOI
     (hundreds of thousands to millions of 256-px chunks) from exhausting
     memory during the download phase: previously every chunk had a Future
-    materialised up front. The manifest is flushed to disk every
-    ``_MANIFEST_FLUSH_EVERY`` completed chunks so an interrupted run can
-    resume without re-downloading the whole AOI.
+    materialised up front. Per-chunk status lives in a
+    :class:`ChunkManifest` (one byte per chunk); its journal is appended
+    every ``_MANIFEST_FLUSH_EVERY`` completed chunks and compacted when the
+    download ends or is interrupted, so a re-run resumes without
+    re-downloading the whole AOI. *chunks* is normally a lazy
+    :class:`ChunkGrid` (a list of chunk dicts also works): the chunks to
+    verify and fetch are found with one vectorised manifest lookup and kept
+    as index arrays, so the driver holds a few bytes per chunk plus the
+    O(workers) chunk dicts in flight.
+
+    ``engine`` selects the transport (see ``ENGINES``). With ``"thread"``
+    *workers* is the thread count; with ``"async"`` it is the number of
+    in-flight requests on one event loop, so it can be set in the thousands.
+    Both engines size their keep-alive connection pool to *workers* and feed
+    the same consumer loop below, so manifest handling, retries and the
+    ``(chunk_paths, failed)`` contract are identical.
+
+    With a :func:`cached_tile_format` *img_format* the chunks (a 256-px
+    tile-aligned grid written by a ``tile_writer``) are fetched from the
+    service's tile cache; tiles the cache does not have are recorded as
+    ``EMPTY`` like blank chunks.
+
+    ``controller`` (an :class:`AimdController`, ``--adaptive``) replaces the
+    fixed *workers* concurrency with one that adapts to the server: it is
+    shared by every worker of this run, and its current limit and throughput
+    are shown on the progress bar.
+
+    ``tile_writer`` (an :class:`XyzTileWriter`, ``--tile-aligned``) cuts each
+    response of a tile-aligned grid straight into XYZ tiles instead of
+    writing a chunk file; only the manifest is kept in *tmp_dir*, and the
+    returned paths are each chunk's upper-left tile.
+
+    Ortho (``U8``) responses that are blank -- fully transparent or one flat
+    colour, as at the edge of a service's coverage -- are detected on the
+    worker and recorded as ``EMPTY`` instead of being written: they are not
+    in the returned paths, so they are left out of the mosaic (or produce no
+    tiles), and a re-run does not fetch them again.
+
+    Every chunk written is recorded with its size and CRC32 (see
+    :func:`file_digest`), hashed on the worker that wrote it. Reused chunks
+    are verified against that digest; ``deep_verify`` (``--deep-verify``)
+    also decodes every pixel, as every resume did before digests were
+    stored.
+
+    ``store`` (a :class:`TileStore`, ``--tile-store``) is consulted before
+    the network for every chunk not already in *tmp_dir*.
+
+    Every request of the fetch phase is timed in a :class:`DownloadMetrics`
+    whose live MB/s and latency percentiles are shown on the progress bar;
+    its summary is written to ``download_metrics.json`` in *tmp_dir* when
+    the fetch ends, and with ``metrics_csv`` (``--metrics-csv``) each
+    request is also logged to ``download_requests.csv`` there.
+
+    ``breaker`` (a :class:`CircuitBreaker`) is shared by every worker: while
+    it is open no request is started and failures do not use up retries,
+    and its state is shown on the progress bar. Chunks not fetched by the
+    run deadline are returned in *failed* but left unrecorded in the
+    manifest, like chunks the run never reached.
+
+    ``order`` (``--order``, see :func:`chunk_order`) is the order the
+    chunks are fetched in: grid rows (``row``), outwards from the AOI
+    centre (``spiral``) or along a Hilbert curve (``hilbert``). With
+    ``preview_s`` (``--preview``) a low-resolution :class:`PreviewMosaic`
+    of the chunks fetched so far is saved to ``preview.png`` in *tmp_dir*
+    every ``preview_s`` seconds and when the fetch ends.
+
+    ``chunk_compression`` (``--chunk-compression``) selects the GTiff
+    creation options of the chunk GeoTIFFs (see :mod:`ChunkStorage`); it
+    does not apply to ``world_file`` or ``tile_writer`` output.
+
+    *img_format* is the transfer-format spec the chunks are requested in
+    (``--transfer-format``, see :mod:`TransferFormat`). ``lerc`` responses
+    are always georeferenced, as they carry no georeferencing of their own.
     """
-    manifest = _load_manifest(tmp_dir)
+    options = options or DownloadOptions()
+    engine, world_file, order = options.engine, options.world_file, options.order
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine {engine!r}; expected one of {ENGINES}")
+    if order not in ORDERS:
+        raise ValueError(f"unknown order {order!r}; expected one of {ORDERS}")
+    if engine == "async":
+        # Fail before the (possibly long) cached-chunk verification pass.
+        from .AsyncTransport import require_aiohttp
+
+        require_aiohttp()
+
+    if img_format.startswith("lerc"):
+        # Unlike an exportImage TIFF, a LERC blob carries no georeferencing.
+        georeference = True
+    if world_file:
+        if img_format.startswith("jpgpng"):
+            raise ValueError(
+                "--world-file keeps each response as-is, so it needs a "
+                "single-format transfer (png, png8 or jpg), not jpgpng"
+            )
+        if img_format == "png8" and tile_writer is None:
+            raise ValueError(
+                "--world-file keeps each response as-is, and gdal2tiles "
+                "cannot tile a mosaic of paletted png8 chunks; use png or jpg, "
+                "or drop --world-file so the chunks are expanded to RGBA"
+            )
+        ext = response_ext(img_format)
+    else:
+        ext = "tif" if georeference else response_ext(img_format)
+    _check_grid(tmp_dir, chunks)
+    manifest = ChunkManifest.load(tmp_dir, suffix=f".{ext}")
 
-    if not manifest:
-        recovered = _recover_manifest_from_disk(tmp_dir)
+    if not manifest and tile_writer is None:
+        recovered = _recover_manifest_from_disk(tmp_dir, suffix=f".{ext}")
         if recovered:
             print(
                 f"No manifest found but {len(recovered)} chunk file(s) exist "
                 f"on disk from a previous interrupted run -- recovering."
             )
-            manifest = recovered
+            manifest.update_from_dict(recovered)
 
-    chunk_paths: list[Path] = []
     failed: list[dict] = []
-    to_download: list[dict] = []
-
-    # Collect chunks the manifest says are already downloaded so we can
-    # verify them before reusing -- a truncated/corrupt file (e.g. from an
-    # interrupted write) must be re-fetched, not silently used. These are
-    # lists of references to the caller's chunk dicts, so they add only
-    # ~8 bytes/chunk of pointer overhead, not a second copy of the dicts.
-    cached: list[tuple[dict, str, Path]] = []
-    for chunk in chunks:
-        key = _chunk_key(chunk)
-        entry = manifest.get(key)
-        if entry and entry.get("status") == "downloaded":
-            cached_path = tmp_dir / entry["file"]
-            if cached_path.is_file():
-                cached.append((chunk, key, cached_path))
-                continue
-        to_download.append(chunk)
+
+    # Per-chunk state is kept as index arrays into *chunks* (a few bytes per
+    # chunk) rather than lists of chunk dicts: a chunk's dict is only built
+    # while it is being verified or fetched, so with a lazy ChunkGrid the
+    # driver holds O(workers) dicts however large the AOI is.
+    rows, cols = _chunk_rows_cols(chunks)
+    statuses = manifest.lookup(rows, cols)
+    n_empty = int(np.count_nonzero(statuses == EMPTY))
+    cached = np.flatnonzero(statuses == DOWNLOADED)
+    to_download = np.flatnonzero((statuses != DOWNLOADED) & (statuses != EMPTY))
+    del statuses
+    if len(rows):
+        manifest.reserve(int(rows.max()) + 1, int(cols.max()) + 1)
+
+    if tile_writer is not None:
+        path_of = tile_writer.first_tile
+    else:
+        path_of = lambda c: tmp_dir / manifest.file_name(c["row"], c["col"])
 
     # Bound the live Future set for both the verify and download phases so
     # peak memory is O(workers * factor) rather than O(total chunks).
     max_inflight = max(workers, 1) * _MAX_INFLIGHT_FACTOR
 
-    if cached:
-        corrupt: list[tuple[dict, str, Path]] = []
-        with ThreadPoolExecutor(max_workers=workers) as verify_pool:
-            with tqdm(total=len(cached), desc="Verifying cached chunks") as pbar:
-                for (chunk, key, cached_path), res in _stream_futures(
-                    verify_pool,
-                    lambda ckp: _verify_chunk(ckp[2]),
-                    cached,
-                    max_inflight,
-                ):
-                    ok = False if isinstance(res, Exception) else bool(res)
-                    if ok:
-                        chunk_paths.append(cached_path)
-                    else:
-                        pbar.write(
-                            f"Chunk ({chunk['col']},{chunk['row']}) failed "
-                            f"verification -- will re-download."
-                        )
-                        cached_path.unlink(missing_ok=True)
-                        manifest[key] = {"status": "failed", "file": None}
-                        corrupt.append((chunk, key, cached_path))
-                    pbar.update(1)
-        if corrupt:
-            to_download.extend(c[0] for c in corrupt)
-            print(
-                f"{len(cached) - len(corrupt)} chunk(s) verified, "
-                f"{len(corrupt)} corrupt and will be re-downloaded."
-            )
-        else:
-            print(f"{len(cached)} chunk(s) verified OK.")
+    # Verify chunks the manifest says are already downloaded before reusing
+    # them -- a truncated/corrupt file (e.g. from an interrupted write) must
+    # be re-fetched, not silently used.
+    n_reused = 0
+    if len(cached):
+        n_reused, redo = _verify_cached_chunks(
+            chunks,
+            cached,
+            manifest,
+            path_of,
+            tile_writer,
+            options.deep_verify,
+            workers,
+            max_inflight,
+        )
+        if redo:
+            to_download = np.concatenate([to_download, np.array(redo, np.int64)])
+
+    if order != "row" and len(to_download):
+        # Centred on the whole AOI, not on what is left of it.
+        centre = (
+            (int(rows.min()) + int(rows.max())) / 2,
+            (int(cols.min()) + int(cols.max())) / 2,
+        )
+        to_download = to_download[
+            chunk_order(rows[to_download], cols[to_download], order, centre)
+        ]
 
-    if to_download:
+    if n_empty:
+        print(f"{n_empty} blank chunk(s) from a previous run skipped.")
+    if len(to_download):
         print(
-            f"{len(chunk_paths)} chunk(s) already downloaded; "
+            f"{n_reused} chunk(s) already downloaded; "
             f"fetching {len(to_download)} remaining chunk(s)..."
         )
-    elif chunk_paths:
+    elif n_reused:
         print("All chunks already downloaded -- skipping fetch.")
     else:
         print(f"Downloading {len(chunks)} chunks with {workers} workers...")
 
-    with requests.Session() as session, ThreadPoolExecutor(
-        max_workers=workers
-    ) as pool:
-        fetch = lambda c: fetch_chunk(
-            session, service, c, img_format, max_retries, timeout, pixel_type
+    write = _chunk_writer(
+        img_format,
+        tmp_dir,
+        service.srs,
+        georeference,
+        world_file,
+        tile_writer,
+        chunk_creation_options(options.chunk_compression, pixel_type),
+    )
+
+    skip_blank = pixel_type == "U8"
+    n_deferred = 0
+    metrics = preview = None
+    if len(to_download):
+        metrics = DownloadMetrics(
+            tmp_dir / REQUESTS_CSV_FILENAME if options.metrics_csv else None
         )
-        with tqdm(total=len(to_download), desc="Downloading chunks") as pbar:
-            since_flush = 0
-            for chunk, res in _stream_futures(
-                pool, fetch, to_download, max_inflight
-            ):
-                key = _chunk_key(chunk)
-                if isinstance(res, Exception):
-                    failed.append(chunk)
-                    manifest[key] = {"status": "failed", "file": None}
+        if options.preview_s is not None:
+            preview = PreviewMosaic(
+                chunks,
+                tmp_dir,
+                service.srs,
+                interval_s=options.preview_s,
+                elevation=pixel_type == "F32",
+            )
+            print(f"Writing a preview of the download to {preview.path}")
+
+    def persist(c, raw):
+        if skip_blank and (not raw or is_blank_bytes(raw)):
+            return None
+        if preview is not None:
+            preview.add(c, raw)
+        started = time.monotonic()
+        path = write(c, raw)
+        digest = file_digest(path)
+        metrics.record_write(time.monotonic() - started)
+        return path, digest
+
+    try:
+        with _fetch_results(
+            engine,
+            (chunks[i] for i in to_download),
+            service,
+            img_format,
+            max_retries,
+            timeout,
+            workers,
+            pixel_type,
+            persist,
+            controller,
+            store,
+            metrics,
+            breaker,
+            options.write_workers,
+        ) as results:
+            with tqdm(total=len(to_download), desc="Downloading chunks") as pbar:
+                since_flush = 0
+                for chunk, res in results:
+                    if isinstance(res, RunDeadlineExceeded):
+                        failed.append(chunk)
+                        n_deferred += 1
+                        status = f"Chunk ({chunk['col']},{chunk['row']}) deferred"
+                    elif isinstance(res, Exception):
+                        failed.append(chunk)
+                        manifest.set(chunk["row"], chunk["col"], FAILED)
+                        status = f"Chunk ({chunk['col']},{chunk['row']}) FAILED: {res}"
+                    elif res is None:
+                        n_empty += 1
+                        manifest.set(chunk["row"], chunk["col"], EMPTY)
+                        status = f"Chunk ({chunk['col']},{chunk['row']}) blank"
+                    else:
+                        path, digest = res
+                        manifest.set(chunk["row"], chunk["col"], DOWNLOADED, digest)
+                        status = f"Chunk ({chunk['col']},{chunk['row']}) OK"
+                    if controller is not None:
+                        status = f"{status} | {controller.status()}"
+                    if breaker is not None and breaker.status():
+                        status = f"{status} | {breaker.status()}"
+                    # Shown with the bar's next (rate-limited) refresh rather
+                    # than redrawing it for every chunk.
                     pbar.set_postfix_str(
-                        f"Chunk ({chunk['col']},{chunk['row']}) FAILED: {res}"
+                        f"{status} | {metrics.status()}", refresh=False
                     )
-                else:
-                    try:
-                        raw_bytes = res
-                        if georeference:
-                            path = georeference_chunk(
-                                raw_bytes,
-                                chunk,
-                                img_format,
-                                tmp_dir,
-                                service.srs,
-                            )
-                        else:
-                            path = write_chunk_direct(
-                                raw_bytes, chunk, img_format, tmp_dir
-                            )
-                        chunk_paths.append(path)
-                        manifest[key] = {"status": "downloaded", "file": path.name}
-                        pbar.set_postfix_str(
-                            f"Chunk ({chunk['col']},{chunk['row']}) OK"
-                        )
-                    except Exception as e:
-                        failed.append(chunk)
-                        manifest[key] = {"status": "failed", "file": None}
-                        pbar.set_postfix_str(
-                            f"Chunk ({chunk['col']},{chunk['row']}) FAILED: {e}"
-                        )
-                pbar.update(1)
-                since_flush += 1
-                if since_flush >= _MANIFEST_FLUSH_EVERY:
-                    _save_manifest(tmp_dir, manifest)
-                    since_flush = 0
-
-    _save_manifest(tmp_dir, manifest)
-
-    if failed:
+                    pbar.update(1)
+                    since_flush += 1
+                    if since_flush >= _MANIFEST_FLUSH_EVERY:
+                        manifest.flush()
+                        since_flush = 0
+                    if preview is not None and preview.due():
+                        preview.write()
+    finally:
+        # Also runs when the download is interrupted, so a re-run resumes
+        # from every chunk that completed.
+        manifest.compact()
+        if metrics is not None:
+            metrics.close()
+            metrics.write_summary(tmp_dir)
+        if preview is not None and preview.added:
+            preview.write()
+
+    # Every chunk of *chunks* now recorded as downloaded, reused or fresh.
+    done = np.flatnonzero(manifest.lookup(rows, cols) == DOWNLOADED)
+    chunk_paths = ChunkPaths(chunks, done, path_of)
+
+    if metrics is not None and metrics.requests:
+        print(metrics.report())
+    if breaker is not None and breaker.trips:
+        print(breaker.report())
+    if store is not None and store.reused:
         print(
-            f"\n{len(failed)} chunk(s) failed after all retries. "
+            f"{store.reused} chunk(s) reused from the tile store "
+            f"({store.revalidated} revalidated with the server)."
+        )
+    if n_empty:
+        print(f"{n_empty} blank chunk(s) left out of the output.")
+    if n_deferred:
+        print(
+            f"\nRun deadline reached with {n_deferred} chunk(s) not fetched. "
+            f"Re-run the command to continue."
+        )
+    if len(failed) > n_deferred:
+        print(
+            f"\n{len(failed) - n_deferred} chunk(s) failed after all retries. "
             f"Re-run the command to retry only the failed chunks."
         )
     return chunk_paths, failed
 
+
 # -- Hierarchical VRT support ------------------------------------------------
 # A flat VRT with hundreds of thousands of sources produces an XML file that
 # is too large for gdal2tiles to parse (the VRT driver builds an in-memory DOM
@@ -545,8 +1490,8 @@ def download_all_chunks(
 # region are read.
 
 # Matches ``chunk_{col}_{row}.tif`` produced by georeference_chunk /
-# write_chunk_direct.
-_CHUNK_FILENAME_RE = re.compile(r"chunk_(\d+)_(\d+)\.tif$")
+# write_chunk_direct, and the ``.png`` / ``.jpg`` of write_chunk_worldfile.
+_CHUNK_FILENAME_RE = re.compile(r"chunk_(\d+)_(\d+)\.(?:tif|png|jpg)$")
 
 # Above this chunk count build_mosaic builds a hierarchical VRT.
 _HIERARCHICAL_VRT_THRESHOLD = 50_000
@@ -559,7 +1504,7 @@ _SUB_VRT_BATCH_SIZE = 10_000
 
 
 def _parse_chunk_coords(path: Path) -> tuple[int, int]:
-    """Extract (row, col) from a chunk filename chunk_{col}_{row}.tif.
+    """Extract (row, col) from a chunk filename chunk_{col}_{row}.{ext}.
 
     Returns (0, 0) for filenames that do not match the expected pattern so
     non-standard files sort first without raising.
@@ -659,14 +1604,28 @@ def _build_hierarchical_vrt(
     return top_vrt
 
 
-def build_mosaic(chunk_paths, tmp_dir: Path) -> Path:
+def build_mosaic(chunk_paths, tmp_dir: Path, chunks=None, srs: int | None = None) -> Path:
     """Build a VRT mosaic from chunk GeoTIFFs.
 
+    When the chunk grid (*chunks*, from :func:`build_chunk_grid`) and its
+    *srs* are given, the VRT XML is written directly from chunk geometry by
+    :func:`write_mosaic_vrt`, which never opens the chunk files. Without
+    them, or if the chunks' band layout cannot be described that way,
+    ``gdalbuildvrt`` builds it instead.
+
     For large chunk counts (above _HIERARCHICAL_VRT_THRESHOLD) a hierarchical
     VRT (VRT-of-VRTs) is built to keep the top-level VRT file small enough
     for gdal2tiles to open.  For smaller counts a single flat VRT is built
     as before.
     """
+    if chunks and srs is not None and chunk_paths:
+        try:
+            return write_mosaic_vrt(
+                chunk_paths, chunks, tmp_dir, srs, _HIERARCHICAL_VRT_THRESHOLD
+            )
+        except UnsupportedChunkLayout as e:
+            print(f"{e} -- building the mosaic with gdalbuildvrt instead.")
+
     if len(chunk_paths) > _HIERARCHICAL_VRT_THRESHOLD:
         return _build_hierarchical_vrt(chunk_paths, tmp_dir)
 
@@ -732,10 +1691,14 @@ class ArcGISDownloaderBase:
     def __init__(
         self,
         service: ImageryService | None = None,
-        service_index: int | None = None,
+        service_index: int | str | None = None,
+        failover: bool = False,
     ):
         self.service = service
         self.service_index = service_index
+        self.failover = failover
+        # Ranked stand-ins for the resolved service (``failover``).
+        self.fallbacks: list[ImageryService] = []
 
     def resolve_service(self, loader, aoi_bbox) -> ImageryService:
         """Pick a registered service of this downloader's ``kind`` for the AOI.
@@ -745,28 +1708,135 @@ class ArcGISDownloaderBase:
         When an explicit ``service`` was supplied to the constructor it is
         returned unchanged. When several candidates cover the AOI and no
         ``service_index`` disambiguates, the candidate list is printed and the
-        process exits (2).
+        process exits (2); with ``service_index`` ``"auto"`` they are probed
+        instead and the best ranked is picked (see :func:`rank_services`).
+
+        With ``failover`` the other candidates of equivalent resolution,
+        ranked the same way, become ``fallbacks`` (see
+        :meth:`download_parts`).
         """
         if self.service is not None:
             return self.service
+        registry = loader()
+        auto = self.service_index == AUTO_INDEX
+        ranking = None
         try:
             service = select_service(
-                loader(), aoi_bbox, index=self.service_index, kind=self.kind
+                registry,
+                aoi_bbox,
+                index=None if auto else self.service_index,
+                kind=self.kind,
             )
         except AmbiguousServiceError as e:
-            print(
-                f"Multiple {self.kind} services cover this area. Re-run with "
-                "`--service-index <N>` to choose one:"
-            )
-            for i, s in enumerate(e.candidates):
-                print(
-                    f"  {i}: {s.label} ({s.key})  "
-                    f"native {s.native_pixel_size_m:.4f} m/px"
-                )
-            sys.exit(2)
+            if not auto:
+                self._exit_ambiguous(e)
+            ranking = self._rank(e.candidates, aoi_bbox)
+            service = ranking[0]
         print(f"Selected {self.kind} service: {service.label} ({service.key})")
+        if self.failover:
+            self.fallbacks = self._fallbacks(registry, aoi_bbox, service, ranking)
         return service
 
+    def resolve_services(self, loader, aoi_bbox) -> list[ImageryService]:
+        """:meth:`resolve_service`, except that an AOI no single service
+        covers is split between the services that together cover it (see
+        :func:`select_services`) instead of rejected."""
+        if self.service is not None:
+            return [self.service]
+        registry = loader()
+        try:
+            return [self.resolve_service(lambda: registry, aoi_bbox)]
+        except AmbiguousServiceError:
+            raise
+        except ValueError:
+            index = None if self.service_index == AUTO_INDEX else self.service_index
+            services = select_services(
+                registry, aoi_bbox, index=index, kind=self.kind
+            )
+        print(f"The AOI spans {len(services)} {self.kind} services:")
+        for s in services:
+            print(f"  {s.label} ({s.key})")
+        return services
+
+    def _rank(self, candidates, aoi_bbox) -> list[ImageryService]:
+        """*candidates* best first, probed at the centre of the WGS84
+        *aoi_bbox*."""
+        min_lat, min_lon, max_lat, max_lon = aoi_bbox
+        centre = WGS84_TO_WEBMERC.transform(
+            (min_lon + max_lon) / 2, (min_lat + max_lat) / 2
+        )
+        ranking = rank_services(candidates, self.img_format, self.pixel_type, centre)
+        return [r.service for r in ranking]
+
+    def _fallbacks(self, registry, aoi_bbox, service, ranking=None):
+        """The candidates other than *service* that cover the AOI at an
+        equivalent resolution, in *ranking* order (probed if not given)."""
+        others = [
+            s
+            for s in covering_services(registry, aoi_bbox, kind=self.kind)
+            if s.key != service.key and equivalent_resolution(s, service)
+        ]
+        if not others:
+            print(
+                f"No other {self.kind} service covers the AOI at "
+                f"{service.key}'s resolution; nothing to fail over to."
+            )
+            return []
+        keys = {s.key for s in others}
+        ranked = [s for s in ranking or self._rank(others, aoi_bbox) if s.key in keys]
+        print(f"Failover order: {', '.join(s.key for s in ranked)}")
+        return ranked
+
+    def _exit_ambiguous(self, e: AmbiguousServiceError) -> None:
+        print(
+            f"Multiple {self.kind} services cover this area. Re-run with "
+            "`--service-index <N>` to choose one:"
+        )
+        for i, s in enumerate(e.candidates):
+            print(
+                f"  {i}: {s.label} ({s.key})  "
+                f"native {s.native_pixel_size_m:.4f} m/px"
+            )
+        sys.exit(2)
+
+    @staticmethod
+    def part_dir(tmp_dir: Path, services, service: ImageryService) -> Path:
+        """The directory *service*'s chunks of a download from *services*
+        go to: *tmp_dir* itself for one service, else a subdirectory named
+        for the service, so every part has its own manifest."""
+        if len(services) == 1:
+            return Path(tmp_dir)
+        path = Path(tmp_dir) / service.key
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def transfer_format(
+        self, service: ImageryService, specs=None, timeout: int = 30
+    ) -> str:
+        """The spec of the transfer format to request from *service*: the
+        last of *specs* (``--transfer-format``) for this downloader's
+        ``kind``, else ``img_format``.
+
+        A format other than ``img_format`` is checked against the service
+        metadata first, and a service that cannot encode it exits the run
+        (2). Metadata that cannot be fetched only skips the check.
+        """
+        spec = select_transfer_format(specs, self.kind) or self.img_format
+        if spec == self.img_format:
+            return spec
+        try:
+            info = service_info(service, timeout)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Could not read {service.key} metadata ({e}); using {spec}.")
+        else:
+            try:
+                check_transfer_format(spec, info)
+            except ValueError as e:
+                print(f"{service.label} ({service.key}): {e}")
+                sys.exit(2)
+        print(f"Requesting chunks as {spec}")
+        return spec
+
     def download_chunks(
         self,
         service: ImageryService,
@@ -775,18 +1845,225 @@ class ArcGISDownloaderBase:
         timeout: int,
         num_workers: int,
         max_retries: int | None = None,
+        options: DownloadOptions | None = None,
+        tile_store: TileStore | None = None,
+        tile_writer: XyzTileWriter | None = None,
+        tile_zoom: int | None = None,
     ) -> tuple[list[Path], list[dict]]:
         """Download *chunks* for *service* into *tmp_dir* using this
-        downloader's ``img_format`` / ``pixel_type`` / ``georeference``."""
+        downloader's ``img_format`` / ``pixel_type`` / ``georeference``.
+
+        *options* (a :class:`DownloadOptions`) are the run's options. With
+        ``adaptive`` the run starts at *num_workers* requests in flight and
+        an :class:`AimdController` moves that between 1 and ``max_workers``
+        (default ``DEFAULT_MAX_FACTOR`` x *num_workers*). A
+        :class:`CircuitBreaker` opened by ``breaker_threshold`` consecutive
+        failures (0 disables it) pauses the run through outages, bounded by
+        ``chunk_deadline_s`` per chunk and ``run_deadline_s`` for the whole
+        fetch. ``world_file`` only applies to georeferenced downloads. The
+        chunks are requested in the last of ``transfer_formats`` for this
+        downloader's ``kind`` (see :meth:`transfer_format`), or with
+        *tile_zoom* (a 256-px tile-aligned grid) copied from the service's
+        tile cache at that LOD.
+
+        *tile_store* (the opened ``--tile-store``) is read before the network
+        and filled with every fresh response; *tile_writer* cuts a
+        tile-aligned grid straight into XYZ tiles. The rest is
+        :func:`download_all_chunks`."""
+        options = options or DownloadOptions()
+        if tile_zoom is not None:
+            img_format = cached_tile_format(tile_zoom)
+        else:
+            img_format = self.transfer_format(
+                service, options.transfer_formats, timeout
+            )
+        if options.world_file and not self.georeference:
+            options = dataclasses.replace(options, world_file=False)
         max_retries = self.default_max_retries if max_retries is None else max_retries
+        controller = (
+            AimdController(num_workers, max_limit=options.max_workers)
+            if options.adaptive
+            else None
+        )
+        breaker = None
+        if (
+            options.breaker_threshold
+            or options.chunk_deadline_s
+            or options.run_deadline_s
+        ):
+            breaker = CircuitBreaker(
+                options.breaker_threshold,
+                chunk_deadline_s=options.chunk_deadline_s,
+                run_deadline_s=options.run_deadline_s,
+            )
         return download_all_chunks(
             chunks,
             service,
-            self.img_format,
+            img_format,
             max_retries,
             timeout,
             num_workers,
             tmp_dir,
             pixel_type=self.pixel_type,
             georeference=self.georeference,
+            options=options,
+            controller=controller,
+            breaker=breaker,
+            store=tile_store,
+            tile_writer=tile_writer,
+        )
+
+    def download_parts(
+        self,
+        services: list[ImageryService],
+        chunks,
+        tmp_dir: Path,
+        timeout: int,
+        num_workers: int,
+        **kwargs,
+    ) -> tuple[list[Path], list[dict]]:
+        """:meth:`download_chunks` (taking the same keyword arguments) for a
+        download from one or more *services* (see :meth:`resolve_services`).
+
+        Each service fetches the chunks :func:`split_chunks` gives it into
+        its :meth:`part_dir`, all at once: they are separate servers, so
+        each has its own connection pool, *num_workers* workers, rate
+        controller and circuit breaker, and the run takes as long as the
+        slowest part. A chunk that comes back blank from its part's service
+        is then requested from the other services that reach it (see
+        :meth:`_refill_blank`). The parts' chunk paths and failures are
+        merged, to be mosaicked as one grid.
+
+        A single service's failed chunks are then fetched from each of its
+        ``fallbacks`` in turn (``--failover``), into the same *tmp_dir* and
+        manifest, until none are left."""
+        if len(services) == 1:
+            chunk_paths, failed = self.download_chunks(
+                services[0], chunks, tmp_dir, timeout, num_workers, **kwargs
+            )
+            for fallback in self.fallbacks:
+                if not failed:
+                    break
+                chunk_paths, failed = self._fail_over(
+                    fallback,
+                    chunks,
+                    chunk_paths,
+                    failed,
+                    tmp_dir,
+                    timeout,
+                    num_workers,
+                    kwargs,
+                )
+            return chunk_paths, failed
+        parts = split_chunks(chunks, services)
+        for service, part in zip(services, parts):
+            print(f"  {service.key}: {len(part)} chunks")
+        with ThreadPoolExecutor(max_workers=len(services)) as pool:
+            futures = [
+                pool.submit(
+                    self.download_chunks,
+                    service,
+                    part,
+                    self.part_dir(tmp_dir, services, service),
+                    timeout,
+                    num_workers,
+                    **kwargs,
+                )
+                for service, part in zip(services, parts)
+                if len(part)
+            ]
+            results = [f.result() for f in futures]
+        chunk_paths = [p for paths, _ in results for p in paths]
+        failed = [c for _, part_failed in results for c in part_failed]
+        for service, part in zip(services, parts):
+            if len(part):
+                paths, part_failed = self._refill_blank(
+                    service, part, services, tmp_dir, timeout, num_workers, kwargs
+                )
+                chunk_paths += paths
+                failed += part_failed
+        return chunk_paths, failed
+
+    def _refill_blank(
+        self,
+        owner: ImageryService,
+        part,
+        services: list[ImageryService],
+        tmp_dir: Path,
+        timeout: int,
+        num_workers: int,
+        kwargs: dict,
+    ) -> tuple[list[Path], list[dict]]:
+        """Request the chunks of *part* that *owner* returned blank from each
+        other service of *services* whose coverage reaches them, in order,
+        until one has imagery there; returns those ``(chunk_paths, failed)``.
+
+        A chunk blank from every one of them stays ``EMPTY``. Each service
+        keeps the chunks in its own :meth:`part_dir`, so a resumed run finds
+        them there."""
+        rows, cols = part.rows_cols()
+
+        def blank_in(service):
+            manifest = ChunkManifest.load(self.part_dir(tmp_dir, services, service))
+            return manifest.lookup(rows, cols) == EMPTY
+
+        chunk_paths: list[Path] = []
+        failed: list[dict] = []
+        blank = blank_in(owner)
+        for service in services:
+            if not blank.any():
+                break
+            if service is owner:
+                continue
+            reached = blank & covered_by(part, service)
+            if not reached.any():
+                continue
+            print(
+                f"Requesting {int(reached.sum())} chunk(s) that {owner.key} "
+                f"returned blank from {service.key}..."
+            )
+            paths, retry_failed = self.download_chunks(
+                service,
+                part.subset(reached),
+                self.part_dir(tmp_dir, services, service),
+                timeout,
+                num_workers,
+                **kwargs,
+            )
+            chunk_paths += paths
+            failed += retry_failed
+            blank &= ~reached | blank_in(service)
+        return chunk_paths, failed
+
+    def _fail_over(
+        self,
+        fallback: ImageryService,
+        chunks,
+        chunk_paths,
+        failed: list[dict],
+        tmp_dir: Path,
+        timeout: int,
+        num_workers: int,
+        kwargs: dict,
+    ) -> tuple[list[Path], list[dict]]:
+        """Fetch the *failed* chunks of *chunks* from *fallback*, adding
+        their files to *chunk_paths*; returns the new ``(chunk_paths,
+        failed)``."""
+        print(
+            f"Failing over {len(failed)} chunk(s) to {fallback.label} "
+            f"({fallback.key})..."
+        )
+        rows, cols = chunks.rows_cols()
+        flat = rows * chunks.n_cols + cols
+        retry = chunks.subset(
+            np.isin(flat, [c["row"] * chunks.n_cols + c["col"] for c in failed])
+        )
+        tile_zoom = kwargs.get("tile_zoom")
+        if tile_zoom is not None and not fallback.has_tile_level(tile_zoom):
+            # The grid is still 256-px tile-aligned, so exportImage renders
+            # the same tiles.
+            kwargs = {**kwargs, "tile_zoom": None}
+        paths, failed = self.download_chunks(
+            fallback, retry, tmp_dir, timeout, num_workers, **kwargs
         )
+        return [*chunk_paths, *paths], failed
@@ -10,6 +10,7 @@ from terrain_stitcher.arcgis.services import (
     load_services,
 )
 from terrain_stitcher.common.ParseArea import ParseArea
+from terrain_stitcher.common.area_mask import AreaMask
 
 from .DownloaderBase import (
     ArcGISDownloaderBase,
@@ -18,6 +19,10 @@ from .DownloaderBase import (
     build_mosaic,
     _translate_to_geotiff,
 )
+from .DownloadMetrics import keep_metrics
+from .DownloadOptions import DownloadOptions
+from .ChunkSize import AUTO, resolve_chunk_px
+from .TileStore import STORE_CHUNK_PX, open_tile_store
 
 
 class ElevationDownloader(ArcGISDownloaderBase):
@@ -42,33 +47,41 @@ class ElevationDownloader(ArcGISDownloaderBase):
         shapefile_path: str,
         outdir: str,
         res: float | None = None,
-        chunk_px: int = 256,
+        chunk_px: int | str = "auto",
         timeout: int = 30,
         num_workers: int = 32,
         padding: float = 0.0,
+        options: DownloadOptions | None = None,
     ) -> None:
+        options = options or DownloadOptions()
         shape_area = ParseArea.fromJSONFile(shapefile_path)
         lat = shape_area.center.get_lat()
         lon = shape_area.center.get_lon()
 
-        # Resolve the elevation service from the AOI when one is not supplied.
+        # Resolve the elevation service(s) from the AOI when one is not
+        # supplied.
         aoi_bbox = bbox_latlon_from_radius(lat, lon, shape_area.view_distance)
-        service = self.resolve_service(load_services, aoi_bbox)
+        services = self.resolve_services(load_services, aoi_bbox)
 
-        # Default resolution to the service's registered native cell size.
-        pixel_size_m = res if res is not None else service.native_pixel_size_m
+        # Default resolution to the registered native cell size (the
+        # coarsest one of an AOI split between services).
+        native = max(services, key=lambda s: s.native_pixel_size_m)
+        pixel_size_m = res if res is not None else native.native_pixel_size_m
         if pixel_size_m <= 0:
             raise ValueError(
-                f"{service.key} has an invalid native pixel size; pass --res."
-            )
-        if res is not None and res < service.native_pixel_size_m:
-            # 3DEP resamples on the fly; warn rather than fail so a user can
-            # still request a slightly finer grid than the declared cell size.
-            print(
-                f"Warning: requested {res:.4f} m/px is finer than {service.key}'s "
-                f"declared native resolution {service.native_pixel_size_m:.4f} "
-                f"m/px; 3DEP will resample on the fly."
+                f"{native.key} has an invalid native pixel size; pass --res."
             )
+        for service in services:
+            if res is not None and res < service.native_pixel_size_m:
+                # 3DEP resamples on the fly; warn rather than fail so a user
+                # can still request a slightly finer grid than the declared
+                # cell size.
+                print(
+                    f"Warning: requested {res:.4f} m/px is finer than "
+                    f"{service.key}'s declared native resolution "
+                    f"{service.native_pixel_size_m:.4f} m/px; 3DEP will "
+                    f"resample on the fly."
+                )
 
         # Expand the AOI by an optional padding (degrees) before projecting.
         min_lat, min_lon, max_lat, max_lon = aoi_bbox
@@ -84,23 +97,67 @@ class ElevationDownloader(ArcGISDownloaderBase):
         tmp_dir = Path(outdir).parent / self.tmp_dir_name
         tmp_dir.mkdir(exist_ok=True)
 
-        chunks = build_chunk_grid(xmin, ymin, xmax, ymax, chunk_px, pixel_size_m)
+        # Store keys include each chunk's offset and size, so a store-backed
+        # run needs the same chunks as every other run: no measured size.
+        if options.tile_store is not None and chunk_px == AUTO:
+            print(f"Tile store: fixed {STORE_CHUNK_PX}px chunks instead of auto.")
+            chunk_px = STORE_CHUNK_PX
+        chunk_px = min(
+            resolve_chunk_px(
+                chunk_px,
+                self.part_dir(tmp_dir, services, service),
+                service,
+                (xmin, ymin, xmax, ymax),
+                pixel_size_m,
+                num_workers,
+                timeout,
+                self.img_format,
+                self.pixel_type,
+            )
+            for service in services
+        )
+        chunks = build_chunk_grid(
+            xmin,
+            ymin,
+            xmax,
+            ymax,
+            chunk_px,
+            pixel_size_m,
+            snap=options.tile_store is not None,
+        )
+        # Skip chunks wholly outside a CIRCLE / POLYGON AOI, grown by the
+        # same padding as the bbox.
+        area_mask = AreaMask.for_area(shape_area, 3857, buffer_deg=padding)
+        if area_mask is not None:
+            chunks.restrict(area_mask)
 
         # Elevation chunks are already-georeferenced F32 TIFFs, so we skip the
         # georeference pass and write the bytes straight to disk.
-        chunk_paths, failed = self.download_chunks(
-            service, chunks, tmp_dir, timeout, num_workers
-        )
-        # The chunk-index dicts are no longer needed; drop them before the
-        # memory-heavy mosaic + translate pass so they can be reclaimed.
-        del chunks
-
+        store = open_tile_store(options.tile_store, options.tile_store_max_gb)
+        try:
+            chunk_paths, failed = self.download_parts(
+                services,
+                chunks,
+                tmp_dir,
+                timeout,
+                num_workers,
+                options=options,
+                tile_store=store,
+            )
+        finally:
+            if store is not None:
+                store.close()
         if not chunk_paths:
             print("No elevation chunks downloaded successfully - aborting.")
             sys.exit(1)
 
         print("Building mosaic...")
-        mosaic_path = build_mosaic(chunk_paths, tmp_dir)
+        mosaic_path = build_mosaic(
+            chunk_paths, tmp_dir, chunks=chunks, srs=services[0].srs
+        )
+        # The chunk-index dicts are no longer needed; drop them before the
+        # memory-heavy translate pass so they can be reclaimed.
+        del chunks
 
         print(f"Writing merged GeoTIFF -> {outdir}")
         _translate_to_geotiff(mosaic_path, Path(outdir))
@@ -113,6 +170,7 @@ class ElevationDownloader(ArcGISDownloaderBase):
                 f"command to retry only the {len(failed)} failed chunk(s)."
             )
         else:
+            keep_metrics(tmp_dir, Path(outdir).parent)
             shutil.rmtree(tmp_dir, ignore_errors=True)
             print(f"Done. Merged elevation GeoTIFF written to: {outdir}")
 
@@ -121,12 +179,13 @@ def download_elevation(
     shapefile_path: str,
     outdir: str = "elevation_merged.tif",
     res: float | None = None,
-    chunk_px: int = 256,
+    chunk_px: int | str = "auto",
     timeout: int = 30,
     num_workers: int = 32,
     service: ImageryService | None = None,
-    service_index: int | None = None,
+    service_index: int | str | None = None,
     padding: float = 0.0,
+    options: DownloadOptions | None = None,
 ):
     """Fetch a continuous Float32 elevation GeoTIFF over the shape AOI.
 
@@ -136,7 +195,10 @@ def download_elevation(
     *outdir*. ``res`` defaults to the selected service's registered native
     pixel size.
     """
-    ElevationDownloader(service=service, service_index=service_index).run(
+    options = options or DownloadOptions()
+    ElevationDownloader(
+        service=service, service_index=service_index, failover=options.failover
+    ).run(
         shapefile_path=shapefile_path,
         outdir=outdir,
         res=res,
@@ -144,6 +206,7 @@ def download_elevation(
         timeout=timeout,
         num_workers=num_workers,
         padding=padding,
+        options=options,
     )
 
 
@@ -153,10 +216,11 @@ def main_elevation(
     res: float | None = None,
     timeout: int = 30,
     num_workers: int = 32,
-    chunk_px: int = 256,
+    chunk_px: int | str = "auto",
     service: ImageryService | None = None,
-    service_index: int | None = None,
+    service_index: int | str | None = None,
     padding: float = 0.0,
+    options: DownloadOptions | None = None,
 ):
     download_elevation(
         shapefile_path=shape_file,
@@ -168,4 +232,5 @@ def main_elevation(
         service=service,
         service_index=service_index,
         padding=padding,
+        options=options,
     )
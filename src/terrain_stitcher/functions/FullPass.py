@@ -8,11 +8,15 @@ produces two or three quality tiers of the same AOI, one directory per tier:
   <output>/<name>_19   -- gathered at LOD 19 (ultra quality, only with --ultra)
 
 A single ``download-arcgis`` at the highest requested LOD feeds every tier:
-gdal2tiles builds a full 0..N pyramid, and ``gather-ortho --from-download``
-stitches one LOD out of it via ``--lod_min``. If the installed gdal2tiles only
-emits the top level (so a lower LOD is missing from the pyramid), the gather
-for that tier falls back to a dedicated download at that LOD, so the command
-is correct regardless of the gdal2tiles version's ``-z`` semantics.
+the lower tier LODs are built in-process from its tiles (``--pyramid-lods``,
+see :mod:`PyramidBuilder`), and ``gather-ortho --from-download`` stitches one
+LOD out of the pyramid via ``--lod_min``. If a lower LOD is still missing
+from the pyramid, the gather for that tier falls back to a dedicated download
+at that LOD.
+
+With ``direct`` each tier is instead rendered window by window straight from
+exportImage (see :mod:`DirectGather`): no download, tile pyramid or gather
+rescan, and so nothing intermediate to clean up.
 
 Chunking is mandatory: ``dimension`` must be >= 2. With dimension 1 every
 cache tile becomes its own output file (thousands of files for a real AOI),
@@ -29,8 +33,11 @@ from .OrthoDownloader import main as main_arcgis_downloader
 from .ArcGisImporter import (
     import_from_download as main_ortho_arcgis_import_from_download,
 )
+from .DirectGather import gather_direct
 from .ElevationDownloader import main_elevation
 from .ElevationGeoPrep import DEFAULT_PADDING_DEG
+from .DownloadMetrics import keep_metrics
+from .DownloadOptions import DownloadOptions
 
 LOW_LOD = 17
 HIGH_LOD = 18
@@ -52,11 +59,15 @@ def _download_kwargs(
     outdir: str,
     lod: int,
     workers: int,
-    chunk_px: int,
+    chunk_px: int | str,
     timeout: int,
     resampling: str,
     processes: int,
-    service_index: Optional[int],
+    service_index: Optional[int | str],
+    tile_aligned: bool = False,
+    tile_cache: bool = True,
+    pyramid_lods: Optional[list[int]] = None,
+    options: Optional[DownloadOptions] = None,
 ) -> dict:
     return dict(
         shape_file=shape_file,
@@ -68,6 +79,10 @@ def _download_kwargs(
         processes=processes,
         resampling=resampling,
         service_index=service_index,
+        tile_aligned=tile_aligned,
+        tile_cache=tile_cache,
+        pyramid_lods=pyramid_lods,
+        options=options,
     )
 
 
@@ -99,6 +114,34 @@ def _gather_kwargs(
     )
 
 
+def _direct_gather_kwargs(
+    shape_file: str,
+    output_dir: str,
+    lod: int,
+    dimension: int,
+    scale_factor: float,
+    resume: bool,
+    workers: int,
+    timeout: int,
+    service_index: Optional[int | str],
+    elevation_data_dir: Optional[str],
+    elevation_padding_deg: float,
+) -> dict:
+    return dict(
+        shape_file=shape_file,
+        output_dir=output_dir,
+        lod=lod,
+        dimension=dimension,
+        scale_factor=scale_factor,
+        resume=resume,
+        workers=workers,
+        timeout=timeout,
+        service_index=service_index,
+        elevation_data_dir=elevation_data_dir,
+        elevation_padding_deg=elevation_padding_deg,
+    )
+
+
 def _is_missing_lod_error(exc: BaseException) -> bool:
     """True when a gather failed because its LOD is absent from the pyramid.
 
@@ -124,10 +167,14 @@ def main_process_terrain(
     workers: int = 32,
     processes: int = 32,
     gather_workers: Optional[int] = None,
-    chunk_px: int = 256,
+    chunk_px: int | str = "auto",
     timeout: int = 30,
     resampling: str = "lanczos",
-    service_index: Optional[int] = None,
+    service_index: Optional[int | str] = None,
+    tile_aligned: bool = False,
+    tile_cache: bool = True,
+    direct: bool = False,
+    options: Optional[DownloadOptions] = None,
 ) -> None:
     """Run a full download + gather pass producing 2-3 quality tiers.
 
@@ -160,22 +207,28 @@ def main_process_terrain(
         f"under '{output}' (dimension={dimension}x{dimension})"
     )
 
-    # 1) One download at the highest requested LOD builds the shared pyramid.
-    print(f"Downloading orthoimagery at LOD {max_lod} -> {tiles_dir}")
-    main_arcgis_downloader(
-        **_download_kwargs(
-            shape_file=shape_file,
-            outdir=tiles_dir,
-            lod=max_lod,
-            workers=workers,
-            chunk_px=chunk_px,
-            timeout=timeout,
-            resampling=resampling,
-            processes=processes,
-            service_index=service_index,
+    # 1) One download at the highest requested LOD builds the shared pyramid
+    #    (skipped with --direct: every tier is fetched window by window).
+    if not direct:
+        print(f"Downloading orthoimagery at LOD {max_lod} -> {tiles_dir}")
+        main_arcgis_downloader(
+            **_download_kwargs(
+                shape_file=shape_file,
+                outdir=tiles_dir,
+                lod=max_lod,
+                workers=workers,
+                chunk_px=chunk_px,
+                timeout=timeout,
+                resampling=resampling,
+                processes=processes,
+                service_index=service_index,
+                tile_aligned=tile_aligned,
+                tile_cache=tile_cache,
+                pyramid_lods=tiers[:-1],
+                options=options,
+            )
         )
-    )
-    cleanup_dirs.append(tiles_dir)
+        cleanup_dirs.append(tiles_dir)
 
     # 2) Optional continuous elevation GeoTIFF, fed to every tier's gather.
     elevation_data_dir: Optional[str] = None
@@ -190,6 +243,7 @@ def main_process_terrain(
             chunk_px=chunk_px,
             timeout=timeout,
             service_index=service_index,
+            options=options,
         )
         elevation_data_dir = elevation_dir
 
@@ -197,6 +251,25 @@ def main_process_terrain(
     produced: list[str] = []
     for lod in tiers:
         tier_dir = os.path.join(output, f"{name}_{lod}")
+        if direct:
+            print(f"Gathering tier LOD {lod} directly from exportImage -> {tier_dir}")
+            gather_direct(
+                **_direct_gather_kwargs(
+                    shape_file=shape_file,
+                    output_dir=tier_dir,
+                    lod=lod,
+                    dimension=dimension,
+                    scale_factor=scale_factor,
+                    resume=resume,
+                    workers=workers,
+                    timeout=timeout,
+                    service_index=service_index,
+                    elevation_data_dir=elevation_data_dir,
+                    elevation_padding_deg=DEFAULT_PADDING_DEG,
+                )
+            )
+            produced.append(tier_dir)
+            continue
         print(f"Gathering tier LOD {lod} -> {tier_dir}")
         try:
             main_ortho_arcgis_import_from_download(
@@ -217,9 +290,8 @@ def main_process_terrain(
         except ValueError as exc:
             if not _is_missing_lod_error(exc):
                 raise
-            # The shared pyramid did not contain this LOD (gdal2tiles emitted
-            # only the top level). Fall back to a dedicated download at this
-            # LOD so the command is correct regardless of -z semantics.
+            # The shared pyramid did not contain this LOD. Fall back to a
+            # dedicated download at this LOD so the tier is still produced.
             tier_tiles = os.path.join(output, f"{name}_{lod}_tiles")
             print(
                 f"LOD {lod} not present in shared pyramid; downloading it "
@@ -236,6 +308,9 @@ def main_process_terrain(
                     resampling=resampling,
                     processes=processes,
                     service_index=service_index,
+                    tile_aligned=tile_aligned,
+                    tile_cache=tile_cache,
+                    options=options,
                 )
             )
             cleanup_dirs.append(tier_tiles)
@@ -257,8 +332,10 @@ def main_process_terrain(
         produced.append(tier_dir)
 
     # 4) Drop intermediate tile pyramids unless the user asked to keep them.
-    if not keep_tiles:
+    if not keep_tiles and cleanup_dirs:
         for d in cleanup_dirs:
+            # The download metrics in a pyramid's root outlive it.
+            keep_metrics(d, output, prefix=f"{os.path.basename(d)}_")
             shutil.rmtree(d, ignore_errors=True)
         print(
             "Removed intermediate tile pyramids (use --keep-tiles to retain "
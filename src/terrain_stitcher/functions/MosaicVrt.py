@@ -0,0 +1,250 @@
+"""Write the chunk mosaic VRT straight from the chunk grid.
+
+``gdalbuildvrt`` / ``gdal.BuildVRT`` open every source file to learn its
+size, band layout and geotransform -- 1.8M file opens for a large LOD-19
+AOI -- although :func:`DownloaderBase.build_chunk_grid` already knows each
+chunk's exact ``w``, ``h``, ``xmin`` and ``ymax``. :func:`write_mosaic_vrt`
+emits the ``<SimpleSource>`` XML from that metadata instead. Band count and
+data type are the same for every chunk one service returns, so they are read
+from the header of one sample chunk per service directory (an AOI split
+between services keeps each part in its own); no other chunk file is opened.
+
+Above ``_HIERARCHICAL_VRT_THRESHOLD`` chunks the mosaic is a VRT-of-VRTs
+(see :func:`DownloaderBase._build_hierarchical_vrt` for why). Here each
+sub-VRT covers a square spatial block of ``_SUB_VRT_BLOCK`` x
+``_SUB_VRT_BLOCK`` chunks rather than a run of row-sorted chunks, so a
+gdal2tiles tile read touches one or two sub-VRTs instead of a long strip,
+and the sub-VRTs are written in parallel on a process pool.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from xml.sax.saxutils import escape as xml_escape
+
+from PIL import Image as pImage
+from pyproj import CRS
+
+from .ChunkGrid import ChunkGrid
+
+# Chunks per side of one hierarchical sub-VRT block: 100 x 100 = 10k
+# sources, the same per-file size as the row-sorted gdalbuildvrt batches.
+_SUB_VRT_BLOCK = 100
+
+# PIL image mode -> (GDAL data type, per-band colour interpretation).
+_MODE_BANDS = {
+    "L": ("Byte", ["Gray"]),
+    "LA": ("Byte", ["Gray", "Alpha"]),
+    "RGB": ("Byte", ["Red", "Green", "Blue"]),
+    "RGBA": ("Byte", ["Red", "Green", "Blue", "Alpha"]),
+    "I;16": ("UInt16", ["Gray"]),
+    "I": ("Int32", ["Gray"]),
+    "F": ("Float32", ["Gray"]),
+}
+
+# TIFF tag GDAL stores a band's nodata value in (as text).
+_GDAL_NODATA_TAG = 42113
+
+
+class UnsupportedChunkLayout(ValueError):
+    """The sample chunk's band layout cannot be described without GDAL;
+    the caller falls back to ``gdalbuildvrt``."""
+
+
+class MixedChunkLayouts(ValueError):
+    """The chunks of one mosaic, fetched from several services, do not
+    share a band layout, so no one list of VRT bands describes them."""
+
+
+def _band_layout(sample: Path) -> tuple[str, list[str], str | None]:
+    """``(data_type, color_interps, nodata)`` of *sample*, read from its
+    header only (PIL opens lazily and decodes no pixels here)."""
+    try:
+        with pImage.open(sample) as img:
+            mode = img.mode
+            nodata = None
+            tags = getattr(img, "tag_v2", None)
+            if tags is not None and _GDAL_NODATA_TAG in tags:
+                nodata = str(tags[_GDAL_NODATA_TAG]).strip("\x00 ")
+    except OSError as e:
+        raise UnsupportedChunkLayout(f"cannot read {sample}: {e}") from e
+    if mode not in _MODE_BANDS:
+        raise UnsupportedChunkLayout(f"unsupported image mode {mode!r} in {sample}")
+    data_type, interps = _MODE_BANDS[mode]
+    return data_type, interps, nodata
+
+
+def _common_band_layout(chunk_paths) -> tuple[str, list[str], str | None]:
+    """The :func:`_band_layout` every chunk directory of *chunk_paths* shares,
+    sampling one chunk per directory. Raises :class:`MixedChunkLayouts`
+    when two of them differ."""
+    samples: dict[Path, Path] = {}
+    for path in chunk_paths:
+        path = Path(path)
+        samples.setdefault(path.parent, path)
+    (first, layout), *others = ((p, _band_layout(p)) for p in samples.values())
+    for sample, other in others:
+        if other != layout:
+            raise MixedChunkLayouts(
+                f"{first.parent} has {_describe(layout)} but {sample.parent} has "
+                f"{_describe(other)}; the services of one mosaic must return the "
+                f"same bands (pick a single one with --service-index)"
+            )
+    return layout
+
+
+def _describe(layout: tuple[str, list[str], str | None]) -> str:
+    data_type, interps, nodata = layout
+    text = f"{data_type} {'/'.join(interps)} chunks"
+    return text if nodata is None else f"{text} (nodata {nodata})"
+
+
+def _vrt_xml(
+    width: int,
+    height: int,
+    geotransform: tuple,
+    srs_wkt: str,
+    data_type: str,
+    interps: list[str],
+    nodata: str | None,
+    sources: list[tuple[str, int, int, int, int]],
+) -> str:
+    """VRT XML for a ``width`` x ``height`` raster made of *sources*, each
+    ``(relative_filename, x_off, y_off, w, h)`` placed 1:1 at that offset."""
+    gt = ", ".join(repr(v) for v in geotransform)
+    out = [
+        f'<VRTDataset rasterXSize="{width}" rasterYSize="{height}">',
+        f'  <SRS dataAxisToSRSAxisMapping="1,2">{xml_escape(srs_wkt)}</SRS>',
+        f"  <GeoTransform>{gt}</GeoTransform>",
+    ]
+    for band, interp in enumerate(interps, start=1):
+        out.append(f'  <VRTRasterBand dataType="{data_type}" band="{band}">')
+        if nodata is not None:
+            out.append(f"    <NoDataValue>{xml_escape(nodata)}</NoDataValue>")
+        out.append(f"    <ColorInterp>{interp}</ColorInterp>")
+        for name, x_off, y_off, w, h in sources:
+            out.append(
+                "    <SimpleSource>"
+                f'<SourceFilename relativeToVRT="1">{xml_escape(name)}</SourceFilename>'
+                f"<SourceBand>{band}</SourceBand>"
+                f'<SourceProperties RasterXSize="{w}" RasterYSize="{h}" '
+                f'DataType="{data_type}"/>'
+                f'<SrcRect xOff="0" yOff="0" xSize="{w}" ySize="{h}"/>'
+                f'<DstRect xOff="{x_off}" yOff="{y_off}" xSize="{w}" ySize="{h}"/>'
+                "</SimpleSource>"
+            )
+        out.append("  </VRTRasterBand>")
+    out.append("</VRTDataset>")
+    return "\n".join(out) + "\n"
+
+
+def _write_vrt(job: tuple[Path, tuple]) -> Path:
+    """Write ``_vrt_xml(*args)`` for a ``(vrt_path, args)`` job; a single
+    argument so it can be mapped over a process pool."""
+    vrt_path, args = job
+    vrt_path.write_text(_vrt_xml(*args), encoding="utf-8")
+    return vrt_path
+
+
+def write_mosaic_vrt(
+    chunk_paths: list[Path],
+    chunks: list[dict],
+    tmp_dir: Path,
+    srs: int,
+    hierarchical_threshold: int,
+    workers: int | None = None,
+) -> Path:
+    """Write ``tmp_dir/mosaic.vrt`` over *chunk_paths* using the geometry in
+    *chunks* (the :func:`build_chunk_grid` :class:`ChunkGrid`, or a list of
+    its dicts; only chunks with a path are included).
+
+    Raises :class:`UnsupportedChunkLayout` when a sample chunk's band
+    layout is not one this writer can describe, and
+    :class:`MixedChunkLayouts` when the services' layouts differ.
+    """
+    from .DownloaderBase import _parse_chunk_coords
+
+    tmp_dir = Path(tmp_dir)
+    vrt_path = tmp_dir / "mosaic.vrt"
+    data_type, interps, nodata = _common_band_layout(chunk_paths)
+    srs_wkt = CRS.from_epsg(srs).to_wkt("WKT1_GDAL")
+
+    # The grid is regular: every chunk shares the pixel size, and offsets
+    # are whole pixels from the grid's upper-left corner.
+    if isinstance(chunks, ChunkGrid):
+        # Read straight off the lazy grid; no chunk dict is built up front.
+        px = py = chunks.pixel_size_m
+        origin_x, origin_y = chunks.xmin, chunks.ymax
+        width, height = chunks.total_w_px, chunks.total_h_px
+
+        def chunk_at(coords):
+            return chunks.chunk(*coords) if chunks.contains(*coords) else None
+
+    else:
+        first = chunks[0]
+        px = (first["xmax"] - first["xmin"]) / first["w"]
+        py = (first["ymax"] - first["ymin"]) / first["h"]
+        origin_x = min(c["xmin"] for c in chunks)
+        origin_y = max(c["ymax"] for c in chunks)
+        width = round((max(c["xmax"] for c in chunks) - origin_x) / px)
+        height = round((origin_y - min(c["ymin"] for c in chunks)) / py)
+        chunk_at = {(c["row"], c["col"]): c for c in chunks}.get
+    geotransform = (origin_x, px, 0.0, origin_y, 0.0, -py)
+
+    placed = []  # (row, col, name, x_off, y_off, w, h)
+    for path in chunk_paths:
+        path = Path(path)
+        c = chunk_at(_parse_chunk_coords(path))
+        if c is None:
+            continue
+        placed.append(
+            (
+                c["row"],
+                c["col"],
+                os.path.relpath(path, tmp_dir),
+                round((c["xmin"] - origin_x) / px),
+                round((origin_y - c["ymax"]) / py),
+                c["w"],
+                c["h"],
+            )
+        )
+    layout = (data_type, interps, nodata)
+
+    if len(placed) <= hierarchical_threshold:
+        sources = [p[2:] for p in placed]
+        _write_vrt((vrt_path, (width, height, geotransform, srs_wkt, *layout, sources)))
+        return vrt_path
+
+    # Hierarchical: one sub-VRT per _SUB_VRT_BLOCK x _SUB_VRT_BLOCK block.
+    blocks: dict[tuple[int, int], list] = {}
+    for p in placed:
+        blocks.setdefault((p[0] // _SUB_VRT_BLOCK, p[1] // _SUB_VRT_BLOCK), []).append(p)
+
+    jobs = []  # (sub_vrt_path, _vrt_xml args)
+    top_sources = []
+    for (brow, bcol), members in sorted(blocks.items()):
+        bx = min(m[3] for m in members)
+        by = min(m[4] for m in members)
+        bw = max(m[3] + m[5] for m in members) - bx
+        bh = max(m[4] + m[6] for m in members) - by
+        sub_gt = (origin_x + bx * px, px, 0.0, origin_y - by * py, 0.0, -py)
+        sources = [(m[2], m[3] - bx, m[4] - by, m[5], m[6]) for m in members]
+        sub_vrt = tmp_dir / f"sub_{brow:04d}_{bcol:04d}.vrt"
+        jobs.append((sub_vrt, (bw, bh, sub_gt, srs_wkt, *layout, sources)))
+        top_sources.append((sub_vrt.name, bx, by, bw, bh))
+
+    print(
+        f"Writing hierarchical VRT: {len(placed)} chunks in {len(jobs)} "
+        f"{_SUB_VRT_BLOCK}x{_SUB_VRT_BLOCK}-chunk sub-VRTs..."
+    )
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for _ in pool.map(_write_vrt, jobs):
+            pass
+
+    _write_vrt(
+        (vrt_path, (width, height, geotransform, srs_wkt, *layout, top_sources))
+    )
+    print(f"Top-level VRT written: {vrt_path} ({len(jobs)} sub-VRT sources)")
+    return vrt_path
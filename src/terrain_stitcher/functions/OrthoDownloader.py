@@ -13,6 +13,7 @@ from terrain_stitcher.arcgis.services import (
     load_services,
 )
 from terrain_stitcher.common.ParseArea import ParseArea
+from terrain_stitcher.common.area_mask import AreaMask
 
 from .DownloaderBase import (
     ArcGISDownloaderBase,
@@ -20,6 +21,13 @@ from .DownloaderBase import (
     build_chunk_grid,
     build_mosaic,
 )
+from .DownloadMetrics import keep_metrics
+from .DownloadOptions import DownloadOptions
+from .ChunkSize import AUTO, resolve_chunk_px
+from .TileStore import STORE_CHUNK_PX, open_tile_store
+from .PyramidBuilder import build_pyramid, check_pyramid_zooms
+from .ChunkGrid import TILE_PX
+from .XyzTiles import XyzTileWriter, build_tile_aligned_grid
 
 
 def pixel_size_for_zoom(zoom: int) -> float:
@@ -131,7 +139,13 @@ def run_gdal2tiles(
 
 class OrthoDownloader(ArcGISDownloaderBase):
     """Downloads orthoimagery over a shape AOI as PNG chunks and tiles them
-    with gdal2tiles into a web-mercator tile cache."""
+    with gdal2tiles into a web-mercator tile cache. Lower ``pyramid_lods``
+    are built in-process from the downloaded level (see
+    :func:`build_pyramid`); unlisted levels in between are kept unless
+    ``drop_intermediate``. A service with a Web Mercator tile cache at the
+    requested LOD is copied tile by tile instead (``tile_cache``), and an
+    AOI on the edge of every service's coverage is split between the
+    services that cover it (:meth:`download_parts`)."""
 
     kind = "imagery"
     img_format = "png"
@@ -150,23 +164,30 @@ class OrthoDownloader(ArcGISDownloaderBase):
         processes: int,
         timeout: int,
         num_workers: int,
-        chunk_px: int,
+        chunk_px: int | str,
         skip_mosaic: bool = False,
+        tile_aligned: bool = False,
+        tile_cache: bool = True,
+        pyramid_lods: list[int] | None = None,
+        drop_intermediate: bool = False,
+        options: DownloadOptions | None = None,
     ) -> None:
+        options = options or DownloadOptions()
+        pyramid_lods = check_pyramid_zooms(zoom, pyramid_lods or [])
         shape_area = ParseArea.fromJSONFile(shapefile_path)
         lat = shape_area.center.get_lat()
         lon = shape_area.center.get_lon()
 
         # Resolve the imagery service from the AOI when one is not supplied.
-        # The service's WGS84 coverage bbox picks the right state layer and
-        # validates that the whole AOI fits inside it (downloads are limited
-        # to one state).
+        # The services' WGS84 coverage bboxes pick the right state layer, or
+        # the layers an AOI on a state line is split between.
         aoi_bbox = bbox_latlon_from_radius(lat, lon, shape_area.view_distance)
-        service = self.resolve_service(load_services, aoi_bbox)
+        services = self.resolve_services(load_services, aoi_bbox)
 
-        # Fail (no override) when the requested LOD is finer than the
+        # Fail (no override) when the requested LOD is finer than a
         # service's native cell size -- see assert_lod_within_native.
-        assert_lod_within_native(zoom, service)
+        for service in services:
+            assert_lod_within_native(zoom, service)
 
         xmin, ymin, xmax, ymax = bbox_from_radius(
             lat,
@@ -180,44 +201,169 @@ class OrthoDownloader(ArcGISDownloaderBase):
 
         pixel_size_m = pixel_size_for_zoom(zoom)
 
-        chunks = build_chunk_grid(xmin, ymin, xmax, ymax, chunk_px, pixel_size_m)
-
-        print(f"Downloading {len(chunks)} chunks with {num_workers} workers...")
-        chunk_paths, failed = self.download_chunks(
-            service, chunks, tmp_dir, timeout, num_workers
+        # A service with a Web Mercator tile cache at this LOD already has
+        # every XYZ tile pre-rendered: fetch those one per chunk instead of
+        # having exportImage render them (--no-tile-cache opts out).
+        tile_zoom = None
+        if tile_cache and all(s.has_tile_level(zoom) for s in services):
+            keys = ", ".join(s.key for s in services)
+            print(f"{keys}: tile cache at LOD {zoom}; copying the cached tiles.")
+            tile_zoom = zoom
+            tile_aligned = True
+            chunk_px = TILE_PX
+
+        # Store keys include each chunk's offset and size, so a store-backed
+        # run needs the same chunks as every other run: no measured size.
+        if options.tile_store is not None and chunk_px == AUTO:
+            print(f"Tile store: fixed {STORE_CHUNK_PX}px chunks instead of auto.")
+            chunk_px = STORE_CHUNK_PX
+
+        # A split AOI shares one grid, so it takes the smallest size any of
+        # its services needs.
+        chunk_px = min(
+            resolve_chunk_px(
+                chunk_px,
+                self.part_dir(tmp_dir, services, service),
+                service,
+                (xmin, ymin, xmax, ymax),
+                pixel_size_m,
+                num_workers,
+                timeout,
+                self.img_format,
+                self.pixel_type,
+            )
+            for service in services
         )
-        # The chunk-index dicts are no longer needed; drop them before the
-        # memory-heavy gdal2tiles pass so they can be reclaimed.
-        del chunks
 
+        # --tile-aligned snaps the grid to the zoom's XYZ tiles and cuts each
+        # response straight into the tile tree, so there is no mosaic to
+        # build or resample.
+        tile_writer = None
+        if tile_aligned:
+            chunks = build_tile_aligned_grid(xmin, ymin, xmax, ymax, chunk_px, zoom)
+            tile_writer = XyzTileWriter(outdir, zoom, xyz)
+        else:
+            # A tile store only pays off if every AOI requests chunks from
+            # the same global grid.
+            chunks = build_chunk_grid(
+                xmin,
+                ymin,
+                xmax,
+                ymax,
+                chunk_px,
+                pixel_size_m,
+                snap=options.tile_store is not None,
+            )
+        # A CIRCLE / POLYGON AOI covers only part of its bbox: skip the
+        # chunks that lie wholly outside the shape.
+        area_mask = AreaMask.for_area(shape_area, 3857)
+        if area_mask is not None:
+            chunks.restrict(area_mask)
+
+        print(f"Downloading {len(chunks)} chunks with {num_workers} workers...")
+        store = open_tile_store(options.tile_store, options.tile_store_max_gb)
+        try:
+            chunk_paths, failed = self.download_parts(
+                services,
+                chunks,
+                tmp_dir,
+                timeout,
+                num_workers,
+                options=options,
+                tile_store=store,
+                tile_writer=tile_writer,
+                tile_zoom=tile_zoom,
+            )
+        finally:
+            if store is not None:
+                store.close()
         if not chunk_paths:
             print("No chunks downloaded successfully - aborting.")
             sys.exit(1)
 
-        if not skip_mosaic:
+        if tile_aligned:
+            self._build_pyramid(
+                outdir,
+                zoom,
+                pyramid_lods,
+                drop_intermediate,
+                xyz,
+                resampling,
+                processes,
+                failed,
+            )
+            self._report_tiles(outdir, xyz, failed, tmp_dir)
+        elif not skip_mosaic:
             print("Building mosaic...")
-            mosaic_path = build_mosaic(chunk_paths, tmp_dir)
+            mosaic_path = build_mosaic(
+                chunk_paths, tmp_dir, chunks=chunks, srs=services[0].srs
+            )
+            # The chunk-index dicts are no longer needed; drop them before
+            # the memory-heavy gdal2tiles pass so they can be reclaimed.
+            del chunks
 
             print(f"Tiling (zoom {zoom})...")
             run_gdal2tiles(
                 mosaic_path, outdir, zoom, xyz, resampling, processes, "none"
             )
+            self._build_pyramid(
+                outdir,
+                zoom,
+                pyramid_lods,
+                drop_intermediate,
+                xyz,
+                resampling,
+                processes,
+                failed,
+            )
+            self._report_tiles(outdir, xyz, failed, tmp_dir)
+
+    @staticmethod
+    def _build_pyramid(
+        outdir,
+        zoom,
+        pyramid_lods,
+        drop_intermediate,
+        xyz,
+        resampling,
+        processes,
+        failed,
+    ):
+        if pyramid_lods and failed:
+            # Lower LODs built now would keep the gaps; the re-run that
+            # fills them builds the pyramid instead.
+            print(f"Skipping LODs {pyramid_lods} until the failed chunks are in.")
+        elif pyramid_lods:
+            print(f"Building LODs {pyramid_lods} from LOD {zoom} tiles...")
+            build_pyramid(
+                outdir,
+                zoom,
+                pyramid_lods,
+                xyz,
+                resampling,
+                processes,
+                drop_intermediate=drop_intermediate,
+            )
 
-            if failed:
-                print(
-                    f"\nCompleted with {len(failed)} failed chunk(s). "
-                    f"Tiles written to: {outdir} ({'XYZ' if xyz else 'TMS'} numbering), "
-                    f"but gaps exist where chunks failed.\n"
-                    f"Temporary chunk files kept in {tmp_dir} -- re-run the same "
-                    f"command to retry only the {len(failed)} failed chunk(s)."
-                )
-            else:
-                # all chunks succeeded -- safe to clean up temporary files
-                shutil.rmtree(tmp_dir, ignore_errors=True)
-                print(
-                    f"Done. Tiles written to: {outdir} "
-                    f"({'XYZ' if xyz else 'TMS'} numbering)"
-                )
+    @staticmethod
+    def _report_tiles(outdir, xyz: bool, failed: list, tmp_dir: Path) -> None:
+        if failed:
+            print(
+                f"\nCompleted with {len(failed)} failed chunk(s). "
+                f"Tiles written to: {outdir} ({'XYZ' if xyz else 'TMS'} numbering), "
+                f"but gaps exist where chunks failed.\n"
+                f"Temporary chunk files kept in {tmp_dir} -- re-run the same "
+                f"command to retry only the {len(failed)} failed chunk(s)."
+            )
+        else:
+            # all chunks succeeded -- safe to clean up temporary files, once
+            # the run's metrics are out of them
+            keep_metrics(tmp_dir, outdir)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            print(
+                f"Done. Tiles written to: {outdir} "
+                f"({'XYZ' if xyz else 'TMS'} numbering)"
+            )
 
 
 def download_from_arcgis(
@@ -231,10 +377,18 @@ def download_from_arcgis(
     num_workers,
     chunk_px,
     service: ImageryService | None = None,
-    service_index: int | None = None,
+    service_index: int | str | None = None,
     skip_mosaic: bool = False,
+    tile_aligned: bool = False,
+    tile_cache: bool = True,
+    pyramid_lods: list[int] | None = None,
+    drop_intermediate: bool = False,
+    options: DownloadOptions | None = None,
 ):
-    OrthoDownloader(service=service, service_index=service_index).run(
+    options = options or DownloadOptions()
+    OrthoDownloader(
+        service=service, service_index=service_index, failover=options.failover
+    ).run(
         shapefile_path=shapefile_path,
         outdir=outdir,
         zoom=zoom,
@@ -245,6 +399,11 @@ def download_from_arcgis(
         num_workers=num_workers,
         chunk_px=chunk_px,
         skip_mosaic=skip_mosaic,
+        tile_aligned=tile_aligned,
+        tile_cache=tile_cache,
+        pyramid_lods=pyramid_lods,
+        drop_intermediate=drop_intermediate,
+        options=options,
     )
 
 
@@ -257,10 +416,15 @@ def main(
     processes: int = 32,
     timeout: int = 30,
     num_workers: int = 32,
-    chunk_px: int = 256,
+    chunk_px: int | str = "auto",
     service: ImageryService | None = None,
-    service_index: int | None = None,
+    service_index: int | str | None = None,
     skip_mosaic: bool = False,
+    tile_aligned: bool = False,
+    tile_cache: bool = True,
+    pyramid_lods: list[int] | None = None,
+    drop_intermediate: bool = False,
+    options: DownloadOptions | None = None,
 ):
     download_from_arcgis(
         shapefile_path=shape_file,
@@ -275,4 +439,9 @@ def main(
         service=service,
         service_index=service_index,
         skip_mosaic=skip_mosaic,
+        tile_aligned=tile_aligned,
+        tile_cache=tile_cache,
+        pyramid_lods=pyramid_lods,
+        drop_intermediate=drop_intermediate,
+        options=options,
     )
@@ -11,6 +11,7 @@ from tqdm import tqdm
 from terrain_stitcher.stitching import GatheredTiles, ManifestReader
 from terrain_stitcher.common import World_Coordinates, get_all_files_in_directory
 import json
+from terrain_stitcher.functions.BlankImage import is_blank
 from terrain_stitcher.functions.ElevationGeoPrep import DEFAULT_PADDING_DEG
 from terrain_stitcher.common.bounds import Bounds
 from terrain_stitcher.arcgis.acquisition_source import ArcGisProAcquisitionSource
@@ -313,8 +314,13 @@ def writeManifest(
 
 
 def process_group(
-    output_dir: os.PathLike, group: GatheredTiles, resume: bool = False
-) -> None:
+    output_dir: os.PathLike,
+    group: GatheredTiles,
+    resume: bool = False,
+    skip_blank: bool = False,
+) -> bool:
+    """Stitch and save *group*; returns False when ``skip_blank`` left a
+    blank merged image unsaved (see :func:`is_blank`)."""
     out_name = _output_stem(group.origin) + ".png"
     out_path = os.path.join(output_dir, out_name)
     # With --resume, skip groups whose output already exists. process_group
@@ -323,10 +329,13 @@ def process_group(
     # previous run. Lets an interrupted stitch pick up where it left off
     # instead of re-doing hours of finished work on every invocation.
     if resume and os.path.isfile(out_path):
-        return
+        return True
     image = group.createMergedImage()
     group.pasteTiles(image)
+    if skip_blank and is_blank(image):
+        return False
     _save_canvas(image, out_path)
+    return True
 
 
 def stitch_groups(
@@ -0,0 +1,179 @@
+"""Low-resolution preview of a download in progress (``--preview``).
+
+A long LOD 19 run produces nothing viewable until every chunk is in and the
+mosaic is built. :class:`PreviewMosaic` keeps a downsampled copy of the
+whole AOI in memory -- at most ``PREVIEW_MAX_PX`` on its longer side -- that
+each chunk is reduced into as it is written, and periodically saves it as
+``preview.png`` (with a world file and ``.aux.xml``, so GIS tools place it)
+next to the chunk manifest. Combined with a centre-out ``--order`` the
+preview fills in from the middle.
+
+Imagery chunks are kept as RGBA; elevation chunks (F32) as metres and saved
+as a grayscale stretch of the range seen so far. Chunks not yet downloaded
+are transparent (imagery) or black (elevation).
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+from PIL import Image as pImage
+
+from .ChunkGrid import ChunkGrid
+
+PREVIEW_FILENAME = "preview.png"
+
+# Longer side of the preview image, in pixels.
+PREVIEW_MAX_PX = 2048
+
+
+def _grid_geometry(chunks) -> tuple[float, float, float, float, float]:
+    """``(xmin, ymin, xmax, ymax, pixel_size)`` of the raster *chunks* tile."""
+    if isinstance(chunks, ChunkGrid):
+        return (*chunks.bounds, chunks.pixel_size_m)
+    first = chunks[0]
+    return (
+        min(c["xmin"] for c in chunks),
+        min(c["ymin"] for c in chunks),
+        max(c["xmax"] for c in chunks),
+        max(c["ymax"] for c in chunks),
+        (first["xmax"] - first["xmin"]) / first["w"],
+    )
+
+
+class PreviewMosaic:
+    """Downsampled mosaic of *chunks*, filled by :meth:`add` (from any
+    thread) and saved by :meth:`write` to *out_dir* at most every
+    *interval_s* seconds (see :meth:`due`)."""
+
+    def __init__(
+        self,
+        chunks,
+        out_dir: Path,
+        srs: int,
+        interval_s: float = 60.0,
+        elevation: bool = False,
+        max_px: int = PREVIEW_MAX_PX,
+    ) -> None:
+        xmin, ymin, xmax, ymax, px = _grid_geometry(chunks)
+        full_w = round((xmax - xmin) / px)
+        full_h = round((ymax - ymin) / px)
+        self.factor = max(1, math.ceil(max(full_w, full_h) / max_px))
+        self.width = max(1, math.ceil(full_w / self.factor))
+        self.height = max(1, math.ceil(full_h / self.factor))
+        # Preview pixel size (m). The preview's extent is rounded up to
+        # whole preview pixels, so its last row/column may be part-covered.
+        self._step = px * self.factor
+        self.bbox = {
+            "xmin": xmin,
+            "ymin": ymax - self.height * self._step,
+            "xmax": xmin + self.width * self._step,
+            "ymax": ymax,
+        }
+        self.path = Path(out_dir) / PREVIEW_FILENAME
+        self.srs = srs
+        self.interval_s = interval_s
+        self.elevation = elevation
+        if elevation:
+            self._canvas = np.full((self.height, self.width), np.nan, np.float32)
+        else:
+            self._canvas = np.zeros((self.height, self.width, 4), np.uint8)
+        self._lock = threading.Lock()
+        self._last_write = time.monotonic()
+        self.added = 0
+
+    def _window(self, chunk: dict) -> tuple[int, int, int, int]:
+        """``(x0, y0, x1, y1)`` preview pixels covered by *chunk*."""
+        x0 = round((chunk["xmin"] - self.bbox["xmin"]) / self._step)
+        x1 = round((chunk["xmax"] - self.bbox["xmin"]) / self._step)
+        y0 = round((self.bbox["ymax"] - chunk["ymax"]) / self._step)
+        y1 = round((self.bbox["ymax"] - chunk["ymin"]) / self._step)
+        return x0, y0, min(x1, self.width), min(y1, self.height)
+
+    def add(self, chunk: dict, raw: bytes) -> None:
+        """Reduce the exportImage response *raw* for *chunk* into the
+        preview. Undecodable responses are skipped: the preview is best
+        effort and must never fail a download."""
+        import rasterio
+        from rasterio.enums import ColorInterp, Resampling
+        from rasterio.io import MemoryFile
+
+        x0, y0, x1, y1 = self._window(chunk)
+        if x1 <= x0 or y1 <= y0:
+            return
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter(
+                    "ignore", rasterio.errors.NotGeoreferencedWarning
+                )
+                with MemoryFile(raw) as mem, mem.open() as ds:
+                    count = 1 if self.elevation else min(ds.count, 4)
+                    paletted = not self.elevation and ds.colorinterp[0] == (
+                        ColorInterp.palette
+                    )
+                    data = ds.read(
+                        list(range(1, count + 1)),
+                        out_shape=(count, y1 - y0, x1 - x0),
+                        # Palette indices cannot be averaged.
+                        resampling=(
+                            Resampling.nearest if paletted else Resampling.average
+                        ),
+                    )
+                    nodata = ds.nodata
+                    if paletted:
+                        lut = np.zeros((256, 4), np.uint8)
+                        for index, rgba in ds.colormap(1).items():
+                            lut[index] = rgba
+                        data = np.moveaxis(lut[data[0]], -1, 0)
+                        count = 4
+        except rasterio.errors.RasterioError:
+            return
+        if self.elevation:
+            values = data[0].astype(np.float32)
+            if nodata is not None:
+                values[values == nodata] = np.nan
+            tile = values
+        else:
+            tile = np.empty((y1 - y0, x1 - x0, 4), np.uint8)
+            if count >= 3:
+                tile[..., :3] = np.moveaxis(data[:3], 0, -1)
+            else:
+                tile[..., :3] = data[0][..., None]
+            tile[..., 3] = data[3] if count == 4 else 255
+        with self._lock:
+            self._canvas[y0:y1, x0:x1] = tile
+            self.added += 1
+
+    def due(self) -> bool:
+        return time.monotonic() - self._last_write >= self.interval_s
+
+    def write(self) -> Path:
+        """Save the preview (image written last, through a temporary file,
+        so a viewer never sees a half-written PNG)."""
+        with self._lock:
+            canvas = self._canvas.copy()
+        if self.elevation:
+            finite = np.isfinite(canvas)
+            grey = np.zeros(canvas.shape, np.uint8)
+            if finite.any():
+                lo, hi = canvas[finite].min(), canvas[finite].max()
+                scale = 254.0 / (hi - lo) if hi > lo else 0.0
+                grey[finite] = 1 + ((canvas[finite] - lo) * scale).astype(np.uint8)
+            img = pImage.fromarray(grey, "L")
+        else:
+            img = pImage.fromarray(canvas, "RGBA")
+
+        from .DownloaderBase import write_georef_sidecars
+
+        write_georef_sidecars(self.path, self.bbox, self.width, self.height, self.srs)
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        img.save(tmp, format="PNG")
+        os.replace(tmp, self.path)
+        self._last_write = time.monotonic()
+        return self.path
@@ -0,0 +1,204 @@
+"""In-process tile pyramid builder for the ortho download.
+
+gdal2tiles builds each zoom level by re-reading the whole mosaic VRT, and by
+default the whole 0..N pyramid, although ``process-terrain`` only needs the
+tier LODs (17-19). :func:`build_pyramid` starts from the top-LOD tiles
+already on disk (from gdal2tiles ``-z <top>`` or ``--tile-aligned``) and
+produces each lower level from the level above: every parent tile is its four
+children pasted into a 512 x 512 canvas and reduced 2x with the requested
+resampling filter. Only levels down to the lowest requested one are built.
+With ``drop_intermediate`` a level in between that was not requested is
+deleted as soon as the level below it has consumed its tiles, which caps
+scratch disk.
+
+Work is split into batches of parent tiles on a process pool. Each tile is
+written to a temporary name and renamed into place, so an existing tile is
+always complete. A re-run skips a parent that is newer than all of its
+children and rebuilds one that is older than any of them, so tiles fetched
+by a later run (filling a failed chunk) reach every level below.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image as pImage
+from tqdm import tqdm
+
+from .XyzTiles import TILE_PX
+
+# --resampling choices (gdal2tiles names) -> PIL reduction filter.
+_PIL_RESAMPLING = {
+    "average": pImage.Resampling.BOX,
+    "near": pImage.Resampling.NEAREST,
+    "bilinear": pImage.Resampling.BILINEAR,
+    "cubic": pImage.Resampling.BICUBIC,
+    "cubicspline": pImage.Resampling.BICUBIC,
+    "lanczos": pImage.Resampling.LANCZOS,
+}
+
+# Parent tiles per process-pool task.
+_BATCH_SIZE = 64
+
+
+def _tile_path(tiles_dir: Path, z: int, x: int, y: int) -> Path:
+    return tiles_dir / str(z) / str(x) / f"{y}.png"
+
+
+def _level_tiles(tiles_dir: Path, z: int) -> list[tuple[int, int]]:
+    """``(x, y)`` of every tile on disk at level *z*."""
+    level_dir = tiles_dir / str(z)
+    tiles = []
+    if not level_dir.is_dir():
+        return tiles
+    for x_entry in os.scandir(level_dir):
+        if not x_entry.is_dir() or not x_entry.name.isdigit():
+            continue
+        x = int(x_entry.name)
+        for y_entry in os.scandir(x_entry.path):
+            stem, ext = os.path.splitext(y_entry.name)
+            if ext == ".png" and stem.isdigit():
+                tiles.append((x, int(stem)))
+    return tiles
+
+
+def _is_current(parent: Path, children: list[Path]) -> bool:
+    """True if *parent* exists and is no older than any of its *children*."""
+    try:
+        built = parent.stat().st_mtime_ns
+    except FileNotFoundError:
+        return False
+    for child in children:
+        try:
+            if child.stat().st_mtime_ns > built:
+                return False
+        except FileNotFoundError:
+            continue
+    return True
+
+
+def _reduce_batch(job) -> int:
+    """Build the parent tiles of one batch; returns how many were written.
+
+    Runs in a worker process, so takes one picklable tuple.
+    """
+    tiles_dir, z, parents, xyz, resampling, drop_children = job
+    resample = _PIL_RESAMPLING[resampling]
+    built = 0
+    for px, py in parents:
+        children = []
+        for dy in (0, 1):
+            for dx in (0, 1):
+                # TMS rows grow northward, so the top half is the odd row.
+                cy = 2 * py + (dy if xyz else 1 - dy)
+                children.append((_tile_path(tiles_dir, z + 1, 2 * px + dx, cy), dx, dy))
+
+        out = _tile_path(tiles_dir, z, px, py)
+        if _is_current(out, [path for path, _, _ in children]):
+            # Keep the children: a later tile under them rebuilds this parent.
+            continue
+        canvas = pImage.new("RGBA", (2 * TILE_PX, 2 * TILE_PX))
+        for path, dx, dy in children:
+            if path.is_file():
+                with pImage.open(path) as child:
+                    canvas.paste(child.convert("RGBA"), (dx * TILE_PX, dy * TILE_PX))
+        out.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out.with_name(f".{out.name}.tmp")
+        canvas.resize((TILE_PX, TILE_PX), resample).save(tmp, format="PNG")
+        os.replace(tmp, out)
+        built += 1
+        if drop_children:
+            for path, _, _ in children:
+                path.unlink(missing_ok=True)
+    return built
+
+
+def check_pyramid_zooms(top_zoom: int, zooms) -> list[int]:
+    """Sorted, de-duplicated *zooms*; raises ``ValueError`` unless every one
+    is below *top_zoom* (the level the pyramid is built from)."""
+    zooms = sorted(set(zooms))
+    if zooms and (zooms[0] < 0 or zooms[-1] >= top_zoom):
+        raise ValueError(
+            f"pyramid LODs must be between 0 and {top_zoom - 1} (below the "
+            f"download LOD), got {zooms}"
+        )
+    return zooms
+
+
+def build_pyramid(
+    tiles_dir,
+    top_zoom: int,
+    zooms,
+    xyz: bool = True,
+    resampling: str = "lanczos",
+    processes: int | None = None,
+    drop_intermediate: bool = False,
+) -> None:
+    """Build the requested lower *zooms* under *tiles_dir* from the tiles at
+    *top_zoom*.
+
+    Every level between ``min(zooms)`` and *top_zoom* is produced in turn.
+    Levels not in *zooms* are intermediates; with ``drop_intermediate`` the
+    children of each parent built from them are deleted (those of a parent
+    skipped as up to date are kept), and a later run rebuilds the level from
+    *top_zoom*. *tiles_dir* uses the ``<z>/<x>/<y>.png`` layout, with TMS row
+    numbering when ``xyz`` is False.
+    """
+    zooms = check_pyramid_zooms(top_zoom, zooms)
+    if not zooms:
+        return
+    if resampling not in _PIL_RESAMPLING:
+        raise ValueError(
+            f"unknown resampling {resampling!r}; expected one of "
+            f"{sorted(_PIL_RESAMPLING)}"
+        )
+    tiles_dir = Path(tiles_dir)
+    min_zoom = zooms[0]
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for z in range(top_zoom - 1, min_zoom - 1, -1):
+            children = _level_tiles(tiles_dir, z + 1)
+            parents = sorted({(x // 2, y // 2) for x, y in children})
+            drop_children = (
+                drop_intermediate and z + 1 != top_zoom and z + 1 not in zooms
+            )
+            jobs = [
+                (
+                    tiles_dir,
+                    z,
+                    parents[i : i + _BATCH_SIZE],
+                    xyz,
+                    resampling,
+                    drop_children,
+                )
+                for i in range(0, len(parents), _BATCH_SIZE)
+            ]
+            built = 0
+            with tqdm(total=len(parents), desc=f"Building LOD {z}") as pbar:
+                for job, n in zip(jobs, pool.map(_reduce_batch, jobs)):
+                    built += n
+                    pbar.update(len(job[2]))
+            print(
+                f"LOD {z}: {built} tile(s) built, "
+                f"{len(parents) - built} already up to date."
+            )
+            if drop_children:
+                _remove_empty_dirs(tiles_dir / str(z + 1))
+
+
+def _remove_empty_dirs(level_dir: Path) -> None:
+    """Remove a consumed intermediate level's now-empty directories."""
+    if not level_dir.is_dir():
+        return
+    for x_entry in os.scandir(level_dir):
+        if x_entry.is_dir():
+            try:
+                os.rmdir(x_entry.path)
+            except OSError:
+                pass
+    try:
+        level_dir.rmdir()
+    except OSError:
+        pass
@@ -0,0 +1,315 @@
+"""Shared concurrency control for exportImage fetches.
+
+Without it every download worker retries on its own fixed ``2**attempt``
+schedule, so when the server throttles a run all ``-w`` workers back off and
+come back together in waves, and the worker count is a guess that never
+changes. :class:`AimdController` is one object shared by every worker (thread
+or asyncio task) of a run that:
+
+* gates each HTTP attempt on a dynamic in-flight limit,
+* widens that limit additively while latency and error rate stay healthy,
+* halves it on a throttle response (429/503), at most once per congestion
+  event,
+* honours ``Retry-After`` by pausing *all* workers until it expires, and
+* replaces the lock-step ``2**attempt`` sleeps with full-jitter backoff, so
+  retries spread out instead of arriving together.
+
+It also tracks completed requests and bytes for the progress bar.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import email.utils
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+# HTTP statuses that mean "slow down" rather than "broken".
+THROTTLE_STATUS_CODES = {429, 503}
+
+# Default ceiling on the adaptive limit, as a multiple of the starting limit.
+DEFAULT_MAX_FACTOR = 4
+
+# Recent outcomes considered for the error rate.
+_ERROR_WINDOW = 100
+
+# Seconds of history used for the throughput figures.
+_RATE_WINDOW_S = 10.0
+
+# Smoothing factor for the latency EWMA.
+_LATENCY_ALPHA = 0.1
+
+# Per-sample upward drift of the latency floor, so the baseline follows a
+# server that is slower all day rather than pinning the best minute forever.
+_FLOOR_DRIFT = 1.001
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a ``Retry-After`` header (delta-seconds or an
+    HTTP-date), or ``None`` when absent or unparseable."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def jittered_backoff(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Full-jitter exponential backoff: uniform in ``[0, min(cap, base *
+    2**attempt)]``. Same ceiling as the fixed ``min(2**attempt, 30)`` sleep,
+    but workers that failed together no longer retry together."""
+    return random.uniform(0.0, min(cap, base * 2**attempt))
+
+
+class Waiters:
+    """The threads and asyncio tasks waiting on one shared gate.
+
+    *cond* is the gate's lock: threads block on it directly, and an asyncio
+    task parks on a future that :meth:`wake` resolves from whichever thread
+    changed the gate's state.
+    """
+
+    def __init__(self, cond: threading.Condition) -> None:
+        self._cond = cond
+        self._tasks: collections.deque = collections.deque()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def wait_async(self, admit: Callable[[float], Optional[float]]) -> None:
+        """Suspend until *admit* lets the caller through. *admit* is called
+        with the lock held and the current monotonic time, and returns 0.0
+        to admit, else the longest wait before asking again (``None``: until
+        woken)."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                wait = admit(time.monotonic())
+                if wait == 0.0:
+                    return
+                fut = loop.create_future()
+                self._tasks.append((loop, fut))
+            try:
+                await asyncio.wait_for(asyncio.shield(fut), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                # A waiter that timed out or was cancelled must not stay
+                # queued, or a later wake-up would be spent on it instead of
+                # on a task that is still waiting.
+                with self._cond:
+                    try:
+                        self._tasks.remove((loop, fut))
+                    except ValueError:
+                        pass
+
+    def wake(self, n: Optional[int] = None) -> None:
+        """With the lock held: wake up to *n* waiting threads and tasks
+        (all of them when *n* is None)."""
+        if n is None:
+            self._cond.notify_all()
+            n = len(self._tasks)
+        else:
+            self._cond.notify(n)
+        for _ in range(min(n, len(self._tasks))):
+            loop, fut = self._tasks.popleft()
+            try:
+                loop.call_soon_threadsafe(_resolve, fut)
+            except RuntimeError:  # waiter's loop already closed
+                pass
+
+
+class AimdController:
+    """Additive-increase / multiplicative-decrease in-flight limit shared by
+    every worker of one download run.
+
+    Workers bracket each HTTP attempt with :meth:`acquire` (or
+    :meth:`acquire_async`) and :meth:`release`, then report the outcome with
+    :meth:`on_success`, :meth:`on_throttle` or :meth:`on_error`; the latter
+    two return how long the worker should sleep before its next attempt.
+
+    ``initial`` is the starting limit (the CLI's ``-w``) and ``max_limit`` the
+    ceiling (the worker pool must be at least this large). The limit grows by
+    ``increase`` per limit's worth of healthy completions (about +1 per round
+    trip) and is multiplied by ``decrease`` on a throttle response.
+    "Healthy" means the smoothed latency is within ``latency_tolerance`` x
+    its observed floor and fewer than ``error_threshold`` of the last
+    ``_ERROR_WINDOW`` attempts failed.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        max_limit: Optional[int] = None,
+        min_limit: int = 1,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_tolerance: float = 2.0,
+        error_threshold: float = 0.05,
+    ) -> None:
+        initial = max(int(initial), 1)
+        self.min_limit = max(int(min_limit), 1)
+        self.max_limit = max(
+            int(max_limit) if max_limit is not None else initial * DEFAULT_MAX_FACTOR,
+            initial,
+        )
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.error_threshold = error_threshold
+
+        self._cond = threading.Condition()
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._pause_until = 0.0
+        self._last_decrease = 0.0
+        self._latency_ewma: Optional[float] = None
+        self._latency_floor: Optional[float] = None
+        self._outcomes: collections.deque = collections.deque(maxlen=_ERROR_WINDOW)
+        self._recent: collections.deque = collections.deque()  # (t, nbytes)
+        self._waiters = Waiters(self._cond)
+
+    # -- gating ---------------------------------------------------------------
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _admit_delay(self, now: float) -> Optional[float]:
+        """With the lock held: admit the caller (returns 0.0), or return how
+        long to wait -- the remaining pause, or ``None`` to wait for a slot."""
+        if now < self._pause_until:
+            return self._pause_until - now
+        if self._in_flight < int(self._limit):
+            self._in_flight += 1
+            return 0.0
+        return None
+
+    def acquire(self) -> None:
+        """Block until an in-flight slot is free and no pause is active."""
+        with self._cond:
+            while True:
+                wait = self._admit_delay(time.monotonic())
+                if wait == 0.0:
+                    return
+                self._cond.wait(timeout=wait)
+
+    async def acquire_async(self) -> None:
+        """:meth:`acquire` for asyncio tasks; suspends instead of blocking
+        the event loop."""
+        await self._waiters.wait_async(self._admit_delay)
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._waiters.wake(1)
+
+    # -- outcomes -------------------------------------------------------------
+
+    def on_success(self, latency_s: float, nbytes: int = 0) -> None:
+        now = time.monotonic()
+        with self._cond:
+            self._outcomes.append(False)
+            self._recent.append((now, nbytes))
+            self._trim(now)
+            if self._latency_ewma is None:
+                self._latency_ewma = latency_s
+            else:
+                self._latency_ewma += _LATENCY_ALPHA * (latency_s - self._latency_ewma)
+            if self._latency_floor is None or self._latency_ewma < self._latency_floor:
+                self._latency_floor = self._latency_ewma
+            else:
+                self._latency_floor *= _FLOOR_DRIFT
+            if self._healthy() and self._limit < self.max_limit:
+                before = int(self._limit)
+                self._limit = min(
+                    float(self.max_limit), self._limit + self.increase / self._limit
+                )
+                if int(self._limit) > before:
+                    self._waiters.wake(int(self._limit) - before)
+
+    def on_throttle(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Record a 429/503. Shrinks the limit (once per congestion event),
+        pauses every worker for ``retry_after`` seconds when the server sent
+        one, and returns this worker's sleep before retrying."""
+        now = time.monotonic()
+        with self._cond:
+            self._outcomes.append(True)
+            # One decrease per congestion event: all the requests that were
+            # already in flight when the server started throttling will come
+            # back 429 too, and must not each halve the limit again.
+            cooldown = max(self._latency_ewma or 0.0, 1.0)
+            if now - self._last_decrease >= cooldown:
+                self._limit = max(float(self.min_limit), self._limit * self.decrease)
+                self._last_decrease = now
+            if retry_after:
+                self._pause_until = max(self._pause_until, now + retry_after)
+        delay = jittered_backoff(attempt)
+        if retry_after:
+            delay = max(delay, retry_after) + random.uniform(0.0, 1.0)
+        return delay
+
+    def on_error(self, attempt: int) -> float:
+        """Record a transport error or non-throttle 5xx and return this
+        worker's jittered sleep before retrying. Errors count against the
+        health check (blocking growth) but do not shrink the limit."""
+        with self._cond:
+            self._outcomes.append(True)
+        return jittered_backoff(attempt)
+
+    # -- reporting ------------------------------------------------------------
+
+    def _healthy(self) -> bool:
+        if self._outcomes:
+            error_rate = sum(self._outcomes) / len(self._outcomes)
+            if error_rate >= self.error_threshold:
+                return False
+        if self._latency_ewma is not None and self._latency_floor:
+            if self._latency_ewma > self._latency_floor * self.latency_tolerance:
+                return False
+        return True
+
+    def _trim(self, now: float) -> None:
+        while self._recent and now - self._recent[0][0] > _RATE_WINDOW_S:
+            self._recent.popleft()
+
+    def throughput(self) -> tuple[float, float]:
+        """``(requests/s, MB/s)`` over the last ``_RATE_WINDOW_S`` seconds."""
+        now = time.monotonic()
+        with self._cond:
+            self._trim(now)
+            if not self._recent:
+                return 0.0, 0.0
+            span = max(now - self._recent[0][0], 1.0)
+            n = len(self._recent)
+            nbytes = sum(b for _, b in self._recent)
+        return n / span, nbytes / span / 1e6
+
+    def status(self) -> str:
+        """Short progress-bar summary: in-flight/limit and throughput."""
+        rps, mbps = self.throughput()
+        return (
+            f"conc {self._in_flight}/{int(self._limit)} | "
+            f"{rps:.1f} req/s {mbps:.2f} MB/s"
+        )
+
+
+def _resolve(fut) -> None:
+    if not fut.done():
+        fut.set_result(None)
@@ -0,0 +1,142 @@
+"""Probe and rank the services that cover an AOI.
+
+When several registered services cover an AOI, ``--service-index`` picks
+one by its place in the candidate list, with nothing to say which of them
+is fast or healthy today. :func:`rank_services` sends each candidate a few
+sample exportImage requests at the AOI centre and ranks them by
+:attr:`ProbeResult.score`, the expected time per successful request: the
+median latency stretched by the retries their error rate costs.
+``--service-index auto`` downloads from the best of them, and ``--failover``
+(see :meth:`ArcGISDownloaderBase.download_parts`) moves the chunks the
+chosen service failed to the next-ranked candidate of equivalent
+resolution (:func:`equivalent_resolution`).
+"""
+
+from __future__ import annotations
+
+import math
+import statistics
+import time
+from dataclasses import dataclass
+
+import requests
+
+from terrain_stitcher.arcgis.services import ImageryService
+
+# ``--service-index auto``.
+AUTO_INDEX = "auto"
+
+# Request timeout (s) of a probe; a candidate slower than this is failing.
+PROBE_TIMEOUT = 10
+
+# Sample requests per candidate and their side (px).
+_PROBE_SAMPLES = 3
+_PROBE_PX = 512
+
+
+@dataclass(frozen=True)
+class ProbeResult:
+    """What :func:`probe_service` measured for one service."""
+
+    service: ImageryService
+    latency_s: float  # median of the successful requests; inf if none
+    throughput_bps: float  # response bytes per second over those requests
+    error_rate: float  # failed requests / samples
+
+    @property
+    def score(self) -> float:
+        """Expected seconds per successful request (lower is better)."""
+        if self.error_rate >= 1:
+            return math.inf
+        return self.latency_s / (1 - self.error_rate)
+
+
+def probe_chunk(centre: tuple[float, float], side_px: int, pixel_size_m: float):
+    """A ``side_px`` square chunk dict centred on the EPSG:3857 *centre*."""
+    half = side_px * pixel_size_m / 2
+    return {
+        "row": 0,
+        "col": 0,
+        "w": side_px,
+        "h": side_px,
+        "xmin": centre[0] - half,
+        "ymin": centre[1] - half,
+        "xmax": centre[0] + half,
+        "ymax": centre[1] + half,
+    }
+
+
+def probe_service(
+    service: ImageryService,
+    img_format: str,
+    pixel_type: str,
+    centre: tuple[float, float],
+    timeout: float = PROBE_TIMEOUT,
+    samples: int = _PROBE_SAMPLES,
+) -> ProbeResult:
+    """Send *service* *samples* exportImage requests of ``_PROBE_PX`` px at
+    its native resolution around *centre*. Each is sent once, without the
+    download's retries and backoff: any response but an image is an error."""
+    from .DownloaderBase import _make_session, _request_target
+
+    chunk = probe_chunk(centre, _PROBE_PX, max(service.native_pixel_size_m, 0.01))
+    url, params = _request_target(service, chunk, img_format, pixel_type)
+    times = []
+    nbytes = errors = 0
+    with _make_session(1) as session:
+        for _ in range(samples):
+            started = time.monotonic()
+            try:
+                resp = session.get(url, params=params, timeout=timeout)
+            except requests.RequestException:
+                errors += 1
+                continue
+            if resp.status_code != 200 or not resp.headers.get(
+                "Content-Type", ""
+            ).startswith("image"):
+                errors += 1
+                continue
+            times.append(time.monotonic() - started)
+            nbytes += len(resp.content)
+    return ProbeResult(
+        service,
+        statistics.median(times) if times else math.inf,
+        nbytes / sum(times) if times and sum(times) > 0 else 0.0,
+        errors / samples,
+    )
+
+
+def rank_services(
+    services,
+    img_format: str,
+    pixel_type: str,
+    centre: tuple[float, float],
+    timeout: float = PROBE_TIMEOUT,
+) -> list[ProbeResult]:
+    """:func:`probe_service` every one of *services* at the EPSG:3857
+    *centre*, best first (ties by ``key``), and print the ranking."""
+    results = sorted(
+        (
+            probe_service(s, img_format, pixel_type, centre, timeout)
+            for s in services
+        ),
+        key=lambda r: (r.score, r.service.key),
+    )
+    print("Service ranking (probed at the AOI centre):")
+    for i, r in enumerate(results):
+        latency = (
+            f"{r.latency_s * 1000:.0f} ms" if math.isfinite(r.latency_s) else "-"
+        )
+        print(
+            f"  {i}: {r.service.label} ({r.service.key})  {latency}, "
+            f"{r.throughput_bps / 1e6:.2f} MB/s, {r.error_rate:.0%} errors"
+        )
+    return results
+
+
+def equivalent_resolution(a: ImageryService, b: ImageryService) -> bool:
+    """Whether *a* and *b* have native cell sizes within half an LOD of each
+    other (a factor of sqrt(2)), so either can stand in for the other."""
+    if a.native_pixel_size_m <= 0 or b.native_pixel_size_m <= 0:
+        return False
+    return abs(math.log2(a.native_pixel_size_m / b.native_pixel_size_m)) < 0.5
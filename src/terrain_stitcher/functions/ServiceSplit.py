@@ -0,0 +1,72 @@
+"""Split a download grid between the services that together cover the AOI.
+
+Imagery services are mostly state layers, so an AOI on a state line is
+inside no single one of them. :func:`select_services` then returns the
+services whose coverages together cover it, and :func:`split_chunks` gives
+each chunk of the one grid over the whole AOI to the first of those
+services whose coverage holds the chunk's centre. Every part keeps its
+chunks' rows and columns on the whole grid, so the parts are downloaded
+separately (see :meth:`ArcGISDownloaderBase.download_parts`) and mosaicked
+as one.
+
+A coverage is a bbox, not the outline of the imagery, so a chunk on a seam
+can come back blank from the service it was given to. :func:`covered_by`
+says which other services reach it, to request it from them instead.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from pyproj import Transformer
+
+from .ChunkGrid import ChunkGrid
+
+_WEBMERC_TO_WGS84 = Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True)
+
+
+def _chunk_extents(chunks: ChunkGrid) -> tuple[np.ndarray, ...]:
+    """EPSG:3857 ``(xmin, ymin, xmax, ymax)`` of every chunk, in sequence
+    order."""
+    rows, cols = chunks.rows_cols()
+    px = chunks.pixel_size_m
+    x_off = cols * chunks.chunk_px
+    y_off = rows * chunks.chunk_px
+    w = np.minimum(chunks.chunk_px, chunks.total_w_px - x_off)
+    h = np.minimum(chunks.chunk_px, chunks.total_h_px - y_off)
+    xmin = chunks.xmin + x_off * px
+    ymax = chunks.ymax - y_off * px
+    return xmin, ymax - h * px, xmin + w * px, ymax
+
+
+def _chunk_centres(chunks: ChunkGrid) -> tuple[np.ndarray, np.ndarray]:
+    """WGS84 ``(lon, lat)`` of every chunk's centre, in sequence order."""
+    xmin, ymin, xmax, ymax = _chunk_extents(chunks)
+    return _WEBMERC_TO_WGS84.transform((xmin + xmax) / 2, (ymin + ymax) / 2)
+
+
+def covered_by(chunks: ChunkGrid, service) -> np.ndarray:
+    """Whether each of the EPSG:3857 *chunks* (in sequence order) overlaps
+    *service*'s coverage."""
+    xmin, ymin, xmax, ymax = _chunk_extents(chunks)
+    west, south = _WEBMERC_TO_WGS84.transform(xmin, ymin)
+    east, north = _WEBMERC_TO_WGS84.transform(xmax, ymax)
+    min_lat, min_lon, max_lat, max_lon = service.coverage
+    return (west < max_lon) & (east > min_lon) & (south < max_lat) & (north > min_lat)
+
+
+def split_chunks(chunks: ChunkGrid, services) -> list[ChunkGrid]:
+    """One :meth:`ChunkGrid.subset` of the EPSG:3857 *chunks* per service
+    of *services*, in order: each chunk goes to the first service whose
+    coverage holds its centre. A chunk at the edge of the AOI whose centre
+    is outside every coverage goes to the service nearest to it."""
+    lon, lat = _chunk_centres(chunks)
+    # Distance (degrees) from each centre to each coverage; 0 inside it.
+    dist = np.empty((len(services), lon.size))
+    for i, service in enumerate(services):
+        min_lat, min_lon, max_lat, max_lon = service.coverage
+        dx = np.maximum(np.maximum(min_lon - lon, lon - max_lon), 0.0)
+        dy = np.maximum(np.maximum(min_lat - lat, lat - max_lat), 0.0)
+        dist[i] = np.hypot(dx, dy)
+    # argmin takes the first of several services at distance 0.
+    owner = np.argmin(dist, axis=0)
+    return [chunks.subset(owner == i) for i in range(len(services))]
@@ -3,15 +3,24 @@ import json
 
 from terrain_stitcher.common import (
     ParseArea,
+    TerrainBoundsCalculateType,
     World_Coordinates,
     nameToTerrainBoundsType,
 )
+from terrain_stitcher.common.ParseArea import polygon_from_geojson
 
 
-def main(lat: str, lon: str, type: str, view_distance=None):
-    area = ParseArea(
-        nameToTerrainBoundsType(type), World_Coordinates(lat, lon), view_distance
-    )
+def main(lat: str, lon: str, type: str, view_distance=None, polygon_file=None):
+    boundsType = nameToTerrainBoundsType(type)
+    polygon = None
+    if boundsType is TerrainBoundsCalculateType.POLYGON:
+        if not polygon_file:
+            raise Exception("POLYGON bounds need --polygon FILE (GeoJSON)")
+        with open(polygon_file, "r") as file:
+            polygon = polygon_from_geojson(json.load(file))
+    # A POLYGON's center defaults to the middle of its bounds.
+    center = World_Coordinates(lat, lon) if lat is not None and lon is not None else None
+    area = ParseArea(boundsType, center, view_distance, polygon)
 
     jPath = os.path.join(os.getcwd(), "Shape.json")
     areaData = area.toJSON()
@@ -0,0 +1,255 @@
+"""Persistent exportImage response store shared across runs and AOIs.
+
+Every download starts from an empty ``aoi_chunks`` directory (deleted once a
+run succeeds), so the weekly re-runs of neighbouring or overlapping AOIs
+re-download the same ground from the same service. With ``--tile-store``
+each response is also kept in a global on-disk :class:`TileStore` and read
+from there before going to the network.
+
+Layout under the store directory::
+
+    index.sqlite          key -> content digest, size, validators, last use
+    objects/ab/<sha256>   response bytes, named by their SHA-256
+
+Entries are keyed by what identifies a response on the server: service key,
+SRS, format and pixel type, and the chunk's place on the pixel grid (pixel
+size, pixel offset of its upper-left corner, size). On a LOD grid the pixel
+size identifies the LOD and the offset the tile x/y. A store-backed download
+snaps its chunk grid to a multiple of the chunk size (see
+:func:`build_chunk_grid`), so overlapping AOIs request the same chunks. It
+also replaces ``--chunk-px auto`` with a fixed :data:`STORE_CHUNK_PX`: a size
+measured per run would cut every run's grid differently and no key would
+ever match.
+Identical bodies are stored once.
+
+A stored response that carried an ``ETag`` or ``Last-Modified`` header is
+revalidated with a conditional request (``304`` reuses it); one without is
+reused with no request at all. The store is size-capped: once it grows past
+``max_bytes`` the least recently used entries are evicted.
+
+The index is opened in WAL mode, so several downloads can share one store.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+INDEX_FILENAME = "index.sqlite"
+OBJECTS_DIRNAME = "objects"
+
+DEFAULT_MAX_GB = 50.0
+
+# Chunk size (px) of a store-backed ``--chunk-px auto`` download; a multiple
+# of 256 within the image size limits of any ImageServer.
+STORE_CHUNK_PX = 1024
+
+# Evict down to this fraction of max_bytes, so a full store does not evict
+# on every put.
+_EVICT_TO = 0.9
+_EVICT_BATCH = 256
+
+# Index writes per commit. An uncommitted tail is only lost recency (or an
+# entry whose object is still on disk), never a wrong response.
+_COMMIT_EVERY = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tiles (
+    key TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tiles_last_used ON tiles (last_used);
+CREATE INDEX IF NOT EXISTS tiles_digest ON tiles (digest);
+"""
+
+
+def default_store_dir() -> Path:
+    """The per-user store directory used by a bare ``--tile-store``."""
+    try:
+        from platformdirs import user_cache_dir
+    except ImportError:
+        raise RuntimeError(
+            "platformdirs is not installed; pass a directory to --tile-store."
+        )
+    from terrain_stitcher.arcgis.services import APP_NAME
+
+    return Path(user_cache_dir(APP_NAME)) / "tile_store"
+
+
+def open_tile_store(path, max_gb: float = DEFAULT_MAX_GB) -> "TileStore | None":
+    """The store for ``--tile-store [DIR]``: None when *path* is None, the
+    :func:`default_store_dir` when it is empty."""
+    if path is None:
+        return None
+    root = Path(path) if path else default_store_dir()
+    store = TileStore(root, max_bytes=int(max_gb * 1e9))
+    print(f"Tile store: {root} (max {max_gb:g} GB)")
+    return store
+
+
+def store_key(service, chunk: dict, img_format: str, pixel_type: str) -> str:
+    """The store key of *chunk*'s exportImage response from *service*."""
+    px = (chunk["xmax"] - chunk["xmin"]) / chunk["w"]
+    py = (chunk["ymax"] - chunk["ymin"]) / chunk["h"]
+    return (
+        f"{service.key}/{service.srs}/{img_format}/{pixel_type}/"
+        f"{px:.6f}x{py:.6f}/{round(chunk['xmin'] / px)}_{round(chunk['ymax'] / py)}/"
+        f"{chunk['w']}x{chunk['h']}"
+    )
+
+
+@dataclass
+class StoredTile:
+    """A stored response and the validators it was served with."""
+
+    data: bytes
+    etag: str | None = None
+    last_modified: str | None = None
+
+    @property
+    def revalidates(self) -> bool:
+        """True if the server sent validators to revalidate this response."""
+        return bool(self.etag or self.last_modified)
+
+
+class TileStore:
+    """Content-addressed, LRU-evicted response store rooted at *root*.
+
+    Thread-safe: the download workers share one instance.
+    """
+
+    def __init__(self, root, max_bytes: int = int(DEFAULT_MAX_GB * 1e9)):
+        self.root = Path(root)
+        self.objects = self.root / OBJECTS_DIRNAME
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.root / INDEX_FILENAME, check_same_thread=False, timeout=60
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._writes = 0
+        self._total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM "
+            "(SELECT DISTINCT digest, size FROM tiles)"
+        ).fetchone()[0]
+        self.reused = 0
+        self.revalidated = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+    def __enter__(self) -> "TileStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def note_reuse(self, revalidated: bool) -> None:
+        """Count a stored response used instead of a download."""
+        with self._lock:
+            self.reused += 1
+            self.revalidated += revalidated
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest
+
+    def _wrote(self) -> None:
+        self._writes += 1
+        if self._writes >= _COMMIT_EVERY:
+            self._db.commit()
+            self._writes = 0
+
+    def get(self, key: str) -> StoredTile | None:
+        """The stored response for *key*, marking it most recently used."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest, etag, last_modified FROM tiles WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE tiles SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self._wrote()
+        digest, etag, last_modified = row
+        try:
+            data = self._object_path(digest).read_bytes()
+        except OSError:
+            # Object evicted by another process (or removed by hand).
+            with self._lock:
+                self._db.execute("DELETE FROM tiles WHERE key = ?", (key,))
+                self._wrote()
+            return None
+        return StoredTile(data, etag, last_modified)
+
+    def put(
+        self,
+        key: str,
+        data: bytes,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> None:
+        """Store *data* under *key*, then evict down to size if needed."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        new_object = not path.is_file()
+        if new_object:
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_name(f".{digest}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        with self._lock:
+            old = self._db.execute(
+                "SELECT digest, size FROM tiles WHERE key = ?", (key,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?, ?, ?)",
+                (key, digest, len(data), etag, last_modified, time.time()),
+            )
+            if new_object:
+                self._total += len(data)
+            if old is not None and old[0] != digest:
+                self._release(old[0], old[1])
+            if self._total > self.max_bytes:
+                self._evict()
+            self._wrote()
+
+    def _release(self, digest: str, size: int) -> None:
+        """Delete *digest*'s object if no key refers to it any more."""
+        if self._db.execute(
+            "SELECT 1 FROM tiles WHERE digest = ? LIMIT 1", (digest,)
+        ).fetchone():
+            return
+        self._object_path(digest).unlink(missing_ok=True)
+        self._total -= size
+
+    def _evict(self) -> None:
+        target = self.max_bytes * _EVICT_TO
+        while self._total > target:
+            victims = self._db.execute(
+                "SELECT key, digest, size FROM tiles ORDER BY last_used LIMIT ?",
+                (_EVICT_BATCH,),
+            ).fetchall()
+            if not victims:
+                self._total = 0
+                break
+            for key, digest, size in victims:
+                self._db.execute("DELETE FROM tiles WHERE key = ?", (key,))
+                self._release(digest, size)
+                if self._total <= target:
+                    break
+        self._db.commit()
@@ -0,0 +1,133 @@
+"""exportImage response formats (``--transfer-format``).
+
+By default imagery chunks are requested as lossless ``png`` and elevation
+chunks as ``tiff`` (raw F32). Neither is what a large download should pay
+for on the wire:
+
+* ``jpg[:QUALITY]`` -- JPEG at *QUALITY* (1-100, default 85); RGB imagery
+  has no alpha worth keeping inside the AOI, and a high-quality JPEG is
+  several times smaller than the PNG.
+* ``jpgpng[:QUALITY]`` -- JPEG, except for chunks with transparent pixels
+  (at the edge of a service's coverage), which the server sends as PNG.
+* ``png8`` -- 8-bit paletted PNG; smaller than ``png`` for imagery with few
+  distinct colours (scanned maps, classified rasters).
+* ``lerc[:MAX_ERROR]`` -- LERC for elevation, lossy to at most *MAX_ERROR*
+  metres per pixel (default 0.01; 0 is lossless) and typically several
+  times smaller than the F32 TIFF. The response is a bare LERC blob with no
+  georeferencing, so its chunks are georeferenced like imagery chunks.
+
+A format is written as a *spec*, the format name optionally followed by
+``:`` and its option. Specs are canonicalised with their default option
+filled in, so the spec is also what tells two tile-store entries apart.
+"""
+
+from __future__ import annotations
+
+from terrain_stitcher.arcgis.services import KIND_ELEVATION, KIND_IMAGERY
+
+TRANSFER_FORMATS = {
+    KIND_IMAGERY: ("png", "png8", "jpg", "jpgpng"),
+    KIND_ELEVATION: ("tiff", "lerc"),
+}
+
+DEFAULT_JPEG_QUALITY = 85
+
+# Metres; well below the vertical accuracy of any 3DEP product.
+DEFAULT_LERC_MAX_ERROR = 0.01
+
+# The ``allowedCompressions`` entry of the service info that each lossy
+# format needs.
+_COMPRESSION = {"jpg": "JPEG", "jpgpng": "JPEG", "lerc": "LERC"}
+
+# File extension of a response in each format.
+_EXT = {"png8": "png", "jpgpng": "jpg", "tiff": "tif", "lerc": "lrc"}
+
+
+def _split(spec: str) -> tuple[str, str | None]:
+    name, sep, option = spec.partition(":")
+    return name, option if sep else None
+
+
+def parse_transfer_format(spec: str) -> str:
+    """Validate *spec* and return it canonicalised (``jpg`` ->
+    ``jpg:85``); raises ``ValueError`` for unknown formats or options."""
+    name, option = _split(spec)
+    if not any(name in names for names in TRANSFER_FORMATS.values()):
+        known = sorted(n for names in TRANSFER_FORMATS.values() for n in names)
+        raise ValueError(
+            f"unknown transfer format {name!r}; expected one of {known}"
+        )
+    if name in ("jpg", "jpgpng"):
+        try:
+            quality = int(option) if option is not None else DEFAULT_JPEG_QUALITY
+        except ValueError:
+            quality = 0
+        if not 1 <= quality <= 100:
+            raise ValueError(f"{name} quality must be 1-100, got {option!r}")
+        return f"{name}:{quality}"
+    if name == "lerc":
+        try:
+            max_error = (
+                float(option) if option is not None else DEFAULT_LERC_MAX_ERROR
+            )
+        except ValueError:
+            max_error = -1.0
+        if not max_error >= 0:
+            raise ValueError(f"lerc max error must be >= 0, got {option!r}")
+        return f"lerc:{max_error:g}"
+    if option is not None:
+        raise ValueError(f"transfer format {name!r} takes no option")
+    return name
+
+
+def transfer_format_kind(spec: str) -> str:
+    """The service kind (imagery / elevation) *spec* is a format for."""
+    name, _ = _split(spec)
+    return next(kind for kind, names in TRANSFER_FORMATS.items() if name in names)
+
+
+def select_transfer_format(specs, kind: str) -> str | None:
+    """The last of *specs* that is a format for *kind*, canonicalised, or
+    ``None`` if there is none (``process-terrain`` takes one of each)."""
+    for spec in reversed(list(specs or ())):
+        spec = parse_transfer_format(spec)
+        if transfer_format_kind(spec) == kind:
+            return spec
+    return None
+
+
+def export_format_params(spec: str) -> dict:
+    """The exportImage ``format`` (and compression) parameters of *spec*.
+    Plain format names pass through, so ``png`` / ``tiff`` still work."""
+    name, option = _split(spec)
+    params: dict = {"format": name}
+    if name in ("jpg", "jpgpng") and option is not None:
+        params["compressionQuality"] = int(option)
+    elif name == "lerc":
+        # GDAL reads LERC2 blobs; servers default to version 1.
+        params["lercVersion"] = 2
+        if option is not None:
+            params["compressionTolerance"] = float(option)
+    return params
+
+
+def response_ext(spec: str) -> str:
+    """File extension of a response in *spec*'s format."""
+    name, _ = _split(spec)
+    return _EXT.get(name, name)
+
+
+def check_transfer_format(spec: str, info: dict) -> None:
+    """Raise ``ValueError`` if the service described by *info* (its
+    ``?f=json`` metadata) cannot encode *spec*. Services that do not list
+    ``allowedCompressions`` are taken to support every format."""
+    name, _ = _split(spec)
+    needed = _COMPRESSION.get(name)
+    allowed = info.get("allowedCompressions")
+    if needed is None or allowed is None:
+        return
+    if needed.lower() not in {c.strip().lower() for c in allowed.split(",")}:
+        raise ValueError(
+            f"transfer format {name!r} needs {needed} compression, which the "
+            f"service does not offer (allowedCompressions: {allowed})"
+        )
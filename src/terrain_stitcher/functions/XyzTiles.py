@@ -0,0 +1,137 @@
+"""Tile-aligned chunk grid for ``--tile-aligned`` ortho downloads.
+
+:func:`DownloaderBase.build_chunk_grid` starts the grid at the AOI's bbox
+corner, which is not on the Web Mercator tile grid, so every downloaded chunk
+straddles tile edges and the whole AOI has to be mosaicked and resampled by
+gdal2tiles. :func:`build_tile_aligned_grid` instead snaps the grid to the
+target LOD's XYZ tile boundaries with ``chunk_px`` a multiple of 256: each
+exportImage response then covers exactly ``k x k`` tiles at the tile grid's
+own resolution, and :class:`XyzTileWriter` cuts it straight into
+``<z>/<x>/<y>.png`` (writing the server's bytes unchanged when ``k == 1``).
+That is the layout :meth:`ArcGisProAcquisitionSource.from_tile_scheme` and
+``gather-ortho --from-download`` read, with no VRT or gdal2tiles pass.
+"""
+
+from __future__ import annotations
+
+import io
+import math
+from pathlib import Path
+
+from PIL import Image as pImage
+
+from .ChunkGrid import TILE_PX, ChunkGrid
+
+# Half the extent of the EPSG:3857 tile grid: tile (0, 0) at every zoom has
+# its upper-left corner at (-WEBMERC_HALF, WEBMERC_HALF).
+WEBMERC_HALF = math.pi * 6378137.0
+
+# Leading bytes of a PNG file; anything else is re-encoded before it is
+# written as a tile.
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def build_tile_aligned_grid(xmin, ymin, xmax, ymax, chunk_px: int, zoom: int):
+    """Return the :class:`ChunkGrid` (as :func:`build_chunk_grid`) covering
+    every XYZ tile at *zoom* that the EPSG:3857 bbox touches, each chunk
+    spanning ``chunk_px // 256`` tiles per side starting on a tile boundary.
+
+    Each dict also carries ``tile_x`` / ``tile_y``, the XYZ column and row of
+    its upper-left tile. ``row`` / ``col`` stay 0-based chunk indices so the
+    manifest stays sized to the AOI. Chunks at the right/bottom edge of the
+    AOI (or of the world) cover fewer tiles, always whole ones.
+    """
+    if chunk_px <= 0 or chunk_px % TILE_PX:
+        raise ValueError(
+            f"--tile-aligned needs --chunk-px to be a multiple of {TILE_PX}, "
+            f"got {chunk_px}"
+        )
+    n_tiles = 2**zoom
+    tile_m = 2 * WEBMERC_HALF / n_tiles
+    pixel_size_m = tile_m / TILE_PX
+
+    def tile_index(offset_m):
+        return min(max(math.floor(offset_m / tile_m), 0), n_tiles - 1)
+
+    # The max edges are exclusive: an AOI ending exactly on a tile boundary
+    # does not pull in the next tile.
+    tx0 = tile_index(xmin + WEBMERC_HALF)
+    tx1 = tile_index(math.nextafter(xmax + WEBMERC_HALF, -math.inf))
+    ty0 = tile_index(WEBMERC_HALF - ymax)
+    ty1 = tile_index(math.nextafter(WEBMERC_HALF - ymin, -math.inf))
+
+    chunks = ChunkGrid(
+        tx0 * tile_m - WEBMERC_HALF,
+        WEBMERC_HALF - ty0 * tile_m,
+        pixel_size_m,
+        chunk_px,
+        (tx1 - tx0 + 1) * TILE_PX,
+        (ty1 - ty0 + 1) * TILE_PX,
+        tile_origin=(tx0, ty0),
+    )
+
+    print(
+        f"Tile-aligned raster: tiles x {tx0}-{tx1}, y {ty0}-{ty1} at zoom {zoom} "
+        f"@ {pixel_size_m:.3f} m/px -> {len(chunks)} chunks "
+        f"({chunks.n_cols} cols x {chunks.n_rows} rows, {chunk_px}px each)"
+    )
+    return chunks
+
+
+class XyzTileWriter:
+    """Cuts tile-aligned chunk responses into a ``<z>/<x>/<y>.png`` tree.
+
+    ``xyz=False`` numbers rows TMS-style (y increasing northward), matching
+    gdal2tiles without ``--xyz``.
+    """
+
+    def __init__(self, outdir, zoom: int, xyz: bool = True):
+        self.outdir = Path(outdir)
+        self.zoom = zoom
+        self.xyz = xyz
+
+    def tile_path(self, x: int, y: int) -> Path:
+        if not self.xyz:
+            y = 2**self.zoom - 1 - y
+        return self.outdir / str(self.zoom) / str(x) / f"{y}.png"
+
+    def tiles(self, chunk: dict):
+        """Yield ``(path, left, upper)`` for each tile of *chunk*, with the
+        tile's pixel offset inside the chunk image."""
+        for dy in range(chunk["h"] // TILE_PX):
+            for dx in range(chunk["w"] // TILE_PX):
+                path = self.tile_path(chunk["tile_x"] + dx, chunk["tile_y"] + dy)
+                yield path, dx * TILE_PX, dy * TILE_PX
+
+    def first_tile(self, chunk: dict) -> Path:
+        return self.tile_path(chunk["tile_x"], chunk["tile_y"])
+
+    def write(self, raw_bytes: bytes, chunk: dict) -> Path:
+        """Write *chunk*'s tiles and return its upper-left tile path.
+
+        That tile is written last, so its presence marks a complete chunk
+        for :meth:`verify` and resume.
+        """
+        tiles = list(self.tiles(chunk))
+        if len(tiles) == 1 and raw_bytes.startswith(_PNG_SIGNATURE):
+            path = tiles[0][0]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(raw_bytes)
+            return path
+
+        with pImage.open(io.BytesIO(raw_bytes)) as img:
+            img.load()
+            for path, left, upper in reversed(tiles):
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tile = img.crop((left, upper, left + TILE_PX, upper + TILE_PX))
+                tile.save(path, format="PNG")
+        return tiles[0][0]
+
+    def verify(self, chunk: dict) -> bool:
+        """True if every tile of *chunk* is on disk and the upper-left one,
+        written last, is a complete PNG."""
+        from .DownloaderBase import _image_trailer_ok
+
+        if not all(path.is_file() for path, _, _ in self.tiles(chunk)):
+            return False
+        return _image_trailer_ok(self.first_tile(chunk))
@@ -12,3 +12,4 @@ from .OrthoDownloader import main as main_arcgis_downloader
 from .ElevationDownloader import main_elevation
 from .FullPass import main_process_terrain
 from .ImageSplitter import main as main_split_image
+from .DownloadBenchmark import main as main_benchmark_download
@@ -0,0 +1,18 @@
+"""Shared fixtures for the tests."""
+
+import pytest
+
+from terrain_stitcher.arcgis.services import ImageryService
+
+
+@pytest.fixture()
+def service():
+    """A 1 m/px Web Mercator ImageServer; tests stub out every request to it."""
+    return ImageryService(
+        key="svc",
+        label="svc",
+        base_url="https://example/svc/ImageServer/exportImage",
+        native_pixel_size_m=1.0,
+        srs=3857,
+        coverage=(10.0, -100.0, 60.0, -50.0),
+    )
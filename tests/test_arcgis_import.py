@@ -11,6 +11,7 @@ from __future__ import annotations
 
 import json
 import os
+import shutil
 from pathlib import Path
 
 import pytest
@@ -107,4 +108,30 @@ def test_stitch_arcgis_import_resume_is_idempotent(tmp_path):
         workers=1,
     )
     second = {p.name: p.stat().st_size for p in out.iterdir() if p.suffix == ".png"}
-    assert first == second
\ No newline at end of file
+    assert first == second
+
+
+def test_stitch_arcgis_import_leaves_out_blank_windows(tmp_path):
+    cache = tmp_path / "cache"
+    shutil.copytree(FIXTURE, cache)
+    tiles = sorted((cache / "_alllayers").rglob("*.png"))
+    with pImage.open(tiles[-1]) as im:
+        size = im.size
+    pImage.new("RGBA", size).save(tiles[-1])  # fully transparent
+
+    out = tmp_path / "out"
+    groups = import_from_arcgis_dir(
+        shape_file=None,
+        cache_dir=str(cache),
+        output_dir=str(out),
+        dimension=1,
+        workers=1,
+    )
+
+    assert len(groups) == 2
+    manifest = json.loads((out / "height_info.json").read_text())
+    assert {img["name"] for img in manifest["images"]} == {
+        "gathered_r0_c0",
+        "gathered_r0_c1",
+    }
+    assert not (out / "gathered_r0_c2.png").exists()
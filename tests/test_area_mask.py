@@ -0,0 +1,88 @@
+"""Tests for CIRCLE / POLYGON AOI masks (AreaMask) on chunks and tiles."""
+
+import pickle
+
+import numpy as np
+import shapely
+
+from terrain_stitcher.arcgis.tile_bounds import TileFootprints
+from terrain_stitcher.arcgis.tile_filter import ShapeTileFilter
+from terrain_stitcher.arcgis.tile_info import TileInfo
+from terrain_stitcher.arcgis.tile_scheme import TileSchemeInfo
+from terrain_stitcher.common import (
+    AreaMask,
+    ParseArea,
+    TerrainBoundsCalculateType,
+    World_Coordinates,
+)
+from terrain_stitcher.functions.DownloaderBase import build_chunk_grid
+from terrain_stitcher.functions.OrthoDownloader import bbox_from_radius
+
+# A right triangle over the lower-left half of a 0.02 degree square.
+_TRIANGLE = shapely.Polygon([(-100.01, 39.99), (-99.99, 39.99), (-100.01, 40.01)])
+
+
+def _circle():
+    return ParseArea(
+        TerrainBoundsCalculateType.CIRCLE, World_Coordinates("40.0", "-100.0"), 1
+    )
+
+
+def test_circle_grid_drops_corner_chunks():
+    area = _circle()
+    grid = build_chunk_grid(*bbox_from_radius(40.0, -100.0, 1), 16, 10.0)
+    total = len(grid)
+
+    grid.restrict(AreaMask.for_area(area, 3857))
+
+    kept = {(c["row"], c["col"]) for c in grid}
+    assert 0.7 * total < len(grid) < 0.9 * total
+    assert (0, 0) not in kept
+    assert (grid.n_rows // 2, grid.n_cols // 2) in kept
+    rows, cols = grid.rows_cols()
+    assert list(zip(rows, cols)) == [(c["row"], c["col"]) for c in grid]
+    assert grid[-1] == grid.chunk(*max(kept))
+
+
+def test_point_area_has_no_mask():
+    area = ParseArea(
+        TerrainBoundsCalculateType.POINT, World_Coordinates("40.0", "-100.0"), 1
+    )
+    assert area.boundary() is None
+    assert AreaMask.for_area(area, 3857) is None
+
+
+def test_polygon_tile_filter_masks_tiles_outside_the_outline():
+    scheme = TileSchemeInfo.from_web_mercator(min_level=17, max_level=17)
+    area = ParseArea(TerrainBoundsCalculateType.POLYGON, None, polygon=_TRIANGLE)
+    f = ShapeTileFilter(scheme, area.getTotalRegion(), boundary=area.boundary())
+
+    res = scheme.levels[0].resolution
+    tw = scheme.tile_cols * res
+    ox, oy = scheme.tile_origin_x, scheme.tile_origin_y
+    min_x, min_y, max_x, max_y = f.box
+    c0, c1 = int((min_x - ox) // tw), int((max_x - ox) // tw)
+    r0, r1 = int((oy - max_y) // tw), int((oy - min_y) // tw)
+    tiles = [
+        TileInfo(path=None, layer_number=17, row_number=r, col_number=c)
+        for r in range(r0, r1 + 1)
+        for c in range(c0, c1 + 1)
+    ]
+    cols = np.array([t.col_number for t in tiles], dtype=float)
+    rows = np.array([t.row_number for t in tiles], dtype=float)
+    footprints = TileFootprints(
+        west_x=ox + cols * tw,
+        east_x=ox + (cols + 1) * tw,
+        south_y=oy - (rows + 1) * tw,
+        north_y=oy - rows * tw,
+    )
+
+    mask = f.mask(footprints)
+    assert list(mask) == [f(t) for t in tiles]
+    # The upper-right corner tile of the bbox lies outside the triangle.
+    assert not mask[c1 - c0]
+    assert 0.3 * len(tiles) < mask.sum() < 0.8 * len(tiles)
+
+    # The workers' copy carries the outline through pickling.
+    copy = ShapeTileFilter.from_box(scheme, f.box, pickle.loads(pickle.dumps(f.area_mask)))
+    assert list(copy.mask(footprints)) == list(mask)
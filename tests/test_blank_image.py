@@ -0,0 +1,87 @@
+"""Tests for blank chunk / window detection."""
+
+import io
+
+from PIL import Image as pImage
+
+from terrain_stitcher.functions import ChunkManifest as cm
+from terrain_stitcher.functions import DownloaderBase
+from terrain_stitcher.functions.BlankImage import is_blank, is_blank_bytes
+from terrain_stitcher.functions.DownloadOptions import DownloadOptions
+
+
+def _png(img):
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _imagery(w=8, h=8):
+    img = pImage.new("RGB", (w, h), (90, 120, 60))
+    img.putpixel((3, 3), (10, 10, 10))
+    return img
+
+
+def test_transparent_and_uniform_images_are_blank():
+    assert is_blank(pImage.new("RGBA", (8, 8)))
+    # Colour under zero alpha does not matter.
+    transparent = pImage.new("RGBA", (8, 8), (255, 0, 0, 0))
+    transparent.putpixel((1, 1), (0, 255, 0, 0))
+    assert is_blank(transparent)
+    assert is_blank(pImage.new("RGB", (8, 8), (255, 255, 255)))
+    assert is_blank(pImage.new("L", (8, 8), 0))
+
+
+def test_images_with_content_are_not_blank():
+    assert not is_blank(_imagery())
+    rgba = pImage.new("RGBA", (8, 8))
+    rgba.putpixel((7, 7), (1, 2, 3, 255))
+    assert not is_blank(rgba)
+
+
+def test_undecodable_bytes_are_not_blank():
+    assert is_blank_bytes(_png(pImage.new("RGBA", (4, 4))))
+    assert not is_blank_bytes(b"II*\x00" + bytes(100))
+
+
+def _chunks(n):
+    return [
+        {
+            "row": 0,
+            "col": i,
+            "w": 8,
+            "h": 8,
+            "xmin": 8.0 * i,
+            "ymin": 0.0,
+            "xmax": 8.0 * (i + 1),
+            "ymax": 8.0,
+        }
+        for i in range(n)
+    ]
+
+
+def test_blank_chunks_are_recorded_empty_and_not_refetched(
+    monkeypatch, tmp_path, service
+):
+    fetched = []
+
+    def fake_fetch(session, service, chunk, *a, **k):
+        fetched.append(chunk["col"])
+        if chunk["col"] == 1:
+            return _png(pImage.new("RGBA", (8, 8)))
+        return _png(_imagery())
+
+    monkeypatch.setattr(DownloaderBase, "fetch_chunk", fake_fetch)
+    args = (_chunks(3), service, "png", 1, 5, 2, tmp_path)
+
+    paths, failed = DownloaderBase.download_all_chunks(*args, options=DownloadOptions(world_file=True))
+
+    assert sorted(p.name for p in paths) == ["chunk_0_0.png", "chunk_2_0.png"]
+    assert not failed
+    assert not (tmp_path / "chunk_1_0.png").exists()
+    assert cm.ChunkManifest.load(tmp_path).get(0, 1) == cm.EMPTY
+
+    fetched.clear()
+    paths, _ = DownloaderBase.download_all_chunks(*args, options=DownloadOptions(world_file=True))
+    assert fetched == []
+    assert len(paths) == 2
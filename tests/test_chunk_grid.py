@@ -0,0 +1,111 @@
+"""Tests for the lazy chunk grid."""
+
+import numpy as np
+import pytest
+from PIL import Image as pImage
+
+from terrain_stitcher.functions import ChunkManifest as cm
+from terrain_stitcher.functions import DownloaderBase
+from terrain_stitcher.functions.ChunkGrid import ChunkGrid
+from terrain_stitcher.functions.DownloaderBase import build_chunk_grid
+from terrain_stitcher.functions.MosaicVrt import write_mosaic_vrt
+
+
+def _eager_grid(xmin, ymax, total_w, total_h, chunk_px, px):
+    """The chunk dicts build_chunk_grid used to return as a list."""
+    chunks = []
+    for row in range(-(-total_h // chunk_px)):
+        h = min(chunk_px, total_h - row * chunk_px)
+        cy = ymax - row * chunk_px * px
+        for col in range(-(-total_w // chunk_px)):
+            w = min(chunk_px, total_w - col * chunk_px)
+            cx = xmin + col * chunk_px * px
+            chunks.append(
+                {
+                    "row": row,
+                    "col": col,
+                    "w": w,
+                    "h": h,
+                    "xmin": cx,
+                    "ymin": cy - h * px,
+                    "xmax": cx + w * px,
+                    "ymax": cy,
+                }
+            )
+    return chunks
+
+
+def test_grid_yields_the_eager_chunk_dicts():
+    grid = build_chunk_grid(100.0, 0.0, 150.0, 30.0, 8, 2.0)
+
+    expected = _eager_grid(100.0, 30.0, 25, 15, 8, 2.0)
+    assert isinstance(grid, ChunkGrid)
+    assert len(grid) == len(expected) == 8
+    for got, want in zip(grid, expected):
+        assert got == pytest.approx(want)
+    assert grid[5] == pytest.approx(expected[5])
+    assert grid[-1] == pytest.approx(expected[-1])
+    with pytest.raises(IndexError):
+        grid[len(grid)]
+    rows, cols = grid.rows_cols()
+    assert list(zip(rows, cols)) == [(c["row"], c["col"]) for c in expected]
+    assert grid.bounds == pytest.approx((100.0, 0.0, 150.0, 30.0))
+
+
+def test_manifest_lookup_matches_get(tmp_path):
+    manifest = cm.ChunkManifest(tmp_path)
+    manifest.set(0, 1, cm.DOWNLOADED)
+    manifest.set(2, 0, cm.EMPTY)
+    rows = np.array([0, 0, 2, 5])
+    cols = np.array([0, 1, 0, 9])
+
+    assert list(manifest.lookup(rows, cols)) == [
+        manifest.get(r, c) for r, c in zip(rows, cols)
+    ]
+
+
+def test_mosaic_vrt_from_grid_matches_the_dict_list(tmp_path):
+    grid = build_chunk_grid(1000.0, 4940.0, 1100.0, 5000.0, 4, 10.0)
+    paths = []
+    for c in grid:
+        path = tmp_path / f"chunk_{c['col']}_{c['row']}.tif"
+        pImage.new("RGB", (c["w"], c["h"])).save(path)
+        paths.append(path)
+
+    from_grid = write_mosaic_vrt(paths, grid, tmp_path, 3857, 100).read_text()
+    from_list = write_mosaic_vrt(paths, list(grid), tmp_path, 3857, 100).read_text()
+
+    assert from_grid == from_list
+
+
+def test_resume_builds_chunk_dicts_only_for_work(monkeypatch, tmp_path, service):
+    def fake_fetch(session, service, chunk, *a):
+        if chunk["col"] == 2:
+            raise RuntimeError("HTTP 500")
+        return b"II*\x00" + bytes(2000)
+
+    monkeypatch.setattr(DownloaderBase, "fetch_chunk", fake_fetch)
+    grid = build_chunk_grid(0.0, 0.0, 64.0, 32.0, 8, 1.0)
+    args = (grid, service, "tiff", 1, 5, 2, tmp_path)
+
+    paths, failed = DownloaderBase.download_all_chunks(*args, georeference=False)
+    assert len(paths) == 28 and len(failed) == 4
+    assert paths[0].name == "chunk_0_0.tif"
+
+    built = []
+    real_chunk = ChunkGrid.chunk
+
+    def counting_chunk(self, row, col):
+        built.append((row, col))
+        return real_chunk(self, row, col)
+
+    monkeypatch.setattr(ChunkGrid, "chunk", counting_chunk)
+    monkeypatch.setattr(DownloaderBase, "_verify_chunk", lambda p: True)
+    DownloaderBase.download_all_chunks(*args, georeference=False)
+
+    # One dict per verified chunk and one per re-fetched chunk; none for
+    # chunks that were only looked up in the manifest.
+    assert sorted(built) == sorted(
+        [(r, c) for r in range(4) for c in range(8) if c != 2]
+        + [(r, 2) for r in range(4)]
+    )
@@ -0,0 +1,284 @@
+"""Tests for the compact status-array + journal chunk manifest."""
+
+import json
+
+import numpy as np
+import pytest
+
+from terrain_stitcher.functions import ChunkManifest as cm
+from terrain_stitcher.functions import ChunkSize, DownloaderBase
+from terrain_stitcher.functions.ChunkGrid import ChunkGrid
+from terrain_stitcher.functions.ChunkManifest import ChunkManifest
+from terrain_stitcher.functions.DownloadOptions import DownloadOptions
+
+
+def test_flush_appends_only_new_records(tmp_path):
+    m = ChunkManifest.load(tmp_path)
+    m.set(0, 0, cm.DOWNLOADED)
+    m.set(3, 5, cm.FAILED)
+    m.flush()
+    journal = tmp_path / cm.JOURNAL_FILENAME
+    first = journal.stat().st_size
+    m.set(1, 1, cm.DOWNLOADED)
+    m.flush()
+    assert journal.stat().st_size == first + first // 2
+    m.flush()  # nothing pending: no write
+    assert journal.stat().st_size == first + first // 2
+
+
+def test_resume_replays_journal_last_record_wins(tmp_path):
+    m = ChunkManifest.load(tmp_path)
+    m.set(2, 4, cm.FAILED)
+    m.set(0, 1, cm.DOWNLOADED)
+    m.set(2, 4, cm.DOWNLOADED)
+    m.flush()
+
+    resumed = ChunkManifest.load(tmp_path)
+    assert resumed.get(2, 4) == cm.DOWNLOADED
+    assert resumed.get(0, 1) == cm.DOWNLOADED
+    assert resumed.get(0, 0) == cm.MISSING
+    assert resumed.get(99, 99) == cm.MISSING
+
+
+def test_torn_trailing_journal_record_is_ignored(tmp_path):
+    m = ChunkManifest.load(tmp_path)
+    m.set(1, 2, cm.DOWNLOADED)
+    m.flush()
+    with open(tmp_path / cm.JOURNAL_FILENAME, "ab") as fh:
+        fh.write(b"\x07\x00\x00")  # crash mid-record
+    resumed = ChunkManifest.load(tmp_path)
+    assert resumed.get(1, 2) == cm.DOWNLOADED
+    assert resumed.count() == 1
+
+
+def test_compact_folds_journal_into_array(tmp_path):
+    m = ChunkManifest.load(tmp_path)
+    m.reserve(4, 4)
+    m.set(3, 3, cm.DOWNLOADED)
+    m.flush()
+    m.set(0, 2, cm.FAILED)
+    m.compact()
+
+    assert not (tmp_path / cm.JOURNAL_FILENAME).exists()
+    arr = np.load(tmp_path / cm.MANIFEST_FILENAME)
+    assert arr.shape == (4, 4) and arr.dtype == np.uint8
+    resumed = ChunkManifest.load(tmp_path)
+    assert resumed.get(3, 3) == cm.DOWNLOADED
+    assert resumed.get(0, 2) == cm.FAILED
+
+
+def test_legacy_json_manifest_is_read_and_migrated(tmp_path):
+    legacy = {
+        "0_1": {"status": "downloaded", "file": "chunk_1_0.tif"},
+        "2_0": {"status": "failed", "file": None},
+    }
+    (tmp_path / cm.LEGACY_MANIFEST_FILENAME).write_text(json.dumps(legacy))
+
+    m = ChunkManifest.load(tmp_path)
+    assert m.get(0, 1) == cm.DOWNLOADED
+    assert m.get(2, 0) == cm.FAILED
+    assert m.file_name(0, 1) == "chunk_1_0.tif"
+
+    m.compact()
+    assert not (tmp_path / cm.LEGACY_MANIFEST_FILENAME).exists()
+    assert ChunkManifest.load(tmp_path).get(0, 1) == cm.DOWNLOADED
+
+
+def test_digests_survive_journal_and_compaction(tmp_path):
+    m = ChunkManifest.load(tmp_path)
+    m.set(1, 2, cm.DOWNLOADED, (2000, 0xDEADBEEF))
+    m.set(0, 0, cm.FAILED)
+    m.flush()
+
+    resumed = ChunkManifest.load(tmp_path)
+    assert resumed.digest(1, 2) == (2000, 0xDEADBEEF)
+    assert resumed.digest(0, 0) is None
+    assert resumed.digest(50, 50) is None
+
+    resumed.compact()
+    assert not (tmp_path / cm.DIGEST_JOURNAL_FILENAME).exists()
+    assert ChunkManifest.load(tmp_path).digest(1, 2) == (2000, 0xDEADBEEF)
+
+
+def test_file_digest_is_size_and_crc32(tmp_path):
+    import zlib
+
+    path = tmp_path / "chunk_0_0.tif"
+    data = bytes(range(256)) * 10
+    path.write_bytes(data)
+    assert cm.file_digest(path) == (len(data), zlib.crc32(data))
+
+
+def _chunks(n):
+    return [
+        {
+            "row": i // 3,
+            "col": i % 3,
+            "w": 2,
+            "h": 2,
+            "xmin": 0.0,
+            "ymin": 0.0,
+            "xmax": 2.0,
+            "ymax": 2.0,
+        }
+        for i in range(n)
+    ]
+
+
+def test_download_all_chunks_resumes_from_compact_manifest(
+    monkeypatch, tmp_path, service
+):
+    """A second run skips every chunk the first recorded as downloaded and
+    only refetches the one that failed."""
+    fetched = []
+    broken = {(1, 1)}
+
+    def fake_fetch(session, service, chunk, *a, **k):
+        fetched.append((chunk["row"], chunk["col"]))
+        if (chunk["row"], chunk["col"]) in broken:
+            raise RuntimeError("HTTP 400")
+        return b"II*\x00" + bytes(2000)
+
+    monkeypatch.setattr(DownloaderBase, "fetch_chunk", fake_fetch)
+    monkeypatch.setattr(DownloaderBase, "_verify_chunk", lambda p: True)
+
+    args = (_chunks(6), service, "tiff", 1, 5, 2, tmp_path)
+    paths, failed = DownloaderBase.download_all_chunks(*args, georeference=False)
+    assert len(paths) == 5 and len(failed) == 1
+    assert (tmp_path / cm.MANIFEST_FILENAME).is_file()
+    assert not (tmp_path / cm.JOURNAL_FILENAME).exists()
+
+    fetched.clear()
+    broken.clear()
+    paths, failed = DownloaderBase.download_all_chunks(*args, georeference=False)
+    assert fetched == [(1, 1)]
+    assert len(paths) == 6 and not failed
+
+
+def _fake_tiff_fetch(fetched):
+    def fetch(session, service, chunk, *a, **k):
+        fetched.append((chunk["row"], chunk["col"]))
+        return b"II*\x00" + bytes(2000)
+
+    return fetch
+
+
+def test_resume_checks_stored_digest_without_decoding(monkeypatch, tmp_path, service):
+    fetched = []
+    monkeypatch.setattr(DownloaderBase, "fetch_chunk", _fake_tiff_fetch(fetched))
+    args = (_chunks(3), service, "tiff", 1, 5, 2, tmp_path)
+    DownloaderBase.download_all_chunks(*args, georeference=False)
+
+    # Flip one byte without changing the size: only the CRC catches it.
+    bad = tmp_path / "chunk_1_0.tif"
+    data = bytearray(bad.read_bytes())
+    data[100] ^= 0xFF
+    bad.write_bytes(bytes(data))
+
+    def no_decode(path):
+        raise AssertionError("a chunk with a digest must not be decoded")
+
+    monkeypatch.setattr(DownloaderBase, "_verify_chunk", no_decode)
+    fetched.clear()
+    paths, failed = DownloaderBase.download_all_chunks(*args, georeference=False)
+    assert fetched == [(0, 1)]
+    assert len(paths) == 3 and not failed
+
+
+def test_deep_verify_decodes_cached_chunks(monkeypatch, tmp_path, service):
+    monkeypatch.setattr(DownloaderBase, "fetch_chunk", _fake_tiff_fetch([]))
+    args = (_chunks(3), service, "tiff", 1, 5, 2, tmp_path)
+    DownloaderBase.download_all_chunks(*args, georeference=False)
+
+    decoded = []
+    monkeypatch.setattr(
+        DownloaderBase, "_verify_chunk", lambda p: decoded.append(p.name) or True
+    )
+    DownloaderBase.download_all_chunks(
+        *args, georeference=False, options=DownloadOptions(deep_verify=True)
+    )
+    assert sorted(decoded) == ["chunk_0_0.tif", "chunk_1_0.tif", "chunk_2_0.tif"]
+
+
+def test_resume_on_another_grid_starts_over(monkeypatch, tmp_path, service):
+    fetched = []
+    monkeypatch.setattr(DownloaderBase, "fetch_chunk", _fake_tiff_fetch(fetched))
+    monkeypatch.setattr(DownloaderBase, "_verify_chunk", lambda p: True)
+    grid = ChunkGrid(0.0, 4.0, 1.0, 2, 4, 4)
+    DownloaderBase.download_all_chunks(
+        grid, service, "tiff", 1, 5, 2, tmp_path, georeference=False
+    )
+    assert cm.load_grid(tmp_path) == grid.grid_params()
+
+    # The same grid resumes; a re-cut one (chunk 0_0 is now a different
+    # area) fetches every chunk again.
+    fetched.clear()
+    DownloaderBase.download_all_chunks(
+        grid, service, "tiff", 1, 5, 2, tmp_path, georeference=False
+    )
+    assert fetched == []
+    recut = ChunkGrid(0.0, 4.0, 1.0, 4, 4, 4)
+    paths, failed = DownloaderBase.download_all_chunks(
+        recut, service, "tiff", 1, 5, 2, tmp_path, georeference=False
+    )
+    assert fetched == [(0, 0)] and len(paths) == 1 and not failed
+    assert not (tmp_path / "chunk_1_1.tif").exists()
+    assert cm.load_grid(tmp_path)["chunk_px"] == 4
+
+
+def _legacy_run(tmp_path, n=2):
+    """An older run's scratch dir: manifest.json plus ``n x n`` chunk
+    files, no manifest_grid.json or chunk_size.json."""
+    legacy = {}
+    for row in range(n):
+        for col in range(n):
+            name = f"chunk_{col}_{row}.tif"
+            (tmp_path / name).write_bytes(b"II*\x00" + bytes(2000))
+            legacy[f"{row}_{col}"] = {"status": "downloaded", "file": name}
+    (tmp_path / cm.LEGACY_MANIFEST_FILENAME).write_text(json.dumps(legacy))
+
+
+def test_legacy_dir_resumes_under_auto_chunk_size(monkeypatch, tmp_path, service):
+    fetched = []
+    monkeypatch.setattr(DownloaderBase, "fetch_chunk", _fake_tiff_fetch(fetched))
+    monkeypatch.setattr(DownloaderBase, "_verify_chunk", lambda p: True)
+    monkeypatch.setattr(
+        ChunkSize, "measure_latency", lambda *a: pytest.fail("chunk size measured")
+    )
+    _legacy_run(tmp_path)
+    bounds = (0.0, 0.0, 512.0, 512.0)
+
+    chunk_px = ChunkSize.resolve_chunk_px(
+        "auto", tmp_path, service, bounds, 1.0, 2, 30, "tiff", "F32"
+    )
+    grid = DownloaderBase.build_chunk_grid(*bounds, chunk_px, 1.0)
+    paths, failed = DownloaderBase.download_all_chunks(
+        grid, service, "tiff", 1, 5, 2, tmp_path, georeference=False
+    )
+
+    assert chunk_px == 256
+    assert fetched == [] and len(paths) == 4 and not failed
+    assert cm.load_grid(tmp_path) == grid.grid_params()
+
+
+def test_legacy_dir_on_another_grid_starts_over(monkeypatch, tmp_path, service):
+    fetched = []
+    monkeypatch.setattr(DownloaderBase, "fetch_chunk", _fake_tiff_fetch(fetched))
+    monkeypatch.setattr(DownloaderBase, "_verify_chunk", lambda p: True)
+    bounds = (100.0, 0.0, 612.0, 512.0)
+
+    # Larger chunks, and 256-px chunks snapped off the AOI's corner.
+    for name, grid in (
+        ("larger", DownloaderBase.build_chunk_grid(*bounds, 512, 1.0)),
+        ("snapped", DownloaderBase.build_chunk_grid(*bounds, 256, 1.0, snap=True)),
+    ):
+        tmp_dir = tmp_path / name
+        tmp_dir.mkdir()
+        _legacy_run(tmp_dir)
+        fetched.clear()
+        paths, failed = DownloaderBase.download_all_chunks(
+            grid, service, "tiff", 1, 5, 2, tmp_dir, georeference=False
+        )
+        assert sorted(fetched) == sorted((c["row"], c["col"]) for c in grid)
+        assert len(paths) == len(grid) and not failed
+        assert cm.load_grid(tmp_dir) == grid.grid_params()
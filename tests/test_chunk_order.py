@@ -0,0 +1,90 @@
+"""Tests for the chunk download order (--order) and previews (--preview)."""
+
+import io
+
+import numpy as np
+import pytest
+from PIL import Image as pImage
+
+from terrain_stitcher.functions import DownloaderBase
+from terrain_stitcher.functions.ChunkOrder import chunk_order, hilbert_index
+from terrain_stitcher.functions.DownloadOptions import DownloadOptions
+from terrain_stitcher.functions.DownloaderBase import build_chunk_grid
+from terrain_stitcher.functions.PreviewMosaic import PREVIEW_FILENAME, PreviewMosaic
+
+
+def _png(w, h, red):
+    """A chunk whose red channel is *red* (a green ramp keeps it from
+    being skipped as blank)."""
+    rgb = np.zeros((h, w, 3), np.uint8)
+    rgb[..., 0] = red
+    rgb[..., 1] = np.arange(w, dtype=np.uint8) * 10
+    buf = io.BytesIO()
+    pImage.fromarray(rgb, "RGB").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_hilbert_order_steps_between_neighbours():
+    rows, cols = (a.ravel() for a in np.indices((8, 8)))
+    perm = chunk_order(rows, cols, "hilbert")
+
+    assert sorted(hilbert_index(rows, cols)) == list(range(64))
+    steps = np.abs(np.diff(rows[perm])) + np.abs(np.diff(cols[perm]))
+    assert np.all(steps == 1)
+
+
+def test_spiral_order_starts_at_the_centre_and_grows_by_ring():
+    rows, cols = (a.ravel() for a in np.indices((5, 7)))
+    perm = chunk_order(rows, cols, "spiral")
+
+    assert (rows[perm[0]], cols[perm[0]]) == (2, 3)
+    ring = np.maximum(np.abs(rows[perm] - 2), np.abs(cols[perm] - 3))
+    assert np.all(np.diff(ring) >= 0)
+    with pytest.raises(ValueError, match="unknown order"):
+        chunk_order(rows, cols, "random")
+
+
+def test_spiral_download_writes_a_georeferenced_preview(monkeypatch, tmp_path, service):
+    grid = build_chunk_grid(0.0, 0.0, 40.0, 24.0, 8, 1.0)
+    fetched = []
+
+    def fake_fetch(session, service, chunk, *a, **k):
+        fetched.append((chunk["row"], chunk["col"]))
+        return _png(chunk["w"], chunk["h"], 10 + 40 * chunk["col"])
+
+    monkeypatch.setattr(DownloaderBase, "fetch_chunk", fake_fetch)
+
+    paths, failed = DownloaderBase.download_all_chunks(
+        grid,
+        service,
+        "png",
+        1,
+        5,
+        1,
+        tmp_path,
+        georeference=False,
+        options=DownloadOptions(order="spiral", preview_s=3600.0),
+    )
+
+    assert len(paths) == 15 and not failed
+    assert fetched[0] == (1, 2)
+    with pImage.open(tmp_path / PREVIEW_FILENAME) as img:
+        assert img.size == (40, 24) and img.mode == "RGBA"
+        pixels = np.asarray(img)
+    assert pixels[0, 0].tolist() == [10, 0, 0, 255]
+    assert pixels[23, 39].tolist() == [170, 70, 0, 255]
+    world = (tmp_path / "preview.pgw").read_text().split()
+    assert [float(v) for v in world] == [1.0, 0.0, 0.0, -1.0, 0.5, 23.5]
+
+
+def test_preview_paints_paletted_chunks_in_colour(tmp_path):
+    grid = build_chunk_grid(0.0, 0.0, 8.0, 8.0, 8, 1.0)
+    img = pImage.new("P", (8, 8), 1)
+    img.putpalette([0, 0, 0, 200, 40, 10] + [0] * 762)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+
+    preview = PreviewMosaic(grid, tmp_path, 3857)
+    preview.add(grid[0], buf.getvalue())
+
+    assert preview._canvas[4, 4].tolist() == [200, 40, 10, 255]
@@ -0,0 +1,103 @@
+"""Tests for the automatic chunk size (--chunk-px auto)."""
+
+import dataclasses
+import json
+
+import pytest
+import requests as _requests
+
+from terrain_stitcher.arcgis.mock_image_server import MockImageServer
+from terrain_stitcher.arcgis.services import harvest_from_items
+from terrain_stitcher.functions.ChunkManifest import save_grid
+from terrain_stitcher.functions.ChunkSize import (
+    CHUNK_SIZE_FILENAME,
+    LatencyModel,
+    choose_chunk_px,
+    resolve_chunk_px,
+)
+
+# A 20 km square at 0.6 m/px: 33334 px per side.
+_BOUNDS = (0.0, 0.0, 20000.0, 20000.0)
+
+
+def _service(**limits):
+    with MockImageServer() as server:
+        return dataclasses.replace(server.service(), **limits)
+
+
+def test_latency_model_fits_overhead_and_per_pixel_cost():
+    model = LatencyModel.fit([(65536, 0.2 + 65536e-7), (1048576, 0.2 + 1048576e-7)])
+
+    assert model.overhead_s == pytest.approx(0.2)
+    assert model.s_per_px == pytest.approx(1e-7)
+    assert model.max_side(0.2 + 4096**2 * 1e-7) == pytest.approx(4096)
+    with pytest.raises(ValueError):
+        LatencyModel.fit([(65536, 0.3), (65536, 0.4)])
+
+
+def test_largest_multiple_of_256_within_every_bound():
+    service = _service()
+    total = 33334
+
+    # Service limit (4100 px -> 4096).
+    assert choose_chunk_px(total, total, service, 8, 30) == 4096
+    # Latency: 30 s timeout -> 7.5 s per chunk at 1 us/px is ~2739 px.
+    slow = LatencyModel(0.0, 1e-6)
+    assert choose_chunk_px(total, total, service, 8, 30, slow) == 2560
+    # Memory: 64 MB over 2 x 8 decoded RGBA chunks is 1024 px.
+    assert choose_chunk_px(total, total, service, 8, 30, memory_budget_mb=64) == 1024
+    # Workers: a 3000 px AOI still gives 32 workers two chunks each.
+    assert choose_chunk_px(3000, 3000, service, 32, 30) == 256
+    # A registry entry without limits.
+    unknown = _service(max_image_width=None, max_image_height=None)
+    assert choose_chunk_px(total, total, unknown, 8, 30) == 2048
+
+
+def test_auto_size_is_measured_once_and_reused_on_resume(tmp_path):
+    with MockImageServer() as server:
+        service = server.service()
+        args = (tmp_path, service, _BOUNDS, 0.6, 8, 30, "png", "U8")
+
+        first = resolve_chunk_px("auto", *args)
+        probes = server.requests
+        again = resolve_chunk_px("auto", *args)
+
+        assert resolve_chunk_px(512, *args) == 512
+        assert server.requests == probes == 4
+
+    assert first == again == 4096
+    saved = json.loads((tmp_path / CHUNK_SIZE_FILENAME).read_text())
+    assert saved == {"service": service.key, "pixel_size_m": 0.6, "chunk_px": 4096}
+
+
+def test_saved_size_is_kept_whichever_service_resumes(tmp_path):
+    with MockImageServer() as server:
+        first = server.service()
+        other = dataclasses.replace(first, key="mock_other")
+        resolve_chunk_px("auto", tmp_path, first, _BOUNDS, 0.6, 8, 30, "png", "U8")
+        probes = server.requests
+        again = resolve_chunk_px(
+            "auto", tmp_path, other, _BOUNDS, 0.6, 8, 30, "png", "U8"
+        )
+        assert server.requests == probes
+
+    assert again == 4096
+    # A tmp_dir with only the manifest's grid record reuses its chunk size.
+    (tmp_path / CHUNK_SIZE_FILENAME).unlink()
+    grid = {"xmin": 0.0, "ymax": 0.0, "pixel_size_m": 0.6, "chunk_px": 512}
+    save_grid(tmp_path, grid)
+    args = (tmp_path, first, _BOUNDS, 0.6, 8, 30, "png", "U8")
+    assert resolve_chunk_px("auto", *args) == 512
+
+
+def test_harvest_records_image_size_limits(monkeypatch):
+    class _Resp:
+        def json(self):
+            return MockImageServer().info()
+
+    monkeypatch.setattr(_requests, "get", lambda *a, **k: _Resp())
+    (service,) = harvest_from_items(["https://example.test/x/ImageServer"])[
+        "services"
+    ]
+
+    assert service["max_image_width"] == service["max_image_height"] == 4100
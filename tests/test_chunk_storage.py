@@ -0,0 +1,72 @@
+"""Tests for the chunk GeoTIFF creation options (--chunk-compression)."""
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.io import MemoryFile
+from rasterio.transform import from_bounds
+
+from terrain_stitcher.functions import DownloaderBase
+from terrain_stitcher.functions.ChunkStorage import chunk_creation_options
+
+_CHUNK = {"row": 1, "col": 2, "w": 300, "h": 300}
+_CHUNK.update(xmin=0.0, ymin=0.0, xmax=300.0, ymax=300.0)
+
+
+def _f32_tiff():
+    values = np.fromfunction(lambda y, x: 100.0 + x * 0.5 + y, (300, 300))
+    with MemoryFile() as mem:
+        with mem.open(
+            driver="GTiff",
+            width=300,
+            height=300,
+            count=1,
+            dtype="float32",
+            crs="EPSG:3857",
+            transform=from_bounds(0.0, 0.0, 300.0, 300.0, 300, 300),
+        ) as ds:
+            ds.write(values.astype(np.float32), 1)
+        return mem.read(), values.astype(np.float32)
+
+
+def test_presets_pick_predictors_and_fall_back_for_imagery():
+    assert chunk_creation_options("none") == []
+    zstd = chunk_creation_options("zstd", "F32")
+    assert {"TILED=YES", "COMPRESS=ZSTD", "PREDICTOR=3"} <= set(zstd)
+    assert "PREDICTOR=2" in chunk_creation_options("deflate", "U8")
+    assert "COMPRESS=LERC_DEFLATE" in chunk_creation_options("lerc", "F32")
+    assert "COMPRESS=DEFLATE" in chunk_creation_options("lerc", "U8")
+    with pytest.raises(ValueError, match="unknown chunk compression"):
+        chunk_creation_options("lzma")
+
+
+def test_elevation_chunk_is_re_encoded_losslessly(tmp_path):
+    raw, values = _f32_tiff()
+    options = chunk_creation_options("deflate", "F32")
+
+    out = DownloaderBase.write_chunk_direct(raw, _CHUNK, "tiff", tmp_path, options)
+
+    assert out == tmp_path / "chunk_2_1.tif"
+    assert out.stat().st_size < len(raw) / 2
+    with rasterio.open(out) as ds:
+        assert ds.compression.name == "deflate"
+        assert ds.block_shapes == [(256, 256)]
+        assert ds.crs.to_epsg() == 3857
+        np.testing.assert_array_equal(ds.read(1), values)
+
+
+def test_subprocess_georeference_passes_creation_options(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(
+        DownloaderBase.subprocess, "run", lambda args, **k: calls.append(args)
+    )
+    options = chunk_creation_options("zstd", "U8")
+
+    DownloaderBase._georeference_subprocess(
+        tmp_path / "raw.png", tmp_path / "chunk.tif", _CHUNK, 3857, options
+    )
+
+    args = calls[0]
+    assert args[-2:] == [str(tmp_path / "raw.png"), str(tmp_path / "chunk.tif")]
+    passed = [args[i + 1] for i, a in enumerate(args) if a == "-co"]
+    assert passed == options
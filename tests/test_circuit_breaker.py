@@ -0,0 +1,151 @@
+"""Tests for the shared circuit breaker and download deadlines."""
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+import requests
+
+from terrain_stitcher.functions import DownloaderBase
+from terrain_stitcher.functions.ChunkManifest import MISSING, ChunkManifest
+from terrain_stitcher.functions.CircuitBreaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    DeadlineExceeded,
+)
+from terrain_stitcher.functions.DownloaderBase import build_chunk_grid
+
+
+_CHUNK = {"row": 0, "col": 0, "w": 2, "h": 2}
+_CHUNK.update(xmin=0.0, ymin=0.0, xmax=2.0, ymax=2.0)
+
+
+class _Resp:
+    def __init__(self, status, content=b"png"):
+        self.status_code = status
+        self.headers = {"Content-Type": "image/png"} if status == 200 else {}
+        self.content = content
+        self.text = ""
+
+
+class _OutageSession:
+    """Fails the first *down* requests with a 503, then answers 200."""
+
+    def __init__(self, down):
+        self.down = down
+        self.calls = 0
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.calls += 1
+        return _Resp(503) if self.calls <= self.down else _Resp(200, b"data")
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+
+def test_opens_after_threshold_and_one_probe_closes_it():
+    breaker = CircuitBreaker(threshold=3, cooldown_s=0.05)
+    assert not breaker.on_failure() and not breaker.on_failure()
+    assert breaker.on_failure() and breaker.state == OPEN
+
+    started = time.monotonic()
+    breaker.wait()  # becomes the probe once the cooldown ends
+    assert time.monotonic() - started >= 0.04 and breaker.state == HALF_OPEN
+
+    # A second worker waits for the probe's outcome instead of sending.
+    released = []
+    waiter = threading.Thread(target=lambda: released.append(breaker.wait()))
+    waiter.start()
+    time.sleep(0.02)
+    assert not released
+    breaker.on_success()
+    waiter.join(timeout=1)
+
+    assert released and breaker.state == CLOSED
+    assert breaker.trips == 1 and breaker.probes == 1 and breaker.open_s > 0
+
+
+def test_failed_probe_doubles_the_cooldown_and_deadline_ends_the_wait():
+    breaker = CircuitBreaker(threshold=1, cooldown_s=0.05, max_cooldown_s=0.08)
+    breaker.on_failure()
+    breaker.wait()
+    assert breaker.on_failure() and breaker.state == OPEN
+    assert breaker.status().startswith("circuit open")
+
+    with pytest.raises(DeadlineExceeded):
+        breaker.wait(time.monotonic() + 0.02)
+    started = time.monotonic()
+    asyncio.run(breaker.wait_async())
+    assert 0.04 <= time.monotonic() - started < 0.5
+
+
+def test_outage_does_not_use_up_the_chunk_retries(monkeypatch, service):
+    sleeps = []
+    monkeypatch.setattr(DownloaderBase.time, "sleep", sleeps.append)
+    session = _OutageSession(down=6)
+    breaker = CircuitBreaker(threshold=2, cooldown_s=0.01)
+
+    body = DownloaderBase.fetch_chunk(
+        session, service, _CHUNK, "png", 3, 30, breaker=breaker
+    )
+
+    assert body == b"data" and session.calls == 7
+    # Only the failure before the circuit opened was a retry with a sleep.
+    assert sleeps == [2]
+    assert breaker.state == CLOSED and breaker.trips == 1
+
+    with pytest.raises(RuntimeError, match="failed after 3 retries"):
+        DownloaderBase.fetch_chunk(
+            _OutageSession(down=6), service, _CHUNK, "png", 3, 30
+        )
+
+
+def test_dead_service_gives_up_after_max_probes(monkeypatch, service):
+    monkeypatch.setattr(DownloaderBase.time, "sleep", lambda s: None)
+    session = _OutageSession(down=100)
+    breaker = CircuitBreaker(threshold=2, cooldown_s=0.01, max_probes=2)
+
+    with pytest.raises(RuntimeError, match="failed after 3 retries"):
+        DownloaderBase.fetch_chunk(
+            session, service, _CHUNK, "png", 3, 30, breaker=breaker
+        )
+
+    # Two failures open the circuit, two failed probes give up, and the
+    # retries are spent again from there.
+    assert breaker.gave_up and breaker.state == CLOSED
+    assert breaker.probes == 2 and "Gave up" in breaker.report()
+    assert session.calls == 5
+
+
+def test_chunks_past_the_run_deadline_are_left_for_the_next_run(
+    monkeypatch, tmp_path, service
+):
+    monkeypatch.setattr(requests, "Session", lambda: _OutageSession(down=0))
+    grid = build_chunk_grid(0.0, 0.0, 16.0, 8.0, 8, 1.0)
+
+    paths, failed = DownloaderBase.download_all_chunks(
+        grid,
+        service,
+        "png",
+        3,
+        30,
+        2,
+        tmp_path,
+        georeference=False,
+        breaker=CircuitBreaker(run_deadline_s=0.0),
+    )
+
+    assert not len(paths) and len(failed) == 2
+    rows, cols = grid.rows_cols()
+    statuses = ChunkManifest.load(tmp_path, suffix=".png").lookup(rows, cols)
+    assert np.all(statuses == MISSING)
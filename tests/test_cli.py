@@ -88,6 +88,34 @@ def test_cli_download_arcgis_service_index_defaults_none(monkeypatch, tmp_path):
     cli_mod.main()
 
     assert captured.get("service_index") is None
+    assert captured.get("drop_intermediate") is False
+
+
+def test_cli_download_arcgis_forwards_drop_intermediate(monkeypatch, tmp_path):
+    shape = _shape_file(tmp_path)
+    captured = {}
+    monkeypatch.setattr(
+        cli_mod, "main_arcgis_downloader", lambda **kw: captured.update(kw) or None
+    )
+
+    argv = [
+        "prog",
+        "download-arcgis",
+        "-s",
+        str(shape),
+        "-o",
+        str(tmp_path / "out"),
+        "--lod",
+        "18",
+        "--pyramid-lods",
+        "16",
+        "--drop-intermediate",
+    ]
+    monkeypatch.setattr("sys.argv", argv)
+    cli_mod.main()
+
+    assert captured["pyramid_lods"] == [16]
+    assert captured["drop_intermediate"] is True
 
 
 def test_cli_download_elevation_forwards_service_index(monkeypatch, tmp_path):
@@ -111,3 +139,62 @@ def test_cli_download_elevation_forwards_service_index(monkeypatch, tmp_path):
     cli_mod.main()
 
     assert captured.get("service_index") == 1
+
+
+def test_cli_download_elevation_forwards_auto_index_and_failover(
+    monkeypatch, tmp_path
+):
+    shape = _shape_file(tmp_path)
+    captured = {}
+    monkeypatch.setattr(
+        cli_mod, "main_elevation", lambda **kw: captured.update(kw) or None
+    )
+
+    argv = [
+        "prog",
+        "download-elevation",
+        "-s",
+        str(shape),
+        "--service-index",
+        "auto",
+        "--failover",
+    ]
+    monkeypatch.setattr("sys.argv", argv)
+    cli_mod.main()
+
+    assert captured["service_index"] == "auto"
+    assert captured["options"].failover is True
+
+
+def test_cli_download_options_are_shared_by_every_download_command(
+    monkeypatch, tmp_path
+):
+    shape = _shape_file(tmp_path)
+    captured = {}
+    for entry in ("main_arcgis_downloader", "main_elevation", "main_process_terrain"):
+        monkeypatch.setattr(
+            cli_mod, entry, lambda _entry=entry, **kw: captured.update({_entry: kw})
+        )
+
+    shared = ["--order", "spiral", "--breaker-threshold", "5"]
+    for argv in (
+        ["download-arcgis", "-s", str(shape), "--lod", "18", "--world-file"],
+        ["download-elevation", "-s", str(shape), "--transfer-format", "lerc"],
+        ["process-terrain", "--name", "t", "-s", str(shape), "-d", "2"]
+        + ["--transfer-format", "jpg", "lerc:0"],
+    ):
+        monkeypatch.setattr("sys.argv", ["prog", *argv, *shared])
+        cli_mod.main()
+
+    options = {name: kw["options"] for name, kw in captured.items()}
+    assert {(o.order, o.breaker_threshold) for o in options.values()} == {
+        ("spiral", 5)
+    }
+    assert options["main_arcgis_downloader"].world_file is True
+    assert options["main_elevation"].transfer_formats == ["lerc:0.01"]
+    assert options["main_process_terrain"].transfer_formats == ["jpg:85", "lerc:0"]
+    with pytest.raises(SystemExit):
+        monkeypatch.setattr(
+            "sys.argv", ["prog", "download-elevation", "-s", str(shape), "--world-file"]
+        )
+        cli_mod.main()
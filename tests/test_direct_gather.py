@@ -0,0 +1,183 @@
+"""Tests for the direct gather (process-terrain --direct)."""
+
+import dataclasses
+import io
+import json
+
+import pytest
+from PIL import Image as pImage
+
+from terrain_stitcher.arcgis.tile_filter import ShapeTileFilter
+from terrain_stitcher.arcgis.tile_info import TileInfo
+from terrain_stitcher.common.ParseArea import ParseArea
+from terrain_stitcher.functions import DirectGather
+from terrain_stitcher.functions.DirectGather import plan_windows, window_requests
+
+
+def _shape_file(tmp_path, radius=1.0):
+    p = tmp_path / "Shape.json"
+    p.write_text(
+        json.dumps(
+            {
+                "boundsType": "POINT",
+                "center": {"x": -90.0, "y": 40.0},
+                "view_distance": radius,
+            }
+        )
+    )
+    return str(p)
+
+
+def _piece_colour(piece):
+    return (piece["x_off"] // 64 % 256, piece["y_off"] // 64 % 256, 7, 255)
+
+
+def _fake_fetch(fetched):
+    def fetch(session, service, piece, *a, **k):
+        fetched.append((piece["row"], piece["col"]))
+        buf = io.BytesIO()
+        img = pImage.new("RGBA", (piece["w"], piece["h"]), _piece_colour(piece))
+        img.putpixel((0, 0), (200, 200, 200, 255))  # not blank
+        img.save(buf, format="PNG")
+        return buf.getvalue()
+
+    return fetch
+
+
+def test_windows_cover_exactly_the_filtered_tiles(tmp_path):
+    region = ParseArea.fromJSONFile(_shape_file(tmp_path, radius=3.0)).getTotalRegion()
+    lod = 14
+
+    scheme, windows = plan_windows(region, lod, 3)
+
+    planned = {}
+    for w in windows:
+        assert w["r_hi"] - w["r_lo"] < 3 and w["c_hi"] - w["c_lo"] < 3
+        for r in range(w["r_lo"], w["r_hi"] + 1):
+            for c in range(w["c_lo"], w["c_hi"] + 1):
+                planned[(r, c)] = w["origin"]
+
+    keep = ShapeTileFilter(scheme, region)
+    r_min = min(r for r, _ in planned)
+    c_min = min(c for _, c in planned)
+    survivors = {
+        (r, c)
+        for r in range(r_min - 2, max(r for r, _ in planned) + 3)
+        for c in range(c_min - 2, max(c for _, c in planned) + 3)
+        if keep(TileInfo(path=None, layer_number=lod, row_number=r, col_number=c))
+    }
+    assert set(planned) == survivors
+    # Bucketed d x d from the NW-most tile, as the stitcher groups them.
+    for (r, c), origin in planned.items():
+        assert origin == ((r - r_min) // 3 * 3, (c - c_min) // 3 * 3)
+
+
+def test_window_requests_tile_the_window():
+    window = {
+        "origin": (0, 3),
+        "xmin": 0.0,
+        "xmax": 768.0,
+        "ymin": -512.0,
+        "ymax": 0.0,
+        "w": 768,
+        "h": 512,
+    }
+
+    pieces = window_requests(window, max_image_px=300)
+
+    assert all(p["w"] <= 300 and p["h"] <= 300 for p in pieces)
+    assert sum(p["w"] * p["h"] for p in pieces) == 768 * 512
+    assert {(p["x_off"], p["y_off"]) for p in pieces} == {
+        (x, y) for x in (0, 300, 600) for y in (0, 300)
+    }
+    for p in pieces:
+        assert (p["row"], p["col"]) == (0, 3)
+        assert p["xmin"] == pytest.approx(p["x_off"])
+        assert p["ymax"] == pytest.approx(-p["y_off"])
+        assert p["xmax"] - p["xmin"] == pytest.approx(p["w"])
+
+
+def test_gather_direct_writes_windows_and_manifest(monkeypatch, tmp_path, service):
+    fetched = []
+    monkeypatch.setattr(DirectGather, "fetch_chunk", _fake_fetch(fetched))
+    shape = _shape_file(tmp_path)
+    out = tmp_path / "out"
+
+    groups = DirectGather.gather_direct(
+        shape, str(out), 14, 2, service=service, workers=2, max_image_px=256
+    )
+
+    manifest = json.loads((out / "height_info.json").read_text())
+    names = [e["name"] for e in manifest["images"]]
+    assert names == [f"gathered_r{g.origin[0]}_c{g.origin[1]}" for g in groups]
+    for g in groups:
+        with pImage.open(out / f"gathered_r{g.origin[0]}_c{g.origin[1]}.png") as img:
+            assert img.size[0] % 256 == 0 and img.size[1] % 256 == 0
+            # Each 256-px sub-request is pasted at its own offset.
+            if img.size[0] > 256:
+                assert img.getpixel((300, 10)) == (4, 0, 7, 255)
+    # 256-px requests: one per tile.
+    assert len(fetched) == sum(g.n_tiles for g in groups)
+
+    fetched.clear()
+    DirectGather.gather_direct(
+        shape, str(out), 14, 2, service=service, resume=True, max_image_px=256
+    )
+    assert fetched == []
+
+
+def test_gather_direct_sub_requests_follow_the_service_limit(
+    monkeypatch, tmp_path, service
+):
+    fetched = []
+    monkeypatch.setattr(DirectGather, "fetch_chunk", _fake_fetch(fetched))
+    limited = dataclasses.replace(
+        service, max_image_width=4100, max_image_height=256
+    )
+
+    groups = DirectGather.gather_direct(
+        _shape_file(tmp_path), str(tmp_path / "out"), 14, 2, service=limited
+    )
+
+    # The smaller side limit (256 px) gives one request per tile.
+    assert len(fetched) == sum(g.n_tiles for g in groups)
+
+
+def test_gather_direct_leaves_out_failed_windows(monkeypatch, tmp_path, service):
+    fetch = _fake_fetch([])
+
+    def flaky(session, service, piece, *a, **k):
+        if (piece["row"], piece["col"]) == (0, 0):
+            raise RuntimeError("boom")
+        return fetch(session, service, piece, *a, **k)
+
+    monkeypatch.setattr(DirectGather, "fetch_chunk", flaky)
+    out = tmp_path / "out"
+
+    groups = DirectGather.gather_direct(
+        _shape_file(tmp_path), str(out), 14, 2, service=service, workers=2
+    )
+
+    assert (0, 0) not in {g.origin for g in groups}
+    assert groups
+    assert not (out / "gathered_r0_c0.png").exists()
+    names = [e["name"] for e in json.loads((out / "height_info.json").read_text())["images"]]
+    assert "gathered_r0_c0" not in names
+
+
+def test_gather_direct_leaves_out_blank_windows(monkeypatch, tmp_path, service):
+    def transparent(session, service, piece, *a, **k):
+        buf = io.BytesIO()
+        pImage.new("RGBA", (piece["w"], piece["h"])).save(buf, format="PNG")
+        return buf.getvalue()
+
+    monkeypatch.setattr(DirectGather, "fetch_chunk", transparent)
+    out = tmp_path / "out"
+
+    groups = DirectGather.gather_direct(
+        _shape_file(tmp_path), str(out), 14, 2, service=service, workers=2
+    )
+
+    assert groups == []
+    assert not list(out.glob("gathered_*.png"))
+    assert json.loads((out / "height_info.json").read_text())["images"] == []
@@ -1,3 +1,4 @@
+import datetime
 import json
 
 import pytest
@@ -42,16 +43,20 @@ class _FakeResp:
     headers = {"Content-Type": "image/tiff"}
     content = b"II*\x00\x08\x00\x00\x00"
     text = ""
+    elapsed = datetime.timedelta(milliseconds=5)
 
 
 class _FakeSession:
     def __init__(self):
         self.calls = []
 
-    def get(self, url, params=None, timeout=None):
+    def get(self, url, params=None, headers=None, timeout=None):
         self.calls.append(dict(params))
         return _FakeResp()
 
+    def mount(self, prefix, adapter):
+        pass
+
     def __enter__(self):
         return self
 
@@ -79,7 +84,7 @@ def test_download_elevation_fetches_f32_tiff(monkeypatch, tmp_path):
 
     calls = []
 
-    def fake_build_mosaic(chunk_paths, td):
+    def fake_build_mosaic(chunk_paths, td, **kw):
         calls.append(("build_mosaic", len(chunk_paths)))
         vrt = td / "mosaic.vrt"
         vrt.write_text("vrt")
@@ -123,7 +128,7 @@ def test_download_elevation_default_res_uses_service_native(monkeypatch, tmp_pat
     # Capture the resolution passed to build_chunk_grid.
     captured = {}
 
-    def fake_grid(xmin, ymin, xmax, ymax, chunk_px, pixel_size_m):
+    def fake_grid(xmin, ymin, xmax, ymax, chunk_px, pixel_size_m, snap=False):
         captured["res"] = pixel_size_m
         # single 1x1 chunk
         return [
@@ -141,7 +146,7 @@ def test_download_elevation_default_res_uses_service_native(monkeypatch, tmp_pat
 
     monkeypatch.setattr(ElevationDownloader, "build_chunk_grid", fake_grid)
 
-    def fake_mosaic(chunk_paths, td):
+    def fake_mosaic(chunk_paths, td, **kw):
         vrt = td / "mosaic.vrt"
         vrt.write_text("vrt")
         return vrt
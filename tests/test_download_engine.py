@@ -0,0 +1,309 @@
+"""Tests for the download transports behind ``download_all_chunks``.
+
+The async engine is exercised with a fake session factory and fake fetch
+coroutine, so no network (and, except where noted, no aiohttp) is needed;
+the tests pin the ``_stream_futures``-compatible contract of
+``stream_async`` and the engine dispatch in ``download_all_chunks``.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from terrain_stitcher.functions import AsyncTransport, DownloaderBase
+from terrain_stitcher.functions.DownloadOptions import DownloadOptions
+
+
+def _chunks(n):
+    return [
+        {
+            "row": i // 4,
+            "col": i % 4,
+            "w": 2,
+            "h": 2,
+            "xmin": 0.0,
+            "ymin": 0.0,
+            "xmax": 2.0,
+            "ymax": 2.0,
+        }
+        for i in range(n)
+    ]
+
+
+class _NullSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *a):
+        return False
+
+
+# ---------------------------------------------------------------------------
+# stream_async
+# ---------------------------------------------------------------------------
+
+
+def test_stream_async_yields_every_item_and_routes_exceptions():
+    async def fn(session, item):
+        await asyncio.sleep(0)
+        if item == 3:
+            raise RuntimeError("boom")
+        return item * 10
+
+    out = dict(AsyncTransport.stream_async(fn, range(8), 4, _NullSession))
+
+    assert set(out) == set(range(8))
+    assert isinstance(out[3], RuntimeError)
+    assert out[5] == 50
+
+
+def test_stream_async_bounds_inflight():
+    lock = threading.Lock()
+    state = {"live": 0, "peak": 0}
+
+    async def fn(session, item):
+        with lock:
+            state["live"] += 1
+            state["peak"] = max(state["peak"], state["live"])
+        await asyncio.sleep(0.001)
+        with lock:
+            state["live"] -= 1
+        return item
+
+    results = list(AsyncTransport.stream_async(fn, range(50), 5, _NullSession))
+
+    assert len(results) == 50
+    assert state["peak"] <= 5
+
+
+def test_stream_async_early_close_stops_loop():
+    async def fn(session, item):
+        await asyncio.sleep(0.01)
+        return item
+
+    gen = AsyncTransport.stream_async(fn, range(1000), 8, _NullSession)
+    next(gen)
+    gen.close()  # must cancel the in-flight tasks and join the loop thread
+
+
+def test_stream_async_session_factory_error_propagates():
+    def bad_factory():
+        raise ImportError("no aiohttp")
+
+    async def fn(session, item):
+        return item
+
+    with pytest.raises(ImportError, match="no aiohttp"):
+        list(AsyncTransport.stream_async(fn, range(3), 2, bad_factory))
+
+
+# ---------------------------------------------------------------------------
+# Engine dispatch in download_all_chunks
+# ---------------------------------------------------------------------------
+
+
+def test_download_all_chunks_rejects_unknown_engine(tmp_path, service):
+    with pytest.raises(ValueError, match="unknown engine"):
+        DownloaderBase.download_all_chunks(
+            _chunks(1),
+            service,
+            "tiff",
+            1,
+            5,
+            1,
+            tmp_path,
+            options=DownloadOptions(engine="gevent"),
+        )
+
+
+def test_download_all_chunks_async_engine(monkeypatch, tmp_path, service):
+    pytest.importorskip("aiohttp")
+    fetched = []
+
+    async def fake_fetch(
+        session,
+        service,
+        chunk,
+        img_format,
+        retries,
+        timeout,
+        pt,
+        controller=None,
+        validators=None,
+        metrics=None,
+        breaker=None,
+    ):
+        fetched.append((chunk["row"], chunk["col"]))
+        if (chunk["row"], chunk["col"]) == (1, 1):
+            raise RuntimeError("HTTP 400")
+        return b"II*\x00" + bytes(2000)
+
+    monkeypatch.setattr(AsyncTransport, "fetch_chunk_async", fake_fetch)
+    monkeypatch.setattr(AsyncTransport, "open_async_session", lambda n: _NullSession())
+
+    chunk_paths, failed = DownloaderBase.download_all_chunks(
+        _chunks(8),
+        service,
+        "tiff",
+        1,
+        5,
+        16,
+        tmp_path,
+        pixel_type="F32",
+        georeference=False,
+        options=DownloadOptions(engine="async"),
+    )
+
+    assert len(fetched) == 8
+    assert [(c["row"], c["col"]) for c in failed] == [(1, 1)]
+    assert len(chunk_paths) == 7
+    assert all(p.is_file() for p in chunk_paths)
+    assert (tmp_path / DownloaderBase.MANIFEST_FILENAME).is_file()
+
+
+def test_thread_session_pool_sized_to_workers():
+    session = DownloaderBase._make_session(64)
+    adapter = session.get_adapter("https://example/")
+    assert adapter._pool_maxsize == 64
+
+
+# ---------------------------------------------------------------------------
+# georeferencing on the workers, from memory
+# ---------------------------------------------------------------------------
+
+
+class _FakeGdal:
+    """Just enough of ``osgeo.gdal`` for ``_georeference_inprocess``."""
+
+    def __init__(self):
+        self.mem = {}
+        self.sources = []
+
+    def FileFromMemBuffer(self, path, data):
+        self.mem[path] = data
+
+    def Unlink(self, path):
+        self.mem.pop(path, None)
+
+    def TranslateOptions(self, args, format):
+        return args
+
+    def Translate(self, dst, src, options=None):
+        self.sources.append(src)
+        assert src in self.mem, "source must be the /vsimem/ buffer"
+        with open(dst, "wb") as fh:
+            fh.write(self.mem[src])
+        return object()
+
+
+def test_georeference_chunk_translates_from_vsimem(monkeypatch, tmp_path):
+    import sys
+    import types
+
+    gdal = _FakeGdal()
+    monkeypatch.setitem(sys.modules, "osgeo", types.SimpleNamespace(gdal=gdal))
+
+    chunk = _chunks(1)[0]
+    out = DownloaderBase.georeference_chunk(b"\x89PNG...", chunk, "png", tmp_path, 3857)
+
+    assert out == tmp_path / "chunk_0_0.tif"
+    assert out.read_bytes() == b"\x89PNG..."
+    assert gdal.sources and gdal.sources[0].startswith("/vsimem/")
+    assert not gdal.mem, "the /vsimem/ buffer must be released"
+    assert [p.name for p in tmp_path.iterdir()] == ["chunk_0_0.tif"]
+
+
+def test_chunks_are_georeferenced_on_worker_threads(monkeypatch, tmp_path, service):
+    persisted_on = []
+
+    monkeypatch.setattr(DownloaderBase, "fetch_chunk", lambda *a, **k: b"png")
+
+    def fake_georef(raw, chunk, img_format, td, srs, creation_options=None):
+        persisted_on.append(threading.current_thread())
+        path = td / f"chunk_{chunk['col']}_{chunk['row']}.tif"
+        path.write_bytes(raw)
+        return path
+
+    monkeypatch.setattr(DownloaderBase, "georeference_chunk", fake_georef)
+
+    paths, failed = DownloaderBase.download_all_chunks(
+        _chunks(6), service, "png", 1, 5, 3, tmp_path
+    )
+
+    assert len(paths) == 6 and not failed
+    assert len(persisted_on) == 6
+    assert threading.main_thread() not in persisted_on
+
+
+def test_writes_run_in_their_own_stage_without_holding_fetch_workers(
+    monkeypatch, tmp_path, service
+):
+    fetched = []
+    all_fetched = threading.Event()
+
+    def fake_fetch(session, service, chunk, *a, **k):
+        fetched.append(chunk["col"])
+        if len(fetched) == 4:
+            all_fetched.set()
+        return b"png"
+
+    written_on = []
+
+    def fake_georef(raw, chunk, img_format, td, srs, creation_options=None):
+        # The one writer blocks until every chunk was fetched: with writes on
+        # the two fetch workers, only two fetches could ever happen.
+        assert all_fetched.wait(timeout=5)
+        written_on.append(threading.current_thread().name)
+        path = td / f"chunk_{chunk['col']}_{chunk['row']}.tif"
+        path.write_bytes(raw)
+        return path
+
+    monkeypatch.setattr(DownloaderBase, "fetch_chunk", fake_fetch)
+    monkeypatch.setattr(DownloaderBase, "georeference_chunk", fake_georef)
+
+    paths, failed = DownloaderBase.download_all_chunks(
+        _chunks(4),
+        service,
+        "png",
+        1,
+        5,
+        2,
+        tmp_path,
+        options=DownloadOptions(write_workers=1),
+    )
+
+    assert len(paths) == 4 and not failed
+    assert len(set(written_on)) == 1 and written_on[0].startswith("chunk-write")
+
+
+def test_async_engine_georeferences_off_the_consumer(monkeypatch, tmp_path, service):
+    pytest.importorskip("aiohttp")
+    persisted_on = []
+
+    async def fake_fetch(*a, **k):
+        return b"png"
+
+    def fake_georef(raw, chunk, img_format, td, srs, creation_options=None):
+        persisted_on.append(threading.current_thread())
+        path = td / f"chunk_{chunk['col']}_{chunk['row']}.tif"
+        path.write_bytes(raw)
+        return path
+
+    monkeypatch.setattr(AsyncTransport, "fetch_chunk_async", fake_fetch)
+    monkeypatch.setattr(AsyncTransport, "open_async_session", lambda n: _NullSession())
+    monkeypatch.setattr(DownloaderBase, "georeference_chunk", fake_georef)
+
+    paths, failed = DownloaderBase.download_all_chunks(
+        _chunks(4),
+        service,
+        "png",
+        1,
+        5,
+        4,
+        tmp_path,
+        options=DownloadOptions(engine="async"),
+    )
+
+    assert len(paths) == 4 and not failed
+    assert threading.main_thread() not in persisted_on
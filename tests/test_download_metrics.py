@@ -0,0 +1,176 @@
+"""Tests for per-request download metrics."""
+
+import csv
+import datetime
+import io
+import json
+
+import pytest
+import requests
+from PIL import Image as pImage
+
+from terrain_stitcher.functions import DownloaderBase, OrthoDownloader
+from terrain_stitcher.functions.DownloadMetrics import (
+    METRICS_FILENAME,
+    REQUESTS_CSV_FILENAME,
+    DownloadMetrics,
+    LatencyHistogram,
+    keep_metrics,
+)
+from terrain_stitcher.functions.DownloadOptions import DownloadOptions
+from terrain_stitcher.functions.DownloaderBase import build_chunk_grid
+
+
+class _Resp:
+    def __init__(self, status, content=b"II*\x00" + bytes(996)):
+        self.status_code = status
+        self.headers = {"Content-Type": "image/tiff"} if status == 200 else {}
+        self.content = content
+        self.text = ""
+        self.elapsed = datetime.timedelta(milliseconds=20)
+
+
+class _Session:
+    """Answers 503 to the first request for column 1, 200 otherwise."""
+
+    def __init__(self):
+        self.seen = set()
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        bbox = params["bbox"]
+        if bbox.startswith("8.0,") and bbox not in self.seen:
+            self.seen.add(bbox)
+            return _Resp(503)
+        return _Resp(200)
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+
+def test_histogram_percentiles_are_within_a_bin():
+    hist = LatencyHistogram()
+    for ms in range(1, 1001):
+        hist.add(ms / 1000)
+
+    assert hist.quantile(0.50) == pytest.approx(0.5, rel=0.05)
+    assert hist.quantile(0.99) == pytest.approx(0.99, rel=0.05)
+    assert hist.quantile(1.0) == pytest.approx(1.0)
+    assert LatencyHistogram().quantile(0.5) is None
+
+
+def test_download_writes_summary_and_request_csv(monkeypatch, tmp_path, service):
+    monkeypatch.setattr(requests, "Session", _Session)
+    monkeypatch.setattr(DownloaderBase.time, "sleep", lambda s: None)
+    grid = build_chunk_grid(0.0, 0.0, 24.0, 8.0, 8, 1.0)
+
+    paths, failed = DownloaderBase.download_all_chunks(
+        grid,
+        service,
+        "tiff",
+        3,
+        5,
+        2,
+        tmp_path,
+        pixel_type="F32",
+        georeference=False,
+        options=DownloadOptions(metrics_csv=True),
+    )
+
+    assert len(paths) == 3 and not failed
+    summary = json.loads((tmp_path / METRICS_FILENAME).read_text())
+    assert summary["requests"] == 3
+    assert summary["retries"] == 1
+    assert summary["bytes"] == 3000
+    assert summary["status_counts"] == {"200": 3}
+    assert summary["ttfb"]["p50_s"] == pytest.approx(0.02, rel=0.05)
+    assert summary["write"]["count"] == 3
+
+    with open(tmp_path / REQUESTS_CSV_FILENAME, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert sorted((r["col"], r["retries"]) for r in rows) == [
+        ("0", "0"),
+        ("1", "1"),
+        ("2", "0"),
+    ]
+
+
+def test_failed_request_is_recorded_with_its_status(tmp_path, service):
+    class Refusing(_Session):
+        def get(self, *a, **k):
+            return _Resp(400)
+
+    metrics = DownloadMetrics()
+    chunk = {"row": 0, "col": 0, "w": 8, "h": 8}
+    chunk.update(xmin=0.0, ymin=0.0, xmax=8.0, ymax=8.0)
+    with pytest.raises(RuntimeError, match="HTTP 400"):
+        DownloaderBase.fetch_chunk(
+            Refusing(), service, chunk, "png", 3, 5, metrics=metrics
+        )
+
+    assert metrics.requests == 1 and metrics.bytes == 0
+    assert metrics.by_status == {"400": 1}
+    assert "MB/s" in metrics.status()
+
+
+def test_successful_run_keeps_its_metrics(monkeypatch, tmp_path, service):
+    shape = tmp_path / "Shape.json"
+    shape.write_text(
+        json.dumps(
+            {
+                "boundsType": "POINT",
+                "center": {"x": -90.0, "y": 40.0},
+                "view_distance": 1.0,
+            }
+        )
+    )
+    monkeypatch.chdir(tmp_path)
+
+    def fake_fetch(session, service, chunk, *a, **k):
+        buf = io.BytesIO()
+        img = pImage.new("RGB", (chunk["w"], chunk["h"]), (10, 20, 30))
+        img.putpixel((0, 0), (0, 0, 255))  # not blank
+        img.save(buf, format="PNG")
+        return buf.getvalue()
+
+    monkeypatch.setattr(DownloaderBase, "fetch_chunk", fake_fetch)
+
+    outdir = tmp_path / "tiles"
+    OrthoDownloader.OrthoDownloader(service=service).run(
+        shapefile_path=str(shape),
+        outdir=str(outdir),
+        zoom=12,
+        xyz=True,
+        resampling="lanczos",
+        processes=1,
+        timeout=30,
+        num_workers=2,
+        chunk_px=512,
+        tile_aligned=True,
+        options=DownloadOptions(metrics_csv=True),
+    )
+
+    # The chunk directory is gone, the metrics moved to the tile tree.
+    assert not (tmp_path / "aoi_chunks").exists()
+    assert "requests" in json.loads((outdir / METRICS_FILENAME).read_text())
+    assert (outdir / REQUESTS_CSV_FILENAME).is_file()
+
+
+def test_keep_metrics_names_split_aoi_parts(tmp_path):
+    src = tmp_path / "aoi_chunks"
+    (src / "west").mkdir(parents=True)
+    (src / METRICS_FILENAME).write_text("{}")
+    (src / "west" / METRICS_FILENAME).write_text("{}")
+
+    kept = keep_metrics(src, tmp_path / "out", prefix="perry_tiles_")
+
+    assert sorted(p.name for p in kept) == [
+        f"perry_tiles_{METRICS_FILENAME}",
+        f"perry_tiles_west_{METRICS_FILENAME}",
+    ]
+    assert not list(src.rglob(METRICS_FILENAME))
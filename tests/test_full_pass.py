@@ -97,7 +97,7 @@ def test_cli_process_terrain_dispatches_default(monkeypatch, tmp_path):
     assert captured["workers"] == 32
     assert captured["processes"] == 32
     assert captured["gather_workers"] is None
-    assert captured["chunk_px"] == 256
+    assert captured["chunk_px"] == "auto"
     assert captured["timeout"] == 30
     assert captured["resampling"] == "lanczos"
     assert captured["service_index"] == 2
@@ -154,6 +154,8 @@ def test_process_terrain_two_tiers_single_download(monkeypatch, tmp_path):
     assert len(downloads) == 1
     assert downloads[0]["lod"] == 18
     assert downloads[0]["outdir"] == str(tmp_path / "perry_tiles")
+    # the lower tier is built in-process from the LOD 18 tiles
+    assert downloads[0]["pyramid_lods"] == [17]
 
     # one gather per tier, into <name>_<lod>, sharing the pyramid
     assert [g["min_level"] for g in gathers] == [17, 18]
@@ -277,6 +279,33 @@ def test_process_terrain_dimension_lt_2_raises(monkeypatch, tmp_path):
         )
 
 
+def test_process_terrain_direct_gathers_each_tier_from_the_server(
+    monkeypatch, tmp_path
+):
+    downloads, gathers, _ = _patch_pipeline(monkeypatch)
+    removed = _patch_rmtree(monkeypatch)
+    direct = []
+    monkeypatch.setattr(fullpass_mod, "gather_direct", lambda **kw: direct.append(kw))
+
+    FullPass.main_process_terrain(
+        name="perry",
+        shape_file=_shape_file(tmp_path),
+        output=str(tmp_path),
+        dimension=4,
+        direct=True,
+    )
+
+    assert downloads == [] and gathers == []
+    assert [d["lod"] for d in direct] == [17, 18]
+    assert [d["output_dir"] for d in direct] == [
+        str(tmp_path / "perry_17"),
+        str(tmp_path / "perry_18"),
+    ]
+    assert all(d["dimension"] == 4 for d in direct)
+    # No tile pyramid is written, so there is nothing to clean up.
+    assert removed == []
+
+
 # ---------------------------------------------------------------------------
 # Fallback: a tier's LOD missing from the shared pyramid triggers a
 # dedicated per-LOD download (robust to gdal2tiles -z semantics).
@@ -0,0 +1,68 @@
+"""Tests for the mock ImageServer and the offline download benchmark."""
+
+import io
+
+import pytest
+import rasterio
+import requests
+from PIL import Image as pImage
+
+from terrain_stitcher.arcgis.mock_image_server import MockImageServer
+from terrain_stitcher.functions import DownloadBenchmark
+from terrain_stitcher.functions.DownloaderBase import fetch_chunk
+
+_CHUNK = {"row": 0, "col": 0, "w": 64, "h": 32}
+_CHUNK.update(xmin=1000.0, ymin=2000.0, xmax=1640.0, ymax=2320.0)
+
+
+def test_serves_png_and_georeferenced_f32_tiff():
+    with MockImageServer() as server, requests.Session() as session:
+        png = fetch_chunk(session, server.service("imagery"), _CHUNK, "png", 1, 5)
+        tiff = fetch_chunk(
+            session, server.service("elevation"), _CHUNK, "tiff", 1, 5, "F32"
+        )
+        info = session.get(server.base_url, params={"f": "json"}).json()
+
+    with pImage.open(io.BytesIO(png)) as img:
+        assert (img.format, img.size, img.mode) == ("PNG", (64, 32), "RGB")
+    with rasterio.MemoryFile(tiff) as mem, mem.open() as ds:
+        assert ds.dtypes == ("float32",)
+        assert tuple(ds.bounds) == pytest.approx((1000.0, 2000.0, 1640.0, 2320.0))
+        assert ds.crs.to_epsg() == 3857
+    assert info["maxImageWidth"] == 4100
+    assert server.requests == 2 and server.bytes_sent == len(png) + len(tiff)
+
+
+def test_throttles_with_retry_after():
+    with MockImageServer(throttle_rate=1.0, retry_after_s=7) as server:
+        url = server.service().base_url
+        resp = requests.get(url, params={"bbox": "0,0,1,1", "size": "1,1"})
+        with pytest.raises(RuntimeError, match="HTTP 429"):
+            fetch_chunk(requests.Session(), server.service(), _CHUNK, "png", 1, 5)
+
+    assert resp.status_code == 429 and resp.headers["Retry-After"] == "7"
+    assert server.throttled == 2
+
+
+def test_benchmark_reports_every_case_and_flags_regressions(tmp_path):
+    results = DownloadBenchmark.main(
+        sizes=(2,),
+        workers=(2, 4),
+        latency_s=0.0,
+        jitter_s=0.0,
+        tiles=False,
+        json_out=str(tmp_path / "bench.json"),
+    )
+
+    assert [r.case for r in results] == [
+        "imagery/2x2/w2",
+        "imagery/2x2/w4",
+        "elevation/2x2/w2",
+        "elevation/2x2/w4",
+    ]
+    assert all(r.chunks == 4 and not r.failed and r.bytes > 0 for r in results)
+    assert all(r.chunks_per_s > 0 and r.mosaic_s is not None for r in results)
+
+    faster = {"results": [{**r.to_dict(), "chunks_per_s": 1e9} for r in results]}
+    assert len(DownloadBenchmark.compare_to_baseline(results, faster, 0.25)) == 4
+    assert not DownloadBenchmark.compare_to_baseline(results, {"results": []}, 0.25)
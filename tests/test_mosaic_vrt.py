@@ -0,0 +1,160 @@
+"""Tests for writing the mosaic VRT directly from chunk geometry."""
+
+import pytest
+import rasterio
+from PIL import Image as pImage
+
+from terrain_stitcher.functions import DownloaderBase, MosaicVrt
+from terrain_stitcher.functions.MosaicVrt import (
+    MixedChunkLayouts,
+    UnsupportedChunkLayout,
+    write_mosaic_vrt,
+)
+
+
+def _grid(n_rows, n_cols, size=4, px=10.0):
+    """A regular chunk grid whose last row/column are half-width edge chunks,
+    as ``build_chunk_grid`` produces for an AOI that is not a whole multiple
+    of the chunk size."""
+    chunks = []
+    x0, y0 = 1000.0, 5000.0
+    for row in range(n_rows):
+        for col in range(n_cols):
+            w = size // 2 if col == n_cols - 1 else size
+            h = size // 2 if row == n_rows - 1 else size
+            xmin = x0 + col * size * px
+            ymax = y0 - row * size * px
+            chunks.append(
+                {
+                    "row": row,
+                    "col": col,
+                    "w": w,
+                    "h": h,
+                    "xmin": xmin,
+                    "xmax": xmin + w * px,
+                    "ymin": ymax - h * px,
+                    "ymax": ymax,
+                }
+            )
+    return chunks
+
+
+def _write_chunks(tmp_path, chunks, mode="RGB"):
+    paths = []
+    for c in chunks:
+        value = c["row"] * 10 + c["col"]
+        img = pImage.new(mode, (c["w"], c["h"]), (value,) * len(mode))
+        path = tmp_path / f"chunk_{c['col']}_{c['row']}.tif"
+        img.save(path)
+        paths.append(path)
+    return paths
+
+
+def test_flat_vrt_places_chunks_from_geometry(tmp_path):
+    chunks = _grid(2, 3)
+    paths = _write_chunks(tmp_path, chunks)
+
+    vrt = write_mosaic_vrt(paths, chunks, tmp_path, 3857, hierarchical_threshold=100)
+
+    with rasterio.open(vrt) as ds:
+        assert (ds.width, ds.height) == (10, 6)
+        assert ds.count == 3
+        assert ds.crs.to_epsg() == 3857
+        assert ds.bounds == (1000.0, 4940.0, 1100.0, 5000.0)
+        data = ds.read(1)
+    # Each chunk's pixels land at its grid offset.
+    assert data[0, 0] == 0 and data[0, 4] == 1 and data[0, 9] == 2
+    assert data[5, 0] == 10 and data[5, 9] == 12
+
+
+def test_hierarchical_vrt_uses_spatial_blocks_and_opens_one_chunk(monkeypatch, tmp_path):
+    monkeypatch.setattr(MosaicVrt, "_SUB_VRT_BLOCK", 2)
+    chunks = _grid(3, 3)
+    paths = _write_chunks(tmp_path, chunks)
+
+    opened = []
+    real_open = pImage.open
+
+    def counting_open(fp, *a, **kw):
+        opened.append(fp)
+        return real_open(fp, *a, **kw)
+
+    monkeypatch.setattr(MosaicVrt.pImage, "open", counting_open)
+    vrt = write_mosaic_vrt(
+        paths, chunks, tmp_path, 3857, hierarchical_threshold=4, workers=2
+    )
+    assert len(opened) == 1
+
+    subs = sorted(p.name for p in tmp_path.glob("sub_*.vrt"))
+    assert subs == [
+        "sub_0000_0000.vrt",
+        "sub_0000_0001.vrt",
+        "sub_0001_0000.vrt",
+        "sub_0001_0001.vrt",
+    ]
+    # The first block holds the 2x2 chunks in its corner, not a row strip.
+    first = (tmp_path / subs[0]).read_text()
+    assert "chunk_1_1.tif" in first and "chunk_2_0.tif" not in first
+
+    monkeypatch.setattr(MosaicVrt.pImage, "open", real_open)
+    with rasterio.open(vrt) as ds:
+        assert (ds.width, ds.height) == (10, 10)
+        data = ds.read(1)
+    assert data[0, 0] == 0 and data[4, 4] == 11 and data[9, 9] == 22
+
+
+def test_unsupported_mode_raises(tmp_path):
+    chunks = _grid(1, 1)
+    path = tmp_path / "chunk_0_0.tif"
+    pImage.new("CMYK", (2, 2)).save(path)
+    with pytest.raises(UnsupportedChunkLayout):
+        write_mosaic_vrt([path], chunks, tmp_path, 3857, hierarchical_threshold=10)
+
+
+def test_services_with_different_bands_are_refused(tmp_path):
+    chunks = _grid(1, 2)
+    (tmp_path / "west").mkdir()
+    (tmp_path / "east").mkdir()
+    paths = _write_chunks(tmp_path / "west", chunks[:1], mode="RGBA")
+    paths += _write_chunks(tmp_path / "east", chunks[1:], mode="RGB")
+
+    with pytest.raises(MixedChunkLayouts, match="east has Byte Red/Green/Blue"):
+        write_mosaic_vrt(paths, chunks, tmp_path, 3857, hierarchical_threshold=10)
+
+    rgba = _write_chunks(tmp_path / "east", chunks[1:], mode="RGBA")
+    vrt = write_mosaic_vrt(
+        paths[:1] + rgba, chunks, tmp_path, 3857, hierarchical_threshold=10
+    )
+    with rasterio.open(vrt) as ds:
+        assert ds.count == 4
+
+
+def test_build_mosaic_falls_back_to_gdalbuildvrt(monkeypatch, tmp_path):
+    chunks = _grid(1, 1)
+    paths = [tmp_path / "chunk_0_0.tif"]
+
+    def unsupported(*a, **kw):
+        raise UnsupportedChunkLayout("unsupported image mode 'P'")
+
+    calls = []
+    monkeypatch.setattr(DownloaderBase, "write_mosaic_vrt", unsupported)
+    monkeypatch.setattr(
+        DownloaderBase.subprocess, "run", lambda cmd, **kw: calls.append(cmd)
+    )
+    vrt = DownloaderBase.build_mosaic(paths, tmp_path, chunks=chunks, srs=3857)
+    assert vrt == tmp_path / "mosaic.vrt"
+    assert calls[0][0] == "gdalbuildvrt"
+
+
+def test_build_mosaic_without_geometry_keeps_gdalbuildvrt(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        DownloaderBase,
+        "write_mosaic_vrt",
+        lambda *a, **kw: pytest.fail("direct writer used without chunk geometry"),
+    )
+    calls = []
+    monkeypatch.setattr(
+        DownloaderBase.subprocess, "run", lambda cmd, **kw: calls.append(cmd)
+    )
+    DownloaderBase.build_mosaic([tmp_path / "chunk_0_0.tif"], tmp_path)
+    assert calls[0][0] == "gdalbuildvrt"
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 import json
+import math
 from pathlib import Path
 
 import pytest
+import shapely
 
+from terrain_stitcher.arcgis.services import bbox_latlon_from_radius
 from terrain_stitcher.common import (
     ParseArea,
     TerrainBoundsCalculateType,
@@ -129,4 +132,84 @@ def test_round_tripped_area_produces_same_bounding_region(tmp_path):
     )
     assert orig_box.get_upper_right().get_lon() == pytest.approx(
         rest_box.get_upper_right().get_lon()
-    )
\ No newline at end of file
+    )
+
+
+def test_circle_round_trips_and_keeps_the_square_region(tmp_path):
+    area = ParseArea(
+        TerrainBoundsCalculateType.CIRCLE, World_Coordinates("40.0", "-100.0"), 2
+    )
+    p = tmp_path / "Shape.json"
+    p.write_text(json.dumps(area.toJSON()))
+
+    restored = ParseArea.fromJSONFile(str(p))
+    assert restored.boundsType is TerrainBoundsCalculateType.CIRCLE
+    box = restored.getTotalRegion()
+    outline = restored.boundary()
+    min_lon, min_lat, max_lon, max_lat = outline.bounds
+    assert min_lat == pytest.approx(box.get_lower_left().get_lat())
+    assert max_lon == pytest.approx(box.get_upper_right().get_lon())
+    assert outline.area == pytest.approx(
+        math.pi / 4 * (max_lon - min_lon) * (max_lat - min_lat), rel=1e-3
+    )
+
+
+def test_polygon_round_trips_and_derives_center_from_bounds(tmp_path):
+    doc = {
+        "boundsType": "POLYGON",
+        "polygon": {
+            "type": "Feature",
+            "properties": {},
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [
+                    [[-100.2, 40.0], [-99.8, 40.0], [-100.2, 40.1], [-100.2, 40.0]]
+                ],
+            },
+        },
+    }
+    p = tmp_path / "Shape.json"
+    p.write_text(json.dumps(doc))
+
+    area = ParseArea.fromJSONFile(str(p))
+    assert area.center.get_lat() == pytest.approx(40.05)
+    assert area.center.get_lon() == pytest.approx(-100.0)
+    box = area.getTotalRegion()
+    assert box.get_lower_left().get_lon() == pytest.approx(-100.2)
+    assert box.get_upper_right().get_lat() == pytest.approx(40.1)
+
+    p.write_text(json.dumps(area.toJSON()))
+    restored = ParseArea.fromJSONFile(str(p))
+    assert restored.polygon.equals(area.polygon)
+    assert restored.view_distance == pytest.approx(area.view_distance)
+
+
+def test_polygon_view_distance_is_raised_to_cover_the_polygon(tmp_path):
+    polygon = shapely.box(-100.2, 40.0, -99.8, 40.1)
+    derived = ParseArea(TerrainBoundsCalculateType.POLYGON, None, None, polygon)
+    too_small = ParseArea(TerrainBoundsCalculateType.POLYGON, None, 1.0, polygon)
+    larger = ParseArea(TerrainBoundsCalculateType.POLYGON, None, 50.0, polygon)
+
+    assert too_small.view_distance == pytest.approx(derived.view_distance)
+    assert larger.view_distance == 50.0
+    min_lat, min_lon, max_lat, max_lon = bbox_latlon_from_radius(
+        too_small.center.get_lat(),
+        too_small.center.get_lon(),
+        too_small.view_distance,
+    )
+    assert min_lon <= -100.2 and max_lon >= -99.8
+    assert min_lat <= 40.0 and max_lat >= 40.1
+
+
+def test_polygon_bounds_reject_non_polygon_geometry(tmp_path):
+    p = tmp_path / "Shape.json"
+    p.write_text(
+        json.dumps(
+            {
+                "boundsType": "POLYGON",
+                "polygon": {"type": "Point", "coordinates": [-100.0, 40.0]},
+            }
+        )
+    )
+    with pytest.raises(Exception, match="Polygon"):
+        ParseArea.fromJSONFile(str(p))
@@ -0,0 +1,111 @@
+"""Tests for the in-process tile pyramid builder (--pyramid-lods)."""
+
+import os
+
+import pytest
+from PIL import Image as pImage
+
+from terrain_stitcher.functions.PyramidBuilder import build_pyramid, check_pyramid_zooms
+
+_COLOURS = {
+    (0, 0): (255, 0, 0, 255),
+    (1, 0): (0, 255, 0, 255),
+    (0, 1): (0, 0, 255, 255),
+    (1, 1): (255, 255, 0, 255),
+}
+
+
+def _write_level(tiles_dir, z, tiles, tms=False):
+    """Write solid 256-px tiles; *tiles* maps XYZ ``(x, y)`` to a colour."""
+    for (x, y), colour in tiles.items():
+        if tms:
+            y = 2**z - 1 - y
+        path = tiles_dir / str(z) / str(x) / f"{y}.png"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        pImage.new("RGBA", (256, 256), colour).save(path)
+
+
+def _quadrants(path):
+    with pImage.open(path) as img:
+        return [img.getpixel(p) for p in [(64, 64), (192, 64), (64, 192), (192, 192)]]
+
+
+@pytest.mark.parametrize("tms", [False, True])
+def test_parent_is_children_reduced_in_place(tmp_path, tms):
+    # Four children of XYZ tile (3, 5) at z=10 -> quadrants of the parent.
+    children = {(6 + dx, 10 + dy): c for (dx, dy), c in _COLOURS.items()}
+    _write_level(tmp_path, 11, children, tms=tms)
+
+    build_pyramid(tmp_path, 11, [10], xyz=not tms, resampling="average", processes=1)
+
+    y = 2**10 - 1 - 5 if tms else 5
+    assert _quadrants(tmp_path / "10" / "3" / f"{y}.png") == [
+        _COLOURS[(0, 0)],
+        _COLOURS[(1, 0)],
+        _COLOURS[(0, 1)],
+        _COLOURS[(1, 1)],
+    ]
+
+
+def test_missing_children_become_transparent(tmp_path):
+    _write_level(tmp_path, 5, {(0, 0): (9, 9, 9, 255)})
+    build_pyramid(tmp_path, 5, [4], processes=1)
+    q = _quadrants(tmp_path / "4" / "0" / "0.png")
+    assert q[0] == (9, 9, 9, 255)
+    assert q[3][3] == 0
+
+
+def test_intermediate_levels_are_dropped_on_request(tmp_path):
+    _write_level(tmp_path, 8, {(x, y): (1, 2, 3, 255) for x in range(4) for y in range(4)})
+
+    build_pyramid(tmp_path, 8, [6], processes=1)
+    assert len(list((tmp_path / "7").glob("*/*.png"))) == 4
+
+    (tmp_path / "6" / "0" / "0.png").unlink()
+    build_pyramid(tmp_path, 8, [6], processes=1, drop_intermediate=True)
+
+    assert (tmp_path / "6" / "0" / "0.png").is_file()
+    # LOD 7 was only an intermediate step and has been consumed.
+    assert not (tmp_path / "7").exists()
+    assert len(list((tmp_path / "8").glob("*/*.png"))) == 16
+    assert not (tmp_path / "5").exists()
+
+
+def test_rerun_skips_existing_tiles(tmp_path, capsys):
+    _write_level(tmp_path, 8, {(x, y): (1, 2, 3, 255) for x in range(4) for y in range(4)})
+    build_pyramid(tmp_path, 8, [6], processes=1)
+    top = tmp_path / "6" / "0" / "0.png"
+    mtime = top.stat().st_mtime_ns
+    capsys.readouterr()
+
+    # A second run must not rewrite LOD 7 or LOD 6.
+    build_pyramid(tmp_path, 8, [6], processes=1)
+    out = capsys.readouterr().out
+    assert "LOD 7: 0 tile(s) built" in out and "LOD 6: 0 tile(s) built" in out
+    assert top.stat().st_mtime_ns == mtime
+
+
+def test_newer_child_rebuilds_its_ancestors(tmp_path, capsys):
+    _write_level(tmp_path, 8, {(x, y): (1, 2, 3, 255) for x in range(4) for y in range(4)})
+    build_pyramid(tmp_path, 8, [6], processes=1)
+    capsys.readouterr()
+
+    # A re-run fetched a tile that was missing (a failed chunk) after the
+    # first pyramid was built.
+    child = tmp_path / "8" / "3" / "3.png"
+    pImage.new("RGBA", (256, 256), (200, 0, 0, 255)).save(child)
+    later = (tmp_path / "6" / "0" / "0.png").stat().st_mtime_ns + 10**9
+    os.utime(child, ns=(later, later))
+
+    build_pyramid(tmp_path, 8, [6], processes=1)
+    out = capsys.readouterr().out
+    assert "LOD 7: 1 tile(s) built" in out and "LOD 6: 1 tile(s) built" in out
+    with pImage.open(tmp_path / "6" / "0" / "0.png") as img:
+        assert img.getpixel((224, 224)) == (200, 0, 0, 255)
+        assert img.getpixel((32, 32)) == (1, 2, 3, 255)
+
+
+def test_zooms_must_be_below_the_download_lod():
+    assert check_pyramid_zooms(19, [18, 17, 18]) == [17, 18]
+    with pytest.raises(ValueError, match="below the download LOD"):
+        check_pyramid_zooms(18, [18])
@@ -0,0 +1,219 @@
+"""Tests for the shared AIMD concurrency controller (``--adaptive``)."""
+
+import asyncio
+import email.utils
+import threading
+import time
+
+from terrain_stitcher.functions import DownloaderBase, RateControl
+from terrain_stitcher.functions.DownloadOptions import DownloadOptions
+from terrain_stitcher.functions.RateControl import AimdController
+
+
+_CHUNK = {
+    "row": 0,
+    "col": 0,
+    "w": 2,
+    "h": 2,
+    "xmin": 0.0,
+    "ymin": 0.0,
+    "xmax": 2.0,
+    "ymax": 2.0,
+}
+
+
+class _Resp:
+    def __init__(self, status, headers=None, content=b"png"):
+        self.status_code = status
+        self.headers = headers or {}
+        self.content = content
+        self.text = ""
+
+
+class _ScriptedSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        return self.responses.pop(0)
+
+
+def test_parse_retry_after_seconds_date_and_garbage():
+    assert RateControl.parse_retry_after("7") == 7.0
+    assert RateControl.parse_retry_after(None) is None
+    assert RateControl.parse_retry_after("soon") is None
+    future = email.utils.formatdate(time.time() + 60, usegmt=True)
+    assert 50 < RateControl.parse_retry_after(future) <= 60
+
+
+def test_limit_grows_while_healthy_and_respects_ceiling():
+    ctl = AimdController(4, max_limit=6)
+    for _ in range(200):
+        ctl.on_success(0.1, 1000)
+    assert ctl.limit == 6
+
+
+def test_limit_does_not_grow_when_latency_degrades():
+    ctl = AimdController(4, max_limit=100)
+    for _ in range(20):
+        ctl.on_success(0.1)
+    grown = ctl.limit
+    for _ in range(200):
+        ctl.on_success(5.0)
+    # The EWMA crosses 2x the floor within a few samples; after that the
+    # limit holds.
+    assert ctl.limit <= grown + 2
+
+
+def test_throttle_halves_once_per_congestion_event():
+    ctl = AimdController(16)
+    ctl.on_throttle(1)
+    assert ctl.limit == 8
+    # The rest of the burst that was already in flight must not halve again.
+    for _ in range(10):
+        ctl.on_throttle(1)
+    assert ctl.limit == 8
+
+
+def test_throttle_never_drops_below_min():
+    ctl = AimdController(2, min_limit=1)
+    for _ in range(5):
+        ctl.on_throttle(1)
+        ctl._last_decrease = 0.0  # new congestion event
+    assert ctl.limit == 1
+
+
+def test_acquire_blocks_at_limit_until_release():
+    ctl = AimdController(1, max_limit=1)
+    ctl.acquire()
+    got = threading.Event()
+
+    def _worker():
+        ctl.acquire()
+        got.set()
+
+    t = threading.Thread(target=_worker)
+    t.start()
+    assert not got.wait(0.1)
+    ctl.release()
+    assert got.wait(2)
+    t.join()
+
+
+def test_retry_after_pauses_every_worker():
+    ctl = AimdController(4)
+    delay = ctl.on_throttle(1, retry_after=0.3)
+    assert delay >= 0.3
+    start = time.monotonic()
+    ctl.acquire()
+    assert time.monotonic() - start >= 0.25
+
+
+def test_acquire_async_waits_for_release():
+    ctl = AimdController(1, max_limit=1)
+
+    async def _main():
+        await ctl.acquire_async()
+        waiter = asyncio.ensure_future(ctl.acquire_async())
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        ctl.release()
+        await asyncio.wait_for(waiter, 2)
+        assert ctl.in_flight == 1
+        assert not ctl._waiters
+
+    asyncio.run(_main())
+
+
+def test_fetch_chunk_reports_to_controller_and_honours_retry_after(
+    monkeypatch, service
+):
+    sleeps = []
+    monkeypatch.setattr(DownloaderBase.time, "sleep", sleeps.append)
+    session = _ScriptedSession(
+        [
+            _Resp(429, {"Retry-After": "5"}),
+            _Resp(200, {"Content-Type": "image/png"}, b"data"),
+        ]
+    )
+    ctl = AimdController(8)
+    # Let the pause set by the 429 lapse immediately so acquire() returns.
+    monkeypatch.setattr(
+        ctl, "_admit_delay", lambda now: AimdController._admit_delay(ctl, 1e12)
+    )
+
+    body = DownloaderBase.fetch_chunk(
+        session, service, _CHUNK, "png", 3, 30, controller=ctl
+    )
+
+    assert body == b"data"
+    assert len(sleeps) == 1 and sleeps[0] >= 5
+    assert ctl.limit == 4
+    assert ctl.in_flight == 0
+
+
+def test_fetch_chunk_without_controller_keeps_fixed_backoff(monkeypatch, service):
+    sleeps = []
+    monkeypatch.setattr(DownloaderBase.time, "sleep", sleeps.append)
+    session = _ScriptedSession(
+        [_Resp(503), _Resp(200, {"Content-Type": "image/png"}, b"x")]
+    )
+    DownloaderBase.fetch_chunk(session, service, _CHUNK, "png", 3, 30)
+    assert sleeps == [2]
+
+
+def test_download_chunks_builds_shared_controller(monkeypatch, tmp_path, service):
+    captured = {}
+
+    def fake_download_all(*a, **kw):
+        captured.update(kw)
+        return [], []
+
+    monkeypatch.setattr(DownloaderBase, "download_all_chunks", fake_download_all)
+    dl = DownloaderBase.ArcGISDownloaderBase()
+    dl.download_chunks(
+        service, [], tmp_path, 30, 8, options=DownloadOptions(adaptive=True)
+    )
+    ctl = captured["controller"]
+    assert isinstance(ctl, AimdController)
+    assert ctl.limit == 8 and ctl.max_limit == 8 * RateControl.DEFAULT_MAX_FACTOR
+
+    dl.download_chunks(service, [], tmp_path, 30, 8)
+    assert captured["controller"] is None
+
+
+def test_download_all_chunks_shows_controller_status(monkeypatch, tmp_path, service):
+    monkeypatch.setattr(
+        DownloaderBase,
+        "fetch_chunk",
+        lambda *a, **k: b"raw",
+    )
+    def fake_write(raw, c, fmt, td, creation_options=None):
+        path = td / f"chunk_{c['col']}_{c['row']}.tif"
+        path.write_bytes(raw)
+        return path
+
+    monkeypatch.setattr(DownloaderBase, "write_chunk_direct", fake_write)
+    postfixes = []
+    real_tqdm = DownloaderBase.tqdm
+
+    class _Bar(real_tqdm):
+        def set_postfix_str(self, s="", refresh=True):
+            postfixes.append(s)
+            super().set_postfix_str(s, refresh)
+
+    monkeypatch.setattr(DownloaderBase, "tqdm", _Bar)
+    ctl = AimdController(2)
+    paths, failed = DownloaderBase.download_all_chunks(
+        [dict(_CHUNK)],
+        service,
+        "tiff",
+        1,
+        30,
+        2,
+        tmp_path,
+        georeference=False,
+        controller=ctl,
+    )
+    assert not failed and len(paths) == 1
+    assert any("conc 0/2" in p for p in postfixes)
@@ -0,0 +1,78 @@
+"""Tests for ranking candidate services and failing over between them."""
+
+import dataclasses
+
+from terrain_stitcher.arcgis.mock_image_server import MockImageServer
+from terrain_stitcher.arcgis.services import bbox_latlon_from_radius
+from terrain_stitcher.functions.ChunkManifest import DOWNLOADED, ChunkManifest
+from terrain_stitcher.functions.DownloadOptions import DownloadOptions
+from terrain_stitcher.functions.DownloaderBase import build_chunk_grid
+from terrain_stitcher.functions.OrthoDownloader import OrthoDownloader
+from terrain_stitcher.functions.ServiceProbe import rank_services
+
+_AOI = bbox_latlon_from_radius(40.0, -90.0, 1.0)
+
+
+def _named(server, key, **changes):
+    return dataclasses.replace(server.service(), key=key, label=key, **changes)
+
+
+def test_candidates_are_ranked_by_latency_and_errors():
+    with (
+        MockImageServer() as fast,
+        MockImageServer(latency_s=0.1) as slow,
+        MockImageServer(error_rate=1.0) as down,
+    ):
+        services = [
+            _named(down, "down"),
+            _named(slow, "slow"),
+            _named(fast, "fast"),
+        ]
+        ranking = rank_services(services, "png", "U8", (0.0, 0.0), timeout=5)
+
+    assert [r.service.key for r in ranking] == ["fast", "slow", "down"]
+    assert ranking[0].error_rate == 0 and ranking[0].throughput_bps > 0
+    assert ranking[2].error_rate == 1
+
+
+def test_auto_index_picks_the_best_and_ranks_equivalent_fallbacks(capsys):
+    with (
+        MockImageServer(latency_s=0.1) as slow,
+        MockImageServer() as fast,
+        MockImageServer() as coarse,
+    ):
+        registry = {
+            s.key: s
+            for s in (
+                _named(slow, "a_slow"),
+                _named(fast, "b_fast"),
+                _named(coarse, "c_coarse", native_pixel_size_m=1.2),
+            )
+        }
+        downloader = OrthoDownloader(service_index="auto", failover=True)
+        service = downloader.resolve_service(lambda: registry, _AOI)
+
+    assert service.key == "b_fast"
+    assert [s.key for s in downloader.fallbacks] == ["a_slow"]
+    assert "Failover order: a_slow" in capsys.readouterr().out
+
+
+def test_failed_chunks_move_to_the_fallback(tmp_path):
+    grid = build_chunk_grid(0.0, 0.0, 2048.0, 1024.0, 256, 2.0)
+    with MockImageServer(error_rate=1.0) as down, MockImageServer() as up:
+        downloader = OrthoDownloader()
+        downloader.fallbacks = [_named(up, "up")]
+        paths, failed = downloader.download_parts(
+            [_named(down, "down")],
+            grid,
+            tmp_path,
+            5,
+            8,
+            max_retries=1,
+            options=DownloadOptions(world_file=True, breaker_threshold=0),
+        )
+        assert down.requests == up.requests == len(grid)
+
+    assert len(paths) == len(grid) and not failed
+    manifest = ChunkManifest.load(tmp_path, suffix=".png")
+    assert all(manifest.get(c["row"], c["col"]) == DOWNLOADED for c in grid)
@@ -0,0 +1,101 @@
+"""Tests for downloading an AOI split between several services."""
+
+import dataclasses
+import io
+
+from PIL import Image as pImage
+
+from terrain_stitcher.arcgis.mock_image_server import MockImageServer
+from terrain_stitcher.functions import DownloaderBase
+from terrain_stitcher.functions.DownloadOptions import DownloadOptions
+from terrain_stitcher.functions.DownloaderBase import (
+    build_chunk_grid,
+    build_mosaic,
+)
+from terrain_stitcher.functions.OrthoDownloader import OrthoDownloader
+from terrain_stitcher.functions.ServiceSplit import split_chunks
+
+# Coverages meeting at the prime meridian (x = 0 in EPSG:3857).
+_WEST = (-85.0, -180.0, 85.0, 0.0)
+_EAST = (-85.0, 0.0, 85.0, 180.0)
+
+_WORLD_FILE = DownloadOptions(world_file=True)
+
+
+def _part_service(server, key, coverage):
+    return dataclasses.replace(server.service(), key=key, coverage=coverage)
+
+
+def test_chunks_go_to_the_service_holding_their_centre():
+    grid = build_chunk_grid(-1024.0, -512.0, 1024.0, 512.0, 256, 2.0)
+    with MockImageServer() as server:
+        west = _part_service(server, "west", _WEST)
+        east = _part_service(server, "east", _EAST)
+        # "far" covers nothing, and "east" takes the chunks outside "west".
+        far = _part_service(server, "far", (-85.0, 10.0, 85.0, 20.0))
+    parts = split_chunks(grid, [west, far, east])
+
+    assert [len(p) for p in parts] == [4, 0, 4]
+    assert {(c["row"], c["col"]) for c in parts[2]} == {
+        (r, c) for r in range(2) for c in range(2, 4)
+    }
+    assert len(split_chunks(grid, [west])[0]) == len(grid)
+
+
+def test_each_part_comes_from_its_service_and_is_mosaicked_as_one(tmp_path):
+    grid = build_chunk_grid(-1024.0, -512.0, 1024.0, 512.0, 256, 2.0)
+    with MockImageServer() as a, MockImageServer() as b:
+        services = [
+            _part_service(a, "west", _WEST),
+            _part_service(b, "east", _EAST),
+        ]
+        paths, failed = OrthoDownloader().download_parts(
+            services, grid, tmp_path, 5, 4, options=_WORLD_FILE
+        )
+        assert a.requests == b.requests == 4
+
+    assert len(paths) == len(grid) and not failed
+    assert {p.parent.name for p in paths} == {"west", "east"}
+    mosaic = build_mosaic(paths, tmp_path, chunks=grid, srs=3857).read_text()
+    assert mosaic.count("<SimpleSource>") == 3 * len(grid)
+    assert 'relativeToVRT="1">west/chunk_0_0.png' in mosaic
+
+
+def test_chunks_blank_on_a_seam_come_from_the_next_service(monkeypatch, tmp_path):
+    # "west"'s bbox reaches 0.005 deg east of the seam, so it is given the
+    # chunks of column 2, but its imagery stops at x = 0.
+    fetch = DownloaderBase.fetch_chunk
+
+    def west_stops_at_the_seam(session, service, chunk, *a, **k):
+        if service.key == "west" and chunk["xmin"] >= 0:
+            buf = io.BytesIO()
+            pImage.new("RGBA", (chunk["w"], chunk["h"])).save(buf, format="PNG")
+            return buf.getvalue()
+        return fetch(session, service, chunk, *a, **k)
+
+    monkeypatch.setattr(DownloaderBase, "fetch_chunk", west_stops_at_the_seam)
+    grid = build_chunk_grid(-1024.0, -512.0, 1024.0, 512.0, 256, 2.0)
+    with MockImageServer() as a, MockImageServer() as b:
+        services = [
+            _part_service(a, "west", (-85.0, -180.0, 85.0, 0.005)),
+            _part_service(b, "east", _EAST),
+        ]
+        assert [len(p) for p in split_chunks(grid, services)] == [6, 2]
+        downloader = OrthoDownloader()
+        paths, failed = downloader.download_parts(
+            services, grid, tmp_path, 5, 4, options=_WORLD_FILE
+        )
+        assert b.requests == 4
+
+        # A resumed run finds the refilled chunks where it left them.
+        again, _ = downloader.download_parts(
+            services, grid, tmp_path, 5, 4, options=_WORLD_FILE
+        )
+        assert a.requests == 4 and b.requests == 4
+
+    assert len(paths) == len(grid) and not failed
+    assert sorted(p.relative_to(tmp_path).as_posix() for p in again) == sorted(
+        p.relative_to(tmp_path).as_posix() for p in paths
+    )
+    east = {p.name for p in paths if p.parent.name == "east"}
+    assert east == {f"chunk_{c}_{r}.png" for c in (2, 3) for r in (0, 1)}
@@ -363,3 +363,35 @@ def test_select_service_elevation_ignores_imagery_only():
     # For imagery, the DEM is not a candidate, so the imagery-only service is
     # selected (proving the elevation-only service is ignored for imagery).
     assert select_service(services, aoi, kind="imagery").key == "ortho"
+
+
+def _state(key, min_lon, max_lon):
+    return ImageryService(
+        key=key,
+        label=key,
+        base_url=f"https://example/{key}/ImageServer/exportImage",
+        native_pixel_size_m=0.6,
+        srs=3857,
+        coverage=(30.0, min_lon, 40.0, max_lon),
+    )
+
+
+def test_select_services_splits_an_aoi_on_a_state_line():
+    from terrain_stitcher.arcgis.services import select_services
+
+    registry = {
+        s.key: s
+        for s in (
+            _state("west", -110.0, -100.0),
+            _state("east", -100.0, -90.0),
+            _state("far", -80.0, -70.0),
+        )
+    }
+    # Mostly in "east": it is picked first, and "far" is left out.
+    aoi = bbox_latlon_from_radius(35.0, -99.95, 10.0)
+    assert [s.key for s in select_services(registry, aoi)] == ["east", "west"]
+    inside = bbox_latlon_from_radius(35.0, -95.0, 10.0)
+    assert [s.key for s in select_services(registry, inside)] == ["east"]
+    # Nothing covers the gap between "east" and "far".
+    with pytest.raises(ValueError, match="extends outside"):
+        select_services(registry, bbox_latlon_from_radius(35.0, -90.0, 10.0))
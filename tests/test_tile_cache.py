@@ -0,0 +1,91 @@
+"""Tests for copying a service's cached tiles instead of exportImage."""
+
+import pytest
+from PIL import Image as pImage
+
+from terrain_stitcher.arcgis.mock_image_server import MockImageServer
+from terrain_stitcher.arcgis.services import ImageryService, _tile_cache_levels
+from terrain_stitcher.arcgis.tile_info import TileInfo
+from terrain_stitcher.functions.ChunkManifest import EMPTY, ChunkManifest
+from terrain_stitcher.functions.DownloadOptions import DownloadOptions
+from terrain_stitcher.functions.DownloaderBase import (
+    cached_tile_format,
+    download_all_chunks,
+)
+from terrain_stitcher.functions.XyzTiles import (
+    XyzTileWriter,
+    build_tile_aligned_grid,
+)
+
+# A 500 x 400 m EPSG:3857 box: 12 tiles at zoom 18.
+_BBOX = (1000.0, 2000.0, 1500.0, 2400.0)
+
+
+def test_only_web_mercator_256px_caches_are_recorded():
+    info = MockImageServer(tile_levels=[18, 17]).info()
+    assert _tile_cache_levels(info) == [17, 18]
+
+    for change in (
+        {"rows": 512, "cols": 512},
+        {"format": "LERC"},
+        {"origin": {"x": -5120900.0, "y": 9998100.0}},
+    ):
+        assert _tile_cache_levels({"tileInfo": {**info["tileInfo"], **change}}) == []
+    assert _tile_cache_levels({**info, "singleFusedMapCache": False}) == []
+    assert _tile_cache_levels({"tileInfo": {"lods": [{"resolution": 0.3}]}}) == []
+
+    with MockImageServer(tile_levels=[18]) as server:
+        svc = server.service()
+    assert ImageryService.from_dict(svc.to_dict()).tile_levels == [18]
+    legacy = svc.to_dict()
+    del legacy["tile_levels"]
+    assert ImageryService.from_dict(legacy).tile_levels == []
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_cached_tiles_are_copied_into_the_xyz_tree(tmp_path, engine):
+    if engine == "async":
+        pytest.importorskip("aiohttp")
+    grid = build_tile_aligned_grid(*_BBOX, 256, 18)
+    writer = XyzTileWriter(tmp_path / "tiles", 18)
+    with MockImageServer(tile_levels=[18]) as server:
+        service = server.service()
+        paths, failed = download_all_chunks(
+            grid,
+            service,
+            cached_tile_format(18),
+            1,
+            5,
+            2,
+            tmp_path,
+            options=DownloadOptions(engine=engine),
+            tile_writer=writer,
+        )
+        assert server.requests == len(grid)
+
+    assert len(paths) == len(grid) and not failed
+    infos = TileInfo.from_xyz_paths(sorted(paths), tmp_path / "tiles")
+    assert {(i.col_number, i.row_number) for i in infos} == {
+        (c["tile_x"], c["tile_y"]) for c in grid
+    }
+    with pImage.open(paths[0]) as tile:
+        assert (tile.format, tile.size) == ("PNG", (256, 256))
+
+
+def test_tiles_missing_from_the_cache_are_recorded_as_empty(tmp_path):
+    grid = build_tile_aligned_grid(*_BBOX, 256, 18)
+    with MockImageServer(tile_levels=[17]) as server:
+        paths, failed = download_all_chunks(
+            grid,
+            server.service(),
+            cached_tile_format(18),
+            1,
+            5,
+            1,
+            tmp_path,
+            tile_writer=XyzTileWriter(tmp_path / "tiles", 18),
+        )
+
+    assert not paths and not failed
+    manifest = ChunkManifest.load(tmp_path)
+    assert all(manifest.get(c["row"], c["col"]) == EMPTY for c in grid)
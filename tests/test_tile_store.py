@@ -0,0 +1,141 @@
+"""Tests for the persistent tile store (--tile-store)."""
+
+import io
+
+from PIL import Image as pImage
+
+from terrain_stitcher.functions import DownloaderBase
+from terrain_stitcher.functions.DownloadOptions import DownloadOptions
+from terrain_stitcher.functions.DownloaderBase import build_chunk_grid, fetch_chunk
+from terrain_stitcher.functions.TileStore import TileStore, store_key
+
+_WORLD_FILE = DownloadOptions(world_file=True)
+
+
+def _png(value):
+    buf = io.BytesIO()
+    img = pImage.new("RGB", (8, 8), (value, 120, 60))
+    img.putpixel((3, 3), (10, 10, 10))
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_put_get_survives_reopen_and_dedupes(tmp_path):
+    with TileStore(tmp_path) as store:
+        assert store.get("a") is None
+        store.put("a", b"same", etag='"v1"')
+        store.put("b", b"same")
+
+    with TileStore(tmp_path) as store:
+        a = store.get("a")
+        assert (a.data, a.etag, a.revalidates) == (b"same", '"v1"', True)
+        assert not store.get("b").revalidates
+    assert len([p for p in (tmp_path / "objects").rglob("*") if p.is_file()]) == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    with TileStore(tmp_path, max_bytes=3500) as store:
+        for key in "abc":
+            store.put(key, key.encode() * 1000)
+        store.get("a")
+        store.put("d", b"d" * 1000)
+
+        assert store.get("b") is None
+        assert all(store.get(key) is not None for key in "acd")
+
+
+def test_fetch_chunk_revalidates_with_conditional_request(service):
+    class Resp:
+        def __init__(self, status, headers):
+            self.status_code = status
+            self.headers = headers
+            self.content = b"png"
+            self.text = ""
+
+    class Session:
+        def __init__(self, resp):
+            self.resp = resp
+            self.sent = None
+
+        def get(self, url, params=None, headers=None, timeout=None):
+            self.sent = headers
+            return self.resp
+
+    chunk = {"w": 8, "h": 8, "xmin": 0.0, "ymin": 0.0, "xmax": 8.0, "ymax": 8.0}
+    fresh = Session(Resp(200, {"Content-Type": "image/png", "ETag": '"v2"'}))
+    validators = {}
+    assert fetch_chunk(fresh, service, chunk, "png", 1, 5, validators=validators)
+    assert not fresh.sent
+    assert validators["etag"] == '"v2"'
+
+    unchanged = Session(Resp(304, {}))
+    raw = fetch_chunk(unchanged, service, chunk, "png", 1, 5, validators=validators)
+    assert raw is None
+    assert unchanged.sent == {"If-None-Match": '"v2"'}
+
+
+def _chunks(n):
+    return build_chunk_grid(0.0, 0.0, 8.0 * n, 8.0, 8, 1.0)
+
+
+def test_second_download_is_served_from_the_store(monkeypatch, tmp_path, service):
+    fetched = []
+
+    def fake_fetch(session, service, chunk, *a):
+        fetched.append(chunk["col"])
+        return _png(chunk["col"])
+
+    monkeypatch.setattr(DownloaderBase, "fetch_chunk", fake_fetch)
+    (tmp_path / "run1").mkdir()
+    (tmp_path / "run2").mkdir()
+    with TileStore(tmp_path / "store") as store:
+        args = (_chunks(3), service, "png", 1, 5, 2)
+        DownloaderBase.download_all_chunks(
+            *args, tmp_path / "run1", options=_WORLD_FILE, store=store
+        )
+        paths, failed = DownloaderBase.download_all_chunks(
+            *args, tmp_path / "run2", options=_WORLD_FILE, store=store
+        )
+
+    assert sorted(fetched) == [0, 1, 2]
+    assert len(paths) == 3 and not failed
+    assert store.reused == 3
+
+
+def test_validated_responses_are_revalidated(monkeypatch, tmp_path, service):
+    sent = []
+
+    def fake_fetch(
+        session, service, chunk, fmt, retries, timeout, pt, ctl, validators, *a
+    ):
+        sent.append(dict(validators))
+        if validators.get("etag") == '"v1"':
+            return None
+        validators["etag"] = '"v1"'
+        return _png(chunk["col"])
+
+    monkeypatch.setattr(DownloaderBase, "fetch_chunk", fake_fetch)
+    (tmp_path / "run1").mkdir()
+    (tmp_path / "run2").mkdir()
+    with TileStore(tmp_path / "store") as store:
+        args = (_chunks(1), service, "png", 1, 5, 1)
+        DownloaderBase.download_all_chunks(
+            *args, tmp_path / "run1", options=_WORLD_FILE, store=store
+        )
+        paths, _ = DownloaderBase.download_all_chunks(
+            *args, tmp_path / "run2", options=_WORLD_FILE, store=store
+        )
+
+    assert sent == [{}, {"etag": '"v1"', "last_modified": None}]
+    assert paths[0].read_bytes() == _png(0)
+    assert store.revalidated == 1
+
+
+def test_snapped_grids_of_overlapping_aois_share_keys(service):
+    svc = service
+    a = build_chunk_grid(10.0, -40.0, 90.0, 35.0, 16, 1.0, snap=True)
+    b = build_chunk_grid(40.0, -20.0, 130.0, 30.0, 16, 1.0, snap=True)
+    keys_a = {store_key(svc, c, "png", "U8") for c in a}
+    keys_b = {store_key(svc, c, "png", "U8") for c in b}
+    assert all(c["xmin"] % 16 == 0 and c["ymax"] % 16 == 0 for c in [*a, *b])
+    assert len(keys_a & keys_b) >= 4
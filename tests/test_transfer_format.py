@@ -0,0 +1,160 @@
+"""Tests for the exportImage transfer formats (--transfer-format)."""
+
+import sys
+
+import pytest
+import rasterio
+
+from terrain_stitcher.arcgis.mock_image_server import MockImageServer
+from terrain_stitcher.functions import DownloaderBase
+from terrain_stitcher.functions.DownloadOptions import DownloadOptions
+from terrain_stitcher.functions.DownloaderBase import (
+    _export_params,
+    build_chunk_grid,
+    download_all_chunks,
+)
+from terrain_stitcher.functions.ElevationDownloader import ElevationDownloader
+from terrain_stitcher.functions.OrthoDownloader import OrthoDownloader
+from terrain_stitcher.functions.TransferFormat import (
+    parse_transfer_format,
+    select_transfer_format,
+)
+
+_CHUNK = {"row": 0, "col": 0, "w": 64, "h": 32}
+_CHUNK.update(xmin=1000.0, ymin=2000.0, xmax=1640.0, ymax=2320.0)
+
+
+def test_specs_are_canonicalised_into_export_params():
+    assert parse_transfer_format("jpg") == "jpg:85"
+    assert parse_transfer_format("lerc:0.050") == "lerc:0.05"
+    assert select_transfer_format(["jpg:90", "lerc"], "elevation") == "lerc:0.01"
+    assert select_transfer_format(["png8"], "elevation") is None
+    for bad in ("webp", "jpg:0", "lerc:-1", "png8:3"):
+        with pytest.raises(ValueError):
+            parse_transfer_format(bad)
+
+    with MockImageServer() as server:
+        service = server.service()
+    params = _export_params(service, _CHUNK, "jpg:70", "U8")
+    assert (params["format"], params["compressionQuality"]) == ("jpg", 70)
+    params = _export_params(service, _CHUNK, "lerc:0.05", "F32")
+    assert params["format"] == "lerc" and params["compressionTolerance"] == 0.05
+    assert "compressionQuality" not in _export_params(service, _CHUNK, "png", "U8")
+
+
+def test_jpeg_chunks_are_requested_at_quality_and_kept_as_is(tmp_path):
+    grid = build_chunk_grid(0.0, 0.0, 2048.0, 1024.0, 256, 2.0)
+    sizes = {}
+    with MockImageServer() as server:
+        service = server.service()
+        for spec in ("jpg:30", "jpg:90"):
+            out = tmp_path / spec.replace(":", "_")
+            out.mkdir()
+            before = server.bytes_sent
+            paths, failed = download_all_chunks(
+                grid, service, spec, 1, 5, 2, out, options=DownloadOptions(world_file=True)
+            )
+            sizes[spec] = server.bytes_sent - before
+            assert len(paths) == 8 and not failed
+
+    assert sizes["jpg:30"] < sizes["jpg:90"] / 2
+    assert sorted(p.name for p in paths)[0] == "chunk_0_0.jpg"
+    with rasterio.open(paths[0]) as ds:
+        assert ds.driver == "JPEG" and ds.crs.to_epsg() == 3857
+
+
+def test_formats_are_checked_against_the_service(capsys):
+    with MockImageServer() as server:
+        imagery = OrthoDownloader().transfer_format(server.service(), ["jpgpng"])
+        with pytest.raises(SystemExit) as exc:
+            ElevationDownloader().transfer_format(
+                server.service("elevation"), ["lerc"]
+            )
+
+    assert imagery == "jpgpng:85"
+    assert exc.value.code == 2
+    assert "LERC" in capsys.readouterr().out
+
+
+def _png(colour_type):
+    """The first bytes of a PNG whose IHDR has *colour_type*."""
+    return b"\x89PNG\r\n\x1a\n" + bytes(17) + bytes([colour_type]) + bytes(8)
+
+
+def test_jpgpng_chunks_are_all_written_with_alpha(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(
+        DownloaderBase.subprocess, "run", lambda args, **k: calls.append(args)
+    )
+    monkeypatch.setitem(sys.modules, "osgeo", None)
+
+    jpeg = b"\xff\xd8 jpeg"
+    for raw, spec in [
+        (jpeg, "jpgpng:85"),
+        (_png(2), "jpgpng:85"),
+        (_png(6), "jpgpng:85"),
+        (jpeg, "jpg:85"),
+    ]:
+        DownloaderBase.georeference_chunk(raw, _CHUNK, spec, tmp_path, 3857)
+
+    masked = ["-b", "mask"]
+    with_mask = [
+        any(args[i : i + 2] == masked for i in range(len(args))) for args in calls
+    ]
+    # JPEG and RGB PNG gain an alpha band; RGBA PNG and plain jpg are as-is.
+    assert with_mask == [True, True, False, False]
+
+
+def test_png8_chunks_are_expanded_to_rgba(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(
+        DownloaderBase.subprocess, "run", lambda args, **k: calls.append(args)
+    )
+    monkeypatch.setitem(sys.modules, "osgeo", None)
+
+    DownloaderBase.georeference_chunk(_png(3), _CHUNK, "png8", tmp_path, 3857)
+
+    assert calls[0][calls[0].index("-expand") + 1] == "rgba"
+    # Kept as-is, a paletted mosaic cannot be tiled.
+    with MockImageServer() as server:
+        with pytest.raises(ValueError, match="png8"):
+            download_all_chunks(
+                [dict(_CHUNK)],
+                server.service(),
+                "png8",
+                1,
+                5,
+                1,
+                tmp_path,
+                options=DownloadOptions(world_file=True),
+            )
+
+
+def test_lerc_chunks_are_georeferenced(monkeypatch, tmp_path):
+    written = []
+
+    def fake_georeference(raw, c, img_format, tmp_dir, srs, creation_options):
+        written.append(img_format)
+        path = tmp_dir / f"chunk_{c['col']}_{c['row']}.tif"
+        path.write_bytes(raw)
+        return path
+
+    monkeypatch.setattr(DownloaderBase, "georeference_chunk", fake_georeference)
+    monkeypatch.setattr(
+        DownloaderBase, "fetch_chunk", lambda *a, **k: b"Lerc2 blob"
+    )
+    with MockImageServer() as server:
+        paths, failed = download_all_chunks(
+            [dict(_CHUNK)],
+            server.service("elevation"),
+            "lerc:0.01",
+            1,
+            5,
+            1,
+            tmp_path,
+            pixel_type="F32",
+            georeference=False,
+        )
+
+    assert written == ["lerc:0.01"] and not failed
+    assert [p.name for p in paths] == ["chunk_0_0.tif"]
@@ -0,0 +1,103 @@
+"""Tests for the ``--world-file`` chunk mode (server PNG + sidecars)."""
+
+import io
+
+import pytest
+from PIL import Image
+
+from terrain_stitcher.functions import ChunkManifest as cm
+from terrain_stitcher.functions import DownloaderBase
+from terrain_stitcher.functions.DownloadOptions import DownloadOptions
+
+
+def _png(w=4, h=2):
+    buf = io.BytesIO()
+    img = Image.new("RGB", (w, h), (10, 20, 30))
+    img.putpixel((0, 0), (40, 50, 60))  # not blank
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+_CHUNK = {
+    "row": 3,
+    "col": 7,
+    "w": 4,
+    "h": 2,
+    "xmin": 1000.0,
+    "ymin": 500.0,
+    "xmax": 1040.0,
+    "ymax": 520.0,
+}
+
+
+def test_write_chunk_worldfile_keeps_bytes_and_writes_sidecars(tmp_path):
+    raw = _png()
+    path = DownloaderBase.write_chunk_worldfile(raw, _CHUNK, "png", tmp_path, 3857)
+
+    assert path == tmp_path / "chunk_7_3.png"
+    assert path.read_bytes() == raw
+    world = [float(v) for v in (tmp_path / "chunk_7_3.pgw").read_text().split()]
+    # 10 m x 10 m pixels; the world file names the centre of the UL pixel.
+    assert world == [10.0, 0.0, 0.0, -10.0, 1005.0, 515.0]
+    assert "<SRS>" in (tmp_path / "chunk_7_3.png.aux.xml").read_text()
+
+
+def test_gdal_reads_worldfile_georeferencing(tmp_path):
+    rasterio = pytest.importorskip("rasterio")
+    path = DownloaderBase.write_chunk_worldfile(
+        _png(), _CHUNK, "png", tmp_path, 3857
+    )
+    with rasterio.open(path) as ds:
+        assert ds.crs.to_epsg() == 3857
+        assert tuple(ds.bounds) == pytest.approx((1000.0, 500.0, 1040.0, 520.0))
+
+
+def test_verify_png_chunk_needs_world_file_and_full_trailer(monkeypatch, tmp_path):
+    # Exercise the no-GDAL fallback regardless of the local install.
+    monkeypatch.setitem(__import__("sys").modules, "osgeo", None)
+    monkeypatch.setattr(DownloaderBase.shutil, "which", lambda name: None)
+
+    path = DownloaderBase.write_chunk_worldfile(
+        _png(), _CHUNK, "png", tmp_path, 3857
+    )
+    assert DownloaderBase._verify_chunk(path)
+
+    path.write_bytes(path.read_bytes()[:-6])  # truncated mid-IEND
+    assert not DownloaderBase._verify_chunk(path)
+
+    path.write_bytes(_png())
+    (tmp_path / "chunk_7_3.pgw").unlink()
+    assert not DownloaderBase._verify_chunk(path)
+
+
+def test_recover_manifest_from_disk_finds_png_chunks_not_sidecars(tmp_path):
+    DownloaderBase.write_chunk_worldfile(_png(), _CHUNK, "png", tmp_path, 3857)
+    recovered = DownloaderBase._recover_manifest_from_disk(tmp_path, suffix=".png")
+    assert recovered == {"3_7": {"status": "downloaded", "file": "chunk_7_3.png"}}
+
+
+def test_download_all_chunks_world_file_mode(monkeypatch, tmp_path, service):
+    monkeypatch.setattr(DownloaderBase, "fetch_chunk", lambda *a, **k: _png())
+
+    def _no_transcode(*a, **k):
+        raise AssertionError("world-file mode must not run georeference_chunk")
+
+    monkeypatch.setattr(DownloaderBase, "georeference_chunk", _no_transcode)
+    chunks = [dict(_CHUNK, row=0, col=c) for c in range(3)]
+
+    paths, failed = DownloaderBase.download_all_chunks(
+        chunks,
+        service,
+        "png",
+        1,
+        5,
+        2,
+        tmp_path,
+        options=DownloadOptions(world_file=True),
+    )
+
+    assert not failed
+    assert sorted(p.name for p in paths) == [f"chunk_{c}_0.png" for c in range(3)]
+    resumed = cm.ChunkManifest.load(tmp_path, suffix=".png")
+    assert resumed.get(0, 2) == cm.DOWNLOADED
+    assert resumed.file_name(0, 2) == "chunk_2_0.png"
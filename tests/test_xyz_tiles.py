@@ -0,0 +1,137 @@
+"""Tests for the tile-aligned chunk grid and XYZ tile writer (--tile-aligned)."""
+
+import io
+import json
+
+import pytest
+from PIL import Image as pImage
+
+from terrain_stitcher.functions import DownloaderBase, OrthoDownloader
+from terrain_stitcher.functions.XyzTiles import (
+    TILE_PX,
+    WEBMERC_HALF,
+    XyzTileWriter,
+    build_tile_aligned_grid,
+)
+
+
+def _png(w, h, colour=(10, 20, 30)):
+    buf = io.BytesIO()
+    img = pImage.new("RGB", (w, h), colour)
+    # Mark each 256-px tile with its (dx, dy) so the cut can be checked.
+    for dy in range(h // TILE_PX):
+        for dx in range(w // TILE_PX):
+            img.putpixel((dx * TILE_PX, dy * TILE_PX), (dx, dy, 255))
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_grid_snaps_to_tile_boundaries():
+    zoom = 10
+    tile_m = 2 * WEBMERC_HALF / 2**zoom
+    # An AOI that starts and ends mid-tile.
+    xmin, ymax = -10_000_000.0 + 0.3 * tile_m, 4_900_000.0 - 0.6 * tile_m
+    xmax, ymin = xmin + 4.5 * tile_m, ymax - 2.2 * tile_m
+
+    chunks = build_tile_aligned_grid(xmin, ymin, xmax, ymax, 512, zoom)
+
+    for c in chunks:
+        assert (c["xmin"] + WEBMERC_HALF) / tile_m == pytest.approx(c["tile_x"])
+        assert (WEBMERC_HALF - c["ymax"]) / tile_m == pytest.approx(c["tile_y"])
+        assert c["w"] % TILE_PX == 0 and c["h"] % TILE_PX == 0
+        assert (c["xmax"] - c["xmin"]) / c["w"] == pytest.approx(tile_m / TILE_PX)
+    # 5-6 tile columns x 3-4 tile rows, in 2x2-tile chunks.
+    assert min(c["xmin"] for c in chunks) <= xmin
+    assert max(c["xmax"] for c in chunks) >= xmax
+    assert min(c["ymin"] for c in chunks) <= ymin
+    assert max(c["ymax"] for c in chunks) >= ymax
+    assert {(c["row"], c["col"]) for c in chunks} == {
+        (r, c) for r in range(2) for c in range(3)
+    }
+
+
+def test_grid_rejects_chunk_px_off_the_tile_size():
+    with pytest.raises(ValueError, match="multiple of 256"):
+        build_tile_aligned_grid(0.0, 0.0, 1000.0, 1000.0, 300, 12)
+
+
+def test_writer_cuts_chunk_into_tiles(tmp_path):
+    chunk = {"w": 512, "h": 512, "tile_x": 100, "tile_y": 200}
+    writer = XyzTileWriter(tmp_path, 9)
+
+    first = writer.write(_png(512, 512), chunk)
+
+    assert first == tmp_path / "9" / "100" / "200.png"
+    for dx, dy in [(0, 0), (1, 0), (0, 1), (1, 1)]:
+        with pImage.open(tmp_path / "9" / str(100 + dx) / f"{200 + dy}.png") as t:
+            assert t.size == (TILE_PX, TILE_PX)
+            assert t.getpixel((0, 0)) == (dx, dy, 255)
+    assert writer.verify(chunk)
+
+
+def test_writer_keeps_single_tile_bytes_and_numbers_tms(tmp_path):
+    raw = _png(256, 256)
+    writer = XyzTileWriter(tmp_path, 3, xyz=False)
+    path = writer.write(raw, {"w": 256, "h": 256, "tile_x": 2, "tile_y": 1})
+    assert path == tmp_path / "3" / "2" / "6.png"
+    assert path.read_bytes() == raw
+
+
+def test_verify_rejects_missing_or_torn_tiles(tmp_path):
+    chunk = {"w": 512, "h": 256, "tile_x": 0, "tile_y": 0}
+    writer = XyzTileWriter(tmp_path, 5)
+    writer.write(_png(512, 256), chunk)
+    first = writer.first_tile(chunk)
+    first.write_bytes(first.read_bytes()[:-8])
+    assert not writer.verify(chunk)
+    writer.write(_png(512, 256), chunk)
+    (tmp_path / "5" / "1" / "0.png").unlink()
+    assert not writer.verify(chunk)
+
+
+def test_ortho_run_tile_aligned_skips_mosaic_and_gdal2tiles(
+    monkeypatch, tmp_path, service
+):
+    shape = tmp_path / "Shape.json"
+    shape.write_text(
+        json.dumps(
+            {
+                "boundsType": "POINT",
+                "center": {"x": -90.0, "y": 40.0},
+                "view_distance": 1.0,
+            }
+        )
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        DownloaderBase,
+        "fetch_chunk",
+        lambda session, service, chunk, *a, **k: _png(chunk["w"], chunk["h"]),
+    )
+    monkeypatch.setattr(
+        OrthoDownloader, "build_mosaic", lambda *a, **k: pytest.fail("mosaic built")
+    )
+    monkeypatch.setattr(
+        OrthoDownloader, "run_gdal2tiles", lambda *a, **k: pytest.fail("gdal2tiles run")
+    )
+
+    outdir = tmp_path / "tiles"
+    OrthoDownloader.OrthoDownloader(service=service).run(
+        shapefile_path=str(shape),
+        outdir=str(outdir),
+        zoom=12,
+        xyz=True,
+        resampling="lanczos",
+        processes=1,
+        timeout=30,
+        num_workers=2,
+        chunk_px=512,
+        tile_aligned=True,
+    )
+
+    tiles = sorted(outdir.glob("12/*/*.png"))
+    assert tiles
+    with pImage.open(tiles[0]) as t:
+        assert t.size == (TILE_PX, TILE_PX)
+    # Every chunk succeeded, so the manifest directory is cleaned up.
+    assert not (tmp_path / "aoi_chunks").exists()